@@ -0,0 +1,104 @@
+"""Tests for the async instrument classes"""
+
+from pyarbtools import error
+from pyarbtools.asyncInstruments import AsyncVSA, AsyncVSG, AsyncVXG
+from pyarbtools.instruments import VSG, VXG
+from pyarbtools.simulator import InstrumentSimulator
+from pyarbtools import wfmBuilder
+import asyncio
+import unittest
+
+VXG_WFM = 'D:\\Users\\Instrument\\Documents\\Keysight\\PathWave\\SignalGenerator\\Waveforms\\sine.bin'
+
+
+def sync_download(model, cls, wfm):
+    """Returns the waveform memory written by the regular instrument class."""
+    with InstrumentSimulator(model) as sim:
+        inst = cls('127.0.0.1', port=sim.port)
+        inst.download_wfm(wfm, wfmID='sine')
+        inst.query('*opc?')
+        inst.disconnect()
+        return dict(sim.memory)
+
+
+class AsyncInstrumentsTests(unittest.TestCase):
+    def test_vsg_vxg(self):
+        wfm = wfmBuilder.sine_generator(fs=100e6, freq=1e6)
+
+        async def run(inst, sim):
+            async with inst:
+                start = len(sim.log)
+                await inst.configure(cf=2e9, amp=-10, rfState=1, fs=100e6)
+                await inst.download_wfm(wfm, wfmID='sine')
+                await inst.query('*opc?')
+                return sim.log[start:]
+
+        async def main(vsgSim, vxgSim):
+            vsg = AsyncVSG('127.0.0.1', port=vsgSim.port)
+            vxg = AsyncVXG('127.0.0.1', port=vxgSim.port)
+            vsgLog, vxgLog = await asyncio.gather(run(vsg, vsgSim), run(vxg, vxgSim))
+            return vsg, vsgLog, vxg, vxgLog
+
+        with InstrumentSimulator('VSG') as vsgSim, InstrumentSimulator('VXG') as vxgSim:
+            vsg, vsgLog, vxg, vxgLog = asyncio.run(main(vsgSim, vxgSim))
+
+            # Each recorded method is replayed as one batched transaction
+            self.assertEqual(vsgLog, [
+                'frequency 2000000000.0;:power -10;:output 1;:radio:arb:sclock:rate 100000000.0',
+                'frequency?;:power?;:output?;:radio:arb:sclock:rate?', 'SYSTem:ERRor?',
+                'output:modulation 0;:radio:arb:state 0', 'mmemory:data "WFM1:sine", #<40000 bytes>',
+                'radio:arb:waveform "WFM1:sine"', 'output:modulation?;:radio:arb:state?', '*opc?'])
+            self.assertEqual(vxgLog, [
+                'source:rf1:frequency 2000000000.0;:source:rf1:power -10;:source:rf1:output:state 1;'
+                ':signal1:waveform:sclock:rate 100000000.0',
+                'source:rf1:frequency?;:source:rf1:power?;:source:rf1:output:state?;:signal1:waveform:sclock:rate?',
+                'SYSTem:ERRor?', 'radio:arb:state off;:rf1:output:modulation off',
+                f'mmemory:data "{VXG_WFM}",#<40000 bytes>', 'radio:arb:state?', '*opc?'])
+
+            # Read-backs update the settings, and the waveform matches the regular classes
+            self.assertEqual((vsg.cf, vsg.amp, vsg.rfState, vsg.fs, vsg.modState, vsg.arbState),
+                             (2e9, -10, 1, 100e6, 0, 0))
+            self.assertEqual((vxg.cf1, vxg.amp1, vxg.rfState1, vxg.fs1), (2e9, -10, 1, 100e6))
+            self.assertEqual(vsgSim.memory['WFM1:sine'], sync_download('VSG', VSG, wfm)['WFM1:sine'])
+            self.assertEqual(vxgSim.memory[VXG_WFM], sync_download('VXG', VXG, wfm)[VXG_WFM])
+
+    def test_vsa_setters(self):
+        settings = [('set_measurement', 'ddemod', 'meas', 'ddemod'),
+                    ('set_modType', 'qpsk', 'modType', '"qpsk"'),
+                    ('set_symRate', 1e6, 'symRate', 1e6),
+                    ('set_measFilter', 'gaussian', 'measFilter', '"gaussian"'),
+                    ('set_refFilter', 'gaussian', 'refFilter', '"gaussian"'),
+                    ('set_filterAlpha', 0.5, 'filterAlpha', 0.5),
+                    ('set_measLength', 500, 'measLength', 500),
+                    ('set_eqState', True, 'eqState', True),
+                    ('set_eqLength', 21, 'eqLength', 21),
+                    ('set_eqConvergence', 1e-8, 'eqConvergence', 1e-8),
+                    ('set_measurement', 'vector', 'meas', 'vector'),
+                    ('set_cf', 2e9, 'cf', 2e9),
+                    ('set_amp', -10, 'amp', -10),
+                    ('set_span', 1e6, 'span', 1e6),
+                    ('set_rbw', 1000, 'rbw', 1000),
+                    ('set_time', 0.01, 'time', 0.01),
+                    ('set_traceFormat', 'real64', 'traceFormat', 'real64')]
+
+        async def run(sim):
+            async with AsyncVSA('127.0.0.1', port=sim.port) as vsa:
+                for name, value, attr, expected in settings:
+                    start = len(sim.log)
+                    await getattr(vsa, name)(value)
+                    await vsa.query('*opc?')
+                    self.assertGreater(len(sim.log) - start, 1, name)
+                    self.assertEqual(getattr(vsa, attr), expected, name)
+                for name in ['get_traces', 'get_trace', 'get_iq']:
+                    with self.assertRaises(error.AsyncInstrumentError):
+                        getattr(vsa, name)(1)
+
+        with InstrumentSimulator('VSA') as sim:
+            asyncio.run(run(sim))
+            self.assertEqual(sim.state['ddemod:srate'], '1000000.0')
+            self.assertEqual(sim.state['sense:rbw'], '1000')
+            self.assertEqual(sim.state['format:trace:data'], 'real64')
+
+
+if __name__ == '__main__':
+    unittest.main()
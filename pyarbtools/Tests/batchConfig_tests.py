@@ -0,0 +1,123 @@
+"""Tests for batched instrument configuration"""
+
+from pyarbtools.batchConfig import join_commands, split_responses
+from pyarbtools.instruments import VSG, VectorUXG, binblock_file_write
+from pyarbtools.simulator import InstrumentSimulator
+from pyarbtools.vsaControl import VSA
+import io
+import numpy as np
+import socketscpi
+import unittest
+
+
+class BatchConfigTests(unittest.TestCase):
+    def test_messages(self):
+        self.assertEqual(join_commands(['output 1', ':output:modulation 0', '*opc?', 'source:freq?']),
+                         'output 1;:output:modulation 0;*opc?;:source:freq?')
+        self.assertEqual(split_responses('1; "a;b" ;2.5', 3), ['1', '"a;b"', '2.5'])
+        with self.assertRaises(ValueError):
+            split_responses('1;2', 3)
+
+    def test_ordering(self):
+        with InstrumentSimulator('VSG') as sim:
+            vsg = VSG('127.0.0.1', port=sim.port)
+            start = len(sim.log)
+            with vsg.batch():
+                vsg.write('output 1')
+                vsg.write('output:modulation 0')
+                self.assertEqual(len(sim.log), start)
+
+                # Binary writes and queries flush the commands batched before them
+                vsg.binblockwrite('mmemory:data "WFM1:a", ', np.zeros(4, dtype=np.int16))
+                vsg.write('radio:arb:state 1')
+                vsg.query('*opc?')
+                vsg.write('output 0')
+                vsg.write_binary_values('mmemory:data "WFM1:b", ', np.zeros(2, dtype=np.int16))
+                vsg.write('radio:arb:state 0')
+            vsg.query('*opc?')
+            self.assertEqual(sim.log[start:], ['output 1;:output:modulation 0', 'mmemory:data "WFM1:a", #<8 bytes>',
+                                               'radio:arb:state 1', '*opc?', 'output 0',
+                                               'mmemory:data "WFM1:b", #<4 bytes>', 'radio:arb:state 0', '*opc?'])
+            vsg.disconnect()
+
+        with InstrumentSimulator('VectorUXG') as sim:
+            uxg = VectorUXG('127.0.0.1', port=sim.port)
+            start = len(sim.log)
+            with uxg.batch():
+                uxg.write('output 1')
+                binblock_file_write(uxg, 'memory:data "test.csv", ', io.BytesIO(b'abc'))
+            uxg.query('*opc?')
+            self.assertEqual(sim.log[start:], ['output 1', 'memory:data "test.csv", #<3 bytes>', '*opc?'])
+            uxg.disconnect()
+
+        # Binary queries flush the batch before the query is sent
+        with InstrumentSimulator('VSA') as sim:
+            vsa = VSA('127.0.0.1', port=sim.port)
+            vsa.set_traceFormat('real32')
+            vsa.query('*opc?')
+            start = len(sim.log)
+            with vsa.batch():
+                vsa.set_cf(3e9)
+                trace = vsa.query_binary_values('trace1:data:y?', datatype='f')
+            vsa.query('*opc?')
+            self.assertEqual(sim.log[start:], ['sense:frequency:center 3000000000.0', '*CLS', 'trace1:data:y?',
+                                               'sense:frequency:center?', '*opc?'])
+            self.assertEqual(len(trace), len(vsa.get_trace(1)))
+            self.assertEqual(vsa.cf, 3e9)
+            vsa.disconnect()
+
+    def test_readback(self):
+        with InstrumentSimulator('VSG') as sim:
+            vsg = VSG('127.0.0.1', port=sim.port)
+            order = []
+            start = len(sim.log)
+            with vsg.batch():
+                vsg.set_and_read('source:frequency 2e9', 'source:frequency?', 'cf', float,
+                                 after=lambda: order.append(vsg.cf))
+                vsg.set_and_read('source:power -20', 'source:power?', 'amp', float, pending=-20.0)
+                self.assertEqual(vsg.amp, -20.0)
+                # Read-back hooks can request follow-up read-backs
+                vsg.read_setting('output?', 'rfState', int,
+                                 after=lambda: vsg.read_setting('output:modulation?', 'modState', int))
+            self.assertEqual(sim.log[start:start + 3], [
+                'source:frequency 2e9;:source:power -20',
+                'source:frequency?;:source:power?;:output?',
+                'output:modulation?'])
+            self.assertEqual((vsg.cf, vsg.amp), (2e9, -20))
+            self.assertEqual(order, [2e9])
+            vsg.disconnect()
+
+    def test_errors(self):
+        with InstrumentSimulator('VSG') as sim:
+            vsg = VSG('127.0.0.1', port=sim.port)
+
+            # Commands not yet sent are discarded if the batch fails
+            start = len(sim.log)
+            with self.assertRaises(KeyError):
+                with vsg.batch():
+                    vsg.write('output 1')
+                    raise KeyError('bogus')
+            self.assertIsNone(vsg.batchState)
+            vsg.query('*opc?')
+            self.assertEqual(sim.log[start:], ['*opc?'])
+
+            # The error check is deferred to the end of the batch
+            with self.assertRaises(socketscpi.SockInstError):
+                with vsg.batch():
+                    vsg.write('mmemory:delete "missing"')
+                    vsg.err_check()
+                    self.assertEqual(sim.errors, [])
+            vsg.err_check()
+
+            # A read-back that can't be parsed raises after the batch is sent
+            sim.state['output'] = '1;1'
+            with self.assertRaises(ValueError):
+                with vsg.batch():
+                    vsg.read_setting('output?', 'rfState', int)
+                    vsg.read_setting('output:modulation?', 'modState', int)
+            self.assertIsNone(vsg.batchState)
+            vsg.disconnect()
+
+
+if __name__ == '__main__':
+    unittest.main()
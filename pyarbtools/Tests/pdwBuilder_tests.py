@@ -0,0 +1,334 @@
+"""Tests for PDW encoding, PdwTable, and PDW file writing"""
+
+from pyarbtools import pdwBuilder
+from pyarbtools import error
+from pyarbtools.instruments import AnalogUXG
+from pyarbtools.simulator import InstrumentSimulator
+import io
+import os
+import tempfile
+import numpy as np
+import time
+import unittest
+
+
+def random_analog_pdws(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [[int(rng.integers(0, 3)), float(rng.uniform(50e6, 40e9)), float(rng.uniform(0, 360)),
+             i * 1e-3 + float(rng.uniform(0, 1e-6)), float(rng.uniform(1e-9, 1e-3)), float(rng.choice([0.5, 1, 0.25])),
+             int(rng.integers(0, 4096)), int(rng.integers(0, 3)), int(rng.integers(0, 2)), int(rng.integers(0, 3)),
+             int(rng.integers(0, 3)), int(rng.integers(0, 64)), float(rng.choice([0, 1e3, 5e6, 20e6])),
+             int(rng.choice([0, 6]))] for i in range(count)]
+
+
+def random_vector_pdws(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [[int(rng.integers(0, 3)), float(rng.uniform(50e6, 40e9)), float(rng.uniform(0, 360)),
+             i * 1e-3 + float(rng.uniform(0, 1e-6)), float(rng.uniform(-130, 10)), int(rng.integers(0, 4096)),
+             int(rng.integers(0, 2)), int(rng.integers(0, 2)), int(rng.integers(0, 1024)),
+             int(rng.integers(0, 16))] for i in range(count)]
+
+
+def random_vector_pdws_3(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [[int(rng.integers(0, 3)), float(rng.uniform(50e6, 40e9)), float(rng.uniform(0, 360)),
+             i * 1e-3 + float(rng.uniform(0, 1e-6)), float(rng.uniform(1e-9, 1e-3)), float(rng.uniform(-130, 10)),
+             int(rng.integers(0, 4096)), float(rng.uniform(-130, 10)), int(rng.integers(0, 2)),
+             int(rng.integers(0, 2)), int(rng.integers(0, 2)), int(rng.integers(0, 2)),
+             float(rng.uniform(0, 1e-6)), int(rng.integers(0, 16)), int(rng.integers(0, 65536))]
+            for i in range(count)]
+
+
+class PdwBuilderTests(unittest.TestCase):
+    def test_analog_array_builder(self):
+        pdwList = random_analog_pdws(500)
+        expected = np.array([pdwBuilder.analog_bin_pdw_builder(*p) for p in pdwList])
+        actual = pdwBuilder.analog_bin_pdw_array_builder(*pdwBuilder.pdw_columns(pdwList))
+        np.testing.assert_array_equal(actual, expected)
+
+    def test_vector_array_builder(self):
+        pdwList = random_vector_pdws(500)
+        expected = b''.join([pdwBuilder.vector_bin_pdw_builder(*p) for p in pdwList])
+        actual = pdwBuilder.vector_bin_pdw_array_builder(*pdwBuilder.pdw_columns(pdwList))
+        self.assertEqual(actual.tobytes(), expected)
+
+    def test_vector_array_builder_3(self):
+        pdwList = random_vector_pdws_3(500)
+        expected = np.array([pdwBuilder.vector_bin_pdw_builder_3(*p) for p in pdwList])
+        actual = pdwBuilder.vector_bin_pdw_array_builder_3(*pdwBuilder.pdw_columns(pdwList))
+        np.testing.assert_array_equal(actual, expected)
+
+    def test_floating_point_array(self):
+        rng = np.random.default_rng(1)
+        powers = 2.0 ** np.arange(-40, 10)
+        values = np.concatenate([10 ** rng.uniform(-12, 3, 20000), powers, np.nextafter(powers, 0),
+                                 np.nextafter(powers, np.inf), powers * (1 + 2 ** -11)])
+        expected = [int(pdwBuilder.convert_to_floating_point(v, -26, 10, 5)) for v in values]
+        actual = pdwBuilder.convert_to_floating_point_array(values, -26, 10, 5)
+        self.assertEqual(actual.tolist(), expected)
+
+    def test_chirp_array(self):
+        rng = np.random.default_rng(2)
+        values = np.concatenate([rng.uniform(0, 1e9, 20000), 10 ** rng.uniform(0, 12, 20000),
+                                 np.arange(0, 200000, 3.0), [0, -5, 8191.5 * 21.822, 2 ** 20 * 21.822]])
+        expected = [int(pdwBuilder.chirp_closest_m_2_n(v)) for v in values]
+        actual = pdwBuilder.chirp_closest_m_2_n_array(values)
+        self.assertEqual(actual.tolist(), expected)
+
+    def test_memo(self):
+        pdwBuilder.analog_power_code.cache_clear()
+        for _ in range(100):
+            pdwBuilder.analog_bin_pdw_builder(powerLin=0.5)
+        info = pdwBuilder.analog_power_code.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 99))
+
+    def test_file_builders(self):
+        self.assertEqual(len(pdwBuilder.vector_bin_pdw_file_builder([])), 4096)
+        pdwList = random_vector_pdws(10)
+        pdwFile = pdwBuilder.vector_bin_pdw_file_builder(pdwList)
+        self.assertEqual(pdwFile[4096:], b''.join([pdwBuilder.vector_bin_pdw_builder(*p) for p in pdwList]))
+
+        pdwList = random_analog_pdws(10)
+        pdwFile = pdwBuilder.analog_bin_pdw_file_builder(pdwList)
+        rawPdws = b''.join([pdwBuilder.analog_bin_pdw_builder(*p).tobytes() for p in pdwList])
+        self.assertEqual(pdwFile[4096:4096 + len(rawPdws)], rawPdws)
+
+    def test_pdw_table(self):
+        pdwList = random_analog_pdws(100)
+        table = pdwBuilder.PdwTable.from_list(pdwList, 'analog')
+        self.assertEqual(len(table), 100)
+        self.assertEqual(table.encode().tobytes(), b''.join([pdwBuilder.analog_bin_pdw_builder(*p).tobytes()
+                                                             for p in pdwList]))
+        self.assertEqual(pdwBuilder.analog_bin_pdw_file_builder(table), pdwBuilder.analog_bin_pdw_file_builder(pdwList))
+
+        table = pdwBuilder.PdwTable('vector')
+        table.append(1, 2e9, startTimeSec=5e-6)
+        table.extend({'startTimeSec': np.arange(10)[::-1] * 1e-6, 'wIndex': 3})
+        self.assertEqual(len(table), 11)
+        self.assertEqual(table.freq[0], 2e9)
+        self.assertEqual(table.freq[1], 1e9)
+        self.assertTrue(np.all(table.wIndex[1:] == 3))
+        table.sort_by_time()
+        self.assertTrue(np.all(np.diff(table.startTimeSec) >= 0))
+        # Pulses move, operation flags stay in place
+        self.assertEqual(table.freq[6], 2e9)
+        self.assertEqual(table.operation.tolist(), [1] + [0] * 10)
+        self.assertEqual(len(table[2:5]), 3)
+        self.assertEqual(table[3]['startTimeSec'], 3e-6)
+        with self.assertRaises(error.UXGError):
+            table.extend({'powerLin': 1})
+
+        # Integer fields don't wrap or truncate
+        for column in [{'wIndex': -1}, {'wIndex': 2 ** 32}, {'markers': 70000}, {'operation': 1.5},
+                       {'rfOff': np.nan}]:
+            with self.assertRaises(error.UXGError):
+                table.extend(column)
+        with self.assertRaises(error.UXGError):
+            table.extend([[256, 1e9]])
+        self.assertEqual(len(table), 11)
+        edge = pdwBuilder.PdwTable.from_list({'wIndex': np.array([2 ** 32 - 1], dtype=np.int64), 'markers': np.uint8(7),
+                                              'rfOff': True}, 'vector')
+        self.assertEqual((edge.wIndex[0], edge.markers[0], edge.rfOff[0]), (2 ** 32 - 1, 7, 1))
+        with self.assertRaises(error.UXGError):
+            pdwBuilder.analog_bin_pdw_file_builder(table)
+
+    def test_file_writer(self):
+        pdwList = random_analog_pdws(1000)
+        buffer = io.BytesIO()
+        with pdwBuilder.PdwFileWriter(buffer, 'analog', chunkSize=300) as writer:
+            writer.write(pdwList[:500])
+            writer.write(pdwBuilder.PdwTable.from_list(pdwList[500:], 'analog'))
+        self.assertEqual(writer.pdwsWritten, 1000)
+        self.assertEqual(buffer.getvalue(), pdwBuilder.analog_bin_pdw_file_builder(pdwList))
+        self.assertEqual(writer.bytesWritten, len(buffer.getvalue()))
+
+        pdwList = random_vector_pdws(1000)
+        with tempfile.TemporaryDirectory() as tempDir:
+            fileName = os.path.join(tempDir, 'scenario.pdw')
+            with pdwBuilder.PdwFileWriter(fileName, 'vector') as writer:
+                writer.write(pdwList)
+            with open(fileName, 'rb') as f:
+                self.assertEqual(f.read(), pdwBuilder.vector_bin_pdw_file_builder(pdwList))
+
+            # A failed write doesn't leave a partial file, or end a caller's file object
+            badName = os.path.join(tempDir, 'bad.pdw')
+            with self.assertRaises(KeyError):
+                with pdwBuilder.PdwFileWriter(badName, 'vector') as writer:
+                    writer.write(pdwList[:10])
+                    raise KeyError('bogus')
+            self.assertFalse(os.path.exists(badName))
+            buffer = io.BytesIO()
+            with self.assertRaises(KeyError):
+                with pdwBuilder.PdwFileWriter(buffer, 'analog') as writer:
+                    raise KeyError('bogus')
+            self.assertEqual(buffer.getvalue(), pdwBuilder.analog_bin_pdw_file_header(pdwBuilder.DEFAULT_FPC_ENTRIES))
+            self.assertTrue(writer.closed)
+
+            with InstrumentSimulator('AnalogUXG') as sim:
+                uxg = AnalogUXG('127.0.0.1', port=sim.port)
+                uxg.download_bin_pdw_file(fileName, pdwName='scenario', chunkSize=1000)
+                self.assertEqual(sim.memory['/USER/PDW/scenario'], pdwBuilder.vector_bin_pdw_file_builder(pdwList))
+                uxg.disconnect()
+
+    def test_file_reader(self):
+        with tempfile.TemporaryDirectory() as tempDir:
+            fileName = os.path.join(tempDir, 'analog.pdw')
+            table = pdwBuilder.PdwTable.from_list(random_analog_pdws(1000), 'analog')
+            with pdwBuilder.PdwFileWriter(fileName, 'analog') as writer:
+                writer.write(table)
+            with pdwBuilder.PdwFileReader(fileName) as reader:
+                self.assertEqual(reader.pdwFormat, 'analog')
+                self.assertEqual(len(reader), 1000)
+                self.assertEqual([b[0] for b in reader.blocks], [13, 1, 16])
+                self.assertEqual(reader.pdwOffset, 4096)
+                words = np.array(reader.words.tolist(), dtype=np.uint32)
+                np.testing.assert_array_equal(words, table.encode())
+                np.testing.assert_allclose(reader.startTimeSec, table.startTimeSec, atol=1e-12)
+                np.testing.assert_allclose(reader.freq, table.freq, atol=1 / 1024)
+                np.testing.assert_allclose(reader.field('width', 10, 20), table.width[10:20], atol=1e-9)
+                np.testing.assert_array_equal(reader.markers, table.markers)
+                np.testing.assert_allclose(reader.powerLin, table.powerLin, rtol=1e-3)
+                phaseError = (reader.to_table().phase - table.phase + 180) % 360 - 180
+                self.assertTrue(np.all(np.abs(phaseError) < 2 * 360 / 4096))
+
+            fileName = os.path.join(tempDir, 'vector.pdw')
+            pdwList = random_vector_pdws(1000)
+            with open(fileName, 'wb') as f:
+                f.write(pdwBuilder.vector_bin_pdw_file_builder(pdwList))
+            with pdwBuilder.PdwFileReader(fileName) as reader:
+                self.assertEqual(reader.pdwFormat, 'vector')
+                table = reader.to_table(500)
+                self.assertEqual(len(table), 500)
+                np.testing.assert_array_equal(table.wIndex, [p[8] for p in pdwList[500:]])
+                np.testing.assert_allclose(table.powerDbm, [p[4] for p in pdwList[500:]], atol=0.005)
+
+            fileName = os.path.join(tempDir, 'bad.pdw')
+            with open(fileName, 'wb') as f:
+                f.write(b'not a PDW file' * 10)
+            with self.assertRaises(error.UXGError):
+                pdwBuilder.PdwFileReader(fileName)
+
+    def test_fpc_table(self):
+        # Subpulse state sequences pack MSB first into the same bytes as the hex pattern
+        self.assertEqual(pdwBuilder.fpc_pattern_bits('2A61'), (b'\x2a\x61', 16))
+        self.assertEqual(pdwBuilder.fpc_pattern_bits([0, 0, 1, 0, 1, 0, 1, 0, 0, 1, 1]), (b'\x2a\x60', 11))
+        self.assertEqual(pdwBuilder.fpc_pattern_bits([0, 2, 3, 1], 2), (b'\x2d', 8))
+        with self.assertRaises(error.UXGError):
+            pdwBuilder.fpc_pattern_bits([0, 4], 2)
+
+        entry = pdwBuilder.bin_freqPhaseCodingSingleEntry(1, 2, 0, [0, 90, 180, 270], [0, 2, 3, 1], 'QPSK')
+        self.assertEqual(entry[:8], bytes([1, 2, 0, 4, 8, 0, 0, 0]))
+        np.testing.assert_array_equal(np.frombuffer(entry[8:40], dtype='<f8'), [0, 90, 180, 270])
+        self.assertEqual(entry[40:], b'\x2dQPSK')
+        with self.assertRaises(error.UXGError):
+            pdwBuilder.bin_freqPhaseCodingSingleEntry(1, 2, 0, [0, 180], [0, 1], 'QPSK')
+
+        entries = [(0, 1, 0, [0, 180], '', 'None'),
+                   {'onOffState': 1, 'codingType': 1, 'stateMapping': [-5e6, 5e6], 'pattern': np.tile([1, 0], 500),
+                    'comment': 'FSK'}]
+        block = b''.join(pdwBuilder.bin_pdw_freqPhaseCodingBlock(entries))
+        self.assertEqual(len(block) % 16, 0)
+        self.assertEqual(int.from_bytes(block[:4], 'little'), 13)
+        self.assertEqual(int.from_bytes(block[8:16], 'little'), 8 + len(pdwBuilder.bin_freqPhaseCodingSingleEntry(
+            *entries[0])) + len(pdwBuilder.bin_freqPhaseCodingSingleEntry(1, 1, 1, [-5e6, 5e6], '55' * 125, 'FSK')))
+
+        # Headers are cached, so repeated builds return the same object
+        header = pdwBuilder.analog_bin_pdw_file_header(entries)
+        self.assertIs(pdwBuilder.analog_bin_pdw_file_header(entries), header)
+        self.assertEqual(len(header), 4096)
+        self.assertEqual(len(pdwBuilder.analog_bin_pdw_file_header(None)), 4096)
+
+        pdwList = random_analog_pdws(10)
+        with tempfile.TemporaryDirectory() as tempDir:
+            fileName = os.path.join(tempDir, 'fpc.pdw')
+            with open(fileName, 'wb') as f:
+                f.write(pdwBuilder.analog_bin_pdw_file_builder(pdwList, entries))
+            with pdwBuilder.PdwFileReader(fileName) as reader:
+                self.assertEqual([b[:2] for b in reader.blocks], [(13, 48), (1, 48 + len(block)), (16, 4080)])
+                self.assertEqual(len(reader), 10)
+
+        with self.assertRaises(error.UXGError):
+            pdwBuilder.analog_bin_pdw_file_header([(1, 1, 0, [0, 180], 'AA' * 4000, 'Too long')])
+
+    def test_validate(self):
+        pdwList = [[1, 1e9, 0, 0, 1e-6, 1, 0, 2, 0, 0, 0, 0, 0, 0],
+                   [0, 1e9, 0, 10e-6, 20e-6, 1, 0, 2, 0, 0, 0, 0, 0, 0],
+                   [0, 50e9, 0, 20e-6, 1e-6, 1, 0x1000, 2, 0, 0, 0, 0, 0, 0],
+                   [0, 1e9, 0, 15e-6, 1e-6, 1, 0, 2.5, 0, 0, 0, 0, 0, 0],
+                   [2, 1e9, 0, 40e-6, 1e-6, 1, 0, 2, 0, 0, 0, 0, 0, 0],
+                   [0, 1e9, 0, 50e-6, 1e-6, 1, 0, 2, 0, 0, 0, 0, 0, 0]]
+        failures = pdwBuilder.validate_pdws(pdwList, 'analog', minSpacing=8e-6, maxPdws=4)
+        self.assertEqual(sorted(failures), ['count', 'freq', 'markers', 'operation', 'overlap', 'pulseMode',
+                                            'spacing', 'startTimeOrder'])
+        np.testing.assert_array_equal(failures['startTimeOrder'], [3])
+        np.testing.assert_array_equal(failures['overlap'], [2, 3])
+        np.testing.assert_array_equal(failures['spacing'], [3])
+        np.testing.assert_array_equal(failures['freq'], [2])
+        np.testing.assert_array_equal(failures['markers'], [2])
+        np.testing.assert_array_equal(failures['pulseMode'], [3])
+        np.testing.assert_array_equal(failures['operation'], [4])
+        np.testing.assert_array_equal(failures['count'], [4, 5])
+
+        table = pdwBuilder.PdwTable('vector')
+        table.extend({'operation': 0, 'startTimeSec': np.arange(1000000) * 1e-6, 'powerDbm': -10})
+        table.operation[0] = 1
+        self.assertEqual(pdwBuilder.validate_pdws(table), {})
+        table.powerDbm[123456] = 30
+        table.startTimeSec[500000] = 0
+        failures = pdwBuilder.validate_pdws(table, maxPdws=pdwBuilder.MAX_PDWS)
+        np.testing.assert_array_equal(failures['powerDbm'], [123456])
+        np.testing.assert_array_equal(failures['startTimeOrder'], [500000])
+        self.assertEqual(len(failures['count']), 1000000 - pdwBuilder.MAX_PDWS)
+
+        with InstrumentSimulator('AnalogUXG') as sim:
+            uxg = AnalogUXG('127.0.0.1', port=sim.port)
+            uxg.check_pdws(pdwList[:2] + pdwList[4:5])
+            with self.assertRaises(error.UXGError):
+                uxg.check_pdws(pdwList)
+            uxg.disconnect()
+
+            # errCheck=False skips the error queue checks, as on VectorUXG
+            uxg = AnalogUXG('127.0.0.1', port=sim.port, errCheck=False)
+            start = len(sim.log)
+            uxg.stream_stop()
+            uxg.query('*opc?')
+            self.assertNotIn('SYSTem:ERRor?', sim.log[start:])
+            uxg.disconnect()
+
+    def test_write_csv(self):
+        # Dict columns are written in fields order, not dict order
+        fileObj = io.BytesIO()
+        pdwBuilder.write_csv(fileObj, ['Operation', 'Time'], {'Time': np.array([0, 1e-6]), 'Operation': [1, 2]})
+        self.assertEqual(fileObj.getvalue().decode(), 'Operation,Time\n1,0.0\n2,1e-06\n')
+        self.assertEqual(len(pdwBuilder.csv_columns({'Operation': [1], 'Time': [0], 'Extra': [5]}, ['Time'])), 1)
+
+        bad = [({'Operation': [1, 2]}, 'missing'),
+               ({'Operation': [1, 2], 'Time': [0]}, 'same length'),
+               ([[1, 0], [2]], 'same number'),
+               ([[1, 0, 1e9], [2, 1e-6, 1e9]], 'fields'),
+               (np.zeros((2, 3)), 'fields')]
+        for data, msg in bad:
+            with self.assertRaisesRegex(error.UXGError, msg):
+                pdwBuilder.write_csv(io.BytesIO(), ['Operation', 'Time'], data)
+
+    def test_encode_speed(self):
+        numPdws = 1000000
+        columns = [np.zeros(numPdws), np.full(numPdws, 1e9), np.zeros(numPdws), np.arange(numPdws) * 10e-6,
+                   np.full(numPdws, 1e-6), np.ones(numPdws), np.zeros(numPdws), np.full(numPdws, 2),
+                   np.zeros(numPdws), np.zeros(numPdws), np.zeros(numPdws), np.zeros(numPdws),
+                   np.full(numPdws, 1e6), np.zeros(numPdws)]
+        # Varying power and chirp rate columns use the vectorized conversions
+        columns[5] = np.tile([1, 0.5, 0.25, 0.125], numPdws // 4)
+        columns[12] = np.tile([1e6, 2e6, 0, 5e5], numPdws // 4)
+        # Best of three to keep the check stable on a loaded machine
+        elapsed = []
+        for _ in range(3):
+            start = time.perf_counter()
+            pdws = pdwBuilder.analog_bin_pdw_array_builder(*columns)
+            elapsed.append(time.perf_counter() - start)
+        self.assertLess(min(elapsed), 1)
+        self.assertEqual(pdws.shape, (numPdws, 7))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""Tests for IQ to PDW conversion"""
+
+from pyarbtools import error
+from pyarbtools import pdwBuilder
+from pyarbtools import pdwConvert
+from pyarbtools import wfmBuilder
+import numpy as np
+import unittest
+
+
+def pulsed_scenario(fs=100e6):
+    chirp = wfmBuilder.chirp_generator(fs=fs, pWidth=10e-6, pri=10e-6, chirpBw=20e6)
+    barker = wfmBuilder.barker_generator(fs=fs, pWidth=13e-6, pri=13e-6, code='b13')
+    iq = np.zeros(int(fs * 1e-3), dtype=np.complex128)
+    starts = [1000, 5000, 20000, 40000, 61234, 90000]
+    pulses = [chirp, barker, chirp * 0.5, barker, chirp, chirp * 0.1]
+    for start, pulse in zip(starts, pulses):
+        iq[start:start + len(pulse)] = pulse
+    return iq, starts, pulses
+
+
+class PdwConvertTests(unittest.TestCase):
+    def test_pulse_edges(self):
+        wfm = np.array([0, 1, 1, 0, 0, 1, 0, 1, 1, 1], dtype=np.complex128)
+        for chunkSize in [1, 3, 100]:
+            starts, stops = pdwConvert.pulse_edges(wfm, 0.5, chunkSize)
+            self.assertEqual(starts.tolist(), [1, 5, 7])
+            self.assertEqual(stops.tolist(), [3, 6, 10])
+
+    def test_extract(self):
+        fs = 100e6
+        iq, starts, pulses = pulsed_scenario(fs)
+        pdws, wfms = pdwConvert.extract_pulses(iq, fs, gran=8, minLen=64, cf=9e9, power=-10, chunkSize=4096)
+        self.assertEqual(len(wfms), 2)
+        self.assertEqual(len(pdws), len(starts) + 1)
+        np.testing.assert_allclose(pdws.startTimeSec[:-1], np.array(starts) / fs)
+        self.assertEqual(pdws.wIndex[:-1].tolist(), [0, 1, 0, 1, 0, 0])
+        np.testing.assert_allclose(pdws.powerDbm[:-1], [-10, -10, -16.0206, -10, -10, -30], atol=1e-3)
+        self.assertEqual(pdws.operation.tolist(), [1, 0, 0, 0, 0, 0, 2])
+        self.assertEqual(pdws.startTimeSec[-1], 1e-3)
+        self.assertTrue(np.all(pdws.freq == 9e9))
+        self.assertTrue(all(len(w) % 8 == 0 for w in wfms))
+
+        # Rebuild the IQ from the PDWs and waveforms
+        rebuilt = np.zeros_like(iq)
+        for start, index, powerDbm in zip(starts, pdws.wIndex, pdws.powerDbm):
+            pulse = wfms[index] * 10 ** ((powerDbm + 10) / 20)
+            stop = min(start + len(pulse), len(iq))
+            rebuilt[start:stop] += pulse[:stop - start]
+        np.testing.assert_allclose(rebuilt, iq, atol=1e-9)
+
+        # Without normalization, scaled copies are separate waveforms
+        pdws, wfms = pdwConvert.extract_pulses(iq, fs, normalize=False, terminate=False)
+        self.assertEqual(len(wfms), 4)
+        self.assertEqual(len(pdws), len(starts))
+
+        pdws, wfms = pdwConvert.extract_pulses(np.zeros(100, dtype=np.complex128), fs)
+        self.assertEqual((len(pdws), len(wfms)), (1, 0))
+
+    def test_render_analog(self):
+        fs = 100e6
+        # CW pulse 1 MHz above cf, 1 MHz/us ramp chirp, and the PSK code from the default FPC table
+        pdws = [[1, 1.001e9, 90, 1e-6, 2e-6, 0.5, 0, 2, 0, 0, 0, 0, 0, 0],
+                [0, 1e9, 0, 4e-6, 2e-6, 1, 0, 2, 0, 0, 2, 0, 1e6, 0],
+                [0, 1e9, 0, 7e-6, 3.2e-6, 1, 0, 2, 0, 0, 0, 1, 0, 0],
+                [0, 1e9, 0, 11e-6, 1e-6, 1, 0, 1, 0, 0, 0, 0, 0, 0]]
+        iq = pdwConvert.render_pdws(pdws, fs, cf=1e9, duration=12e-6)
+        self.assertEqual(len(iq), 1200)
+        np.testing.assert_array_equal(iq[:100], 0)
+        np.testing.assert_allclose(np.abs(iq[100:300]), 0.5)
+        np.testing.assert_array_equal(iq[300:400], 0)
+        np.testing.assert_array_equal(iq[1100:], 0)
+        t = np.arange(100, 300) / fs
+        np.testing.assert_allclose(iq[100:300], 0.5 * np.exp(1j * (np.pi / 2 + 2 * np.pi * 1e6 * t)), atol=1e-9)
+
+        # Instantaneous frequency of the ramp chirp increases by 1 MHz/us
+        instFreq = np.diff(np.unwrap(np.angle(iq[400:600]))) * fs / (2 * np.pi)
+        np.testing.assert_allclose(instFreq, (np.arange(199) + 0.5) / fs * 1e12, atol=1e-3)
+
+        # 32 bit PSK code 0x2A61D327, 10 samples per bit
+        bits = np.unpackbits(np.frombuffer(bytes.fromhex('2A61D327'), dtype=np.uint8))
+        np.testing.assert_allclose(iq[700:1020], np.repeat(np.where(bits, -1, 1), 10), atol=1e-9)
+
+        # Chunked rendering matches
+        chunks = list(pdwConvert.render_chunks(pdws, fs, cf=1e9, duration=12e-6, chunkSize=77))
+        self.assertEqual(len(chunks), 16)
+        np.testing.assert_array_equal(np.concatenate(chunks), iq)
+
+    def test_render_chirp_codes(self):
+        fs = 100e6
+        # 1 MHz/us triangle chirp and the FSK code (+/-10 MHz) from the default FPC table
+        pdws = [[1, 1e9, 0, 0, 2e-6, 1, 0, 2, 0, 0, 1, 0, 1e6, 0],
+                [0, 1e9, 0, 3e-6, 3.2e-6, 1, 0, 2, 0, 0, 0, 2, 0, 0]]
+        iq = pdwConvert.render_pdws(pdws, fs, cf=1e9, duration=7e-6)
+
+        # Frequency ramps up for half the width and back down
+        instFreq = np.diff(np.unwrap(np.angle(iq[:200]))) * fs / (2 * np.pi)
+        tau = (np.arange(199) + 0.5) / fs
+        np.testing.assert_allclose(instFreq, 1e12 * np.minimum(tau, 2e-6 - tau), atol=3e3)
+
+        # 16 subpulses of 20 samples, bit 1 selects +10 MHz
+        bits = np.unpackbits(np.frombuffer(bytes.fromhex('5AC4'), dtype=np.uint8))
+        code = iq[300:620]
+        instFreq = np.diff(np.unwrap(np.angle(code))) * fs / (2 * np.pi)
+        for sub, bit in enumerate(bits):
+            np.testing.assert_allclose(instFreq[sub * 20:sub * 20 + 19], 10e6 if bit else -10e6, atol=1e-3)
+        # Phase is continuous across subpulses
+        self.assertLessEqual(np.abs(np.diff(code)).max(), 2 * np.sin(np.pi * 10e6 / fs) + 1e-9)
+
+    def test_render_vector(self):
+        fs = 100e6
+        iq, starts, pulses = pulsed_scenario(fs)
+        pdws, wfms = pdwConvert.extract_pulses(iq, fs, cf=9e9, power=-10)
+        rendered = pdwConvert.render_pdws(pdws, fs, cf=9e9, wfms=wfms, refPower=-10, chunkSize=10000)
+        self.assertEqual(len(rendered), len(iq))
+        np.testing.assert_allclose(rendered, iq, atol=1e-9)
+
+        # rfOff and frequency offsets, waveforms at a lower sample rate
+        table = pdwBuilder.PdwTable.from_list([[1, 1e9, 0, 0, 0, 0, 0, 0, 0, 0],
+                                               [0, 1e9 + 5e6, 0, 2e-6, -6, 0, 0, 0, 0, 0],
+                                               [0, 1e9, 0, 4e-6, 0, 0, 0, 1, 0, 0]], 'vector')
+        rendered = pdwConvert.render_pdws(table, fs, wfms=[np.ones(50)], wfmFs=50e6, duration=6e-6)
+        np.testing.assert_allclose(rendered[:100], 1)
+        np.testing.assert_array_equal(rendered[100:200], 0)
+        np.testing.assert_allclose(np.abs(rendered[200:300]), 10 ** (-6 / 20))
+        np.testing.assert_array_equal(rendered[300:], 0)
+        np.testing.assert_allclose(np.angle(rendered[201] / rendered[200]), 2 * np.pi * 5e6 / fs)
+
+        # PDWs without output don't need a waveform, so a silent scenario renders
+        pdws, wfms = pdwConvert.extract_pulses(np.zeros(100, dtype=np.complex128), fs)
+        np.testing.assert_array_equal(pdwConvert.render_pdws(pdws, fs, wfms=wfms, duration=1e-6), np.zeros(100))
+        table.wIndex[1] = 1
+        with self.assertRaises(error.UXGError):
+            pdwConvert.render_pdws(table, fs, wfms=[np.ones(50)])
+        table.wIndex[2] = 5
+        table.wIndex[1] = 0
+        self.assertEqual(len(pdwConvert.render_pdws(table, fs, wfms=[np.ones(50)], wfmFs=50e6, duration=6e-6)), 600)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""Tests for the emitter scenario compiler"""
+
+from pyarbtools import pdwBuilder
+from pyarbtools import error
+from pyarbtools.pdwScenario import Emitter, Scenario, scan_gain
+import numpy as np
+import unittest
+
+
+class PdwScenarioTests(unittest.TestCase):
+    def test_pri_types(self):
+        rng = np.random.default_rng(0)
+        times = Emitter(pri=100e-6).start_times(1e-3, rng)
+        np.testing.assert_allclose(times, np.arange(10) * 100e-6)
+
+        times = Emitter(pri=[10e-6, 20e-6, 30e-6], priType='stagger', startTime=5e-6).start_times(1e-3, rng)
+        np.testing.assert_allclose(np.diff(times)[:6], [10e-6, 20e-6, 30e-6] * 2)
+        self.assertEqual(times[0], 5e-6)
+        self.assertLess(times[-1], 1e-3)
+
+        times = Emitter(pri=100e-6, priType='jitter', jitter=0.1).start_times(1, rng)
+        pris = np.diff(times)
+        self.assertTrue(np.all((pris >= 90e-6) & (pris <= 110e-6)))
+        self.assertAlmostEqual(pris.mean(), 100e-6, delta=1e-6)
+
+        times = Emitter(pri=[10e-6, 50e-6], priType='dwell', dwellPulses=[3, 2]).start_times(1e-3, rng)
+        np.testing.assert_allclose(np.diff(times)[:5], [10e-6] * 3 + [50e-6] * 2)
+
+        with self.assertRaises(error.UXGError):
+            Emitter(pri=[10e-6, 20e-6], priType='fixed')
+
+    def test_agility_and_scan(self):
+        emitter = Emitter(pri=1e-3, freq=[1e9, 2e9, 3e9], freqDwell=2, fields={'wIndex': 4})
+        columns = emitter.generate(8e-3, 'vector')
+        np.testing.assert_array_equal(columns['freq'], [1e9, 1e9, 2e9, 2e9, 3e9, 3e9, 1e9, 1e9])
+        np.testing.assert_array_equal(columns['wIndex'], [4] * 8)
+
+        emitter = Emitter(pri=1e-3, freq=[1e9, 2e9], freqPattern='random', seed=1)
+        self.assertTrue(set(emitter.generate(0.1)['freq']) <= {1e9, 2e9})
+
+        # Circular scan points at the receiver halfway through each period
+        t = np.linspace(0, 1, 1001)
+        gain = scan_gain(t, 'circular', scanPeriod=1, beamwidth=3, sidelobe=-30)
+        self.assertEqual(gain.max(), 0)
+        self.assertEqual(t[gain.argmax()], 0.5)
+        self.assertAlmostEqual(scan_gain([0.5 + 1.5 / 360], 'circular', beamwidth=3)[0], -3, delta=0.05)
+        self.assertEqual(gain.min(), -30)
+
+        columns = Emitter(pri=1e-3, power=-10, scanType='sector', scanPeriod=0.1).generate(0.1, 'analog')
+        self.assertTrue(np.all(columns['powerLin'] <= 10 ** (-10 / 20) + 1e-12))
+
+    def test_compile(self):
+        scenario = Scenario(duration=0.1, pdwFormat='vector')
+        scenario.add_emitter(Emitter(pri=100e-6, freq=9e9, fields={'wIndex': 1}))
+        scenario.add_emitter(Emitter(pri=[70e-6, 90e-6], priType='stagger', freq=3e9, power=-20))
+        scenario.add_emitter(Emitter(pri=33e-6, priType='jitter', jitter=0.2, freq=[5e9, 6e9], seed=3))
+        scenario.add_emitter(Emitter(pri=1e-3, startTime=1))
+        pdws = scenario.compile()
+
+        self.assertIsInstance(pdws, pdwBuilder.PdwTable)
+        numPdws = 1000 + 1250 + len(scenario.emitters[2].start_times(0.1, np.random.default_rng(3))) + 1
+        self.assertEqual(len(pdws), numPdws)
+        self.assertTrue(np.all(np.diff(pdws.startTimeSec) >= 0))
+        self.assertEqual(pdws.operation[0], 1)
+        self.assertEqual(pdws.operation[-1], 2)
+        self.assertEqual(np.count_nonzero(pdws.operation), 2)
+        np.testing.assert_array_equal(np.unique(pdws.wIndex[pdws.freq == 9e9]), [1])
+        np.testing.assert_array_equal(np.unique(pdws.powerDbm[pdws.freq == 3e9]), [-20])
+        self.assertEqual(pdws.encode().shape, (numPdws, 6))
+
+        self.assertEqual(len(Scenario(1, 'analog').compile(terminate=False)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+"""Tests for PDW streaming using the instrument simulator"""
+
+from pyarbtools.instruments import VectorUXG
+from pyarbtools.simulator import InstrumentSimulator
+from pyarbtools.asyncInstruments import AsyncAnalogUXG
+from pyarbtools.pdwStreaming import PdwStreamSession, AsyncBurstScheduler, encode_vector_pdws
+from pyarbtools import error
+from pyarbtools.pdwBuilder import PdwTable, PdwFileWriter
+import asyncio
+import numpy as np
+import os
+import tempfile
+import time
+import unittest
+
+
+def pdw_generator(count):
+    for i in range(count):
+        yield [1 if i == 0 else 0, 1e9, 0, i * 10e-6, -10, 0, 0, 0, 0, 0xF]
+
+
+class PdwStreamingTests(unittest.TestCase):
+    def test_stream(self):
+        with InstrumentSimulator('VectorUXG', streamPort=0, keepStream=True) as sim:
+            uxg = VectorUXG('127.0.0.1', port=sim.port)
+            with PdwStreamSession(uxg, pdw_generator(10000), chunkSize=1000, streamPort=sim.streamPort) as session:
+                pass
+            stats = session.stats()
+            self.assertEqual(stats['pdwsSent'], 10000)
+            self.assertEqual(stats['bytesSent'], 10000 * 24)
+            self.assertEqual(sim.memory['stream:external:header'][:4], b'STRM')
+
+            uxg.query('*opc?')
+            while sim.stats['streamBytes'] < stats['bytesSent']:
+                pass
+            self.assertEqual(bytes(sim.streamData), encode_vector_pdws(list(pdw_generator(10000))))
+            uxg.err_check()
+            uxg.disconnect()
+
+    def test_stream_table(self):
+        pdws = PdwTable.from_list(list(pdw_generator(2500)), 'vector')
+        with InstrumentSimulator('VectorUXG', streamPort=0, keepStream=True) as sim:
+            uxg = VectorUXG('127.0.0.1', port=sim.port)
+            with PdwStreamSession(uxg, pdws, chunkSize=1000, streamPort=sim.streamPort) as session:
+                pass
+            self.assertEqual(session.stats()['pdwsSent'], 2500)
+
+            uxg.query('*opc?')
+            while sim.stats['streamBytes'] < 2500 * 24:
+                pass
+            self.assertEqual(bytes(sim.streamData), pdws.encode().tobytes())
+            uxg.err_check()
+            uxg.disconnect()
+
+    def test_replay(self):
+        pdws = PdwTable.from_list(list(pdw_generator(1000)), 'vector')
+        pdws.append(operation=2, startTimeSec=10e-3)
+        with tempfile.TemporaryDirectory() as tempDir:
+            fileName = os.path.join(tempDir, 'scenario.pdw')
+            with PdwFileWriter(fileName, 'vector') as writer:
+                writer.write(pdws)
+
+            with InstrumentSimulator('VectorUXG', streamPort=0, keepStream=True) as sim:
+                uxg = VectorUXG('127.0.0.1', port=sim.port)
+                stats = uxg.replay_pdw_file(fileName, loops=3, streamPort=sim.streamPort, chunkSize=300)
+                self.assertEqual(stats['pdwsSent'], 3001)
+                self.assertEqual(stats['bytesSent'], 3001 * 24)
+                with open(fileName, 'rb') as f:
+                    self.assertEqual(sim.memory['stream:external:header'], f.read(4096))
+
+                uxg.query('*opc?')
+                while sim.stats['streamBytes'] < stats['bytesSent']:
+                    pass
+                # Each loop is moved exactly 10 ms later, only the first and last PDWs keep their operations
+                words = np.frombuffer(bytes(sim.streamData), dtype=np.uint32).reshape(-1, 6)
+                base = pdws.encode()
+                startPs = words[:, 2].astype(np.uint64) | words[:, 3].astype(np.uint64) << np.uint64(32)
+                basePs = base[:, 2].astype(np.uint64) | base[:, 3].astype(np.uint64) << np.uint64(32)
+                index = np.concatenate([np.arange(1000), np.arange(1000), np.arange(1001)])
+                loops = np.repeat([0, 1, 2], [1000, 1000, 1001]).astype(np.uint64)
+                np.testing.assert_array_equal(startPs, basePs[index] + loops * np.uint64(10 ** 10))
+                self.assertEqual(np.flatnonzero(words[:, 0] >> 3 & 0x3).tolist(), [0, 3000])
+                mask = np.array([~0x18 & 0xFFFFFFFF, 0xFFFFFFFF, 0xFFFFFFFF, 0xFFFFFFFF], dtype=np.uint32)
+                np.testing.assert_array_equal(words[:, [0, 1, 4, 5]] & mask, base[index][:, [0, 1, 4, 5]] & mask)
+                with self.assertRaises(error.UXGError):
+                    pdwFile = os.path.join(tempDir, 'open.pdw')
+                    with PdwFileWriter(pdwFile, 'vector') as writer:
+                        writer.write(pdws[:-1])
+                    uxg.replay_pdw_file(pdwFile, loops=2, streamPort=sim.streamPort)
+
+                # The file format must match the instrument's PDW format
+                analogFile = os.path.join(tempDir, 'analog.pdw')
+                with PdwFileWriter(analogFile, 'analog') as writer:
+                    writer.write([[1, 1e9, 0, 0, 1e-6, 1, 0, 2, 0, 0, 0, 0, 0, 0]])
+                with self.assertRaisesRegex(error.UXGError, 'analog PDWs'):
+                    uxg.replay_pdw_file(analogFile, streamPort=sim.streamPort)
+                uxg.disconnect()
+
+    def test_backpressure(self):
+        with InstrumentSimulator('VectorUXG', streamPort=0, bandwidth=100e3) as sim:
+            uxg = VectorUXG('127.0.0.1', port=sim.port)
+            session = PdwStreamSession(uxg, pdw_generator(200000), chunkSize=5000, queueDepth=2,
+                                       streamPort=sim.streamPort)
+            session.start()
+            time.sleep(1)
+            session.stop()
+            self.assertLess(session.pdwsSent, 200000)
+            self.assertGreater(session.stats()['producerStalls'], 0)
+            uxg.disconnect()
+
+    def test_encoder_error(self):
+        with InstrumentSimulator('VectorUXG', streamPort=0) as sim:
+            uxg = VectorUXG('127.0.0.1', port=sim.port)
+            session = PdwStreamSession(uxg, [[0, 1e9]], streamPort=sim.streamPort)
+            session.start()
+            self.assertRaises(error.UXGError, session.wait)
+            uxg.disconnect()
+
+
+    def test_burst_scheduler(self):
+        def burst(index):
+            return [[0, 1e9, 0, 0, 10e-6, 1, 0, 2, 0, 0, 0, 0, 0, 0],
+                    [0, 1e9, 0, 20e-6, 10e-6, 1, 0, 2, 0, 0, 0, 0, 0, 0]]
+
+        async def run(sims):
+            uxgs = [AsyncAnalogUXG('127.0.0.1', port=sim.port) for sim in sims]
+            for uxg in uxgs:
+                await uxg.connect()
+            schedulers = [AsyncBurstScheduler(uxg, burst, burstPeriod=0.05, leadTime=0.02, streamPort=sim.streamPort)
+                          for uxg, sim in zip(uxgs, sims)]
+            await asyncio.gather(*[s.run(numBursts=10) for s in schedulers])
+            for uxg in uxgs:
+                await uxg.close()
+            return schedulers
+
+        with InstrumentSimulator('AnalogUXG', streamPort=0, keepStream=True) as sim1, \
+                InstrumentSimulator('AnalogUXG', streamPort=0, keepStream=True) as sim2:
+            schedulers = asyncio.run(run([sim1, sim2]))
+            for s, sim in zip(schedulers, [sim1, sim2]):
+                stats = s.stats()
+                self.assertEqual(stats['burstsSent'], 10)
+                self.assertEqual(stats['pdwsSent'], 20)
+                self.assertEqual(stats['lateBursts'], 0)
+                self.assertGreaterEqual(stats['elapsed'], 9 * 0.05)
+                self.assertIn('stream:trigger:play:immediate', sim.log)
+
+                while sim.stats['streamBytes'] < stats['bytesSent']:
+                    pass
+                pdws = np.frombuffer(bytes(sim.streamData), dtype=np.uint32).reshape(-1, 7)
+                startPs = pdws[:, 2].astype(np.uint64) | (pdws[:, 3].astype(np.uint64) << np.uint64(32))
+                expected = [int(0.02e12) + b * int(0.05e12) + p * int(20e-6 * 1e12) for b in range(10) for p in range(2)]
+                self.assertEqual(startPs.tolist(), expected)
+                self.assertEqual((pdws[:, 0] >> 3 & 0x3).tolist(), [1] + [0] * 19)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,341 @@
+"""Tests for the instrument simulator using the instrument classes"""
+
+from pyarbtools.instruments import VSG, M8190A, M8195A, VectorUXG
+from pyarbtools.vsaControl import VSA
+from pyarbtools.simulator import InstrumentSimulator
+from pyarbtools import wfmBuilder
+from pyarbtools import error
+import pyarbtools
+import numpy as np
+import socket
+import time
+import socketscpi
+import unittest
+
+
+class FlakyVSG(VSG):
+    """VSG whose first downloads are cut off partway through the binary block."""
+
+    def __init__(self, host, port=5025, failures=1, **kwargs):
+        super().__init__(host, port=port, **kwargs)
+        self.failures = failures
+
+    def download_formatted_wfm(self, wfm, wfmID='wfm'):
+        if self.failures:
+            self.failures -= 1
+            self.socket.sendall(f'mmemory:data "WFM1:{wfmID}", #71000000'.encode() + bytes(4))
+            raise socket.timeout
+        return super().download_formatted_wfm(wfm, wfmID)
+
+
+class SimulatorTests(unittest.TestCase):
+    def test_vsg(self):
+        with InstrumentSimulator('VSG') as sim:
+            vsg = VSG('127.0.0.1', port=sim.port)
+            vsg.configure(cf=2e9, amp=-10, rfState=1, fs=100e6)
+            self.assertEqual(vsg.cf, 2e9)
+            self.assertEqual(vsg.amp, -10)
+            self.assertEqual(vsg.rfState, 1)
+
+            wfm = wfmBuilder.sine_generator(fs=100e6, freq=1e6)
+            vsg.download_wfm(wfm, wfmID='sine')
+            vsg.err_check()
+            self.assertIn('WFM1:sine', sim.memory)
+            self.assertEqual(len(sim.memory['WFM1:sine']), len(wfm) * 4)
+            vsg.disconnect()
+
+    def test_error_queue(self):
+        with InstrumentSimulator('VSG') as sim:
+            vsg = VSG('127.0.0.1', port=sim.port)
+            vsg.write('mmemory:delete "missing"', errCheck=False)
+            self.assertRaises(socketscpi.SockInstError, vsg.err_check)
+            vsg.err_check()
+            sim.push_error(-100, 'Command error')
+            self.assertRaises(socketscpi.SockInstError, vsg.err_check)
+            vsg.disconnect()
+
+    def test_m8190a_segments(self):
+        with InstrumentSimulator('M8190A') as sim:
+            awg = M8190A('127.0.0.1', port=sim.port)
+            awg.configure(res='wsp', fs=7.2e9)
+            wfm = np.zeros(awg.minLen * 10)
+            segment = awg.download_wfm(wfm, ch=1, name='zeros', wfmFormat='real')
+            awg.err_check()
+            self.assertEqual(segment, 1)
+            self.assertEqual(sim.segments[1][1], bytes(len(wfm) * 2))
+            self.assertEqual(sim.segmentNames[1][1], 'zeros_1')
+            self.assertEqual(awg.download_wfm(wfm, ch=1, name='more', wfmFormat='real'), 2)
+            awg.err_check()
+            awg.disconnect()
+
+    def test_m8190a_update(self):
+        with InstrumentSimulator('M8190A') as sim:
+            awg = M8190A('127.0.0.1', port=sim.port)
+            blockLen = awg.blocksPerGran * awg.gran
+            wfm = np.linspace(-0.5, 0.5, blockLen * 4)
+            segment = awg.download_wfm(wfm, ch=1, wfmFormat='real')
+            self.assertEqual(awg.update_wfm(wfm, segment, wfmFormat='real'), [])
+
+            wfm[blockLen + 5] = 0.9
+            wfm[2 * blockLen] = -0.9
+            self.assertEqual(awg.update_wfm(wfm, segment, wfmFormat='real'), [(blockLen, 3 * blockLen)])
+            awg.err_check()
+            self.assertEqual(bytes(sim.segments[1][segment]), awg.format_wfm(wfm, 'real').tobytes())
+
+            self.assertRaises(pyarbtools.error.AWGError, awg.update_wfm, wfm[:blockLen], segment, wfmFormat='real')
+            self.assertRaises(pyarbtools.error.AWGError, awg.update_wfm, wfm, segment + 1, wfmFormat='real')
+
+            # Playback resumes after the update only if the channel was playing
+            self.assertEqual(sim.runState, 0)
+            awg.play(segment, ch=1)
+            start = len(sim.log)
+            wfm[0] = 0.1
+            self.assertEqual(awg.update_wfm(wfm, segment, wfmFormat='real'), [(0, blockLen)])
+            self.assertEqual(sim.log[start:], ['status:operation:run:condition?', 'abort', '*opc?',
+                                               f'trace1:data {segment}, 0, #<{blockLen * 2} bytes>', 'init:imm', '*opc?'])
+            self.assertEqual(sim.runState, 0b11)
+            awg.stop(ch=1)
+            wfm[0] = 0.2
+            awg.update_wfm(wfm, segment, wfmFormat='real')
+            awg.query('*opc?')
+            self.assertEqual(sim.runState, 0)
+            awg.disconnect()
+
+    def test_m8190a_sequence(self):
+        with InstrumentSimulator('M8190A') as sim:
+            awg = M8190A('127.0.0.1', port=sim.port)
+            pulse = np.ones(1000) * 0.5
+            seqID = awg.download_pulse_train(pulse, pri=1e-3, ch=1, wfmFormat='real')
+            awg.err_check()
+            self.assertEqual(seqID, 0)
+            self.assertEqual(sim.state['func1:mode'], 'sts')
+
+            table = np.array(sim.sequenceTables[1], dtype=np.uint32).reshape(-1, 6)
+            self.assertEqual(table.shape, (2, 6))
+            padded = len(sim.segments[1][1]) // 2
+            self.assertEqual(padded % awg.gran, 0)
+            self.assertEqual(table[0, 3], 1)
+            self.assertEqual(table[0, 0] & (1 << 28), 1 << 28)
+            self.assertEqual(table[1, 0] & (1 << 31), 1 << 31)
+            self.assertEqual(table[1, 0] & (1 << 30), 1 << 30)
+            self.assertEqual(table[1, 4] + padded, round(1e-3 * awg.fs))
+
+            self.assertRaises(pyarbtools.error.GranularityError, awg.idle_entry, awg.gran + 1)
+            self.assertRaises(ValueError, awg.wfm_entry, 1, segAdvance='bad')
+
+            # Entry fields are uint32, so out of range values raise instead of wrapping
+            idleGran = awg.idleGran if 'intx' in awg.res else awg.gran
+            self.assertRaises(ValueError, awg.idle_entry, (2 ** 32 // idleGran + 1) * idleGran)
+            self.assertRaises(ValueError, awg.idle_entry, idleGran, idleSample=-1)
+            self.assertRaises(ValueError, awg.wfm_entry, 1, startOffset=-awg.gran)
+            self.assertRaises(ValueError, awg.wfm_entry, 1, startOffset=2 ** 32 * awg.gran)
+            self.assertRaises(ValueError, awg.wfm_entry, 1, endOffset=2 ** 32 * awg.gran - 1)
+            awg.disconnect()
+
+    def test_double_buffer(self):
+        for model, cls, kwargs in [('M8190A', M8190A, {'wfmFormat': 'real'}), ('M8195A', M8195A, {})]:
+            with InstrumentSimulator(model) as sim:
+                awg = cls('127.0.0.1', port=sim.port)
+                self.assertRaises(pyarbtools.error.AWGError, awg.queue_wfm, np.zeros(awg.minLen), **kwargs)
+                awg.play_double_buffered(np.zeros(awg.minLen), **kwargs)
+                self.assertEqual(awg.queue_wfm(np.ones(awg.minLen * 2) * 0.5, **kwargs), 1)
+                # Buffer 0 changes length, so it gets a new segment instead of deleting the old one
+                self.assertEqual(awg.queue_wfm(np.zeros(awg.minLen * 3), **kwargs), 0)
+                awg.err_check()
+                self.assertFalse(any(':del' in m for m in sim.log))
+
+                self.assertEqual(sorted(sim.segments[1]), [1, 2, 3])
+                self.assertEqual(sim.state['stable1:dynamic:select' if model == 'M8190A' else 'stable:dynamic:select'], '0')
+                table = np.array(sim.sequenceTables[1], dtype=np.uint32).reshape(-1, 6)
+                self.assertEqual(list(table[:, 3]), [3, 2])
+
+                # Same length reuses the segment
+                awg.query('*opc?')
+                start = len(sim.log)
+                self.assertEqual(awg.queue_wfm(np.ones(awg.minLen * 2) * 0.25, **kwargs), 1)
+                awg.query('*opc?')
+                self.assertFalse(any(':def' in m for m in sim.log[start:]))
+
+                # Restarting deletes the old buffers while playback is stopped
+                awg.play_double_buffered(np.zeros(awg.minLen), **kwargs)
+                awg.query('*opc?')
+                self.assertEqual(sorted(sim.segments[1]), [1])
+                awg.err_check()
+
+                # M8195A channels share the sequence table, so a second channel can't be double buffered
+                if model == 'M8195A':
+                    self.assertRaises(pyarbtools.error.AWGError, awg.play_double_buffered, np.zeros(awg.minLen), ch=2)
+                    awg.clear_all_wfm()
+                    awg.play_double_buffered(np.zeros(awg.minLen), ch=2)
+                    self.assertEqual(list(awg.doubleBuffers), [2])
+                awg.disconnect()
+
+    def test_double_buffer_pending(self):
+        for model, cls, kwargs in [('M8190A', M8190A, {'wfmFormat': 'real'}), ('M8195A', M8195A, {})]:
+            with InstrumentSimulator(model, sequenceSwitchTime=0.3) as sim:
+                awg = cls('127.0.0.1', port=sim.port)
+                awg.play_double_buffered(np.zeros(awg.minLen), **kwargs)
+                self.assertEqual(awg.queue_wfm(np.ones(awg.minLen) * 0.5, **kwargs), 1)
+
+                # Buffer 0 is still on air until the switch happens, so a second queue_wfm() can't touch it
+                awg.query('*opc?')
+                playing = bytes(sim.segments[1][1])
+                start = len(sim.log)
+                with self.assertRaises(pyarbtools.error.AWGError):
+                    awg.queue_wfm(np.ones(awg.minLen) * 0.25, timeout=0.05, **kwargs)
+                awg.query('*opc?')
+                self.assertEqual(bytes(sim.segments[1][1]), playing)
+                self.assertFalse(any('data' in m or 'dynamic' in m for m in sim.log[start:]))
+
+                # Waiting long enough confirms the switch and then loads buffer 0
+                self.assertEqual(awg.queue_wfm(np.ones(awg.minLen) * 0.25, **kwargs), 0)
+                awg.query('*opc?')
+                self.assertNotEqual(bytes(sim.segments[1][1]), playing)
+                awg.err_check()
+                awg.disconnect()
+
+    def test_stream_sink(self):
+        with InstrumentSimulator('VectorUXG', streamPort=0, keepStream=True) as sim:
+            uxg = VectorUXG('127.0.0.1', port=sim.port)
+            self.assertEqual(uxg.fs, 250e6)
+            with socket.create_connection(('127.0.0.1', sim.streamPort)) as stream:
+                stream.sendall(bytes(range(256)) * 100)
+            uxg.query('*opc?')
+            while sim.stats['streamBytes'] < 25600:
+                pass
+            self.assertEqual(bytes(sim.streamData), bytes(range(256)) * 100)
+            uxg.disconnect()
+
+    def test_uxg_csv(self):
+        with InstrumentSimulator('VectorUXG') as sim:
+            uxg = VectorUXG('127.0.0.1', port=sim.port)
+            fields = ['Operation', 'Time', 'Frequency']
+            data = [[1, 0, 1e9], [0, 12.5e-6, 1.5e9], [2, 100e-6, 2e9]]
+            uxg.csv_pdw_file_download('small', fields, data, chunkSize=2)
+            expected = 'Operation,Time,Frequency\n1,0,1000000000.0\n0,1.25e-05,1500000000.0\n2,0.0001,2000000000.0\n'
+            self.assertEqual(bytes(sim.memory['small.csv']).decode(), expected)
+
+            # Arrays, dicts, and lists of rows all produce the same text as f'{value}'
+            numPdws = 200000
+            times = np.arange(numPdws) * 1e-6
+            ops = np.zeros(numPdws, dtype=np.int64)
+            ops[0], ops[-1] = 1, 2
+            start = time.perf_counter()
+            uxg.csv_pdw_file_download('big', ['Operation', 'Time'], {'Operation': ops, 'Time': times})
+            self.assertLess(time.perf_counter() - start, 5)
+            rows = ''.join(f'{o},{t}\n' for o, t in zip(ops.tolist(), times.tolist()))
+            self.assertEqual(bytes(sim.memory['big.csv']).decode(), 'Operation,Time\n' + rows)
+
+            uxg.csv_windex_file_download({'fileName': 'windex', 'wfmNames': ['a', 'b', 'c']})
+            self.assertEqual(bytes(sim.memory['windex.csv']).decode(), 'Id,Filename\n0,a\n1,b\n2,c\n')
+            uxg.disconnect()
+
+    def test_vsa_traces(self):
+        with InstrumentSimulator('VSA') as sim:
+            vsa = VSA('127.0.0.1', port=sim.port)
+            sim.traces[3] = (np.arange(5.0), np.arange(5.0) * 2)
+            vsa.write('format:trace:data real64')
+            x = vsa.binblockread('trace3:data:x?', datatype='d').byteswap()
+            self.assertTrue(np.array_equal(x, np.arange(5.0)))
+            vsa.write('format:trace:data ascii')
+            y = [float(v) for v in vsa.query('trace3:data:y?').split(',')]
+            self.assertEqual(y, [0, 2, 4, 6, 8])
+            vsa.disconnect()
+
+    def test_vsa_fetch(self):
+        with InstrumentSimulator('VSA') as sim:
+            vsa = VSA('127.0.0.1', port=sim.port)
+            self.assertEqual(vsa.traceFormat, 'asc')
+            sim.traces[1] = (np.arange(3.0), np.array([0.5, -1.5, 2.25]))
+            sim.traces[2] = (np.arange(70000.0), np.linspace(-1, 1, 70000))
+
+            # One compound query for all traces, sent with the format in the same message
+            y1, y2 = vsa.get_traces([1, 2], dataFormat='real64')
+            self.assertEqual(y1.dtype, np.float64)
+            self.assertEqual(y1.tolist(), [0.5, -1.5, 2.25])
+            self.assertTrue(np.array_equal(y2, np.linspace(-1, 1, 70000)))
+            self.assertEqual(sim.log[-1], 'format:trace:data real64;:trace1:data:y?;:trace2:data:y?')
+            self.assertEqual(vsa.traceFormat, 'real64')
+
+            # A format changed behind the driver's back (e.g. by a preset) doesn't corrupt the next fetch
+            vsa.write('system:preset')
+            vsa.write('format:trace:data real32')
+            self.assertEqual(vsa.get_trace(1, dataFormat='real64').tolist(), [0.5, -1.5, 2.25])
+
+            # Preallocated arrays are filled in place
+            out = np.zeros(70000, dtype=np.float32)
+            x = vsa.get_trace(2, axis='x', out=out)
+            self.assertIs(x, out)
+            self.assertTrue(np.array_equal(out, np.arange(70000.0)))
+            with self.assertRaises(error.VSAError):
+                vsa.get_traces([1, 2], out=[np.zeros(2), None])
+            # The connection is still usable after a size mismatch
+            self.assertEqual(vsa.get_trace(1).tolist(), [0.5, -1.5, 2.25])
+
+            # I + jQ from the x and y axes of an IQ trace
+            iq = vsa.get_iq(2, dataFormat='real64')
+            self.assertEqual(iq.dtype, np.complex128)
+            self.assertTrue(np.array_equal(iq, np.arange(70000.0) + 1j * np.linspace(-1, 1, 70000)))
+            out = np.zeros(70000, dtype=np.complex64)
+            self.assertIs(vsa.get_iq(2, out=out), out)
+            self.assertTrue(np.allclose(out, iq))
+            with self.assertRaises(error.VSAError):
+                vsa.get_trace(1, dataFormat='int16')
+
+            # Automatic error checks don't read the trace data as an error message
+            vsa.globalErrCheck = True
+            self.assertEqual(vsa.get_trace(1).tolist(), [0.5, -1.5, 2.25])
+            self.assertTrue(np.allclose(vsa.get_iq(2), iq))
+            self.assertEqual(vsa.query('*opc?'), '1')
+            vsa.disconnect()
+
+    def test_bandwidth(self):
+        with InstrumentSimulator('VSG', bandwidth=10e6) as sim:
+            vsg = VSG('127.0.0.1', port=sim.port)
+            data = bytes(2_000_000)
+            start = time.perf_counter()
+            vsg.binblockwrite('mmemory:data "WFM1:big", ', data)
+            vsg.query('*opc?')
+            self.assertGreaterEqual(time.perf_counter() - start, 0.15)
+            self.assertEqual(len(sim.memory['WFM1:big']), len(data))
+            vsg.disconnect()
+
+    def test_parallel_download(self):
+        wfms = {name: wfmBuilder.sine_generator(fs=100e6, freq=freq) for name, freq in [('a', 1e6), ('b', 2e6)]}
+        with InstrumentSimulator('VSG') as sim1, InstrumentSimulator('VSG') as sim2:
+            vsg1 = VSG('127.0.0.1', port=sim1.port)
+            vsg2 = FlakyVSG('127.0.0.1', port=sim2.port, failures=1)
+            calls = []
+            results = pyarbtools.multiDownload.parallel_download(
+                [vsg1, vsg2], wfms, progress=lambda inst, wfmID, count, total: calls.append((inst, wfmID, count)))
+            self.assertEqual(results, {vsg1: ['a', 'b'], vsg2: ['a', 'b']})
+            self.assertEqual(sorted(calls, key=lambda c: c[0] is vsg2),
+                             [(vsg1, 'a', 1), (vsg1, 'b', 2), (vsg2, 'a', 1), (vsg2, 'b', 2)])
+
+            # The retry reconnects, so the cut off block doesn't swallow the next download
+            for sim in [sim1, sim2]:
+                for name, wfm in wfms.items():
+                    self.assertEqual(bytes(sim.memory[f'WFM1:{name}']), vsg1.format_wfm(wfm).tobytes())
+
+            # Failures that remain after all retries are raised together
+            vsg2.failures = 10
+            with self.assertRaises(error.MultiDownloadError) as ctx:
+                pyarbtools.multiDownload.parallel_download([vsg1, vsg2], wfms, retries=2)
+            self.assertEqual(list(ctx.exception.failures), [vsg2])
+            self.assertIsInstance(ctx.exception.failures[vsg2], socket.timeout)
+            self.assertEqual(ctx.exception.results, {vsg1: ['a', 'b'], vsg2: []})
+            self.assertEqual(vsg2.failures, 7)
+
+            # Other errors aren't retried
+            vsg2.failures = 0
+            sim2.push_error(-100, 'Command error')
+            with self.assertRaises(error.MultiDownloadError) as ctx:
+                pyarbtools.multiDownload.parallel_download([vsg2], wfms, retryErrors=())
+            self.assertIsInstance(ctx.exception.failures[vsg2], socketscpi.SockInstError)
+            self.assertEqual(ctx.exception.results, {vsg2: []})
+            vsg1.disconnect()
+            vsg2.disconnect()
+
+
+if __name__ == '__main__':
+    unittest.main()
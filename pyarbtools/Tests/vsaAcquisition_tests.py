@@ -0,0 +1,149 @@
+"""Tests for event-driven VSA acquisition control"""
+
+from pyarbtools import error
+from pyarbtools.asyncInstruments import AsyncVSA
+from pyarbtools.simulator import InstrumentSimulator
+from pyarbtools.vsaAcquisition import opc_message, poll_intervals
+from pyarbtools.vsaControl import VSA
+import asyncio
+import itertools
+import time
+import unittest
+
+EVM_KEY = 'trace4:data:table "evmrms"'
+
+
+def evm_sequence(sim, values):
+    """Returns a callback that serves the next EVM value for each acquisition."""
+    values = iter(values)
+    sim.state[EVM_KEY] = str(next(values))
+
+    def callback(controller, value):
+        sim.state[EVM_KEY] = str(next(values, value))
+
+    return callback
+
+
+class VsaAcquisitionTests(unittest.TestCase):
+    def test_messages(self):
+        self.assertEqual(opc_message(['initiate:immediate'], 'opc'), 'initiate:immediate;*opc?')
+        self.assertEqual(opc_message(['initiate:immediate'], 'poll'), '*esr?;:initiate:immediate;*opc')
+        with self.assertRaises(error.VSAError):
+            opc_message(['initiate:immediate'], 'spin')
+        self.assertEqual(list(itertools.islice(poll_intervals(0.01, 0.05), 5)), [0.01, 0.02, 0.04, 0.05, 0.05])
+
+    def test_acquire_single(self):
+        with InstrumentSimulator('VSA', acquisitionTime=0.1) as sim:
+            vsa = VSA('127.0.0.1', port=sim.port)
+            for mode in ['opc', 'poll']:
+                queries = sim.stats['queries']
+                start = time.perf_counter()
+                vsa.acquire_single(mode=mode)
+                self.assertGreaterEqual(time.perf_counter() - start, 0.1)
+                if mode == 'opc':
+                    self.assertEqual(sim.log[-1], 'initiate:immediate;*opc?')
+                    self.assertEqual(sim.stats['queries'] - queries, 1)
+                else:
+                    # Backoff keeps the number of polls low
+                    self.assertLessEqual(sim.stats['queries'] - queries, 6)
+                    self.assertEqual(sim.log[-1], '*esr?')
+
+            with self.assertRaises(error.VSAError):
+                vsa.acquire_single(timeout=0.02, mode='poll')
+
+            # The timed out acquisition finishes later, but its operation complete bit doesn't end the next wait early
+            time.sleep(0.15)
+            start = time.perf_counter()
+            vsa.acquire_single(mode='poll')
+            self.assertGreaterEqual(time.perf_counter() - start, 0.1)
+            vsa.autorange(mode='poll')
+            self.assertIn('*esr?;:input:analog:range:auto;*opc', sim.log)
+
+            # Automatic error checks don't read the *opc? response as an error message
+            vsa.globalErrCheck = True
+            vsa.acquire_single(mode='opc')
+            self.assertEqual(vsa.query('*esr?'), '0')
+            vsa.disconnect()
+
+        with InstrumentSimulator('VSA', acquisitionTime=0.5) as sim:
+            vsa = VSA('127.0.0.1', port=sim.port)
+            with self.assertRaises(error.VSAError):
+                vsa.acquire_single(timeout=0.05)
+            # The late *opc? response must not be read as the answer to the next query
+            sim.state['sense:frequency:center'] = '2000000000'
+            self.assertEqual(vsa.query('sense:frequency:center?'), '2000000000')
+            self.assertEqual(vsa.query('*esr?'), '0')
+            vsa.disconnect()
+
+    def test_acquire_until(self):
+        with InstrumentSimulator('VSA') as sim:
+            vsa = VSA('127.0.0.1', port=sim.port)
+
+            # Stops when the target is reached, one transaction per acquisition
+            callback = evm_sequence(sim, [5, 2, 1, 0.3, 0.2])
+            messages = sim.stats['messages']
+            result = vsa.acquire_until('trace4:data:table? "EvmRms"', target=0.4, callback=callback)
+            self.assertEqual(result['reason'], 'target')
+            self.assertEqual(result['values'], [5, 2, 1, 0.3])
+            self.assertEqual(sim.stats['messages'] - messages, 5)
+            self.assertEqual(sim.log[-1], 'initiate:immediate;*opc?;:trace4:data:table? "EvmRms"')
+
+            # Stops when EVM stops improving
+            callback = evm_sequence(sim, [3, 1, 1.01, 1.005, 0.3])
+            result = vsa.acquire_until('trace4:data:table? "EvmRms"', target=0.4, tolerance=0.02, callback=callback,
+                                       mode='poll')
+            self.assertEqual((result['reason'], result['acquisitions'], result['value']), ('converged', 4, 1.005))
+
+            # Callback can stop the run, maxAcquisitions limits it
+            result = vsa.acquire_until('trace4:data:table? "EvmRms"', target=0.1, callback=lambda c, v: len(c.values) == 2)
+            self.assertEqual((result['reason'], result['acquisitions']), ('callback', 2))
+            result = vsa.acquire_until('trace4:data:table? "EvmRms"', target=0.1, maxAcquisitions=3)
+            self.assertEqual((result['reason'], result['acquisitions']), ('maxAcquisitions', 3))
+
+            sim.acquisitionTime = 0.05
+            with self.assertRaises(error.VSAError):
+                vsa.acquire_until('trace4:data:table? "EvmRms"', target=0.1, timeout=0.2, mode='poll')
+            vsa.disconnect()
+
+    def test_async(self):
+        async def run(sim):
+            async with AsyncVSA('127.0.0.1', port=sim.port) as vsa:
+                callback = evm_sequence(sim, [2, 1, 0.5, 0.1])
+
+                async def async_callback(controller, value):
+                    await asyncio.sleep(0)
+                    callback(controller, value)
+
+                # Other transactions share the connection while the acquisition is polled
+                result, _ = await asyncio.gather(
+                    vsa.acquire_until('trace4:data:table? "EvmRms"', target=0.2, callback=async_callback),
+                    vsa.set_cf(2e9))
+                await vsa.acquire_single()
+                await vsa.autorange()
+
+                # A timed out poll wait doesn't leave its operation complete bit for the next one
+                sim.acquisitionTime = 0.1
+                with self.assertRaises(error.VSAError):
+                    await vsa.acquire_single(timeout=0.02)
+                await asyncio.sleep(0.15)
+                start = time.perf_counter()
+                await vsa.acquire_single()
+                self.assertGreaterEqual(time.perf_counter() - start, 0.1)
+
+                # A timed out *opc? doesn't leave its response queued on the connection
+                sim.acquisitionTime = 0.3
+                with self.assertRaises(error.VSAError):
+                    await vsa.acquire_single(timeout=0.05, mode='opc')
+                sim.acquisitionTime = 0.02
+                self.assertEqual(await vsa.transport.query('sense:frequency:center?'), '2000000000.0')
+                return result, vsa.cf
+
+        with InstrumentSimulator('VSA', acquisitionTime=0.02) as sim:
+            result, cf = asyncio.run(run(sim))
+            self.assertEqual(result['values'], [2, 1, 0.5, 0.1])
+            self.assertEqual(cf, 2e9)
+            self.assertEqual(sim.stats['acquisitions'], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
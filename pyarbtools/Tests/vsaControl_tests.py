@@ -0,0 +1,81 @@
+"""Tests for the VSA settings cache"""
+
+from pyarbtools.simulator import InstrumentSimulator
+from pyarbtools.vsaControl import VSA
+import unittest
+
+
+def settings_sent(sim, start):
+    """Returns the settings commands the simulator received after log index start."""
+    return [m for m in sim.log[start:] if 'sense:' in m and '?' not in m]
+
+
+class VsaControlTests(unittest.TestCase):
+    def test_state_cache(self):
+        with InstrumentSimulator('VSA') as sim:
+            vsa = VSA('127.0.0.1', port=sim.port)
+            start = len(sim.log)
+            vsa.set_cf(2e9)
+            vsa.set_cf(2e9)
+            vsa.set_rbw(1000)
+            vsa.set_rbw(1000)
+            self.assertEqual(settings_sent(sim, start), ['sense:frequency:center 2000000000.0',
+                                                         'sense:rbw:points:auto 1', 'sense:rbw 1000'])
+            self.assertEqual(vsa.cacheStats, {'sent': 2, 'skipped': 2, 'mismatches': 0})
+
+            # Coupled settings are resent after a change that affects them
+            start = len(sim.log)
+            vsa.set_span(1e6)
+            vsa.set_rbw(1000)
+            vsa.set_cf(2e9)
+            self.assertEqual(settings_sent(sim, start), ['sense:frequency:span 1000000.0',
+                                                         'sense:rbw:points:auto 1', 'sense:rbw 1000'])
+
+            # Whole batches are skipped when nothing changes
+            vsa.configure_vector(cf=3e9, span=2e6)
+            start = len(sim.log)
+            vsa.configure_vector(cf=3e9, span=2e6)
+            self.assertEqual(settings_sent(sim, start), [])
+
+            # A failed batch may not have been sent
+            with self.assertRaises(KeyError):
+                vsa.configure_vector(cf=4e9, bogus=1)
+            self.assertEqual(vsa.cache, {})
+
+            # Presets, recalls, and measurement changes invalidate the cache
+            vsa.set_cf(2e9)
+            vsa.write('system:preset')
+            self.assertEqual(vsa.cache, {})
+            vsa.set_cf(2e9)
+            vsa.set_measurement('ddemod')
+            self.assertNotIn('cf', vsa.cache)
+            vsa.set_symRate(1e6)
+            vsa.set_measurement('ddemod')
+            start = len(sim.log)
+            vsa.set_symRate(1e6)
+            self.assertEqual(sim.log[start:], ['ddemod:srate 1000000.0', 'ddemod:srate?'])
+
+            # Verify mode checks the setting with a query and resends it if it changed behind the cache
+            vsa.verify = True
+            vsa.set_cf(2e9)
+            start = len(sim.log)
+            vsa.set_cf(2e9)
+            self.assertEqual(sim.log[start:], ['sense:frequency:center?'])
+            sim.state['sense:frequency:center'] = '1000000000'
+            vsa.set_cf(2e9)
+            self.assertEqual(sim.log[-2:], ['sense:frequency:center 2000000000.0', 'sense:frequency:center?'])
+            self.assertEqual(vsa.cacheStats['mismatches'], 1)
+            self.assertEqual(sim.state['sense:frequency:center'], '2000000000.0')
+
+            # Cache off always sends
+            vsa.verify = False
+            vsa.stateCache = False
+            start = len(sim.log)
+            vsa.set_cf(2e9)
+            vsa.set_cf(2e9)
+            self.assertEqual(len(settings_sent(sim, start)), 2)
+            vsa.disconnect()
+
+
+if __name__ == '__main__':
+    unittest.main()
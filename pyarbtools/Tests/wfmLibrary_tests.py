@@ -0,0 +1,58 @@
+"""Tests for the VectorUXG waveform library manager"""
+
+from pyarbtools import pdwBuilder
+from pyarbtools import error
+from pyarbtools import wfmBuilder
+from pyarbtools.instruments import VectorUXG
+from pyarbtools.simulator import InstrumentSimulator
+from pyarbtools.wfmLibrary import WfmLibrary, parse_catalog
+import numpy as np
+import unittest
+
+
+class WfmLibraryTests(unittest.TestCase):
+    def test_parse_catalog(self):
+        response = '1024,2048,"WFM1:a,BIN,512","b,BIN,512"'
+        self.assertEqual(parse_catalog(response), {'a', 'b'})
+        self.assertEqual(parse_catalog('0,0'), set())
+
+    def test_build(self):
+        with InstrumentSimulator('VectorUXG') as sim:
+            uxg = VectorUXG('127.0.0.1', port=sim.port)
+            library = WfmLibrary(uxg)
+            sine = wfmBuilder.sine_generator(fs=uxg.fs, freq=1e6, wfmFormat='iq')
+            chirp = wfmBuilder.chirp_generator(fs=uxg.fs, pWidth=10e-6, pri=20e-6, chirpBw=20e6, wfmFormat='iq')
+            wfms = [sine, chirp, sine.copy(), chirp * 0.5]
+
+            # Index 3 is unused and the duplicate sine shares an entry
+            pdws = [[1, 1e9, 0, 0, 0, 0, 0, 0, 2, 0xF],
+                    [0, 1e9, 0, 10e-6, 0, 0, 0, 0, 1, 0xF],
+                    [0, 1e9, 0, 20e-6, 0, 0, 0, 0, 0, 0xF],
+                    [2, 1e9, 0, 30e-6, 0, 0, 0, 0, 0, 0xF]]
+            newPdws, windex = library.build(pdws, wfms, windexName='scenario')
+            sineName, chirpName = library.wfm_name(sine), library.wfm_name(chirp)
+            self.assertEqual(windex, {'fileName': 'scenario', 'wfmNames': [sineName, chirpName]})
+            self.assertEqual([p[8] for p in newPdws], [0, 1, 0, 0])
+            self.assertEqual(pdws[1][8], 1)
+            self.assertEqual(pdws[0][8], 2)
+            self.assertIn(f'WFM1:{sineName}', sim.memory)
+            self.assertIn(f'WFM1:{chirpName}', sim.memory)
+            self.assertNotIn(f'WFM1:{library.wfm_name(chirp * 0.5)}', sim.memory)
+            self.assertEqual(bytes(sim.memory['scenario.csv']).decode(), f'Id,Filename\n0,{sineName}\n1,{chirpName}\n')
+            self.assertEqual(library.stats['uploaded'], 2)
+
+            # A new library finds the waveforms in the instrument catalog and sends nothing
+            table = pdwBuilder.PdwTable.from_list(pdws, 'vector')
+            library = WfmLibrary(uxg)
+            newTable, windex = library.build(table, wfms, windexName='scenario')
+            self.assertEqual(library.stats, {'uploaded': 0, 'skipped': 2, 'bytesSent': 0})
+            np.testing.assert_array_equal(newTable.wIndex, [0, 1, 0, 0])
+            np.testing.assert_array_equal(table.wIndex, [2, 1, 0, 0])
+
+            with self.assertRaises(error.UXGError):
+                library.build(pdws, wfms[:2])
+            uxg.disconnect()
+
+
+if __name__ == '__main__':
+    unittest.main()
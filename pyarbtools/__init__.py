@@ -18,5 +18,13 @@ from pyarbtools import instruments
 from pyarbtools import wfmBuilder
 from pyarbtools import error
 from pyarbtools import vsaControl
+from pyarbtools import vsaAcquisition
 from pyarbtools import pdwBuilder
+from pyarbtools import asyncInstruments
+from pyarbtools import multiDownload
+from pyarbtools import simulator
+from pyarbtools import pdwStreaming
+from pyarbtools import pdwScenario
+from pyarbtools import wfmLibrary
+from pyarbtools import pdwConvert
 from pyarbtools import gui
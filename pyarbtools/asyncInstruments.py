@@ -0,0 +1,572 @@
+"""
+asyncInstruments
+Author: Morgan Allison, Keysight RF/uW Application Engineer
+asyncio variants of the PyArbTools instrument classes. Independent
+instruments can be configured, loaded, and played concurrently from a
+single event loop.
+
+The async classes subclass the regular instrument classes so that
+validation, waveform formatting, and SCPI command generation are shared.
+Each async method runs the regular (blocking) method in record mode,
+which collects commands, binary blocks, and read-backs without touching
+the network, and then replays them over an asyncio transport.
+
+Example:
+    async def main():
+        async with AsyncVSG('192.168.1.10') as vsg1, AsyncVSG('192.168.1.11') as vsg2:
+            await asyncio.gather(vsg1.configure(cf=1e9, amp=-10), vsg2.configure(cf=2e9, amp=-10))
+            await asyncio.gather(vsg1.download_wfm(wfm, 'test'), vsg2.download_wfm(wfm, 'test'))
+            await asyncio.gather(vsg1.play('test'), vsg2.play('test'))
+"""
+
+import asyncio
+import functools
+import socket
+
+import socketscpi
+
+from pyarbtools import error
+from pyarbtools import instruments
+from pyarbtools import vsaControl
+from pyarbtools import vsaAcquisition
+from pyarbtools.batchConfig import join_commands
+
+
+class AsyncSocketInstrument:
+    """
+    asyncio socket transport for SCPI instruments. Mirrors the subset of
+    socketscpi.SocketInstrument used by PyArbTools, but every I/O method
+    is a coroutine.
+
+    Attributes:
+        host (str): Instrument host name or IP address.
+        port (int): Instrument socket port.
+        timeout (float): Timeout in seconds for connecting and reading.
+        instId (str): Response to *idn? query.
+        lock (asyncio.Lock): Held while a transaction is in progress so
+            that concurrent coroutines don't interleave commands.
+    """
+
+    def __init__(self, host, port=5025, timeout=10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.instId = ''
+        self.reader = None
+        self.writer = None
+        self.lock = None
+
+    async def connect(self):
+        """Opens the socket connection and reads the instrument ID."""
+        self.lock = asyncio.Lock()
+        await self.open()
+        self.instId = await self.query('*idn?')
+
+    async def reconnect(self):
+        """
+        Closes and reopens the socket connection, keeping the lock. Discards
+        responses to queries that were abandoned after a timeout.
+        """
+        await self.close()
+        await self.open()
+
+    async def open(self):
+        """HELPER FUNCTION Opens the socket connection."""
+        # Allow long responses (e.g. catalogs and ASCII traces) to be read as a single line
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, limit=2 ** 24), self.timeout)
+        sock = self.writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    async def close(self):
+        """Gracefully closes socket connection."""
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+            self.writer = None
+            self.reader = None
+
+    async def write(self, cmd):
+        """
+        Writes a command to the instrument.
+        Args:
+            cmd (str): SCPI command.
+        """
+
+        if not isinstance(cmd, str):
+            raise socketscpi.SockInstError('Argument must be a string.')
+        self.writer.write(f'{cmd}\n'.encode('latin_1'))
+        await self.writer.drain()
+
+    async def read(self):
+        """
+        Reads the output buffer of the instrument.
+
+        Returns:
+            (str): Contents of the instrument's output buffer.
+        """
+
+        response = await asyncio.wait_for(self.reader.readuntil(b'\n'), self.timeout)
+        return response.decode('latin_1').strip()
+
+    async def query(self, cmd):
+        """
+        Sends query to instrument and reads the output buffer immediately afterward.
+        Args:
+            cmd (str): SCPI query (must end in a "?" character).
+
+        Returns:
+            (str): Response from instrument's output buffer.
+        """
+
+        if '?' not in cmd:
+            raise socketscpi.SockInstError('Query must include "?"')
+        await self.write(cmd)
+        return await self.read()
+
+    async def err_check(self):
+        """Reads and clears the error queue. Raises SockInstError with the info of the error(s) encountered."""
+
+        err = []
+        temp = (await self.query('SYSTem:ERRor?')).replace('+', '').replace('-', '')
+        while '0,"No error' not in temp:
+            err.append(temp)
+            temp = (await self.query('SYSTem:ERRor?')).replace('+', '').replace('-', '')
+        if err:
+            raise socketscpi.SockInstError(err)
+
+    async def binblockwrite(self, cmd, data):
+        """
+        Sends a command and payload data with IEEE 488.2 binary block format.
+        Args:
+            cmd (str): SCPI command used to send data to instrument as a binary block.
+            data (NumPy array/bytes): Payload data.
+        """
+
+        numBytes = memoryview(data).nbytes
+        header = f'#{len(str(numBytes))}{numBytes}'
+        self.writer.write(f'{cmd}{header}'.encode('latin_1'))
+        self.writer.write(memoryview(data).cast('B'))
+        self.writer.write(b'\n')
+        await self.writer.drain()
+
+
+def recorded(func):
+    """
+    Creates an async version of a regular instrument method. Called
+    from inside another recorded method, the regular method runs
+    directly so that it becomes part of the outer transaction.
+    Args:
+        func (function): Regular instrument method.
+
+    Returns:
+        (function): Coroutine function that records func and replays it over the async transport.
+    """
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if self.batchState is not None:
+            return func(self, *args, **kwargs)
+        return self.execute(func, self, *args, **kwargs)
+
+    return wrapper
+
+
+class AsyncDriverMixin:
+    """
+    Mixin that turns a regular instrument class into an async one. Must
+    come before the instrument class in the list of base classes.
+
+    Outside of a transaction, write(), query(), and err_check() return
+    awaitables that use the async transport directly. Inside a
+    transaction, they are recorded for replay. Only '*opc?' can be
+    queried directly inside a transaction, because the response to any
+    other query isn't known until the transaction is replayed. Settings
+    must be read back with set_and_read()/read_setting() instead.
+    """
+
+    def __init__(self, host, port=5025, timeout=10, reset=False):
+        self.transport = AsyncSocketInstrument(host, port, timeout)
+        self.host = host
+        self.reset = reset
+        self.instId = ''
+        self.ops = []
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, excType, excValue, traceback):
+        await self.close()
+
+    async def connect(self):
+        """Opens the connection, optionally resets the instrument, and reads all settings."""
+        await self.transport.connect()
+        self.instId = self.transport.instId
+        if self.reset:
+            await self.write('*rst')
+            await self.query('*opc?')
+        await self.execute(self.init_settings)
+
+    async def close(self):
+        """Closes the connection to the instrument."""
+        await self.transport.close()
+
+    async def execute(self, func, *args, **kwargs):
+        """
+        Runs a regular instrument method in record mode and replays the
+        recorded commands over the async transport.
+        Args:
+            func (function): Regular instrument method (bound or unbound).
+            *args: Positional arguments for func.
+            **kwargs: Keyword arguments for func.
+
+        Returns:
+            Return value of func.
+        """
+
+        async with self.transport.lock:
+            self.ops = []
+            with self.batch():
+                result = func(*args, **kwargs)
+            ops = self.ops
+            self.ops = []
+            for op in ops:
+                if op[0] == 'write':
+                    await self.transport.write(op[1])
+                elif op[0] == 'query':
+                    await self.transport.query(op[1])
+                elif op[0] == 'binblock':
+                    await self.transport.binblockwrite(op[1], op[2])
+                else:
+                    await self.replay_batch(op[1])
+        return result
+
+    async def replay_batch(self, batch):
+        """
+        HELPER FUNCTION
+        Async counterpart of send_batch().
+        Args:
+            batch (ConfigBatch): Recorded batch.
+        """
+
+        while True:
+            msg = batch.take_message()
+            if msg:
+                await self.transport.write(msg)
+            query, readbacks = batch.take_query()
+            if not readbacks:
+                break
+            response = await self.transport.query(query)
+            # Read-back hooks may request follow-up read-backs, so keep the batch active while applying them
+            self.batchState = batch
+            try:
+                batch.apply(self, readbacks, response)
+            finally:
+                self.batchState = None
+
+        if batch.errCheck:
+            await self.transport.err_check()
+
+    def send_batch(self):
+        """Records the finished batch for replay instead of sending it."""
+        self.ops.append(('batch', self.batchState))
+        self.batchState = None
+
+    def flush_writes(self):
+        """HELPER FUNCTION: Records pending batch commands so that subsequent operations stay in order."""
+        msg = self.batchState.take_message()
+        if msg:
+            self.ops.append(('write', msg))
+
+    def write(self, cmd, *args, **kwargs):
+        """Records a command in a transaction. Otherwise returns an awaitable that writes it to the instrument."""
+        if self.batchState is None:
+            return self.transport.write(cmd)
+        self.batchState.writes.append(cmd)
+
+    def query(self, cmd, *args, **kwargs):
+        """Records a '*opc?' synchronization point in a transaction. Otherwise returns an awaitable query."""
+        if self.batchState is None:
+            return self.transport.query(cmd)
+        if cmd.strip().lower() != '*opc?':
+            raise error.AsyncInstrumentError(f'"{cmd}" requires a response before the transaction can continue. '
+                                             'Use read_setting() or query it directly outside the transaction.')
+        self.flush_writes()
+        self.ops.append(('query', cmd))
+        return '1'
+
+    def err_check(self):
+        """Defers the error check to the end of a transaction. Otherwise returns an awaitable error check."""
+        if self.batchState is None:
+            return self.transport.err_check()
+        self.batchState.errCheck = True
+
+    def binblockwrite(self, cmd, data, *args, **kwargs):
+        """Records a binary block write in a transaction."""
+        if self.batchState is None:
+            return self.transport.binblockwrite(cmd, data)
+        self.flush_writes()
+        self.ops.append(('binblock', cmd, data))
+
+
+class AsyncVSG(AsyncDriverMixin, instruments.VSG):
+    """
+    asyncio variant of instruments.VSG.
+    Usage:
+        vsg = AsyncVSG('192.168.1.10')
+        await vsg.connect()
+    """
+
+    configure = recorded(instruments.VSG.configure)
+    set_rfState = recorded(instruments.VSG.set_rfState)
+    set_modState = recorded(instruments.VSG.set_modState)
+    set_arbState = recorded(instruments.VSG.set_arbState)
+    set_cf = recorded(instruments.VSG.set_cf)
+    set_amp = recorded(instruments.VSG.set_amp)
+    set_alcState = recorded(instruments.VSG.set_alcState)
+    set_iqScale = recorded(instruments.VSG.set_iqScale)
+    set_fs = recorded(instruments.VSG.set_fs)
+    set_refSrc = recorded(instruments.VSG.set_refSrc)
+    download_wfm = recorded(instruments.VSG.download_wfm)
+    download_formatted_wfm = recorded(instruments.VSG.download_formatted_wfm)
+    delete_wfm = recorded(instruments.VSG.delete_wfm)
+    clear_all_wfm = recorded(instruments.VSG.clear_all_wfm)
+    play = recorded(instruments.VSG.play)
+    stop = recorded(instruments.VSG.stop)
+
+
+class AsyncVXG(AsyncDriverMixin, instruments.VXG):
+    """
+    asyncio variant of instruments.VXG.
+    Usage:
+        vxg = AsyncVXG('192.168.1.10')
+        await vxg.connect()
+    """
+
+    configure = recorded(instruments.VXG.configure)
+    set_rfState = recorded(instruments.VXG.set_rfState)
+    set_modState = recorded(instruments.VXG.set_modState)
+    set_arbState = recorded(instruments.VXG.set_arbState)
+    set_cf = recorded(instruments.VXG.set_cf)
+    set_amp = recorded(instruments.VXG.set_amp)
+    set_alcState = recorded(instruments.VXG.set_alcState)
+    set_iqScale = recorded(instruments.VXG.set_iqScale)
+    set_fs = recorded(instruments.VXG.set_fs)
+    set_refSrc = recorded(instruments.VXG.set_refSrc)
+    download_wfm = recorded(instruments.VXG.download_wfm)
+    download_formatted_wfm = recorded(instruments.VXG.download_formatted_wfm)
+    clear_all_wfm = recorded(instruments.VXG.clear_all_wfm)
+    play = recorded(instruments.VXG.play)
+    stop = recorded(instruments.VXG.stop)
+
+
+class AsyncAnalogUXG(AsyncDriverMixin, instruments.AnalogUXG):
+    """
+    asyncio variant of instruments.AnalogUXG.
+    Usage:
+        uxg = AsyncAnalogUXG('192.168.1.10')
+        await uxg.connect()
+    """
+
+    def __init__(self, host, port=5025, timeout=10, reset=False, errCheck=True):
+        super().__init__(host, port, timeout, reset)
+        self.errCheck = errCheck
+
+    async def connect(self):
+        """Opens the connection, selects streaming mode, and reads all settings."""
+        await self.transport.connect()
+        self.instId = self.transport.instId
+        if self.reset:
+            await self.write('*rst')
+            await self.query('*opc?')
+
+        # Check N5193A to make sure Streaming mode is selected
+        mode = await self.query('inst:select?')
+        if mode != "STR":
+            await self.write('inst:select str')
+            await self.query('*opc?')
+
+        await self.execute(self.init_settings)
+
+    configure = recorded(instruments.AnalogUXG.configure)
+    set_rfState = recorded(instruments.AnalogUXG.set_rfState)
+    set_modState = recorded(instruments.AnalogUXG.set_modState)
+    set_cf = recorded(instruments.AnalogUXG.set_cf)
+    set_amp = recorded(instruments.AnalogUXG.set_amp)
+    download_bin_pdw_file = recorded(instruments.AnalogUXG.download_bin_pdw_file)
+    stream_play = recorded(instruments.AnalogUXG.stream_play)
+    stream_stop = recorded(instruments.AnalogUXG.stream_stop)
+
+
+class AsyncVectorUXG(AsyncDriverMixin, instruments.VectorUXG):
+    """
+    asyncio variant of instruments.VectorUXG.
+    Usage:
+        uxg = AsyncVectorUXG('192.168.1.10')
+        await uxg.connect()
+    """
+
+    def __init__(self, host, port=5025, timeout=10, reset=False, clearMemory=False, errCheck=True):
+        super().__init__(host, port, timeout, reset)
+        self.clearMemory = clearMemory
+        self.errCheck = errCheck
+
+    async def connect(self):
+        """Opens the connection, optionally resets the instrument and clears memory, and reads all settings."""
+        await self.transport.connect()
+        self.instId = self.transport.instId
+        if self.reset:
+            await self.write('*rst')
+            await self.query('*opc?')
+        await self.execute(self.init_settings, self.clearMemory)
+
+    configure = recorded(instruments.VectorUXG.configure)
+    set_rfState = recorded(instruments.VectorUXG.set_rfState)
+    set_modState = recorded(instruments.VectorUXG.set_modState)
+    set_cf = recorded(instruments.VectorUXG.set_cf)
+    set_amp = recorded(instruments.VectorUXG.set_amp)
+    set_iqScale = recorded(instruments.VectorUXG.set_iqScale)
+    stream_configure = recorded(instruments.VectorUXG.stream_configure)
+    download_wfm = recorded(instruments.VectorUXG.download_wfm)
+    download_formatted_wfm = recorded(instruments.VectorUXG.download_formatted_wfm)
+    csv_windex_file_download = recorded(instruments.VectorUXG.csv_windex_file_download)
+    clear_all_wfm = recorded(instruments.VectorUXG.clear_all_wfm)
+    play = recorded(instruments.VectorUXG.play)
+    stop = recorded(instruments.VectorUXG.stop)
+    stream_play = recorded(instruments.VectorUXG.stream_play)
+    stream_stop = recorded(instruments.VectorUXG.stream_stop)
+
+
+class AsyncVSA(AsyncDriverMixin, vsaControl.VSA):
+    """
+    asyncio variant of vsaControl.VSA.
+    Usage:
+        vsa = AsyncVSA('127.0.0.1', vsaHardware='"Analyzer1"')
+        await vsa.connect()
+    """
+
+    def __init__(self, host, port=5025, timeout=10, reset=False, vsaHardware=None, stateCache=True, verify=False):
+        # Set up hardware
+        if not isinstance(vsaHardware, str) and vsaHardware is not None:
+            raise error.VSAError('vsaHardware must be a string indicating which hardware platform to use.')
+
+        super().__init__(host, port, timeout, reset)
+        self.hw = vsaHardware
+        self.init_cache(stateCache, verify)
+
+    async def connect(self):
+        """Opens the connection, selects hardware, optionally resets VSA, and reads global settings."""
+        await self.transport.connect()
+        self.instId = self.transport.instId
+
+        if self.hw is not None:
+            await self.set_hw(self.hw)
+
+        if self.reset:
+            # Reset, wait for reset to finish, and stop acquisition
+            await self.write('system:preset')
+            await self.query('*opc?')
+
+        await self.execute(self.init_settings)
+
+    async def set_hw(self, hw):
+        """
+        Sets and reads hardware configuration for VSA. Checks to see if selected hardware is valid.
+        Args:
+            hw (str): Identifier string for acquisition hardware used for VSA
+        """
+
+        async with self.transport.lock:
+            # Get list of available hardware
+            hwList = (await self.transport.query('system:vsa:hardware:configuration:catalog?')).split(',')
+
+            # Check to see if user-selected hardware is available
+            if f'"{hw}"' not in hwList:
+                raise ValueError('Selected hardware not present in VSA hardware list.')
+
+            # If available, connect and wait for operation to finish
+            await self.transport.write(f'system:vsa:hardware:configuration:select "{hw}"')
+            await self.transport.query('*opc?')
+            self.hw = await self.transport.query('system:vsa:hardware:configuration:select?')
+            self.invalidate()
+
+    async def acquire_single(self, timeout=60, mode='poll'):
+        """
+        Sets single acquisition mode and takes a single acquisition. In
+        'poll' mode the connection is free for other coroutines while VSA acquires.
+        Args:
+            timeout (float): Time in seconds to wait for the acquisition to complete.
+            mode (str): Completion detection. 'poll' (*esr? polling) or 'opc' (blocking *opc?).
+        """
+
+        async with self.transport.lock:
+            await self.transport.write('initiate:continuous off')
+        await vsaAcquisition.wait_for_opc_async(self, ['initiate:immediate'], timeout, mode)
+
+    async def acquire_until(self, measure, target=None, tolerance=None, settle=3, maxAcquisitions=None, timeout=60,
+                            mode='poll', pollInterval=0.01, maxPollInterval=0.5, callback=None):
+        """
+        Async counterpart of VSA.acquire_until(). callback may be a coroutine function.
+
+        Returns:
+            (dict): {'value', 'values', 'acquisitions', 'reason', 'elapsed'}
+        """
+
+        controller = vsaAcquisition.AcquisitionController(self, measure, target, tolerance, settle, maxAcquisitions,
+                                                          timeout, mode, pollInterval, maxPollInterval, callback)
+        return await controller.run_async()
+
+    async def autorange(self, timeout=60, mode='poll'):
+        """
+        Executes an amplitude autorange and waits for it to complete.
+        Args:
+            timeout (float): Time in seconds to wait for the autorange to complete.
+            mode (str): Completion detection. 'poll' (*esr? polling) or 'opc' (blocking *opc?).
+        """
+
+        async with self.transport.lock:
+            await self.transport.write(join_commands(['initiate:continuous on', 'initiate:immediate']))
+        await vsaAcquisition.wait_for_opc_async(self, ['input:analog:range:auto'], timeout, mode)
+
+        # Turn it back off when we're done
+        async with self.transport.lock:
+            await self.transport.write('initiate:continuous off')
+
+    acquire_continuous = recorded(vsaControl.VSA.acquire_continuous)
+    stop = recorded(vsaControl.VSA.stop)
+    set_cf = recorded(vsaControl.VSA.set_cf)
+    set_amp = recorded(vsaControl.VSA.set_amp)
+    set_span = recorded(vsaControl.VSA.set_span)
+    set_measurement = recorded(vsaControl.VSA.set_measurement)
+    configure_ddemod = recorded(vsaControl.VSA.configure_ddemod)
+    set_modType = recorded(vsaControl.VSA.set_modType)
+    set_symRate = recorded(vsaControl.VSA.set_symRate)
+    set_measFilter = recorded(vsaControl.VSA.set_measFilter)
+    set_refFilter = recorded(vsaControl.VSA.set_refFilter)
+    set_filterAlpha = recorded(vsaControl.VSA.set_filterAlpha)
+    set_measLength = recorded(vsaControl.VSA.set_measLength)
+    set_eqState = recorded(vsaControl.VSA.set_eqState)
+    set_eqLength = recorded(vsaControl.VSA.set_eqLength)
+    set_eqConvergence = recorded(vsaControl.VSA.set_eqConvergence)
+    configure_vector = recorded(vsaControl.VSA.configure_vector)
+    set_rbw = recorded(vsaControl.VSA.set_rbw)
+    set_time = recorded(vsaControl.VSA.set_time)
+    recall_recording = recorded(vsaControl.VSA.recall_recording)
+    set_traceFormat = recorded(vsaControl.VSA.set_traceFormat)
+
+    def get_traces(self, *args, **kwargs):
+        """Binary trace reads aren't supported over the async transport."""
+        raise error.AsyncInstrumentError('get_traces() reads binary blocks from a blocking socket and isn\'t '
+                                         'available on AsyncVSA. Use vsaControl.VSA to read traces.')
+
+    def get_trace(self, *args, **kwargs):
+        """Binary trace reads aren't supported over the async transport."""
+        raise error.AsyncInstrumentError('get_trace() reads binary blocks from a blocking socket and isn\'t '
+                                         'available on AsyncVSA. Use vsaControl.VSA to read traces.')
+
+    def get_iq(self, *args, **kwargs):
+        """Binary trace reads aren't supported over the async transport."""
+        raise error.AsyncInstrumentError('get_iq() reads binary blocks from a blocking socket and isn\'t '
+                                         'available on AsyncVSA. Use vsaControl.VSA to read traces.')
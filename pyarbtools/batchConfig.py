@@ -0,0 +1,283 @@
+"""
+batchConfig
+Author: Morgan Allison, Keysight RF/uW Application Engineer
+Write-coalescing configuration support for PyArbTools instrument classes.
+Settings changed inside a batch are sent as a single SCPI program
+message, their read-backs are fetched with a single compound query,
+and the error queue is checked once at the end.
+"""
+
+from contextlib import contextmanager
+
+
+def join_commands(cmds):
+    """
+    HELPER FUNCTION
+    Joins a list of SCPI commands into a single program message. Each
+    command after the first is forced back to the root of the command
+    tree so that it is interpreted exactly as if it were sent by itself.
+    Args:
+        cmds (list(str)): SCPI commands or queries.
+
+    Returns:
+        (str): Compound SCPI program message.
+    """
+
+    msg = [cmds[0]]
+    for c in cmds[1:]:
+        if c[:1] in [':', '*']:
+            msg.append(c)
+        else:
+            msg.append(f':{c}')
+    return ';'.join(msg)
+
+
+def split_responses(response, count):
+    """
+    HELPER FUNCTION
+    Splits the response to a compound query into individual responses.
+    Semicolons inside quoted strings are ignored.
+    Args:
+        response (str): Response to a compound query.
+        count (int): Number of queries contained in the compound query.
+
+    Returns:
+        (list(str)): Individual query responses.
+    """
+
+    responses = []
+    start = 0
+    inQuote = False
+    for idx, char in enumerate(response):
+        if char == '"':
+            inQuote = not inQuote
+        elif char == ';' and not inQuote:
+            responses.append(response[start:idx].strip())
+            start = idx + 1
+    responses.append(response[start:].strip())
+
+    if len(responses) != count:
+        raise ValueError(f'Expected {count} responses to compound query, got {len(responses)}: "{response}"')
+    return responses
+
+
+class ConfigBatch:
+    """
+    Holds the commands and deferred read-backs collected while an
+    instrument is in batch mode.
+
+    Attributes:
+        writes (list(str)): SCPI commands waiting to be sent.
+        readbacks (list(tuple)): (query, attr, parser, after) tuples waiting to be read back.
+        errCheck (bool): Determines if the error queue is checked after the batch is sent.
+    """
+
+    def __init__(self):
+        self.writes = []
+        self.readbacks = []
+        self.errCheck = False
+
+    def take_message(self):
+        """Returns all pending commands as a single program message (or None) and clears them."""
+        if not self.writes:
+            return None
+        msg = join_commands(self.writes)
+        self.writes = []
+        return msg
+
+    def take_query(self):
+        """Returns all pending read-backs and their compound query and clears them."""
+        readbacks = self.readbacks
+        self.readbacks = []
+        if not readbacks:
+            return None, readbacks
+        return join_commands([r[0] for r in readbacks]), readbacks
+
+    @staticmethod
+    def apply(inst, readbacks, response):
+        """
+        Parses the response to a compound query and updates the
+        corresponding class attributes of inst.
+        Args:
+            inst (object): Instrument object whose attributes are updated.
+            readbacks (list(tuple)): Read-backs returned by take_query().
+            response (str): Response to the compound query.
+        """
+
+        responses = split_responses(response, len(readbacks))
+        for (query, attr, parser, after), r in zip(readbacks, responses):
+            if attr is not None:
+                setattr(inst, attr, parser(r))
+            if after is not None:
+                after()
+
+
+class BatchConfigMixin:
+    """
+    Mixin for socketscpi.SocketInstrument subclasses that adds a
+    transactional batch mode. Must come before SocketInstrument in the
+    list of base classes.
+
+    Inside a batch, write() calls are collected rather than sent, and
+    read-backs requested through set_and_read()/read_setting() are
+    deferred. When the batch ends, all collected commands are sent as
+    one message, all read-backs are fetched with one compound query,
+    and err_check() runs once if it was called during the batch. Any
+    explicit query() or binary block write sent during a batch first
+    flushes pending commands so that command order is always preserved. If an exception is
+    raised inside a batch, commands that have not been sent yet are
+    discarded.
+    """
+
+    batchState = None
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager that groups settings changes into a single transaction.
+        Nested calls join the outer batch.
+
+        Yields:
+            (ConfigBatch): Batch object holding pending commands and read-backs.
+        """
+
+        if self.batchState is not None:
+            yield self.batchState
+            return
+
+        self.batchState = ConfigBatch()
+        try:
+            yield self.batchState
+        except BaseException:
+            self.batchState = None
+            raise
+        self.send_batch()
+
+    def send_batch(self):
+        """
+        HELPER FUNCTION
+        Sends pending commands, reads back all deferred settings, and
+        performs a single error check if one was requested.
+        """
+
+        batch = self.batchState
+        self.batchState = None
+        while True:
+            msg = batch.take_message()
+            if msg:
+                self.write(msg)
+            query, readbacks = batch.take_query()
+            if not readbacks:
+                break
+            response = self.query(query)
+            # Read-back hooks may request follow-up read-backs, so keep the batch active while applying them
+            self.batchState = batch
+            try:
+                batch.apply(self, readbacks, response)
+            finally:
+                self.batchState = None
+
+        if batch.errCheck:
+            self.err_check()
+
+    def write(self, cmd, *args, **kwargs):
+        """Writes a command to the instrument, or adds it to the pending batch if batch mode is active."""
+        if self.batchState is None:
+            return super().write(cmd, *args, **kwargs)
+        self.batchState.writes.append(cmd)
+
+    def query(self, cmd, *args, **kwargs):
+        """Sends any pending batch commands, then sends query to instrument and reads the response."""
+        if self.batchState is None:
+            return super().query(cmd, *args, **kwargs)
+        with self.suspend_batch():
+            return super().query(cmd, *args, **kwargs)
+
+    def write_binary_values(self, cmd, data, *args, **kwargs):
+        """
+        Sends any pending batch commands, then sends a binary block.
+        binblockwrite() goes through this method, so binary data is never
+        sent ahead of commands that were batched before it.
+        """
+        with self.suspend_batch():
+            return super().write_binary_values(cmd, data, *args, **kwargs)
+
+    def query_binary_values(self, cmd, *args, **kwargs):
+        """
+        Sends any pending batch commands, then sends a binary block query
+        and reads the response. binblockread() goes through this method.
+        """
+        with self.suspend_batch():
+            return super().query_binary_values(cmd, *args, **kwargs)
+
+    @contextmanager
+    def suspend_batch(self):
+        """
+        HELPER FUNCTION
+        Context manager that sends any pending batch commands and talks to
+        the instrument directly until it exits. Used by queries, which
+        need their response before the batch ends, and by binary writes,
+        which can't be joined into a program message.
+        """
+
+        batch = self.batchState
+        if batch is None:
+            yield
+            return
+
+        self.batchState = None
+        try:
+            msg = batch.take_message()
+            if msg:
+                super().write(msg)
+            yield
+        finally:
+            self.batchState = batch
+
+    def err_check(self):
+        """Checks the instrument error queue. In batch mode, the check is deferred until the batch is sent."""
+        if self.batchState is None:
+            return super().err_check()
+        self.batchState.errCheck = True
+
+    def set_and_read(self, cmd, query, attr, parser=str.strip, after=None, pending=None):
+        """
+        HELPER FUNCTION
+        Sends a setting command and reads the resulting value back into a class attribute.
+        Args:
+            cmd (str): SCPI command that changes the setting.
+            query (str): SCPI query that reads the setting back.
+            attr (str): Name of the class attribute that holds the setting.
+            parser (function): Converts the query response to the attribute value.
+            after (function): Optional function called after the attribute is updated.
+            pending: Optional value assigned to attr until the read-back arrives
+                in batch mode. Use this when later commands in the same batch
+                depend on the new setting.
+        """
+
+        self.write(cmd)
+        if pending is not None and self.batchState is not None:
+            setattr(self, attr, pending)
+        self.read_setting(query, attr, parser, after)
+
+    def read_setting(self, query, attr, parser=str.strip, after=None):
+        """
+        HELPER FUNCTION
+        Reads a setting into a class attribute. In batch mode, the read
+        is deferred until the batch is sent.
+        Args:
+            query (str): SCPI query that reads the setting.
+            attr (str): Name of the class attribute that holds the setting. None skips the assignment.
+            parser (function): Converts the query response to the attribute value.
+            after (function): Optional function called after the attribute is updated.
+        """
+
+        if self.batchState is not None:
+            self.batchState.readbacks.append((query, attr, parser, after))
+            return
+
+        response = self.query(query)
+        if attr is not None:
+            setattr(self, attr, parser(response))
+        if after is not None:
+            after()
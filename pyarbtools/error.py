@@ -39,6 +39,27 @@ class VSAError(Exception):
     """VSA Exception class"""
     pass
 
+
+class AsyncInstrumentError(Exception):
+    """Async Instrument Exception class"""
+    pass
+
+
+class MultiDownloadError(Exception):
+    """
+    Parallel Download Exception class
+
+    Attributes:
+        failures (dict): {instrument: exception} for each instrument whose download failed.
+        results (dict): {instrument: [wfmID, ...]} waveforms successfully downloaded to each instrument.
+    """
+
+    def __init__(self, failures, results):
+        self.failures = failures
+        self.results = results
+        super().__init__(f'Download failed on {len(failures)} instrument(s): '
+                         + '; '.join(f'{inst.instId}: {e!r}' for inst, e in failures.items()))
+
 # class BinblockError(Exception):
 #     """Binary Block Exception class"""
 #     pass
@@ -5,6 +5,8 @@ Provides example scripts for generic VSGs, UXG, and AWGs using
 instrument classes from PyArbTools.
 """
 
+import asyncio
+
 import pyarbtools
 
 
@@ -394,12 +396,6 @@ def vector_uxg_lan_streaming_example(ipAddress):
     # Note: the last PDW starting with a '2' in the 'Operation'
     # field marks the end of the PDW stream and does not play
 
-    pdwFile = uxg.bin_pdw_file_builder(rawPdw)
-
-    # Separate pdwFile into header and data portions (AUTOMATE THIS)
-    header = pdwFile[:4096]
-    data = pdwFile[4096:]
-
     # Configure LAN streaming using SCPI commands (AUTOMATE THIS)
     uxg.write('stream:source lan')
     uxg.write('stream:trigger:play:file:type continuous')
@@ -413,32 +409,19 @@ def vector_uxg_lan_streaming_example(ipAddress):
     uxg.write(f'memory:import:windex "{windex["fileName"]}.csv","{windex["fileName"]}"')
     uxg.write(f'stream:windex:select "{windex["fileName"]}"')
 
-    # Clear the stream header to prepare for a new stream
-    uxg.write('stream:external:header:clear')
-
-    """ADVANCED"""
-    # The esr=False argument in binblockwrite() allows you to send your own
-    # read/query after writing the binary block data rather than the
-    # default *ESR? query that is automatically appended for error checking.
-
-    # This is required because the SCPI command is a query rather than a command,
-    # which is uncommon for commands that send binary block data
-    uxg.binblockwrite(f'stream:external:header? ', header, esr=False)
-    if uxg.read() != '+0':
-        raise pyarbtools.error.VSGError('stream:external:header? response invalid. This should never happen.')
-
-    # Configure LAN streaming and send PDWs
-    # uxg.write('stream:state on')
-    uxg.open_lan_stream()
+    # The stream session sends the PDW file header with stream:external:header?,
+    # turns on streaming, and sends the PDWs over the LAN streaming port.
+    # Any iterable of PDWs works, including generators that never end.
+    session = pyarbtools.pdwStreaming.PdwStreamSession(uxg, rawPdw)
+    session.start()
 
-    # If RF is turned on before this point a CW tone will appear before pulses
+    # If RF is turned on before streaming is enabled a CW tone will appear before pulses
     uxg.configure(rfState=1, modState=1)
 
-    # Use the separate LAN socket specifically opened for PDW streaming
-    uxg.lanStream.send(data)
-
-    # Ensure everything is synchronized
+    # Wait for all PDWs to be sent and ensure everything is synchronized
+    session.wait()
     uxg.query('*opc?')
+    print(session.stats())
 
     # Begin streaming
     uxg.write('stream:trigger:play:immediate')
@@ -556,6 +539,38 @@ def analog_uxg_lan_stream_pdw_example(ipAddress):
     uxg.disconnect()
 
 
+
+def analog_uxg_async_burst_stream_example(ipAddressList):
+    """Streams the same four-pulse burst every 500 ms to several analog
+    UXGs at once. Each burst is sent 100 ms before it starts, so the UXG's
+    PDW buffer never overflows or runs dry no matter how long it runs."""
+
+    def burst(index):
+        # operation, freq, phase, startTimeSec, width, power, markers,
+        # pulseMode, phaseControl, bandAdjust, chirpControl, fpc_code_selection,
+        # chirpRate, freqMap
+        # Start times are relative to the start of the burst
+        return [[0, 980e6,  0, 0,     10e-6, 1, 1, 2, 0, 0, 3, 0, 4000000, 0],
+                [0, 1e9,    0, 20e-6, 15e-6, 1, 0, 2, 0, 0, 0, 1, 0,       0],
+                [0, 1.01e9, 0, 40e-6, 20e-6, 1, 0, 2, 0, 0, 0, 2, 0,       0],
+                [0, 1e9,    0, 80e-6, 5e-6,  1, 0, 2, 0, 0, 0, 1, 0,       0]]
+
+    async def stream(ipAddress):
+        async with pyarbtools.asyncInstruments.AsyncAnalogUXG(ipAddress) as uxg:
+            await uxg.configure(rfState=1, modState=1, cf=1e9, amp=-5)
+            await uxg.write('stream:source lan')
+            await uxg.write('stream:trigger:play:source bus')
+
+            scheduler = pyarbtools.pdwStreaming.AsyncBurstScheduler(uxg, burst, burstPeriod=0.5, leadTime=0.1)
+            await scheduler.run(numBursts=20)
+            print(ipAddress, scheduler.stats())
+            await uxg.err_check()
+
+    async def main():
+        await asyncio.gather(*[stream(ip) for ip in ipAddressList])
+
+    asyncio.run(main())
+
 def wfm_to_vsa_example(ipAddress):
     """This function creates a "perfect" digitally modulated waveform, exports it to a csv file,
     recalls it into VSA, and configures VSA to analyze it."""
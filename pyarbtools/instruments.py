@@ -8,11 +8,20 @@ checks, etc. per instrument.
 Tested on M8190A, M8195A, M8196A, N5182B, E8257D, M9383A, N5193A, N5194A
 """
 
+import hashlib
+import io
+import os
+import socket
+import tempfile
+import time
+
 import numpy as np
 import socketscpi
 
 from pyarbtools import error
 from pyarbtools import pdwBuilder
+from pyarbtools import pdwStreaming
+from pyarbtools.batchConfig import BatchConfigMixin
 
 """
 TODO:
@@ -20,11 +29,14 @@ TODO:
 * Add a function for IQ adjustments in VSG class
 * Add multithreading for waveform download and wfmBuilder
 * DONE -- Separate out configure() into individual methods that update class attributes
-* Add a check for PDW length (600k limit?)
+* DONE -- Add a check for PDW length (600k limit?) -- see check_pdws()
 * Add a multi-binblockwrite feature for download_wfm in the case of
     waveform size > 1 GB
 """
 
+# CSV files larger than this are spooled to a temporary file instead of memory
+CSV_SPOOL_SIZE = 64 << 20
+
 
 def wraparound_calc(length, gran, minLen):
     """
@@ -48,7 +60,317 @@ def wraparound_calc(length, gran, minLen):
     return repeats
 
 
-class M8190A(socketscpi.SocketInstrument):
+def block_hashes(wfm, blockLen):
+    """
+    HELPER FUNCTION
+    Computes a hash of each block of a formatted waveform. Used to find the
+    parts of a waveform that changed since it was last downloaded.
+    Args:
+        wfm (NumPy array): Formatted waveform data.
+        blockLen (int): Number of array values per block.
+
+    Returns:
+        (list(bytes)): Hash of each block. The last block may be shorter than blockLen.
+    """
+
+    data = memoryview(np.ascontiguousarray(wfm)).cast('B')
+    blockBytes = blockLen * wfm.itemsize
+    return [hashlib.blake2b(data[i:i + blockBytes], digest_size=16).digest()
+            for i in range(0, len(data), blockBytes)]
+
+
+def changed_ranges(oldHashes, newHashes):
+    """
+    HELPER FUNCTION
+    Compares two lists of block hashes and merges adjacent changed blocks.
+    Args:
+        oldHashes (list(bytes)): Block hashes of the waveform in instrument memory.
+        newHashes (list(bytes)): Block hashes of the new waveform.
+
+    Returns:
+        (list(tuple)): (startBlock, stopBlock) ranges of changed blocks, stopBlock is exclusive.
+    """
+
+    ranges = []
+    for idx, (old, new) in enumerate(zip(oldHashes, newHashes)):
+        if old != new:
+            if ranges and ranges[-1][1] == idx:
+                ranges[-1] = (ranges[-1][0], idx + 1)
+            else:
+                ranges.append((idx, idx + 1))
+    return ranges
+
+
+def update_segment(inst, wfm, wfmID, ch, valuesPerSample):
+    """
+    HELPER FUNCTION
+    Rewrites only the changed blocks of a waveform segment that was
+    previously downloaded with download_wfm(). Output is stopped only if
+    something changed, and playback is restarted afterward if the channel
+    was running. The length, block size, and
+    block hashes from the last download are stored in the instrument's
+    segmentHashes attribute.
+    Args:
+        inst (M8190A/M8195A): AWG object.
+        wfm (NumPy array): Formatted waveform data.
+        wfmID (int): Segment number returned by download_wfm().
+        ch (int): AWG channel that holds the segment.
+        valuesPerSample (int): Number of formatted array values per waveform sample (2 for interleaved IQ).
+
+    Returns:
+        (list(tuple)): (start, stop) sample ranges that were rewritten, stop is exclusive.
+    """
+
+    key = (ch, wfmID)
+    if key not in inst.segmentHashes:
+        raise error.AWGError(f'Segment {wfmID} on channel {ch} was not downloaded with download_wfm(). '
+                             'Use download_wfm() first.')
+    oldLen, blockLen, oldHashes = inst.segmentHashes[key]
+    if len(wfm) != oldLen:
+        raise error.AWGError(f'Waveform length changed from {oldLen // valuesPerSample} to '
+                             f'{len(wfm) // valuesPerSample} samples. Use download_wfm() for a new length.')
+
+    newHashes = block_hashes(wfm, blockLen)
+    ranges = changed_ranges(oldHashes, newHashes)
+    running = False
+    if ranges:
+        # Stop output before modifying the segment, remembering whether the channel was playing
+        running = bool(int(inst.query('status:operation:run:condition?')) & (1 << (ch - 1)))
+        inst.write('abort')
+        inst.query('*opc?')
+
+    updated = []
+    for startBlock, stopBlock in ranges:
+        start = startBlock * blockLen
+        stop = min(stopBlock * blockLen, len(wfm))
+        inst.binblockwrite(f'trace{ch}:data {wfmID}, {start // valuesPerSample}, ', wfm[start:stop])
+        updated.append((start // valuesPerSample, stop // valuesPerSample))
+    inst.segmentHashes[key] = (oldLen, blockLen, newHashes)
+
+    if running:
+        inst.write('init:imm')
+        inst.query('*opc?')
+
+    return updated
+
+
+def binblock_file_write(inst, cmd, fileObj, chunkSize=1 << 20):
+    """
+    HELPER FUNCTION
+    Sends the rest of a binary file object as an IEEE 488.2 binary block,
+    reading and sending chunkSize bytes at a time so the file is never held
+    in memory.
+    Args:
+        inst (socketscpi.SocketInstrument): Instrument object.
+        cmd (str): SCPI command that precedes the binary block.
+        fileObj (file): Binary file object, read from its current position to the end.
+        chunkSize (int): Number of bytes read and sent at a time.
+    """
+
+    # Async instruments only take complete binary blocks
+    if not hasattr(inst, 'socket'):
+        return inst.binblockwrite(cmd, fileObj.read())
+
+    start = fileObj.tell()
+    numBytes = fileObj.seek(0, os.SEEK_END) - start
+    fileObj.seek(start)
+
+    # Commands batched before the block must reach the instrument first
+    with inst.suspend_batch():
+        inst.socket.sendall(f'{cmd}#{len(str(numBytes))}{numBytes}'.encode('latin_1'))
+        remaining = numBytes
+        while remaining:
+            chunk = fileObj.read(min(chunkSize, remaining))
+            if not chunk:
+                raise error.UXGError('File ended before the binary block was sent.')
+            inst.socket.sendall(chunk)
+            remaining -= len(chunk)
+        inst.socket.sendall(b'\n')
+
+
+def reconnect(inst, address=None):
+    """
+    HELPER FUNCTION
+    Closes and reopens an instrument connection. A response to a query
+    that timed out is still sent once the operation finishes and would be
+    read as the answer to the next query, and a binary block that was cut
+    off would swallow the commands after it. Reopening the connection
+    discards both.
+    Args:
+        inst (socketscpi.SocketInstrument): Instrument connection.
+        address (tuple): (host, port) to connect to. Default is the current peer,
+            which isn't available if the connection was dropped.
+    """
+
+    if address is None:
+        address = inst.socket.getpeername()
+    timeout = inst.socket.gettimeout()
+    inst.socket.close()
+    inst.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    inst.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    inst.socket.settimeout(timeout)
+    inst.socket.connect(address)
+
+
+def check_pdws(pdwList, pdwFormat, minSpacing=0, maxPdws=pdwBuilder.MAX_PDWS):
+    """
+    HELPER FUNCTION
+    Validates PDWs with pdwBuilder.validate_pdws() and raises an error
+    describing every failed check.
+    Args:
+        pdwList (list/PdwTable): PDWs to check.
+        pdwFormat (str): PDW format. ('analog', 'vector', 'vector3')
+        minSpacing (float): Minimum time in seconds between consecutive PDW start times.
+        maxPdws (int): Maximum number of PDWs.
+    """
+
+    failures = pdwBuilder.validate_pdws(pdwList, pdwFormat, minSpacing, maxPdws)
+    if failures:
+        summary = '; '.join(f'{name}: {len(indices)} PDW(s), first at index {indices[0]}'
+                            for name, indices in failures.items())
+        raise error.UXGError(f'Invalid PDWs. {summary}')
+
+
+def load_buffer(inst, wfm, length, ch, stable, index):
+    """
+    HELPER FUNCTION
+    Loads a waveform into one of the two double-buffer segments and writes
+    a one-entry sequence that plays it. Only the inactive buffer is
+    modified, so the other buffer keeps playing while this runs. The
+    buffer's segment is reused if the length is unchanged. Otherwise a new
+    segment is defined, because segments can't be deleted while the
+    sequencer runs. Replaced segments are deleted by the next
+    play_double_buffered().
+    Args:
+        inst (M8190A/M8195A): AWG object.
+        wfm (NumPy array): Formatted waveform data.
+        length (int): Waveform length in samples.
+        ch (int): AWG channel.
+        stable (str): Sequence table subsystem for the channel ('stable1', 'stable', etc.).
+        index (int): Buffer index (0 or 1). Also used as the sequence table index.
+    """
+
+    buffers = inst.doubleBuffers[ch]
+    if buffers['lengths'][index] != length:
+        if buffers['lengths'][index] is not None:
+            buffers['stale'].append(buffers['segments'][index])
+            buffers['segments'][index] = max(buffers['segments'] + buffers['stale']) + 1
+        inst.write(f'trace{ch}:def {buffers["segments"][index]}, {length}')
+        buffers['lengths'][index] = length
+    segment = buffers['segments'][index]
+    inst.binblockwrite(f'trace{ch}:data {segment}, 0, ', wfm)
+
+    # Init, end of sequence, and end of scenario markers, played once per pass. The sequencer repeats it until
+    # another sequence is selected, so switching happens at the end of a pass without stopping output.
+    control = (1 << 28) | (1 << 30) | (1 << 29)
+    inst.binblockwrite(f'{stable}:data {index}, ',
+                       np.array([control, 1, 1, segment, 0, 0xFFFFFFFF], dtype=np.uint32))
+
+
+def start_buffers(inst, wfm, length, ch, stable):
+    """
+    HELPER FUNCTION
+    Allocates two segments for double-buffered playback, loads the first
+    waveform, and enables dynamic sequence selection. Segments left over
+    from earlier double-buffered playback are deleted. Playback must be
+    stopped.
+    Args:
+        inst (M8190A/M8195A): AWG object.
+        wfm (NumPy array): Formatted waveform data.
+        length (int): Waveform length in samples.
+        ch (int): AWG channel.
+        stable (str): Sequence table subsystem for the channel ('stable1', 'stable', etc.).
+    """
+
+    old = inst.doubleBuffers.pop(ch, None)
+    if old is not None:
+        for segment in [s for s, n in zip(old['segments'], old['lengths']) if n is not None] + old['stale']:
+            inst.write(f'trace{ch}:del {segment}')
+
+    first = int(inst.query(f'trace{ch}:catalog?').strip().split(',')[-2]) + 1
+    inst.doubleBuffers[ch] = {'segments': [first, first + 1], 'lengths': [None, None], 'stale': [],
+                              'active': 0, 'pending': None}
+    load_buffer(inst, wfm, length, ch, stable, 0)
+    inst.write(f'{stable}:dynamic on')
+    inst.write(f'{stable}:sequence:select 0')
+    inst.write(f'{stable}:dynamic:select 0')
+
+
+def sequence_entry(inst, stable):
+    """
+    HELPER FUNCTION
+    Reads the index of the sequence table entry the sequencer is executing.
+    Args:
+        inst (M8190A/M8195A): AWG object.
+        stable (str): Sequence table subsystem for the channel ('stable1', 'stable', etc.).
+
+    Returns:
+        (int): Sequence table index (bits 18..0 of the sequencer state).
+    """
+
+    return int(inst.query(f'{stable}:sequence:state?').strip()) & 0x7FFFF
+
+
+def confirm_swap(inst, ch, stable, timeout=10, pollInterval=1e-3):
+    """
+    HELPER FUNCTION
+    Waits for a previously selected buffer to start playing. Until it
+    does, the other buffer is still on air and can't be reloaded.
+    Args:
+        inst (M8190A/M8195A): AWG object.
+        ch (int): AWG channel.
+        stable (str): Sequence table subsystem for the channel ('stable1', 'stable', etc.).
+        timeout (float): Time in seconds to wait for the switch.
+        pollInterval (float): Time in seconds between sequencer state queries.
+    """
+
+    buffers = inst.doubleBuffers[ch]
+    pending = buffers['pending']
+    if pending is None:
+        return
+    deadline = time.perf_counter() + timeout
+    while sequence_entry(inst, stable) != pending:
+        if time.perf_counter() >= deadline:
+            raise error.AWGError(f'Buffer {pending} on channel {ch} has not started playing yet. '
+                                 'The other buffer is still playing and can\'t be reloaded.')
+        time.sleep(pollInterval)
+    buffers['active'] = pending
+    buffers['pending'] = None
+
+
+def swap_buffers(inst, wfm, length, ch, stable, timeout=10):
+    """
+    HELPER FUNCTION
+    Loads a waveform into the inactive buffer and selects it. The AWG
+    switches to it when the active buffer finishes its current pass. If
+    the previous swap hasn't happened yet, waits up to timeout for it
+    before touching either buffer.
+    Args:
+        inst (M8190A/M8195A): AWG object.
+        wfm (NumPy array): Formatted waveform data.
+        length (int): Waveform length in samples.
+        ch (int): AWG channel.
+        stable (str): Sequence table subsystem for the channel ('stable1', 'stable', etc.).
+        timeout (float): Time in seconds to wait for a pending swap.
+
+    Returns:
+        (int): Buffer index (0 or 1) that is now selected.
+    """
+
+    if ch not in inst.doubleBuffers:
+        raise error.AWGError(f'Double-buffered playback is not running on channel {ch}. '
+                             'Use play_double_buffered() first.')
+    confirm_swap(inst, ch, stable, timeout)
+    buffers = inst.doubleBuffers[ch]
+    index = 1 - buffers['active']
+    load_buffer(inst, wfm, length, ch, stable, index)
+    inst.write(f'{stable}:dynamic:select {index}')
+    buffers['pending'] = index
+
+    return index
+
+
+class M8190A(BatchConfigMixin, socketscpi.SocketInstrument):
     """Generic class for controlling a Keysight M8190A AWG.
 
     Attributes:
@@ -103,6 +425,14 @@ class M8190A(socketscpi.SocketInstrument):
         self.idleGran = 0
         self.check_resolution()
 
+        # Block hashes of downloaded segments used by update_wfm(), {(ch, segment): (length, blockLen, hashes)}
+        self.segmentHashes = {}
+        self.blocksPerGran = 64
+
+        # Double-buffered playback state, {ch: {'segments': [seg0, seg1], 'lengths': [len0, len1], 'stale': [segments],
+        #                                     'active': index, 'pending': index}}
+        self.doubleBuffers = {}
+
     def sanity_check(self):
         """Prints out user-accessible class attributes."""
 
@@ -136,40 +466,42 @@ class M8190A(socketscpi.SocketInstrument):
             cf2 (float): Carrier frequency for channel 2
         """
 
-        # Stop output before doing anything else
-        self.write('abort')
+        # Send all settings as a single transaction with one read-back query and one error check
+        with self.batch():
+            # Stop output before doing anything else
+            self.write('abort')
 
-        # Check to see which keyword arguments the user sent and call the appropriate function
-        for key, value in kwargs.items():
-            if key == 'res':
-                self.set_resolution(value)
-            elif key == 'clkSrc':
-                self.set_clkSrc(value)
-            elif key == 'fs':
-                self.set_fs(value)
-            elif key == 'refSrc':
-                self.set_refSrc(value)
-            elif key == 'refFreq':
-                self.set_refFreq(value)
-            elif key == 'out1':
-                self.set_output(1, value)
-            elif key == 'out2':
-                self.set_output(2, value)
-            elif key == 'amp1':
-                self.set_amp(1, value)
-            elif key == 'amp2':
-                self.set_amp(2, value)
-            elif key == 'func1':
-                self.set_func(1, value)
-            elif key == 'func2':
-                self.set_func(2, value)
-            elif key == 'cf1':
-                self.set_cf(1, value)
-            elif key == 'cf2':
-                self.set_cf(2, value)
-            else:
-                raise KeyError(f'Invalid keyword argument: "{key}"')
-        self.err_check()
+            # Check to see which keyword arguments the user sent and call the appropriate function
+            for key, value in kwargs.items():
+                if key == 'res':
+                    self.set_resolution(value)
+                elif key == 'clkSrc':
+                    self.set_clkSrc(value)
+                elif key == 'fs':
+                    self.set_fs(value)
+                elif key == 'refSrc':
+                    self.set_refSrc(value)
+                elif key == 'refFreq':
+                    self.set_refFreq(value)
+                elif key == 'out1':
+                    self.set_output(1, value)
+                elif key == 'out2':
+                    self.set_output(2, value)
+                elif key == 'amp1':
+                    self.set_amp(1, value)
+                elif key == 'amp2':
+                    self.set_amp(2, value)
+                elif key == 'func1':
+                    self.set_func(1, value)
+                elif key == 'func2':
+                    self.set_func(2, value)
+                elif key == 'cf1':
+                    self.set_cf(1, value)
+                elif key == 'cf2':
+                    self.set_cf(2, value)
+                else:
+                    raise KeyError(f'Invalid keyword argument: "{key}"')
+            self.err_check()
 
     def set_clkSrc(self, clkSrc):
         """
@@ -180,8 +512,8 @@ class M8190A(socketscpi.SocketInstrument):
 
         if clkSrc.lower() not in ['int', 'ext']:
             raise ValueError("'clkSrc' argument must be 'int' or 'ext'.")
-        self.write(f'frequency:raster:source {clkSrc}')
-        self.clkSrc = self.query('frequency:raster:source?').strip().lower()
+        self.set_and_read(f'frequency:raster:source {clkSrc}', 'frequency:raster:source?', 'clkSrc',
+                          lambda r: r.strip().lower(), pending=clkSrc.lower())
 
     def set_fs(self, fs):
         """
@@ -193,14 +525,14 @@ class M8190A(socketscpi.SocketInstrument):
         if not isinstance(fs, (int, float)) or fs <= 0:
             raise ValueError('Sample rate must be a positive floating point value.')
 
+        def update_bbfs():
+            self.bbfs = self.fs / self.intFactor
+
         if 'int' in self.clkSrc:
-            self.write(f'frequency:raster {fs}')
-            self.fs = float(self.query('frequency:raster?').strip())
+            self.set_and_read(f'frequency:raster {fs}', 'frequency:raster?', 'fs', float, after=update_bbfs)
         else:
-            self.write(f'frequency:raster:external {fs}')
-            self.fs = float(self.query('frequency:raster:external?').strip())
-
-        self.bbfs = self.fs / self.intFactor
+            self.set_and_read(f'frequency:raster:external {fs}', 'frequency:raster:external?', 'fs', float,
+                              after=update_bbfs)
 
     def set_output(self, ch, out):
         """
@@ -214,11 +546,7 @@ class M8190A(socketscpi.SocketInstrument):
             raise ValueError("'out' argument must be 'dac', 'dc', or 'ac'")
         if not isinstance(ch, int) or ch < 1 or ch > 2:
             raise ValueError("'ch' must be 1 or 2.")
-        self.write(f'output{ch}:route {out}')
-        if ch == 1:
-            self.out1 = self.query(f'output{ch}:route?').strip()
-        else:
-            self.out2 = self.query(f'output{ch}:route?').strip()
+        self.set_and_read(f'output{ch}:route {out}', f'output{ch}:route?', f'out{ch}', pending=out)
 
     def set_amp(self, ch, amp):
         """
@@ -233,12 +561,8 @@ class M8190A(socketscpi.SocketInstrument):
         if not isinstance(ch, int) or ch < 1 or ch > 2:
             raise ValueError("'ch' must be 1 or 2.")
 
-        if ch == 1:
-            self.write(f'{self.out1}1:voltage:amplitude {amp}')
-            self.amp1 = self.query(f'{self.out1}1:voltage:amplitude?')
-        else:
-            self.write(f'{self.out2}2:voltage:amplitude {amp}')
-            self.amp2 = self.query(f'{self.out2}2:voltage:amplitude?')
+        out = getattr(self, f'out{ch}')
+        self.set_and_read(f'{out}{ch}:voltage:amplitude {amp}', f'{out}{ch}:voltage:amplitude?', f'amp{ch}', float)
 
     def set_func(self, ch, func):
         """
@@ -253,11 +577,7 @@ class M8190A(socketscpi.SocketInstrument):
         if func not in ['arb', 'sts', 'stsc']:
             raise ValueError("'func' must be 'arb', 'sts' (sequence), or 'stsc' (scenario).")
 
-        self.write(f'func{ch}:mode {func}')
-        if ch == 1:
-            self.func1 = self.query(f'func{ch}:mode?').strip()
-        else:
-            self.func2 = self.query(f'func{ch}:mode?').strip()
+        self.set_and_read(f'func{ch}:mode {func}', f'func{ch}:mode?', f'func{ch}')
 
     def set_cf(self, ch, cf):
         """
@@ -271,11 +591,7 @@ class M8190A(socketscpi.SocketInstrument):
             raise ValueError("'ch' must be 1 or 2.")
         if not isinstance(cf, float) or cf <= 0:
             raise socketscpi.SockInstError('Carrier frequency must be a positive floating point value.')
-        self.write(f'carrier{ch}:freq {cf}')
-        if ch == 1:
-            self.cf1 = float(self.query(f'carrier{ch}:freq?').strip().split(',')[0])
-        else:
-            self.cf2 = float(self.query(f'carrier{ch}:freq?').strip().split(',')[0])
+        self.set_and_read(f'carrier{ch}:freq {cf}', f'carrier{ch}:freq?', f'cf{ch}', lambda r: float(r.split(',')[0]))
 
     def set_refSrc(self, refSrc):
         """
@@ -287,8 +603,7 @@ class M8190A(socketscpi.SocketInstrument):
         if refSrc.lower() not in ['axi', 'int', 'ext']:
             raise ValueError("'refSrc' argument must be 'axi', 'int', or 'ext'.")
 
-        self.write(f'roscillator:source {refSrc}')
-        self.refSrc = self.query('roscillator:source?').strip()
+        self.set_and_read(f'roscillator:source {refSrc}', 'roscillator:source?', 'refSrc')
 
     def set_refFreq(self, refFreq):
         """
@@ -300,8 +615,7 @@ class M8190A(socketscpi.SocketInstrument):
         if not isinstance(refFreq, float) or refFreq <= 0:
             raise ValueError('Reference frequency must be a positive floating point value.')
 
-        self.write(f'roscillator:frequency {refFreq}')
-        self.refFreq = float(self.query('roscillator:frequency?').strip())
+        self.set_and_read(f'roscillator:frequency {refFreq}', 'roscillator:frequency?', 'refFreq', float)
 
     def set_resolution(self, res='wsp'):
         """
@@ -313,9 +627,8 @@ class M8190A(socketscpi.SocketInstrument):
         if res.lower() not in ['wsp', 'wpr', 'intx3', 'intx12', 'intx24', 'intx48']:
             raise ValueError("res must be 'wsp', 'wpr', 'intx3', 'intx12', 'intx24', or 'intx48'.")
 
-        self.write(f'trace1:dwidth {res}')
-        self.res = self.query('trace1:dwidth?').strip().lower()
-        self.check_resolution()
+        self.set_and_read(f'trace1:dwidth {res}', 'trace1:dwidth?', 'res', lambda r: r.strip().lower(),
+                          after=self.check_resolution, pending=res.lower())
 
     def check_resolution(self):
         """
@@ -370,18 +683,50 @@ class M8190A(socketscpi.SocketInstrument):
             (int): Segment number of the downloaded waveform. Use this as the waveform identifier for the .play() method.
         """
 
+        wfm = self.format_wfm(wfmData, wfmFormat, sampleMkr, syncMkr)
+
+        # Stop output before doing anything else
+        self.write('abort')
+        self.query('*opc?')
+        valuesPerSample = 2 if wfmFormat.lower() == 'iq' else 1
+        length = len(wfm) / valuesPerSample
+
+        # Initialize waveform segment, populate it with data, and provide a name
+        segment = int(self.query(f'trace{ch}:catalog?').strip().split(',')[-2]) + 1
+        self.write(f'trace{ch}:def {segment}, {length}')
+        self.binblockwrite(f'trace{ch}:data {segment}, 0, ', wfm)
+        self.write(f'trace{ch}:name {segment},"{name}_{segment}"')
+
+        # Remember block hashes so update_wfm() can rewrite only changed blocks
+        blockLen = self.blocksPerGran * self.gran * valuesPerSample
+        self.segmentHashes[(ch, segment)] = (len(wfm), blockLen, block_hashes(wfm, blockLen))
+
+        # Use 'segment' as the waveform identifier for the .play() method.
+        return segment
+
+    def format_wfm(self, wfmData, wfmFormat='iq', sampleMkr=0, syncMkr=0):
+        """
+        HELPER FUNCTION
+        Validates a waveform and converts it to the AWG's binary format.
+        Args:
+            wfmData (NumPy array): Waveform samples (real or complex floating point values).
+            wfmFormat (str): Format of waveform. ('real', 'iq')
+            sampleMkr (int): Index of the beginning of the sample marker.
+            syncMkr (int): Index of the beginning of the sync marker.
+
+        Returns:
+            (NumPy array): Formatted waveform data. IQ waveforms are interleaved.
+        """
+
         # Type checking
         if not isinstance(sampleMkr, int):
             raise TypeError('sampleMkr must be an int.')
         if not isinstance(syncMkr, int):
             raise TypeError('syncMkr must be an int.')
 
-        # Stop output before doing anything else
-        self.write('abort')
-        self.query('*opc?')
         # IQ format is a little complex (hahaha)
         if wfmFormat.lower() == 'iq':
-            if wfmData.dtype != np.complex:
+            if wfmData.dtype != np.complex128:
                 raise TypeError('Invalid wfm type. IQ waveforms must be an array of complex values.')
             else:
                 i = self.check_wfm(np.real(wfmData))
@@ -398,24 +743,35 @@ class M8190A(socketscpi.SocketInstrument):
                     markerData[syncMkr:syncMkr + 240] = 1
                     q += syncMkr
 
-                # Interleave the I and Q arrays and adjust the length to compensate
-                wfm = self.iq_wfm_combiner(i, q)
-                length = len(wfm) / 2
+                # Interleave the I and Q arrays
+                return self.iq_wfm_combiner(i, q)
         # Real format is straightforward
         elif wfmFormat.lower() == 'real':
-            wfm = self.check_wfm(wfmData)
-            length = len(wfm)
+            return self.check_wfm(wfmData)
         else:
             raise socketscpi.SockInstError('Invalid wfmFormat chosen. Use "iq" or "real".')
 
-        # Initialize waveform segment, populate it with data, and provide a name
-        segment = int(self.query(f'trace{ch}:catalog?').strip().split(',')[-2]) + 1
-        self.write(f'trace{ch}:def {segment}, {length}')
-        self.binblockwrite(f'trace{ch}:data {segment}, 0, ', wfm)
-        self.write(f'trace{ch}:name {segment},"{name}_{segment}"')
+    def update_wfm(self, wfmData, wfmID, ch=1, wfmFormat='iq', sampleMkr=0, syncMkr=0):
+        """
+        Updates a segment downloaded with download_wfm() in place. The new
+        waveform is compared to the last downloaded version block by block
+        and only the changed sample ranges are written. Useful for
+        iterative correction loops where most of the waveform is unchanged.
+        Playback is restarted afterward if the channel was playing.
+        Args:
+            wfmData (NumPy array): Waveform samples (real or complex floating point values). Length must not change.
+            wfmID (int): Segment number returned by download_wfm().
+            ch (int): Channel that holds the segment.
+            wfmFormat (str): Format of waveform. ('real', 'iq')
+            sampleMkr (int): Index of the beginning of the sample marker.
+            syncMkr (int): Index of the beginning of the sync marker.
 
-        # Use 'segment' as the waveform identifier for the .play() method.
-        return segment
+        Returns:
+            (list(tuple)): (start, stop) sample ranges that were rewritten.
+        """
+
+        wfm = self.format_wfm(wfmData, wfmFormat, sampleMkr, syncMkr)
+        return update_segment(self, wfm, wfmID, ch, 2 if wfmFormat.lower() == 'iq' else 1)
 
     # def download_iq_wfm(self, i, q, ch=1, name='wfm'):
     #     """Defines and downloads an IQ waveform into the segment memory.
@@ -501,12 +857,15 @@ class M8190A(socketscpi.SocketInstrument):
             raise socketscpi.SockInstError('Channel must be 1 or 2.')
         self.write('abort')
         self.write(f'trace{ch}:delete {wfmID}')
+        self.segmentHashes.pop((ch, wfmID), None)
 
     def clear_all_wfm(self):
         """Clears all segments from segment memory."""
         self.write('abort')
         self.write('trace1:delete:all')
         self.write('trace2:delete:all')
+        self.segmentHashes.clear()
+        self.doubleBuffers.clear()
 
     def play(self, wfmID=1, ch=1):
         """
@@ -533,9 +892,229 @@ class M8190A(socketscpi.SocketInstrument):
         self.write(f'output{ch}:norm off')
         self.write('abort')
 
+    def play_double_buffered(self, wfmData, ch=1, wfmFormat='iq'):
+        """
+        Starts gapless double-buffered playback. The waveform is loaded into
+        the first of two segments and played with dynamic sequencing. Use
+        queue_wfm() to load the next waveform while this one plays.
+        Args:
+            wfmData (NumPy array): Waveform samples (real or complex floating point values).
+            ch (int): AWG channel out of which the waveforms will be played.
+            wfmFormat (str): Format of waveform. ('real', 'iq')
+        """
+
+        wfm = self.format_wfm(wfmData, wfmFormat)
+        length = len(wfm) // (2 if wfmFormat.lower() == 'iq' else 1)
+
+        self.write('abort')
+        self.query('*opc?')
+        self.set_func(ch, 'sts')
+        start_buffers(self, wfm, length, ch, f'stable{ch}')
+        self.write(f'output{ch}:norm on')
+        self.write('init:cont on')
+        self.write('init:imm')
+        self.query('*opc?')
+
+    def queue_wfm(self, wfmData, ch=1, wfmFormat='iq', timeout=10):
+        """
+        Loads a waveform into the inactive buffer while the active buffer
+        plays, then switches to it at the end of the current pass without
+        stopping output. Requires play_double_buffered(). If the waveform
+        queued by the previous call hasn't started playing yet, waits up to
+        timeout for it, then raises AWGError.
+        Args:
+            wfmData (NumPy array): Waveform samples (real or complex floating point values).
+            ch (int): AWG channel out of which the waveforms will be played.
+            wfmFormat (str): Format of waveform. ('real', 'iq')
+            timeout (float): Time in seconds to wait for a previously queued waveform to start playing.
+
+        Returns:
+            (int): Buffer index (0 or 1) that is now selected.
+        """
+
+        wfm = self.format_wfm(wfmData, wfmFormat)
+        length = len(wfm) // (2 if wfmFormat.lower() == 'iq' else 1)
+        return swap_buffers(self, wfm, length, ch, f'stable{ch}', timeout)
+
+    def wfm_entry(self, wfmID, loopCount=1, segAdvance='auto', markerEnable=False, startOffset=0,
+                  endOffset=0xFFFFFFFF):
+        """
+        Creates a sequence table entry that plays a waveform segment.
+        Use with download_sequence().
+        Args:
+            wfmID (int): Segment number returned by download_wfm().
+            loopCount (int): Number of times the segment is played.
+            segAdvance (str): Segment advancement mode ('auto', 'conditional', 'repeat', 'single').
+            markerEnable (bool): Enables the segment's markers.
+            startOffset (int): First sample of the segment to play.
+            endOffset (int): Last sample of the segment to play. 0xFFFFFFFF plays to the end of the segment.
+
+        Returns:
+            (NumPy array): Sequence table entry (6 uint32 values).
+        """
+
+        if not isinstance(wfmID, int) or wfmID < 1:
+            raise ValueError('wfmID must be a positive integer.')
+        if not isinstance(loopCount, int) or loopCount < 1 or loopCount > 0xFFFFFFFF:
+            raise ValueError('loopCount must be an integer between 1 and 4294967295.')
+        if not isinstance(startOffset, int) or startOffset < 0 or startOffset > 0xFFFFFFFF:
+            raise ValueError('startOffset must be an integer between 0 and 4294967295.')
+        if not isinstance(endOffset, int) or endOffset < 0 or endOffset > 0xFFFFFFFF:
+            raise ValueError('endOffset must be an integer between 0 and 4294967295.')
+        if startOffset % self.gran != 0:
+            raise error.GranularityError(f'startOffset must have a granularity of {self.gran}.')
+        if endOffset != 0xFFFFFFFF and (endOffset + 1) % self.gran != 0:
+            raise error.GranularityError(f'endOffset + 1 must have a granularity of {self.gran}.')
+
+        control = self.advance_mode(segAdvance) << 16
+        if markerEnable:
+            control |= 1 << 24
+        return np.array([control, 1, loopCount, wfmID, startOffset, endOffset], dtype=np.uint32)
+
+    def idle_entry(self, idleDelay, idleSample=0):
+        """
+        Creates a sequence table entry that holds the output at a constant
+        value instead of playing zero-valued waveform samples.
+        Use with download_sequence().
+        Args:
+            idleDelay (int): Idle duration in waveform samples. Must be a multiple of the idle granularity.
+            idleSample (int): Binary value output during the idle time.
+
+        Returns:
+            (NumPy array): Sequence table entry (6 uint32 values).
+        """
+
+        self.check_resolution()
+        idleGran = self.idleGran if 'intx' in self.res else self.gran
+        if not isinstance(idleDelay, int) or idleDelay <= 0 or idleDelay > 0xFFFFFFFF:
+            raise ValueError('idleDelay must be an integer between 1 and 4294967295.')
+        if not isinstance(idleSample, int) or idleSample < 0 or idleSample > 0xFFFFFFFF:
+            raise ValueError('idleSample must be an integer between 0 and 4294967295.')
+        if idleDelay % idleGran != 0:
+            raise error.GranularityError(f'idleDelay must have a granularity of {idleGran}. '
+                                         f'Extra samples: {idleDelay % idleGran}')
+
+        # Bit 31 marks a command entry, command code 0 is idle
+        return np.array([1 << 31, 1, 0, idleSample, idleDelay, 0], dtype=np.uint32)
+
+    @staticmethod
+    def advance_mode(advance):
+        """
+        HELPER FUNCTION
+        Converts an advancement mode to its sequence table control word value.
+        Args:
+            advance (str): Advancement mode ('auto', 'conditional', 'repeat', 'single').
+
+        Returns:
+            (int): Advancement mode value.
+        """
+
+        modes = ['auto', 'conditional', 'repeat', 'single']
+        if advance.lower() not in modes:
+            raise ValueError("Advancement mode must be 'auto', 'conditional', 'repeat', or 'single'.")
+        return modes.index(advance.lower())
+
+    def download_sequence(self, entries, ch=1, seqLoop=1, seqAdvance='auto', index=0):
+        """
+        Downloads a sequence built from wfm_entry() and idle_entry() to the
+        sequence table as a single binary block and configures the channel
+        for sequence playback. Looping segments and idling in the sequencer
+        avoids storing repeated waveform samples and dead time in memory.
+        Args:
+            entries (list): Sequence table entries from wfm_entry() and idle_entry().
+            ch (int): AWG channel that plays the sequence.
+            seqLoop (int): Number of times the whole sequence is played.
+            seqAdvance (str): Sequence advancement mode ('auto', 'conditional', 'repeat', 'single').
+            index (int): Sequence table index of the first entry.
+
+        Returns:
+            (int): Sequence table index of the first entry. Use this as the sequence identifier for play_sequence().
+        """
+
+        if not entries:
+            raise error.AWGError('Sequence must contain at least one entry.')
+        if not isinstance(seqLoop, int) or seqLoop < 1 or seqLoop > 0xFFFFFFFF:
+            raise ValueError('seqLoop must be an integer between 1 and 4294967295.')
+        if not isinstance(ch, int) or ch < 1 or ch > 2:
+            raise ValueError("'ch' must be 1 or 2.")
+
+        table = np.array(entries, dtype=np.uint32).reshape(-1, 6)
+        # Sequence loop count and advancement mode are read from the first entry
+        table[0, 0] |= (1 << 28) | (self.advance_mode(seqAdvance) << 20)
+        table[0, 1] = seqLoop
+        # Mark the end of the sequence and scenario
+        table[-1, 0] |= (1 << 30) | (1 << 29)
+
+        self.write('abort')
+        self.set_func(ch, 'sts')
+        self.binblockwrite(f'stable{ch}:data {index}, ', table.ravel())
+        self.write(f'stable{ch}:sequence:select {index}')
+
+        return index
+
+    def download_pulse_train(self, pulse, pri, ch=1, name='pulse', wfmFormat='iq', numPulses=None):
+        """
+        Downloads a single pulse and plays it at a fixed PRI using the
+        sequencer. The pulse is zero-padded to the waveform granularity and
+        the off time is generated with an idle entry rather than zeros.
+        Args:
+            pulse (NumPy array): Pulse waveform samples (real or complex) at the waveform sample rate (bbfs in DUC modes).
+            pri (float): Pulse repetition interval in seconds.
+            ch (int): AWG channel that plays the pulse train.
+            name (str): Optional name for the pulse segment.
+            wfmFormat (str): Format of waveform. ('real', 'iq')
+            numPulses (int): Number of pulses per pass through the sequence (sequence loop count).
+                Default is a single pulse per pass, which repeats continuously in continuous mode.
+
+        Returns:
+            (int): Sequence table index of the pulse train. Use this as the sequence identifier for play_sequence().
+        """
+
+        self.check_resolution()
+        idleGran = self.idleGran if 'intx' in self.res else self.gran
+
+        # Zero-pad rather than repeat the pulse to meet granularity and minimum length requirements
+        length = max(int(np.ceil(len(pulse) / self.gran) * self.gran), self.minLen)
+        padded = np.zeros(length, dtype=pulse.dtype)
+        padded[:len(pulse)] = pulse
+
+        idleDelay = int(round(pri * self.bbfs / idleGran)) * idleGran - length
+        if idleDelay < idleGran:
+            raise error.AWGError(f'PRI must be longer than the padded pulse ({length / self.bbfs} sec).')
+
+        segment = self.download_wfm(padded, ch=ch, name=name, wfmFormat=wfmFormat)
+        entries = [self.wfm_entry(segment), self.idle_entry(idleDelay)]
+        return self.download_sequence(entries, ch=ch, seqLoop=numPulses or 1)
+
+    def play_sequence(self, seqID=0, ch=1):
+        """
+        Selects a sequence, turns on analog output, and begins continuous playback.
+        Args:
+            seqID (int): Sequence table index returned by download_sequence().
+            ch (int): AWG channel out of which the sequence will be played.
+        """
+
+        self.write('abort')
+        self.write(f'stable{ch}:sequence:select {seqID}')
+        self.write(f'output{ch}:norm on')
+        self.write('init:cont on')
+        self.write('init:imm')
+        self.query('*opc?')
+
+    def clear_sequences(self, ch=1):
+        """
+        Resets the sequence table and returns the channel to arb mode.
+        Args:
+            ch (int): AWG channel whose sequence table is reset.
+        """
+
+        self.write('abort')
+        self.write(f'stable{ch}:reset')
+        self.set_func(ch, 'arb')
+
 
 # noinspection PyUnusedLocal,PyUnusedLocal
-class M8195A(socketscpi.SocketInstrument):
+class M8195A(BatchConfigMixin, socketscpi.SocketInstrument):
     """
     Generic class for controlling Keysight M8195A AWG.
 
@@ -577,6 +1156,14 @@ class M8195A(socketscpi.SocketInstrument):
         self.binMult = 127
         self.binShift = 0
 
+        # Block hashes of downloaded segments used by update_wfm(), {(ch, segment): (length, blockLen, hashes)}
+        self.segmentHashes = {}
+        self.blocksPerGran = 64
+
+        # Double-buffered playback state, {ch: {'segments': [seg0, seg1], 'lengths': [len0, len1], 'stale': [segments],
+        #                                     'active': index, 'pending': index}}
+        self.doubleBuffers = {}
+
     # def configure(self, dacMode='single', memDiv=1, fs=64e9, refSrc='axi', refFreq=100e6, amp1=300e-3, amp2=300e-3, amp3=300e-3, amp4=300e-3, func='arb'):
     def configure(self, **kwargs):
         """
@@ -591,37 +1178,39 @@ class M8195A(socketscpi.SocketInstrument):
             func (str): AWG mode, either arb or sequencing. ('arb', 'sts', 'stsc')
         """
 
-        # Stop output on all channels before doing anything else
-        for ch in range(1, 5):
-            self.stop(ch=ch)
-
-        # Check to see which keyword arguments the user sent and call the appropriate function
-        for key, value in kwargs.items():
-            if key == 'dacMode':
-                self.set_dacMode(value)
-            elif key == 'memDiv':
-                self.set_memDiv(value)
-            elif key == 'fs':
-                self.set_fs(value)
-            elif key == 'refSrc':
-                self.set_refSrc(value)
-            elif key == 'refFreq':
-                self.set_refFreq(value)
-            elif key == 'amp1':
-                self.set_amplitude(value, channel=1)
-            elif key == 'amp2':
-                self.set_amplitude(value, channel=2)
-            elif key == 'amp3':
-                self.set_amplitude(value, channel=3)
-            elif key == 'amp4':
-                self.set_amplitude(value, channel=4)
-            elif key == 'func':
-                self.set_func(value)
-            else:
-                raise KeyError(
-                    f'Invalid keyword argument: "{key}"')  # raise KeyError('Invalid keyword argument. Use "dacMode", "memDiv", "fs", "refSrc", "refFreq", "amp1/2/3/4", or "func".')
+        # Send all settings as a single transaction with one read-back query and one error check
+        with self.batch():
+            # Stop output on all channels before doing anything else
+            for ch in range(1, 5):
+                self.stop(ch=ch)
+
+            # Check to see which keyword arguments the user sent and call the appropriate function
+            for key, value in kwargs.items():
+                if key == 'dacMode':
+                    self.set_dacMode(value)
+                elif key == 'memDiv':
+                    self.set_memDiv(value)
+                elif key == 'fs':
+                    self.set_fs(value)
+                elif key == 'refSrc':
+                    self.set_refSrc(value)
+                elif key == 'refFreq':
+                    self.set_refFreq(value)
+                elif key == 'amp1':
+                    self.set_amplitude(value, channel=1)
+                elif key == 'amp2':
+                    self.set_amplitude(value, channel=2)
+                elif key == 'amp3':
+                    self.set_amplitude(value, channel=3)
+                elif key == 'amp4':
+                    self.set_amplitude(value, channel=4)
+                elif key == 'func':
+                    self.set_func(value)
+                else:
+                    raise KeyError(
+                        f'Invalid keyword argument: "{key}"')  # raise KeyError('Invalid keyword argument. Use "dacMode", "memDiv", "fs", "refSrc", "refFreq", "amp1/2/3/4", or "func".')
 
-        self.err_check()
+            self.err_check()
 
     def set_dacMode(self, dacMode='single'):
         """
@@ -633,8 +1222,7 @@ class M8195A(socketscpi.SocketInstrument):
         if dacMode not in ['single', 'dual', 'four', 'marker', 'dcd', 'dcmarker']:
             raise ValueError("'dacMode' must be 'single', 'dual', 'four', 'marker', 'dcd', or 'dcmarker'.")
 
-        self.write(f'inst:dacm {dacMode}')
-        self.dacMode = self.query('inst:dacm?').strip().lower()
+        self.set_and_read(f'inst:dacm {dacMode}', 'inst:dacm?', 'dacMode', lambda r: r.strip().lower())
 
     def set_memDiv(self, memDiv=1):
         """
@@ -645,8 +1233,8 @@ class M8195A(socketscpi.SocketInstrument):
 
         if memDiv not in [1, 2, 4]:
             raise ValueError('Memory divider must be 1, 2, or 4.')
-        self.write(f'instrument:memory:extended:rdivider div{memDiv}')
-        self.memDiv = int(self.query('instrument:memory:extended:rdivider?').strip().split('DIV')[-1])
+        self.set_and_read(f'instrument:memory:extended:rdivider div{memDiv}', 'instrument:memory:extended:rdivider?',
+                          'memDiv', lambda r: int(r.strip().split('DIV')[-1]))
 
     def set_fs(self, fs=65e9):
         """
@@ -657,9 +1245,10 @@ class M8195A(socketscpi.SocketInstrument):
 
         if not isinstance(fs, (int, float)) or fs <= 0:
             raise ValueError('Sample rate must be a positive floating point value.')
-        self.write(f'frequency:raster {fs}')
-        self.fs = float(self.query('frequency:raster?').strip())
-        self.effFs = self.fs / self.memDiv
+        def update_effFs():
+            self.effFs = self.fs / self.memDiv
+
+        self.set_and_read(f'frequency:raster {fs}', 'frequency:raster?', 'fs', float, after=update_effFs)
 
     def set_func(self, func='arb'):
         """
@@ -670,8 +1259,7 @@ class M8195A(socketscpi.SocketInstrument):
 
         if func.lower() not in ['arb', 'sts', 'stsc']:
             raise ValueError("'func' argument must be 'arb', 'sts', 'stsc'")
-        self.write(f'func:mode {func}')
-        self.func = self.query('func:mode?').strip()
+        self.set_and_read(f'func:mode {func}', 'func:mode?', 'func')
 
     def set_refSrc(self, refSrc='axi'):
         """
@@ -682,8 +1270,7 @@ class M8195A(socketscpi.SocketInstrument):
 
         if refSrc.lower() not in ['axi', 'int', 'ext']:
             raise ValueError("'refSrc' must be 'axi', 'int', or 'ext'")
-        self.write(f'roscillator:source {refSrc}')
-        self.refSrc = self.query('roscillator:source?').strip()
+        self.set_and_read(f'roscillator:source {refSrc}', 'roscillator:source?', 'refSrc')
 
     def set_refFreq(self, refFreq=100e6):
         """
@@ -694,8 +1281,7 @@ class M8195A(socketscpi.SocketInstrument):
 
         if not isinstance(refFreq, float) or refFreq <= 0:
             raise ValueError('Reference frequency must be a positive floating point value.')
-        self.write(f'roscillator:frequency {refFreq}')
-        self.refFreq = float(self.query('roscillator:frequency?').strip())
+        self.set_and_read(f'roscillator:frequency {refFreq}', 'roscillator:frequency?', 'refFreq', float)
 
     def set_amplitude(self, amplitude=300e-3, channel=1):
         """
@@ -711,10 +1297,7 @@ class M8195A(socketscpi.SocketInstrument):
         if amplitude < 75e-3 or amplitude > 1:
             raise error.AWGError('\'amplitude\' must be between 75 mV and 1 V.')
 
-        self.write(f'voltage{channel} {amplitude}')
-        # This is a neat use of Python's exec() function, which takes a "program" in as a string and executes it
-        # Very useful if you need to dynamically decide which variable names to call
-        exec(f"self.amp{channel} = float(self.query('voltage{channel}?'))")
+        self.set_and_read(f'voltage{channel} {amplitude}', f'voltage{channel}?', f'amp{channel}', float)
 
     def sanity_check(self):
         """Prints out user-accessible class attributes."""
@@ -755,9 +1338,30 @@ class M8195A(socketscpi.SocketInstrument):
         self.binblockwrite(f'trace{ch}:data {segment}, 0, ', wfm)
         self.write(f'trace{ch}:name {segment},"{name}_{segment}"')
 
+        # Remember block hashes so update_wfm() can rewrite only changed blocks
+        blockLen = self.blocksPerGran * self.gran
+        self.segmentHashes[(ch, segment)] = (len(wfm), blockLen, block_hashes(wfm, blockLen))
+
         # Use 'segment' as the waveform identifier for the .play() method.
         return segment
 
+    def update_wfm(self, wfmData, wfmID, ch=1):
+        """
+        Updates a segment downloaded with download_wfm() in place. The new
+        waveform is compared to the last downloaded version block by block
+        and only the changed sample ranges are written. Playback is
+        restarted afterward if the channel was playing.
+        Args:
+            wfmData (NumPy array): Waveform samples (real floating point values). Length must not change.
+            wfmID (int): Segment number returned by download_wfm().
+            ch (int): Channel that holds the segment.
+
+        Returns:
+            (list(tuple)): (start, stop) sample ranges that were rewritten.
+        """
+
+        return update_segment(self, self.check_wfm(wfmData), wfmID, ch, 1)
+
     def check_wfm(self, wfmData):
         """
         HELPER FUNCTION
@@ -801,12 +1405,15 @@ class M8195A(socketscpi.SocketInstrument):
             raise socketscpi.SockInstError('Channel must be 1, 2, 3, or 4.')
         self.write('abort')
         self.write(f'trace{ch}:del {wfmID}')
+        self.segmentHashes.pop((ch, wfmID), None)
 
     def clear_all_wfm(self):
         """Clears all segments from segment memory."""
         self.write('abort')
         for ch in range(1, 5):
             self.write(f'trace{ch}:del:all')
+        self.segmentHashes.clear()
+        self.doubleBuffers.clear()
 
     def play(self, wfmID=1, ch=1):
         """
@@ -823,17 +1430,63 @@ class M8195A(socketscpi.SocketInstrument):
 
     def stop(self, ch=1):
         """
-        Turns off analog output and stops playback.
+        Turns off analog output and stops playback.
+        Args:
+            ch (int): AWG channel to be deactivated.
+        """
+
+        self.write(f'output{ch} off')
+        self.write('abort')
+
+    def play_double_buffered(self, wfmData, ch=1):
+        """
+        Starts gapless double-buffered playback. The waveform is loaded into
+        the first of two segments and played with dynamic sequencing. Use
+        queue_wfm() to load the next waveform while this one plays. The
+        sequence table is shared by all channels, so only one channel can be
+        double buffered at a time.
+        Args:
+            wfmData (NumPy array): Waveform samples (real floating point values).
+            ch (int): AWG channel out of which the waveforms will be played.
+        """
+
+        # All channels share one sequence table, so only one channel can be double buffered at a time
+        others = [c for c in self.doubleBuffers if c != ch]
+        if others:
+            raise error.AWGError(f'Double-buffered playback is already running on channel {others[0]}. M8195A '
+                                 'channels share one sequence table, so only one channel can be double buffered. '
+                                 'Use clear_all_wfm() first to move it to another channel.')
+        wfm = self.check_wfm(wfmData)
+
+        self.write('abort')
+        self.set_func('sts')
+        start_buffers(self, wfm, len(wfm), ch, 'stable')
+        self.write(f'output{ch} on')
+        self.write('init:cont on')
+        self.write('init:imm')
+
+    def queue_wfm(self, wfmData, ch=1, timeout=10):
+        """
+        Loads a waveform into the inactive buffer while the active buffer
+        plays, then switches to it at the end of the current pass without
+        stopping output. Requires play_double_buffered(). If the waveform
+        queued by the previous call hasn't started playing yet, waits up to
+        timeout for it, then raises AWGError.
         Args:
-            ch (int): AWG channel to be deactivated.
+            wfmData (NumPy array): Waveform samples (real floating point values).
+            ch (int): AWG channel out of which the waveforms will be played.
+            timeout (float): Time in seconds to wait for a previously queued waveform to start playing.
+
+        Returns:
+            (int): Buffer index (0 or 1) that is now selected.
         """
 
-        self.write(f'output{ch} off')
-        self.write('abort')
+        wfm = self.check_wfm(wfmData)
+        return swap_buffers(self, wfm, len(wfm), ch, 'stable', timeout)
 
 
 # noinspection PyUnusedLocal,PyUnusedLocal
-class M8196A(socketscpi.SocketInstrument):
+class M8196A(BatchConfigMixin, socketscpi.SocketInstrument):
     """
     Generic class for controlling Keysight M8196A AWG.
 
@@ -878,24 +1531,26 @@ class M8196A(socketscpi.SocketInstrument):
             refFreq (float): Reference clock frequency.
         """
 
-        # Stop output before doing anything else
-        self.write('abort')
+        # Send all settings as a single transaction with one read-back query and one error check
+        with self.batch():
+            # Stop output before doing anything else
+            self.write('abort')
 
-        # Check to see which keyword arguments the user sent and call the appropriate function
-        for key, value in kwargs.items():
-            if key == 'dacMode':
-                self.set_dacMode(value)  # self.dacMode = self.query('inst:dacm?').strip().lower()
-            elif key == 'fs':
-                self.set_fs(value)  # self.fs = float(self.query('frequency:raster?').strip())
-            elif key == 'refSrc':
-                self.set_refSrc(value)
-            elif key == 'refFreq':
-                self.set_refFreq(value)
-            else:
-                raise KeyError(
-                    f'Invalid keyword argument: "{key}"')  # raise KeyError('Invalid keyword argument. Use "dacMode", "fs", "refSrc", "refFreq".')
+            # Check to see which keyword arguments the user sent and call the appropriate function
+            for key, value in kwargs.items():
+                if key == 'dacMode':
+                    self.set_dacMode(value)  # self.dacMode = self.query('inst:dacm?').strip().lower()
+                elif key == 'fs':
+                    self.set_fs(value)  # self.fs = float(self.query('frequency:raster?').strip())
+                elif key == 'refSrc':
+                    self.set_refSrc(value)
+                elif key == 'refFreq':
+                    self.set_refFreq(value)
+                else:
+                    raise KeyError(
+                        f'Invalid keyword argument: "{key}"')  # raise KeyError('Invalid keyword argument. Use "dacMode", "fs", "refSrc", "refFreq".')
 
-        self.err_check()
+            self.err_check()
 
     def set_dacMode(self, dacMode='single'):
         """
@@ -907,8 +1562,7 @@ class M8196A(socketscpi.SocketInstrument):
         if dacMode not in ['single', 'dual', 'four', 'marker', 'dcmarker']:
             raise ValueError("Invalid DAC mode. Must be 'single', 'dual', 'four', 'marker', or 'dcmarker'")
 
-        self.write(f'inst:dacm {dacMode}')
-        self.dacMode = self.query('inst:dacm?').strip().lower()
+        self.set_and_read(f'inst:dacm {dacMode}', 'inst:dacm?', 'dacMode', lambda r: r.strip().lower())
 
     def set_fs(self, fs=92e9):
         """
@@ -919,8 +1573,7 @@ class M8196A(socketscpi.SocketInstrument):
 
         if not isinstance(fs, (int, float)) or fs <= 0:
             raise ValueError('Sample rate must be a positive floating point value.')
-        self.write(f'frequency:raster {fs}')
-        self.fs = float(self.query('frequency:raster?').strip())
+        self.set_and_read(f'frequency:raster {fs}', 'frequency:raster?', 'fs', float)
 
     def set_refSrc(self, refSrc='axi'):
         """
@@ -931,8 +1584,7 @@ class M8196A(socketscpi.SocketInstrument):
 
         if refSrc.lower() not in ['axi', 'int', 'ext']:
             raise ValueError("'refSrc' must be 'axi', 'int', or 'ext'")
-        self.write(f'roscillator:source {refSrc}')
-        self.refSrc = self.query('roscillator:source?').strip()
+        self.set_and_read(f'roscillator:source {refSrc}', 'roscillator:source?', 'refSrc', pending=refSrc)
 
     def set_refFreq(self, refFreq=100e6):
         """
@@ -1070,7 +1722,7 @@ class M8196A(socketscpi.SocketInstrument):
 
 
 # noinspection PyUnresolvedReferences,PyUnresolvedReferences,PyUnresolvedReferences,PyUnresolvedReferences,PyUnresolvedReferences,PyUnresolvedReferences,PyUnresolvedReferences,PyUnresolvedReferences
-class VSG(socketscpi.SocketInstrument):
+class VSG(BatchConfigMixin, socketscpi.SocketInstrument):
     def __init__(self, host, port=5025, timeout=10, reset=False):
         """
         Generic class for controlling the EXG, MXG, PSG, and M938X
@@ -1095,32 +1747,46 @@ class VSG(socketscpi.SocketInstrument):
             self.write('*rst')
             self.query('*opc?')
 
+        self.init_settings()
+
+    def init_settings(self):
+        """
+        HELPER FUNCTION
+        Queries all settings from the VSG with a single compound query,
+        stores them as class attributes, and initializes waveform format
+        constants.
+        """
+
+        def read_refFreq():
+            if 'int' in self.refSrc.lower():
+                self.refFreq = 10e6
+            elif 'ext' in self.refSrc.lower():
+                self.read_setting('roscillator:frequency:external?', 'refFreq', float)
+            elif 'bbg' in self.refSrc.lower():
+                if 'M938' not in self.instId:
+                    self.read_setting('roscillator:frequency:bbg?', 'refFreq', float)
+                else:
+                    raise error.VSGError('Invalid reference source chosen, select \'int\' or \'ext\'.')
+            else:
+                raise error.VSGError('Unknown refSrc selected.')
+
         # Query all settings from VSG and store them as class attributes
-        self.rfState = self.query('output?').strip()
-        self.modState = self.query('output:modulation?').strip()
-        self.cf = float(self.query('frequency?').strip())
-        self.amp = float(self.query('power?').strip())
-        self.alcState = self.query('power:alc?')
-        self.refSrc = self.query('roscillator:source?').strip()
-        self.arbState = self.query('radio:arb:state?').strip()
-        self.fs = float(self.query('radio:arb:sclock:rate?').strip())
-        if 'int' in self.refSrc.lower():
-            self.refFreq = 10e6
-        elif 'ext' in self.refSrc.lower():
-            self.refFreq = float(self.query('roscillator:frequency:external?').strip())
-        elif 'bbg' in self.refSrc.lower():
+        with self.batch():
+            self.read_setting('output?', 'rfState')
+            self.read_setting('output:modulation?', 'modState')
+            self.read_setting('frequency?', 'cf', float)
+            self.read_setting('power?', 'amp', float)
+            self.read_setting('power:alc?', 'alcState')
+            self.read_setting('roscillator:source?', 'refSrc', after=read_refFreq)
+            self.read_setting('radio:arb:state?', 'arbState')
+            self.read_setting('radio:arb:sclock:rate?', 'fs', float)
             if 'M938' not in self.instId:
-                self.refFreq = float(self.query('roscillator:frequency:bbg?').strip())
-            else:
-                raise error.VSGError('Invalid reference source chosen, select \'int\' or \'ext\'.')
-        else:
-            raise error.VSGError('Unknown refSrc selected.')
+                self.read_setting('radio:arb:rscaling?', 'iqScale', float)
 
-        # Initialize waveform format constants and populate them with check_resolution()
+        # Initialize waveform format constants
         self.minLen = 60
         self.binMult = 32767
         if 'M938' not in self.instId:
-            self.iqScale = float(self.query('radio:arb:rscaling?').strip())
             self.gran = 2
         else:
             self.gran = 4
@@ -1140,32 +1806,34 @@ class VSG(socketscpi.SocketInstrument):
             fs (float): Sets the sample rate of the baseband generator.
         """
 
-        # Check to see which keyword arguments the user sent and call the appropriate function
-        for key, value in kwargs.items():
-            if key == 'rfState':
-                self.set_rfState(value)
-            elif key == 'modState':
-                self.set_modState(value)
-            elif key == 'cf':
-                self.set_cf(value)
-            elif key == 'amp':
-                self.set_amp(value)
-            elif key == 'alcState':
-                self.set_alcState(value)
-            elif key == 'iqScale':
-                self.set_iqScale(value)
-            elif key == 'refSrc':
-                self.set_refSrc(value)
-            elif key == 'fs':
-                self.set_fs(value)
-            else:
-                raise KeyError(f'Invalid keyword argument: "{key}"')  # raise KeyError('Invalid keyword argument.')
-
-        # Arb state can only be turned on after a waveform has been loaded/selected
-        # self.write(f'radio:arb:state {arbState}')
-        # self.arbState = self.query('radio:arb:state?').strip()
+        # Send all settings as a single transaction with one read-back query and one error check
+        with self.batch():
+            # Check to see which keyword arguments the user sent and call the appropriate function
+            for key, value in kwargs.items():
+                if key == 'rfState':
+                    self.set_rfState(value)
+                elif key == 'modState':
+                    self.set_modState(value)
+                elif key == 'cf':
+                    self.set_cf(value)
+                elif key == 'amp':
+                    self.set_amp(value)
+                elif key == 'alcState':
+                    self.set_alcState(value)
+                elif key == 'iqScale':
+                    self.set_iqScale(value)
+                elif key == 'refSrc':
+                    self.set_refSrc(value)
+                elif key == 'fs':
+                    self.set_fs(value)
+                else:
+                    raise KeyError(f'Invalid keyword argument: "{key}"')  # raise KeyError('Invalid keyword argument.')
+
+            # Arb state can only be turned on after a waveform has been loaded/selected
+            # self.write(f'radio:arb:state {arbState}')
+            # self.arbState = self.query('radio:arb:state?').strip()
 
-        self.err_check()
+            self.err_check()
 
     def set_rfState(self, rfState):
         """
@@ -1177,8 +1845,7 @@ class VSG(socketscpi.SocketInstrument):
         if rfState not in [1, 0, 'on', 'off', 'ON', 'OFF', 'On', 'Off']:
             raise ValueError('"rfState" should be 1, 0, "on", or "off"')
 
-        self.write(f'output {rfState}')
-        self.rfState = int(self.query('output?').strip())
+        self.set_and_read(f'output {rfState}', 'output?', 'rfState', int)
 
     def set_modState(self, modState):
         """
@@ -1190,8 +1857,7 @@ class VSG(socketscpi.SocketInstrument):
         if modState not in [1, 0, 'on', 'off', 'ON', 'OFF', 'On', 'Off']:
             raise ValueError('"modState" should be 1, 0, "on", or "off"')
 
-        self.write(f'output:modulation {modState}')
-        self.modState = int(self.query('output:modulation?').strip())
+        self.set_and_read(f'output:modulation {modState}', 'output:modulation?', 'modState', int)
 
     def set_arbState(self, arbState):
         """
@@ -1203,8 +1869,7 @@ class VSG(socketscpi.SocketInstrument):
         if arbState not in [1, 0, 'on', 'off', 'ON', 'OFF', 'On', 'Off']:
             raise ValueError('"arbState" should be 1, 0, "on", or "off"')
 
-        self.write(f'radio:arb:state {arbState}')
-        self.arbState = int(self.query('radio:arb:state?').strip())
+        self.set_and_read(f'radio:arb:state {arbState}', 'radio:arb:state?', 'arbState', int)
 
 
     def set_cf(self, cf):
@@ -1216,8 +1881,7 @@ class VSG(socketscpi.SocketInstrument):
 
         if not isinstance(cf, float) or cf <= 0:
             raise ValueError('Carrier frequency must be a positive floating point value.')
-        self.write(f'frequency {cf}')
-        self.cf = float(self.query('frequency?').strip())
+        self.set_and_read(f'frequency {cf}', 'frequency?', 'cf', float)
 
     def set_amp(self, amp):
         """
@@ -1228,8 +1892,7 @@ class VSG(socketscpi.SocketInstrument):
 
         if not isinstance(amp, (float, int)):
             raise ValueError('Amp argument must be a numerical value.')
-        self.write(f'power {amp}')
-        self.amp = float(self.query('power?').strip())
+        self.set_and_read(f'power {amp}', 'power?', 'amp', float)
 
     def set_alcState(self, alcState):
         """
@@ -1242,8 +1905,7 @@ class VSG(socketscpi.SocketInstrument):
         if alcState not in [1, 0, 'on', 'off', 'ON', 'OFF', 'On', 'Off']:
             raise ValueError('"rfState" should be 1, 0, "on", or "off"')
 
-        self.write(f'power:alc {alcState}')
-        self.alcState = int(self.query('power:alc?').strip())
+        self.set_and_read(f'power:alc {alcState}', 'power:alc?', 'alcState', int)
 
     def set_iqScale(self, iqScale):
         """
@@ -1258,8 +1920,7 @@ class VSG(socketscpi.SocketInstrument):
 
         # M9381/3A don't have an IQ scaling command.
         if 'M938' not in self.instId:
-            self.write(f'radio:arb:rscaling {iqScale}')
-            self.iqScale = float(self.query('radio:arb:rscaling?').strip())
+            self.set_and_read(f'radio:arb:rscaling {iqScale}', 'radio:arb:rscaling?', 'iqScale', float)
 
     def set_fs(self, fs):
         """
@@ -1270,8 +1931,7 @@ class VSG(socketscpi.SocketInstrument):
 
         if not isinstance(fs, (int, float)) or fs <= 0:
             raise ValueError('Sample rate must be a positive floating point value.')
-        self.write(f'radio:arb:sclock:rate {fs}')
-        self.fs = float(self.query('radio:arb:sclock:rate?').strip())
+        self.set_and_read(f'radio:arb:sclock:rate {fs}', 'radio:arb:sclock:rate?', 'fs', float)
 
     def set_refSrc(self, refSrc):
         """
@@ -1283,16 +1943,17 @@ class VSG(socketscpi.SocketInstrument):
         if not isinstance(refSrc, str) or refSrc.lower() not in ['int', 'ext', 'internal', 'external', 'bbg']:
             raise ValueError('"refSrc" must be "internal", "external", or "bbg".')
 
-        self.write(f'roscillator:source {refSrc}')
-        self.refSrc = self.query('roscillator:source?').strip()
-        if 'int' in self.refSrc.lower():
-            self.refFreq = 10e6
-        elif 'ext' in self.refSrc.lower():
-            self.refFreq = float(self.query('roscillator:frequency:external?').strip())
-        elif 'bbg' in self.refSrc.lower():
-            self.refFreq = float(self.query('roscillator:frequency:bbg?').strip())
-        else:
-            raise error.VSGError('Unknown refSrc selected.')
+        def read_refFreq():
+            if 'int' in self.refSrc.lower():
+                self.refFreq = 10e6
+            elif 'ext' in self.refSrc.lower():
+                self.read_setting('roscillator:frequency:external?', 'refFreq', float)
+            elif 'bbg' in self.refSrc.lower():
+                self.read_setting('roscillator:frequency:bbg?', 'refFreq', float)
+            else:
+                raise error.VSGError('Unknown refSrc selected.')
+
+        self.set_and_read(f'roscillator:source {refSrc}', 'roscillator:source?', 'refSrc', after=read_refFreq)
 
     def sanity_check(self):
         """Prints out user-accessible class attributes."""
@@ -1319,10 +1980,55 @@ class VSG(socketscpi.SocketInstrument):
             (str): Useful waveform identifier/name. Use this as the waveform identifier for the .play() method.
         """
 
+        # Format the waveform before touching the instrument so invalid waveforms don't interrupt playback
+        return self.download_formatted_wfm(self.format_wfm(wfmData), wfmID)
+
+    def download_formatted_wfm(self, wfm, wfmID='wfm'):
+        """
+        Downloads a waveform that has already been formatted by format_wfm().
+        Args:
+            wfm (NumPy array): Interleaved IQ values returned by format_wfm().
+            wfmID (str): Waveform name.
+
+        Returns:
+            (str): Useful waveform identifier/name. Use this as the waveform identifier for the .play() method.
+        """
+
         # Stop output before doing anything else
         self.set_modState(0)
         self.set_arbState(0)
 
+        # M9381/3A download procedure is slightly different from X-series sig gens
+        if 'M938' in self.instId:
+            # Delete any existing waveform with the same name. If it doesn't exist, clear the resulting error.
+            self.write(f'memory:delete "{wfmID}"')
+            self.query('*opc?')
+            self.write(f'mmemory:delete "C:\\Temp\\{wfmID}"')
+            self.query('*opc?')
+            self.write('*cls')
+            self.binblockwrite(f'mmemory:data "C:\\Temp\\{wfmID}",', wfm)
+            self.write(f'memory:copy "C:\\Temp\\{wfmID}","{wfmID}"')
+
+        # EXG/MXG/PSG download procedure
+        else:
+            self.binblockwrite(f'mmemory:data "WFM1:{wfmID}", ', wfm)
+            self.write(f'radio:arb:waveform "WFM1:{wfmID}"')
+
+        # Use 'wfmID' as the waveform identifier for the .play() method.
+        return wfmID
+
+    def format_wfm(self, wfmData):
+        """
+        HELPER FUNCTION
+        Checks a complex waveform and converts it to the interleaved
+        binary IQ format used by the VSG.
+        Args:
+            wfmData (NumPy array): Complex waveform values.
+
+        Returns:
+            (NumPy array): Interleaved IQ values ready for download.
+        """
+
         # Adjust endianness for M9381/3A
         if 'M938' in self.instId:
             bigEndian = False
@@ -1334,35 +2040,13 @@ class VSG(socketscpi.SocketInstrument):
             raise TypeError('wfmData should be a complex NumPy array.')
 
         # Waveform format checking. VSGs can only use 'iq' format waveforms.
-        if wfmData.dtype != np.complex:
+        if wfmData.dtype != np.complex128:
             raise TypeError('Invalid wfm type. IQ waveforms must be an array of complex values.')
-        else:
-            i = self.check_wfm(np.real(wfmData), bigEndian=bigEndian)
-            q = self.check_wfm(np.imag(wfmData), bigEndian=bigEndian)
-
-            wfm = self.iq_wfm_combiner(i, q)
-
-        # M9381/3A download procedure is slightly different from X-series sig gens
-        if 'M938' in self.instId:
-            try:
-                self.write(f'memory:delete "{wfmID}"')
-                self.query('*opc?')
-                self.write(f'mmemory:delete "C:\\Temp\\{wfmID}"')
-                self.query('*opc?')
-                self.err_check()
-            except socketscpi.SockInstError:
-                # print('Waveform doesn\'t exist, skipping delete operation.')
-                pass
-            self.binblockwrite(f'mmemory:data "C:\\Temp\\{wfmID}",', wfm)
-            self.write(f'memory:copy "C:\\Temp\\{wfmID}","{wfmID}"')
 
-        # EXG/MXG/PSG download procedure
-        else:
-            self.binblockwrite(f'mmemory:data "WFM1:{wfmID}", ', wfm)
-            self.write(f'radio:arb:waveform "WFM1:{wfmID}"')
+        i = self.check_wfm(np.real(wfmData), bigEndian=bigEndian)
+        q = self.check_wfm(np.imag(wfmData), bigEndian=bigEndian)
 
-        # Use 'wfmID' as the waveform identifier for the .play() method.
-        return wfmID
+        return self.iq_wfm_combiner(i, q)
 
     @staticmethod
     def iq_wfm_combiner(i, q):
@@ -1465,7 +2149,7 @@ class VSG(socketscpi.SocketInstrument):
 
 
 # noinspection PyAttributeOutsideInit,PyUnresolvedReferences,PyUnresolvedReferences,PyUnresolvedReferences,PyUnresolvedReferences,PyUnresolvedReferences,PyUnresolvedReferences,PyUnresolvedReferences,PyUnresolvedReferences
-class VXG(socketscpi.SocketInstrument):
+class VXG(BatchConfigMixin, socketscpi.SocketInstrument):
     def __init__(self, host, port=5025, timeout=10, reset=False):
         """
         Generic class for controlling the M9384B VXG signal generator.
@@ -1489,34 +2173,38 @@ class VXG(socketscpi.SocketInstrument):
             self.write('*rst')
             self.query('*opc?')
 
-        # Query all settings from VXG and store them as class attributes
-        self.rfState1 = self.query('rf1:output?').strip()
-        self.rfState2 = self.query('rf2:output?').strip()
-        self.modState1 = self.query('rf1:output:modulation?').strip()
-        self.modState2 = self.query('rf2:output:modulation?').strip()
-        self.cf1 = float(self.query('source:rf1:frequency?').strip())
-        self.cf2 = float(self.query('source:rf2:frequency?').strip())
-        self.amp1 = float(self.query('rf1:power?').strip())
-        self.amp2 = float(self.query('rf2:power?').strip())
-        self.arbState1 = self.query('signal1:state?').strip()
-        self.arbState2 = self.query('signal2:state?').strip()
-        self.alcState1 = self.query('rf1:power:alc?')
-        self.alcState2 = self.query('rf2:power:alc?')
-        self.iqScale1 = float(self.query('source:signal1:waveform:scale?').strip())
-        self.iqScale2 = float(self.query('source:signal2:waveform:scale?').strip())
-        self.fs1 = float(self.query('signal1:waveform:sclock:rate?').strip())
-        self.fs2 = float(self.query('signal2:waveform:sclock:rate?').strip())
+        self.init_settings()
 
-        self.refSrc = self.query('roscillator:source?').strip()
+    def init_settings(self):
+        """
+        HELPER FUNCTION
+        Queries all settings from the VXG with a single compound query,
+        stores them as class attributes, and initializes waveform format
+        constants.
+        """
 
-        if 'int' in self.refSrc.lower():
-            self.refFreq = 10e6
-        elif 'ext' in self.refSrc.lower():
-            self.refFreq = float(self.query('roscillator:frequency:external?').strip())
-        else:
-            raise error.VXGError('Unknown refSrc selected.')
+        def read_refFreq():
+            if 'int' in self.refSrc.lower():
+                self.refFreq = 10e6
+            elif 'ext' in self.refSrc.lower():
+                self.read_setting('roscillator:frequency:external?', 'refFreq', float)
+            else:
+                raise error.VXGError('Unknown refSrc selected.')
 
-        # Initialize waveform format constants and populate them with check_resolution()
+        # Query all settings from VXG and store them as class attributes
+        with self.batch():
+            for ch in [1, 2]:
+                self.read_setting(f'rf{ch}:output?', f'rfState{ch}')
+                self.read_setting(f'rf{ch}:output:modulation?', f'modState{ch}')
+                self.read_setting(f'source:rf{ch}:frequency?', f'cf{ch}', float)
+                self.read_setting(f'rf{ch}:power?', f'amp{ch}', float)
+                self.read_setting(f'signal{ch}:state?', f'arbState{ch}')
+                self.read_setting(f'rf{ch}:power:alc?', f'alcState{ch}')
+                self.read_setting(f'source:signal{ch}:waveform:scale?', f'iqScale{ch}', float)
+                self.read_setting(f'signal{ch}:waveform:sclock:rate?', f'fs{ch}', float)
+            self.read_setting('roscillator:source?', 'refSrc', after=read_refFreq)
+
+        # Initialize waveform format constants
         self.minLen = 512
         self.binMult = 32767
         self.gran = 8
@@ -1536,50 +2224,52 @@ class VXG(socketscpi.SocketInstrument):
             fs (float): Sets the sample rate of the baseband generator.
         """
 
-        # Check to see which keyword arguments the user sent and call the appropriate function
-        for key, value in kwargs.items():
-            if key == 'rfState1' or key == 'rfState':
-                self.set_rfState(value, ch=1)
-            elif key == 'rfState2':
-                self.set_rfState(value, ch=2)
-            elif key == 'modState1' or key == 'modState':
-                self.set_modState(value, ch=1)
-            elif key == 'modState2':
-                self.set_modState(value, ch=2)
-            elif key == 'arbdState1' or key == 'arbState':
-                self.set_arbState(value, ch=1)
-            elif key == 'arbState2':
-                self.set_modState(value, ch=2)
-            elif key == 'cf1' or key == 'cf':
-                self.set_cf(value, ch=1)
-            elif key == 'cf2':
-                self.set_cf(value, ch=2)
-            elif key == 'amp1' or key == 'amp':
-                self.set_amp(value, ch=1)
-            elif key == 'amp2':
-                self.set_amp(value, ch=2)
-            elif key == 'alcState1' or key == 'alcState':
-                self.set_alcState(value, ch=1)
-            elif key == 'alcState2':
-                self.set_alcState(value, ch=2)
-            elif key == 'iqScale1' or key == 'iqScale':
-                self.set_iqScale(value, ch=1)
-            elif key == 'iqScale2':
-                self.set_iqScale(value, ch=2)
-            elif key == 'fs1' or key == 'fs':
-                self.set_fs(value, ch=1)
-            elif key == 'fs2':
-                self.set_fs(value, ch=2)
-            elif key == 'refSrc':
-                self.set_refSrc(value)
-            else:
-                raise KeyError(f'Invalid keyword argument: "{key}"')  # raise KeyError('Invalid keyword argument.')
-
-        # Arb state can only be turned on after a waveform has been loaded/selected
-        # self.write(f'radio:arb:state {arbState}')
-        # self.arbState = self.query('radio:arb:state?').strip()
+        # Send all settings as a single transaction with one read-back query and one error check
+        with self.batch():
+            # Check to see which keyword arguments the user sent and call the appropriate function
+            for key, value in kwargs.items():
+                if key == 'rfState1' or key == 'rfState':
+                    self.set_rfState(value, ch=1)
+                elif key == 'rfState2':
+                    self.set_rfState(value, ch=2)
+                elif key == 'modState1' or key == 'modState':
+                    self.set_modState(value, ch=1)
+                elif key == 'modState2':
+                    self.set_modState(value, ch=2)
+                elif key == 'arbdState1' or key == 'arbState':
+                    self.set_arbState(value, ch=1)
+                elif key == 'arbState2':
+                    self.set_modState(value, ch=2)
+                elif key == 'cf1' or key == 'cf':
+                    self.set_cf(value, ch=1)
+                elif key == 'cf2':
+                    self.set_cf(value, ch=2)
+                elif key == 'amp1' or key == 'amp':
+                    self.set_amp(value, ch=1)
+                elif key == 'amp2':
+                    self.set_amp(value, ch=2)
+                elif key == 'alcState1' or key == 'alcState':
+                    self.set_alcState(value, ch=1)
+                elif key == 'alcState2':
+                    self.set_alcState(value, ch=2)
+                elif key == 'iqScale1' or key == 'iqScale':
+                    self.set_iqScale(value, ch=1)
+                elif key == 'iqScale2':
+                    self.set_iqScale(value, ch=2)
+                elif key == 'fs1' or key == 'fs':
+                    self.set_fs(value, ch=1)
+                elif key == 'fs2':
+                    self.set_fs(value, ch=2)
+                elif key == 'refSrc':
+                    self.set_refSrc(value)
+                else:
+                    raise KeyError(f'Invalid keyword argument: "{key}"')  # raise KeyError('Invalid keyword argument.')
+
+            # Arb state can only be turned on after a waveform has been loaded/selected
+            # self.write(f'radio:arb:state {arbState}')
+            # self.arbState = self.query('radio:arb:state?').strip()
 
-        self.err_check()
+            self.err_check()
 
     def set_rfState(self, rfState, ch=1):
         """
@@ -1595,8 +2285,7 @@ class VXG(socketscpi.SocketInstrument):
         if rfState not in [1, 0, 'on', 'off', 'ON', 'OFF', 'On', 'Off']:
             raise ValueError('"rfState" should be 1, 0, "on", or "off"')
 
-        self.write(f'source:rf{ch}:output:state {rfState}')
-        exec(f'self.rfState{ch} = int(self.query(f"source:rf{ch}:output:state?").strip())')
+        self.set_and_read(f'source:rf{ch}:output:state {rfState}', f'source:rf{ch}:output:state?', f'rfState{ch}', int)
 
     def set_modState(self, modState, ch=1):
         """
@@ -1612,8 +2301,8 @@ class VXG(socketscpi.SocketInstrument):
         if modState not in [1, 0, 'on', 'off', 'ON', 'OFF', 'On', 'Off']:
             raise ValueError('"modState" should be 1, 0, "on", or "off"')
 
-        self.write(f'source:rf{ch}:output:modulation {modState}')
-        exec(f'self.modState{ch} = int(self.query(f"source:rf{ch}:output:modulation?").strip())')
+        self.set_and_read(f'source:rf{ch}:output:modulation {modState}', f'source:rf{ch}:output:modulation?',
+                          f'modState{ch}', int)
 
     def set_arbState(self, arbState, ch=1):
         """
@@ -1629,8 +2318,7 @@ class VXG(socketscpi.SocketInstrument):
         if arbState not in [1, 0, 'on', 'off', 'ON', 'OFF', 'On', 'Off']:
             raise ValueError('"arbState" should be 1, 0, "on", or "off"')
 
-        self.write(f'source:signal{ch}:state {arbState}')
-        exec(f'self.arbState{ch} = int(self.query(f"source:signal{ch}:state?").strip())')
+        self.set_and_read(f'source:signal{ch}:state {arbState}', f'source:signal{ch}:state?', f'arbState{ch}', int)
 
     def set_cf(self, cf, ch=1):
         """
@@ -1646,8 +2334,7 @@ class VXG(socketscpi.SocketInstrument):
         if not isinstance(cf, float) or cf <= 0:
             raise ValueError('Carrier frequency must be a positive floating point value.')
 
-        self.write(f'source:rf{ch}:frequency {cf}')
-        exec(f'self.cf = float(self.query(f"source:rf{ch}:frequency?").strip())')
+        self.set_and_read(f'source:rf{ch}:frequency {cf}', f'source:rf{ch}:frequency?', f'cf{ch}', float)
 
     def set_amp(self, amp, ch=1):
         """
@@ -1663,8 +2350,7 @@ class VXG(socketscpi.SocketInstrument):
         if not isinstance(amp, (float, int)):
             raise ValueError('Amp argument must be a numerical value.')
 
-        self.write(f'source:rf{ch}:power {amp}')
-        exec(f'self.amp{ch} = float(self.query(f"source:rf{ch}:power?").strip())')
+        self.set_and_read(f'source:rf{ch}:power {amp}', f'source:rf{ch}:power?', f'amp{ch}', float)
 
     def set_alcState(self, alcState, ch=1):
         """
@@ -1681,8 +2367,7 @@ class VXG(socketscpi.SocketInstrument):
         if alcState not in [1, 0, 'on', 'off', 'ON', 'OFF', 'On', 'Off']:
             raise ValueError('"alcState" should be 1, 0, "on", or "off"')
 
-        self.write(f'source:rf{ch}:power:alc {alcState}')
-        exec(f'self.alcState{ch} = int(self.query(f"source:rf{ch}:power:alc?").strip())')
+        self.set_and_read(f'source:rf{ch}:power:alc {alcState}', f'source:rf{ch}:power:alc?', f'alcState{ch}', int)
 
     def set_iqScale(self, iqScale, ch=1):
         """
@@ -1699,8 +2384,8 @@ class VXG(socketscpi.SocketInstrument):
         if not isinstance(iqScale, int) or iqScale <= 0 or iqScale > 100:
             raise ValueError('iqScale argument must be an integer between 1 and 100.')
 
-        self.write(f'source:signal{ch}:waveform:scale {iqScale}')
-        exec(f'self.iqScale{ch} = float(self.query(f"source:signal{ch}:waveform:scale?").strip())')
+        self.set_and_read(f'source:signal{ch}:waveform:scale {iqScale}', f'source:signal{ch}:waveform:scale?',
+                          f'iqScale{ch}', float)
 
     def set_fs(self, fs, ch=1):
         """
@@ -1713,8 +2398,7 @@ class VXG(socketscpi.SocketInstrument):
         if not isinstance(fs, (int, float)) or fs <= 0:
             raise ValueError('Sample rate must be a positive floating point value.')
 
-        self.write(f'signal{ch}:waveform:sclock:rate {fs}')
-        exec(f"self.fs{ch} = float(self.query('signal{ch}:waveform:sclock:rate?').strip())")
+        self.set_and_read(f'signal{ch}:waveform:sclock:rate {fs}', f'signal{ch}:waveform:sclock:rate?', f'fs{ch}', float)
 
     def set_refSrc(self, refSrc):
         """
@@ -1726,16 +2410,17 @@ class VXG(socketscpi.SocketInstrument):
         if not isinstance(refSrc, str) or refSrc.lower() not in ['int', 'ext', 'internal', 'external']:
             raise ValueError('"refSrc" must be "internal" or "external".')
 
-        self.write(f'roscillator:source {refSrc}')
-        self.refSrc = self.query('roscillator:source?').strip()
-        if 'int' in self.refSrc.lower():
-            self.refFreq = 10e6
-        elif 'ext' in self.refSrc.lower():
-            self.refFreq = float(self.query('roscillator:frequency:external?').strip())
-        elif 'bbg' in self.refSrc.lower():
-            self.refFreq = float(self.query('roscillator:frequency:bbg?').strip())
-        else:
-            raise error.VSGError('Unknown refSrc selected.')
+        def read_refFreq():
+            if 'int' in self.refSrc.lower():
+                self.refFreq = 10e6
+            elif 'ext' in self.refSrc.lower():
+                self.read_setting('roscillator:frequency:external?', 'refFreq', float)
+            elif 'bbg' in self.refSrc.lower():
+                self.read_setting('roscillator:frequency:bbg?', 'refFreq', float)
+            else:
+                raise error.VSGError('Unknown refSrc selected.')
+
+        self.set_and_read(f'roscillator:source {refSrc}', 'roscillator:source?', 'refSrc', after=read_refFreq)
 
     def sanity_check(self):
         """Prints out initialized values."""
@@ -1769,22 +2454,24 @@ class VXG(socketscpi.SocketInstrument):
             (str): Useful waveform identifier/name. Use this as the waveform identifier for the .play() method.
         """
 
-        # Stop output before doing anything else
-        self.write('radio:arb:state off')
-        self.write('rf1:output:modulation off')
-        self.arbState = self.query('radio:arb:state?').strip()
+        # Format the waveform before touching the instrument so invalid waveforms don't interrupt playback
+        return self.download_formatted_wfm(self.format_wfm(wfmData), wfmID)
 
-        # Waveform format checking. VXG can only use 'iq' format waveforms.
-        if not isinstance(wfmData, np.ndarray):
-            raise TypeError('wfmData should be a complex NumPy array.')
+    def download_formatted_wfm(self, wfm, wfmID='wfm'):
+        """
+        Downloads a waveform that has already been formatted by format_wfm().
+        Args:
+            wfm (NumPy array): Interleaved IQ values returned by format_wfm().
+            wfmID (str): Waveform name.
 
-        if wfmData.dtype != np.complex:
-            raise TypeError('Invalid wfm type. IQ waveforms must be an array of complex values.')
-        else:
-            i = self.check_wfm(np.real(wfmData))
-            q = self.check_wfm(np.imag(wfmData))
+        Returns:
+            (str): Useful waveform identifier/name. Use this as the waveform identifier for the .play() method.
+        """
 
-            wfm = self.iq_wfm_combiner(i, q)
+        # Stop output before doing anything else
+        self.write('radio:arb:state off')
+        self.write('rf1:output:modulation off')
+        self.read_setting('radio:arb:state?', 'arbState')
 
         # try:
         #     self.write(f'mmemory:delete "D:\\Users\\Instrument\\Documents\\Keysight\\PathWave\\SignalGenerator\\Waveforms\\{wfmID}.bin"')
@@ -1797,6 +2484,30 @@ class VXG(socketscpi.SocketInstrument):
         # self.write(f'source:signal:waveform:select "D:\\Users\\Instrument\\Documents\\Keysight\\PathWave\\SignalGenerator\\Waveforms\\{wfmID}.bin"')
         return wfmID
 
+    def format_wfm(self, wfmData):
+        """
+        HELPER FUNCTION
+        Checks a complex waveform and converts it to the interleaved
+        binary IQ format used by the VXG.
+        Args:
+            wfmData (NumPy array): Complex waveform values.
+
+        Returns:
+            (NumPy array): Interleaved IQ values ready for download.
+        """
+
+        # Waveform format checking. VXG can only use 'iq' format waveforms.
+        if not isinstance(wfmData, np.ndarray):
+            raise TypeError('wfmData should be a complex NumPy array.')
+
+        if wfmData.dtype != np.complex128:
+            raise TypeError('Invalid wfm type. IQ waveforms must be an array of complex values.')
+
+        i = self.check_wfm(np.real(wfmData))
+        q = self.check_wfm(np.imag(wfmData))
+
+        return self.iq_wfm_combiner(i, q)
+
     @staticmethod
     def iq_wfm_combiner(i, q):
         """
@@ -1881,7 +2592,7 @@ class VXG(socketscpi.SocketInstrument):
         self.set_rfState(1, ch)
         self.set_modState(1, ch)
         # Don't know why, but the VXG uses a weird sample rate number when the waveform is selected
-        exec(f"self.set_fs(self.fs{ch}, {ch})")
+        self.set_fs(getattr(self, f'fs{ch}'), ch)
         self.err_check()
 
     def stop(self, ch=1):
@@ -1900,11 +2611,12 @@ class VXG(socketscpi.SocketInstrument):
 
 
 # noinspection PyUnusedLocal,PyRedundantParentheses
-class AnalogUXG(socketscpi.SocketInstrument):
+class AnalogUXG(BatchConfigMixin, socketscpi.SocketInstrument):
     """
     Generic class for controlling the N5193A Analog UXG agile signal generators.
 
     Attributes:
+        pdwFormat (str): Binary PDW format used by the instrument. ('analog')
         rfState (int): Turns the RF output on or off. (1, 0)
         modState (int): Turns the modulator on or off. (1, 0)
         cf (float): Sets the generator's carrier frequency.
@@ -1914,31 +2626,23 @@ class AnalogUXG(socketscpi.SocketInstrument):
         Add check to ensure that the correct instrument is connected
     """
 
-    def __init__(self, host, port=5025, timeout=10, reset=False):
+    pdwFormat = 'analog'
+
+    def __init__(self, host, port=5025, timeout=10, reset=False, errCheck=True):
         super().__init__(host, port, timeout)
         if reset:
             self.write('*rst')
             self.query('*opc?')
 
+        self.errCheck = errCheck
+
         # Check N5193A to make sure Streaming mode is selected
         mode = self.query('inst:select?').strip()
         if mode != "STR":
             self.write('inst:select str')
             self.query('*opc?')
 
-        # Query all settings from UXG and store them as class attributes
-        self.rfState = self.query('output?').strip()
-        self.modState = self.query('output:modulation?').strip()
-        self.streamState = self.query('stream:state?').strip()
-        self.cf = float(self.query('frequency?').strip())
-        self.amp = float(self.query('power?').strip())
-        self.refSrc = self.query('roscillator:source?').strip()
-        self.refFreq = 10e6
-        self.binMult = 32767
-
-        # Stream state should be turned off until streaming is needed.
-        self.write('stream:state off')
-        self.streamState = self.query('stream:state?').strip()
+        self.init_settings()
 
         # Set up host address for streaming purposes
         self.host = host
@@ -1949,6 +2653,27 @@ class AnalogUXG(socketscpi.SocketInstrument):
         self.lanStream.settimeout(
             timeout)  # Can't connect until LAN streaming is turned on  # self.lanStream.connect((host, 5033))
 
+    def init_settings(self):
+        """
+        HELPER FUNCTION
+        Turns off streaming and queries all settings from the UXG with a
+        single compound query and stores them as class attributes.
+        """
+
+        with self.batch():
+            # Stream state should be turned off until streaming is needed.
+            self.write('stream:state off')
+
+            # Query all settings from UXG and store them as class attributes
+            self.read_setting('output?', 'rfState')
+            self.read_setting('output:modulation?', 'modState')
+            self.read_setting('stream:state?', 'streamState')
+            self.read_setting('frequency?', 'cf', float)
+            self.read_setting('power?', 'amp', float)
+            self.read_setting('roscillator:source?', 'refSrc')
+        self.refFreq = 10e6
+        self.binMult = 32767
+
     # def configure(self, rfState=0, modState=0, cf=1e9, amp=-20):
     def configure(self, **kwargs):
         """
@@ -1963,19 +2688,22 @@ class AnalogUXG(socketscpi.SocketInstrument):
             amp (int/float): Sets the generator's RF output power.
         """
 
-        # Check to see which keyword arguments the user sent and call the appropriate function
-        for key, value in kwargs.items():
-            if key == 'rfState':
-                self.set_rfState(value)
-            elif key == 'modState':
-                self.set_modState(value)
-            elif key == 'cf':
-                self.set_cf(value)
-            elif key == 'amp':
-                self.set_amp(value)
-            else:
-                raise KeyError(f'Invalid keyword argument: "{key}"')  # raise KeyError('Invalid keyword argument.')
-        self.err_check()
+        # Send all settings as a single transaction with one read-back query and one error check
+        with self.batch():
+            # Check to see which keyword arguments the user sent and call the appropriate function
+            for key, value in kwargs.items():
+                if key == 'rfState':
+                    self.set_rfState(value)
+                elif key == 'modState':
+                    self.set_modState(value)
+                elif key == 'cf':
+                    self.set_cf(value)
+                elif key == 'amp':
+                    self.set_amp(value)
+                else:
+                    raise KeyError(f'Invalid keyword argument: "{key}"')  # raise KeyError('Invalid keyword argument.')
+            if self.errCheck:
+                self.err_check()
 
     def set_rfState(self, rfState):
         """
@@ -1984,8 +2712,7 @@ class AnalogUXG(socketscpi.SocketInstrument):
             rfState (int): Turns the RF output on or off. (1, 0)
         """
 
-        self.write(f'output {rfState}')
-        self.rfState = int(self.query('output?').strip())
+        self.set_and_read(f'output {rfState}', 'output?', 'rfState', int)
 
     def set_modState(self, modState):
         """
@@ -1994,8 +2721,7 @@ class AnalogUXG(socketscpi.SocketInstrument):
             modState (int): Turns the baseband modulator on or off. (1, 0)
         """
 
-        self.write(f'output:modulation {modState}')
-        self.modState = int(self.query('output:modulation?').strip())
+        self.set_and_read(f'output:modulation {modState}', 'output:modulation?', 'modState', int)
 
     def set_cf(self, cf):
         """
@@ -2006,8 +2732,7 @@ class AnalogUXG(socketscpi.SocketInstrument):
 
         if not isinstance(cf, float) or cf <= 0:
             raise ValueError('Carrier frequency must be a positive floating point value.')
-        self.write(f'frequency {cf}')
-        self.cf = float(self.query('frequency?').strip())
+        self.set_and_read(f'frequency {cf}', 'frequency?', 'cf', float)
 
     def set_amp(self, amp):
         """
@@ -2018,8 +2743,7 @@ class AnalogUXG(socketscpi.SocketInstrument):
 
         if not isinstance(amp, int):
             raise ValueError('Amp argument must be an integer.')
-        self.write(f'power {amp}')
-        self.amp = float(self.query('power?').strip())
+        self.set_and_read(f'power {amp}', 'power?', 'amp', float)
 
     def sanity_check(self):
         """Prints out user-accessible class attributes."""
@@ -2028,7 +2752,8 @@ class AnalogUXG(socketscpi.SocketInstrument):
         print('Center Frequency:', self.cf)
         print('Output Amplitude:', self.amp)
         print('Reference source:', self.refSrc)
-        self.err_check()
+        if self.errCheck:
+            self.err_check()
 
     def open_lan_stream(self):
         """Open connection to port 5033 for LAN streaming to the UXG."""
@@ -2042,6 +2767,27 @@ class AnalogUXG(socketscpi.SocketInstrument):
         self.lanStream.shutdown(socketscpi.socket.SHUT_RDWR)
         self.lanStream.close()
 
+    def replay_pdw_file(self, fileName, loops=1, loopPeriod=None, streamPort=5033, chunkSize=65536):
+        """
+        Streams a binary PDW file from disk over the LAN streaming port
+        without reading it into memory. Set the streaming source to LAN first.
+        See pdwStreaming.replay_pdw_file().
+        Args:
+            fileName (str): Binary PDW file built by bin_pdw_file_builder() or PdwFileWriter.
+            loops (int): Number of times to play the file. Start times are rebased for each loop.
+            loopPeriod (float): Time in seconds between loop starts. Default is the start time of the last PDW (operation 2).
+            streamPort (int): LAN streaming port.
+            chunkSize (int): Number of PDWs rebased and sent at a time for loops after the first.
+
+        Returns:
+            (dict): PDWs and bytes sent, elapsed time, and PDW and byte throughput.
+        """
+
+        stats = pdwStreaming.replay_pdw_file(self, fileName, loops, loopPeriod, streamPort, chunkSize)
+        if self.errCheck:
+            self.err_check()
+        return stats
+
     def stream_play(self, pdwID='pdw'):
         """
         Assigns pdw/windex, activates RF output, modulation, and
@@ -2053,28 +2799,25 @@ class AnalogUXG(socketscpi.SocketInstrument):
         # Assign pdw file
         self.write('stream:source file')
         self.write(f'stream:source:file:name "{pdwID}"')
-        self.err_check()
+        if self.errCheck:
+            self.err_check()
 
         # Activate streaming, and send trigger command.
-        self.write('output:modulation on')
-        self.modState = self.query('output:modulation?').strip()
-        self.write('source:stream:state on')
-        self.err_check()
-        self.streamState = self.query('stream:state?').strip()
-        self.err_check()
+        self.set_and_read('output:modulation on', 'output:modulation?', 'modState')
+        self.set_and_read('source:stream:state on', 'stream:state?', 'streamState')
+        if self.errCheck:
+            self.err_check()
         self.write('stream:trigger:play')
 
     def stream_stop(self):
         """Deactivates RF output, modulation, and streaming mode."""
-        self.write('output off')
-        self.rfState = self.query('output?').strip()
-        self.write('output:modulation off')
-        self.modState = self.query('output:modulation?').strip()
-        self.write('stream:state off')
-        self.streamState = self.query('stream:state?').strip()
-        self.err_check()
+        self.set_and_read('output off', 'output?', 'rfState')
+        self.set_and_read('output:modulation off', 'output:modulation?', 'modState')
+        self.set_and_read('stream:state off', 'stream:state?', 'streamState')
+        if self.errCheck:
+            self.err_check()
 
-    def bin_pdw_file_builder(self, pdwList):
+    def bin_pdw_file_builder(self, pdwList, fpcEntries=pdwBuilder.DEFAULT_FPC_ENTRIES):
         """
         Builds a binary PDW file with a padding block to ensure the
         PDW section begins at an offset of 4096 bytes (required by UXG).
@@ -2083,54 +2826,81 @@ class AnalogUXG(socketscpi.SocketInstrument):
         Keysight UXG X-Series Agile Signal Generator Online Documentation
         http://rfmw.em.keysight.com/wireless/helpfiles/n519xa/n519xa.htm
         Args:
-            pdwList (list): List of lists. Each inner list contains a single pulse descriptor word.
+            pdwList (list/PdwTable): List of lists. Each inner list contains a single pulse descriptor word.
+            fpcEntries (list(tuple/dict)): Frequency/phase coding table entries, see
+                pdwBuilder.bin_pdw_freqPhaseCodingBlock(). None omits the FPC block.
 
         Returns:
             (bytes): Binary data that contains a full PDW file that can be downloaded to and played out of the UXG.
         """
 
-        pdwFile = pdwBuilder.analog_bin_pdw_file_builder(pdwList)
+        pdwFile = pdwBuilder.analog_bin_pdw_file_builder(pdwList, fpcEntries)
 
-        self.err_check()
+        if self.errCheck:
+            self.err_check()
 
         return pdwFile
 
 
+    def check_pdws(self, pdwList, minSpacing=0, maxPdws=pdwBuilder.MAX_PDWS):
+        """
+        Checks PDW ordering, overlap, spacing, field ranges, operation
+        flags, and PDW count before building or downloading a PDW file.
+        Args:
+            pdwList (list/PdwTable): List of lists. Each inner list contains a single pulse descriptor word.
+            minSpacing (float): Minimum time in seconds between consecutive PDW start times. 0 disables the check.
+            maxPdws (int): Maximum number of PDWs. None disables the check.
+        """
+
+        check_pdws(pdwList, self.pdwFormat, minSpacing, maxPdws)
+
     def bin_raw_pdw_block_builder(self, pdwList):
         """
         Builds binary raw pdw block without header or end block for lan streaming
         Args:
-            pdwList (list): List of lists. Each inner list contains a single pulse descriptor word.
+            pdwList (list/PdwTable): List of lists. Each inner list contains a single pulse descriptor word.
 
         Returns:
             (bytes): Binary data that contains a binary block of raw 28 byte
              PDWs without headers or other information to stream directly over
              N5193A LAN port 5033
         """
-        # Build Raw PDW Data from list
-        rawPdws = [pdwBuilder.analog_bin_pdw_builder(*p) for p in pdwList]
-        rawPdws = b''.join(rawPdws)
+        # Build Raw PDW Data from list, encoding all PDWs at once
+        columns = pdwBuilder.pdw_columns(pdwList, 'analog')
+        if not columns:
+            return b''
+        return pdwBuilder.analog_bin_pdw_array_builder(*columns).tobytes()
 
-        return rawPdws
 
-
-    def download_bin_pdw_file(self, pdwFile, pdwName='wfm'):
+    def download_bin_pdw_file(self, pdwFile, pdwName='wfm', chunkSize=1 << 20):
         """
         Downloads binary PDW file to PDW directory in UXG.
         Args:
-            pdwFile (bytes): Binary data containing PDW file, generally created by the bin_pdw_file_builder() method.
+            pdwFile (bytes/str/file): Binary data containing PDW file, generally created by the bin_pdw_file_builder()
+                method, or the name of a PDW file on disk (e.g. written by pdwBuilder.PdwFileWriter) or a binary
+                file object. Files are sent in chunks and never read into memory all at once.
             pdwName (str): Name of PDW file.
+            chunkSize (int): Number of bytes read from a file per send.
         """
 
-        self.binblockwrite(f'memory:data "/USER/PDW/{pdwName}",', pdwFile)
-        self.err_check()
+        cmd = f'memory:data "/USER/PDW/{pdwName}",'
+        if isinstance(pdwFile, (str, os.PathLike)):
+            with open(pdwFile, 'rb') as f:
+                binblock_file_write(self, cmd, f, chunkSize)
+        elif hasattr(pdwFile, 'read'):
+            binblock_file_write(self, cmd, pdwFile, chunkSize)
+        else:
+            self.binblockwrite(cmd, pdwFile)
+        if self.errCheck:
+            self.err_check()
 
 
-class VectorUXG(socketscpi.SocketInstrument):
+class VectorUXG(BatchConfigMixin, socketscpi.SocketInstrument):
     """
     Generic class for controlling the N5194A + N5193A (Vector + Analog) UXG agile signal generators.
 
     Attributes:
+        pdwFormat (str): Binary PDW format used by the instrument. ('vector')
         rfState (int): Turns the RF output on or off. (1, 0)
         modState (int): Turns the modulator on or off. (1, 0)
         cf (float): Sets the generator's carrier frequency.
@@ -2141,35 +2911,16 @@ class VectorUXG(socketscpi.SocketInstrument):
         Add check to ensure that the correct instrument is connected
     """
 
+    pdwFormat = 'vector'
+
     def __init__(self, host, port=5025, timeout=10, reset=False, clearMemory=False, errCheck=True):
         super().__init__(host, port, timeout)
         if reset:
             self.write('*rst')
             self.query('*opc?')
 
-        # Query all settings from VXG and store them as class attributes
-        self.rfState = self.query('output?').strip()
-        self.modState = self.query('output:modulation?').strip()
-        self.arbState = self.query('radio:arb:state?').strip()
-        self.streamState = self.query('stream:state?').strip()
-        self.cf = float(self.query('frequency?').strip())
-        self.amp = float(self.query('power?').strip())
-        self.iqScale = float(self.query('radio:arb:rscaling?').strip())
-        self.refSrc = self.query('roscillator:source?').strip()
-        self.refFreq = 10e6
-        self.fs = float(self.query('radio:arb:sclock:rate?').strip())
-        self.gran = int(self.query('radio:arb:information:quantum?').strip())
-        self.minLen = int(self.query('radio:arb:information:slength:minimum?').strip())
-        self.binMult = 32767
         self.errCheck = errCheck
-
-        # Clear all waveform, pdw, and windex files
-        if clearMemory:
-            self.clear_all_wfm()
-
-        # Arb state can only be turned on after a waveform has been loaded/selected.
-        self.write('radio:arb:state off')
-        self.arbState = self.query('radio:arb:state?').strip()
+        self.init_settings(clearMemory)
 
         # Set up host for streaming socket
         self.host = host
@@ -2180,6 +2931,39 @@ class VectorUXG(socketscpi.SocketInstrument):
         self.lanStream.settimeout(
             timeout)  # Can't connect until LAN streaming is turned on  # self.lanStream.connect((host, 5033))
 
+    def init_settings(self, clearMemory=False):
+        """
+        HELPER FUNCTION
+        Optionally clears waveform memory, turns off arb playback, and
+        queries all settings from the UXG with a single compound query
+        and stores them as class attributes.
+        Args:
+            clearMemory (bool): Clears all waveform, pdw, and windex files.
+        """
+
+        with self.batch():
+            # Clear all waveform, pdw, and windex files
+            if clearMemory:
+                self.clear_all_wfm()
+
+            # Arb state can only be turned on after a waveform has been loaded/selected.
+            self.write('radio:arb:state off')
+
+            # Query all settings from UXG and store them as class attributes
+            self.read_setting('output?', 'rfState')
+            self.read_setting('output:modulation?', 'modState')
+            self.read_setting('radio:arb:state?', 'arbState')
+            self.read_setting('stream:state?', 'streamState')
+            self.read_setting('frequency?', 'cf', float)
+            self.read_setting('power?', 'amp', float)
+            self.read_setting('radio:arb:rscaling?', 'iqScale', float)
+            self.read_setting('roscillator:source?', 'refSrc')
+            self.read_setting('radio:arb:sclock:rate?', 'fs', float)
+            self.read_setting('radio:arb:information:quantum?', 'gran', int)
+            self.read_setting('radio:arb:information:slength:minimum?', 'minLen', int)
+        self.refFreq = 10e6
+        self.binMult = 32767
+
     # def configure(self, rfState=0, modState=0, cf=1e9, amp=-20, iqScale=70):
     def configure(self, **kwargs):
         """
@@ -2195,23 +2979,25 @@ class VectorUXG(socketscpi.SocketInstrument):
             iqScale (int): Scales the IQ modulator. Default/safe value is 70
         """
 
-        # Check to see which keyword arguments the user sent and call the appropriate function
-        for key, value in kwargs.items():
-            if key == 'rfState':
-                self.set_rfState(value)
-            elif key == 'modState':
-                self.set_modState(value)
-            elif key == 'cf':
-                self.set_cf(value)
-            elif key == 'amp':
-                self.set_amp(value)
-            elif key == 'iqScale':
-                self.set_iqScale(value)
-            else:
-                raise KeyError(
-                    f'Invalid keyword argument: "{key}"')  # raise KeyError('Invalid keyword argument.')  # Arb state can only be turned on after a waveform has been loaded/selected  # self.write(f'radio:arb:state {arbState}')  # self.arbState = self.query('radio:arb:state?').strip()
+        # Send all settings as a single transaction with one read-back query and one error check
+        with self.batch():
+            # Check to see which keyword arguments the user sent and call the appropriate function
+            for key, value in kwargs.items():
+                if key == 'rfState':
+                    self.set_rfState(value)
+                elif key == 'modState':
+                    self.set_modState(value)
+                elif key == 'cf':
+                    self.set_cf(value)
+                elif key == 'amp':
+                    self.set_amp(value)
+                elif key == 'iqScale':
+                    self.set_iqScale(value)
+                else:
+                    raise KeyError(
+                        f'Invalid keyword argument: "{key}"')  # raise KeyError('Invalid keyword argument.')  # Arb state can only be turned on after a waveform has been loaded/selected  # self.write(f'radio:arb:state {arbState}')  # self.arbState = self.query('radio:arb:state?').strip()
 
-        self.err_check()
+            self.err_check()
 
     def set_rfState(self, rfState):
         """
@@ -2220,8 +3006,7 @@ class VectorUXG(socketscpi.SocketInstrument):
             rfState (int): Turns the RF output on or off. (1, 0)
         """
 
-        self.write(f'output {rfState}')
-        self.rfState = int(self.query('output?').strip())
+        self.set_and_read(f'output {rfState}', 'output?', 'rfState', int)
 
     def set_modState(self, modState):
         """
@@ -2230,8 +3015,7 @@ class VectorUXG(socketscpi.SocketInstrument):
             modState (int): Turns the baseband modulator on or off. (1, 0)
         """
 
-        self.write(f'output:modulation {modState}')
-        self.modState = int(self.query('output:modulation?').strip())
+        self.set_and_read(f'output:modulation {modState}', 'output:modulation?', 'modState', int)
 
     def set_cf(self, cf):
         """
@@ -2242,8 +3026,7 @@ class VectorUXG(socketscpi.SocketInstrument):
 
         if not isinstance(cf, float) or cf <= 0:
             raise ValueError('Carrier frequency must be a positive floating point value.')
-        self.write(f'frequency {cf}')
-        self.cf = float(self.query('frequency?').strip())
+        self.set_and_read(f'frequency {cf}', 'frequency?', 'cf', float)
 
     def set_amp(self, amp):
         """
@@ -2254,8 +3037,7 @@ class VectorUXG(socketscpi.SocketInstrument):
 
         if not isinstance(amp, int):
             raise ValueError('Amp argument must be an integer.')
-        self.write(f'power {amp}')
-        self.amp = float(self.query('power?').strip())
+        self.set_and_read(f'power {amp}', 'power?', 'amp', float)
 
     def set_iqScale(self, iqScale):
         """
@@ -2270,8 +3052,7 @@ class VectorUXG(socketscpi.SocketInstrument):
 
         # M9381/3A don't have an IQ scaling command.
         if 'M938' not in self.instId:
-            self.write(f'radio:arb:rscaling {iqScale}')
-            self.iqScale = float(self.query('radio:arb:rscaling?').strip())
+            self.set_and_read(f'radio:arb:rscaling {iqScale}', 'radio:arb:rscaling?', 'iqScale', float)
 
     def stream_configure(self, source='file', trigState=True, trigSource='bus', trigInPort=None, trigPeriod=1e-3,
                          trigOutPort=None):
@@ -2287,34 +3068,36 @@ class VectorUXG(socketscpi.SocketInstrument):
             trigOutPort (int): Selects trigger output port. (1-10)
         """
 
-        if source.lower() not in ['file', 'lan']:
-            raise error.UXGError('Invalid stream source selected. Use "file" or "lan"')
-
-        self.write(f'stream:source {source}')
-
-        if trigState:
-            if trigSource.lower() not in ['key', 'bus', 'external', 'timer']:
-                raise error.UXGError('Invalid trigger source selected. Use "key", "bus", "external", or "timer"')
-            if trigInPort == trigOutPort and trigInPort and trigOutPort:
-                raise error.UXGError('Conflicting trigger ports. trigInPort and trigOutPort must be unique.')
-            self.write('stream:trigger:play:file:type:continuous:type trigger')
-            self.write(f'stream:trigger:play:source {trigSource}')
-
-            if trigSource.lower() == 'external':
-                if trigInPort:
-                    if trigInPort < 1 or trigInPort > 10:
-                        raise error.UXGError('trigInPort must be an integer between 1 and 10.')
-                    self.write(f'trigger:play:external:source trigger{trigInPort}')
-            elif trigSource.lower() == 'timer':
-                if trigPeriod < 48e-9 or trigPeriod > 34:
-                    raise error.UXGError('Invalid trigPeriod')
-                self.write(f'trigger:timer {trigPeriod}')
-
-        if trigOutPort:
-            if trigOutPort < 1 or trigOutPort > 10:
-                raise error.UXGError('trigOutPort must be an integer between 1 and 10.')
-            self.write('stream:markers:pdw1:mode stime')
-            self.write(f'rout:trigger{trigOutPort}:output pmarker1')
+        # Send all stream settings as a single program message
+        with self.batch():
+            if source.lower() not in ['file', 'lan']:
+                raise error.UXGError('Invalid stream source selected. Use "file" or "lan"')
+
+            self.write(f'stream:source {source}')
+
+            if trigState:
+                if trigSource.lower() not in ['key', 'bus', 'external', 'timer']:
+                    raise error.UXGError('Invalid trigger source selected. Use "key", "bus", "external", or "timer"')
+                if trigInPort == trigOutPort and trigInPort and trigOutPort:
+                    raise error.UXGError('Conflicting trigger ports. trigInPort and trigOutPort must be unique.')
+                self.write('stream:trigger:play:file:type:continuous:type trigger')
+                self.write(f'stream:trigger:play:source {trigSource}')
+
+                if trigSource.lower() == 'external':
+                    if trigInPort:
+                        if trigInPort < 1 or trigInPort > 10:
+                            raise error.UXGError('trigInPort must be an integer between 1 and 10.')
+                        self.write(f'trigger:play:external:source trigger{trigInPort}')
+                elif trigSource.lower() == 'timer':
+                    if trigPeriod < 48e-9 or trigPeriod > 34:
+                        raise error.UXGError('Invalid trigPeriod')
+                    self.write(f'trigger:timer {trigPeriod}')
+
+            if trigOutPort:
+                if trigOutPort < 1 or trigOutPort > 10:
+                    raise error.UXGError('trigOutPort must be an integer between 1 and 10.')
+                self.write('stream:markers:pdw1:mode stime')
+                self.write(f'rout:trigger{trigOutPort}:output pmarker1')
 
     def sanity_check(self):
         """Prints out initialized values."""
@@ -2339,6 +3122,27 @@ class VectorUXG(socketscpi.SocketInstrument):
         self.lanStream.shutdown(socketscpi.socket.SHUT_RDWR)
         self.lanStream.close()
 
+    def replay_pdw_file(self, fileName, loops=1, loopPeriod=None, streamPort=5033, chunkSize=65536):
+        """
+        Streams a binary PDW file from disk over the LAN streaming port
+        without reading it into memory. Set the streaming source to LAN first.
+        See pdwStreaming.replay_pdw_file().
+        Args:
+            fileName (str): Binary PDW file built by bin_pdw_file_builder() or PdwFileWriter.
+            loops (int): Number of times to play the file. Start times are rebased for each loop.
+            loopPeriod (float): Time in seconds between loop starts. Default is the start time of the last PDW (operation 2).
+            streamPort (int): LAN streaming port.
+            chunkSize (int): Number of PDWs rebased and sent at a time for loops after the first.
+
+        Returns:
+            (dict): PDWs and bytes sent, elapsed time, and PDW and byte throughput.
+        """
+
+        stats = pdwStreaming.replay_pdw_file(self, fileName, loops, loopPeriod, streamPort, chunkSize)
+        if self.errCheck:
+            self.err_check()
+        return stats
+
     def bin_pdw_file_builder(self, pdwList):
         """
         Builds a binary PDW file with a padding block to ensure the
@@ -2348,7 +3152,7 @@ class VectorUXG(socketscpi.SocketInstrument):
         Keysight UXG X-Series Agile Vector Adapter Online Documentation
         http://rfmw.em.keysight.com/wireless/helpfiles/n519xa-vector/n519xa-vector.htm
         Args:
-            pdwList (list): List of lists. Each inner list contains a single
+            pdwList (list/PdwTable): List of lists. Each inner list contains a single
         pulse descriptor word.
 
         Returns:
@@ -2362,33 +3166,46 @@ class VectorUXG(socketscpi.SocketInstrument):
 
         return pdwFile
 
+    def check_pdws(self, pdwList, minSpacing=0, maxPdws=pdwBuilder.MAX_PDWS):
+        """
+        Checks PDW ordering, spacing, field ranges, operation flags, and
+        PDW count before building or downloading a PDW file.
+        Args:
+            pdwList (list/PdwTable): List of lists. Each inner list contains a single pulse descriptor word.
+            minSpacing (float): Minimum time in seconds between consecutive PDW start times. 0 disables the check.
+            maxPdws (int): Maximum number of PDWs. None disables the check.
+        """
+
+        check_pdws(pdwList, self.pdwFormat, minSpacing, maxPdws)
+
     # noinspection PyDefaultArgument,PyDefaultArgument
-    def csv_pdw_file_download(self, fileName, fields=['Operation', 'Time'], data=[[1, 0], [2, 100e-6]]):
+    def csv_pdw_file_download(self, fileName, fields=['Operation', 'Time'], data=[[1, 0], [2, 100e-6]],
+                              chunkSize=65536):
         """
         Builds a CSV PDW file, sends it into the UXG, and converts it to a binary PDW file.
         Args:
             fileName (str): Name of the csv file to be downloaded.
             fields (tuple(str)): Names of the fields contained in PDWs.
-            data (tuple(tuple)): Tuple of tuples. The inner tuples each contain the values for the fields for a single PDW.
+            data (tuple(tuple)/NumPy array/PdwTable/dict): Tuple of tuples. The inner tuples each contain the values for the fields for a single PDW.
+                Also accepts a 2D array, {field: column} dict, or PdwTable. PdwTable columns are written in table
+                field order, so fields must name the CSV columns in that order.
+            chunkSize (int): Number of rows converted to text at a time.
         """
 
-        # Write header fields separated by commas and terminated with \n
-        pdwCsv = ','.join(fields) + '\n'
-        for row in data:
-            # Write subsequent rows with data values separated by commas and terminated with \n
-            # The .join() function requires a list of strings, so convert numbers in row to strings
-            rowString = ','.join([f'{r}' for r in row]) + '\n'
-            pdwCsv += rowString
+        # Build the CSV a chunk of rows at a time. Large files spill to disk instead of memory.
+        with tempfile.SpooledTemporaryFile(max_size=CSV_SPOOL_SIZE) as pdwCsv:
+            pdwBuilder.write_csv(pdwCsv, fields, data, chunkSize)
+            pdwCsv.seek(0)
 
-        # Delete pdw csv file if already exists, continue script if it doesn't
-        try:
-            self.write('stream:state off')
-            self.write(f'memory:delete "{fileName}.csv"')
-            if self.errCheck:
-                self.err_check()
-        except socketscpi.SockInstError:
-            pass
-        self.binblockwrite(f'memory:data "{fileName}.csv", ', pdwCsv.encode('utf-8'))
+            # Delete pdw csv file if already exists, continue script if it doesn't
+            try:
+                self.write('stream:state off')
+                self.write(f'memory:delete "{fileName}.csv"')
+                if self.errCheck:
+                    self.err_check()
+            except socketscpi.SockInstError:
+                pass
+            binblock_file_write(self, f'memory:data "{fileName}.csv", ', pdwCsv)
 
         """Note: memory:import:stream imports/converts csv to pdw AND
         assigns the resulting pdw and waveform index files as the stream
@@ -2409,11 +3226,11 @@ class VectorUXG(socketscpi.SocketInstrument):
             windex (dict): {'fileName': '<fileName>', 'wfmNames': ['<name0>', '<name1>',... '<nameN>']}
         """
 
-        windexCsv = 'Id,Filename\n'
-        for i in range(len(windex['wfmNames'])):
-            windexCsv += f'{i},{windex["wfmNames"][i]}\n'
+        windexCsv = io.BytesIO()
+        wfmNames = windex['wfmNames']
+        pdwBuilder.write_csv(windexCsv, ['Id', 'Filename'], {'Id': np.arange(len(wfmNames)), 'Filename': list(wfmNames)})
 
-        self.binblockwrite(f'memory:data "{windex["fileName"]}.csv", ', windexCsv.encode('utf-8'))
+        self.binblockwrite(f'memory:data "{windex["fileName"]}.csv", ', windexCsv.getvalue())
 
         """Note: memory:import:windex imports/converts csv to waveform
         index file AND assigns the resulting file as the waveform index
@@ -2436,20 +3253,44 @@ class VectorUXG(socketscpi.SocketInstrument):
             (str): Useful waveform identifier/name.
         """
 
-        if wfmData.dtype != np.complex:
-            raise TypeError('Invalid wfm type. IQ waveforms must be an array of complex values.')
-        else:
-            i = self.check_wfm(np.real(wfmData))
-            q = self.check_wfm(np.imag(wfmData))
+        return self.download_formatted_wfm(self.format_wfm(wfmData), wfmID)
 
-            wfm = self.iq_wfm_combiner(i, q)
-        self.write('radio:arb:state off')
+    def download_formatted_wfm(self, wfm, wfmID='wfm'):
+        """
+        Downloads a waveform that has already been formatted by format_wfm().
+        Args:
+            wfm (NumPy array): Interleaved IQ values returned by format_wfm().
+            wfmID (str): Waveform name.
+
+        Returns:
+            (str): Useful waveform identifier/name.
+        """
 
-        self.arbState = self.query('radio:arb:state?').strip()
+        self.set_and_read('radio:arb:state off', 'radio:arb:state?', 'arbState')
         self.binblockwrite(f'memory:data "WFM1:{wfmID}", ', wfm)
 
         return wfmID
 
+    def format_wfm(self, wfmData):
+        """
+        HELPER FUNCTION
+        Checks a complex waveform and converts it to the interleaved
+        binary IQ format used by the UXG.
+        Args:
+            wfmData (NumPy array): Complex waveform values.
+
+        Returns:
+            (NumPy array): Interleaved IQ values ready for download.
+        """
+
+        if wfmData.dtype != np.complex128:
+            raise TypeError('Invalid wfm type. IQ waveforms must be an array of complex values.')
+
+        i = self.check_wfm(np.real(wfmData))
+        q = self.check_wfm(np.imag(wfmData))
+
+        return self.iq_wfm_combiner(i, q)
+
     @staticmethod
     def iq_wfm_combiner(i, q):
         """
@@ -2532,23 +3373,17 @@ class VectorUXG(socketscpi.SocketInstrument):
         """
 
         self.write(f'radio:arb:waveform "WFM1:{wfmID}"')
-        self.write('radio:arb:state on')
-        self.arbState = self.query('radio:arb:state?').strip()
-        self.write('output on')
-        self.rfState = self.query('output?').strip()
-        self.write('output:modulation on')
-        self.modState = self.query('output:modulation?').strip()
+        self.set_and_read('radio:arb:state on', 'radio:arb:state?', 'arbState')
+        self.set_and_read('output on', 'output?', 'rfState')
+        self.set_and_read('output:modulation on', 'output:modulation?', 'modState')
         if self.errCheck:
             self.err_check()
 
     def stop(self):
         """Dectivates RF output, modulation, and arb mode."""
-        self.write('output off')
-        self.rfState = self.query('output?').strip()
-        self.write('output:modulation off')
-        self.modState = self.query('output:modulation?').strip()
-        self.write('radio:arb:state off')
-        self.arbState = self.query('radio:arb:state?').strip()
+        self.set_and_read('output off', 'output?', 'rfState')
+        self.set_and_read('output:modulation off', 'output:modulation?', 'modState')
+        self.set_and_read('radio:arb:state off', 'radio:arb:state?', 'arbState')
         if self.errCheck:
             self.err_check()
 
@@ -2574,21 +3409,16 @@ class VectorUXG(socketscpi.SocketInstrument):
             self.write(f'stream:windex:select "{wIndexID}"')
 
         # Activate streaming, and send trigger command.
-        self.write('output:modulation on')
-        self.modState = self.query('output:modulation?').strip()
-        self.write('stream:state on')
-        self.streamState = self.query('stream:state?').strip()
+        self.set_and_read('output:modulation on', 'output:modulation?', 'modState')
+        self.set_and_read('stream:state on', 'stream:state?', 'streamState')
         self.write('stream:trigger:play:immediate')
         if self.errCheck:
             self.err_check()
 
     def stream_stop(self):
         """Deactivates RF output, modulation, and streaming mode."""
-        self.write('output off')
-        self.rfState = self.query('output?').strip()
-        self.write('output:modulation off')
-        self.modState = self.query('output:modulation?').strip()
-        self.write('stream:state off')
-        self.streamState = self.query('stream:state?').strip()
+        self.set_and_read('output off', 'output?', 'rfState')
+        self.set_and_read('output:modulation off', 'output:modulation?', 'modState')
+        self.set_and_read('stream:state off', 'stream:state?', 'streamState')
         if self.errCheck:
             self.err_check()
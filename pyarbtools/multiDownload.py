@@ -0,0 +1,121 @@
+"""
+multiDownload
+Author: Morgan Allison, Keysight RF/uW Application Engineer
+Downloads a waveform library to several signal generators in parallel.
+Each waveform is formatted once per instrument format family and the
+formatted data is shared by every instrument in that family.
+"""
+
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import socketscpi
+
+from pyarbtools import error
+from pyarbtools.instruments import reconnect
+
+
+def format_family(inst):
+    """
+    HELPER FUNCTION
+    Returns a key that is identical for all instruments that produce
+    identical binary data from the same waveform.
+    Args:
+        inst (VSG/VXG/VectorUXG): Instrument object.
+
+    Returns:
+        (tuple): Format family key.
+    """
+
+    return type(inst).__name__, 'M938' in inst.instId, inst.gran, inst.minLen, inst.binMult
+
+
+def print_progress(inst, wfmID, count, total):
+    """
+    Default progress callback for parallel_download(). Prints one line per completed waveform.
+    Args:
+        inst (VSG/VXG/VectorUXG): Instrument that completed the download.
+        wfmID (str): Waveform name.
+        count (int): Number of waveforms downloaded to inst so far.
+        total (int): Total number of waveforms to download to inst.
+    """
+
+    print(f'{inst.instId}: {wfmID} ({count}/{total})')
+
+
+def parallel_download(instList, wfmDict, retries=2, maxWorkers=None, progress=None,
+                      retryErrors=(socketscpi.SockInstError, socket.timeout, ConnectionError)):
+    """
+    Downloads the same set of waveforms to several VSG, VXG, and/or
+    VectorUXG instruments in parallel. Each instrument is handled by its
+    own worker thread, so waveforms are sent to one instrument in order
+    while different instruments download at the same time. Failed
+    transfers are retried, and any failures that remain after all
+    retries are raised together once every instrument has finished.
+    After a timeout or connection error the connection is reopened, so a
+    partially sent waveform can't swallow the next transfer.
+    Args:
+        instList (list): Instrument objects with format_wfm() and download_formatted_wfm() methods.
+        wfmDict (dict): {wfmID: complex NumPy array} waveforms to download.
+        retries (int): Number of times a failed transfer is retried.
+        maxWorkers (int): Maximum number of simultaneous downloads. Default is one per instrument.
+        progress (function): Optional callback, progress(inst, wfmID, count, total), called
+            after each waveform is downloaded. Use print_progress() for console output.
+        retryErrors (tuple): Exception types that trigger a retry. Other exceptions stop
+            downloads to the affected instrument immediately.
+
+    Returns:
+        (dict): {instrument: [wfmID, ...]} waveforms downloaded to each instrument.
+            If any instrument fails, MultiDownloadError is raised instead and
+            its results attribute holds the waveforms that were downloaded.
+    """
+
+    if not isinstance(retries, int) or retries < 0:
+        raise ValueError('retries must be a non-negative integer.')
+    if not instList:
+        return {}
+
+    # Format each waveform once per format family. Invalid waveforms raise here, before anything is downloaded.
+    formatted = {}
+    for inst in instList:
+        family = format_family(inst)
+        if family not in formatted:
+            formatted[family] = {wfmID: inst.format_wfm(wfmData) for wfmID, wfmData in wfmDict.items()}
+
+    progressLock = threading.Lock()
+    total = len(wfmDict)
+    results = {inst: [] for inst in instList}
+
+    def download_all(inst):
+        wfms = formatted[format_family(inst)]
+        done = results[inst]
+        address = inst.socket.getpeername()
+        for wfmID, wfm in wfms.items():
+            for attempt in range(retries + 1):
+                try:
+                    inst.download_formatted_wfm(wfm, wfmID)
+                    inst.err_check()
+                    break
+                except retryErrors as e:
+                    if isinstance(e, OSError):
+                        reconnect(inst, address)
+                    if attempt == retries:
+                        raise
+            done.append(wfmID)
+            if progress is not None:
+                with progressLock:
+                    progress(inst, wfmID, len(done), total)
+
+    failures = {}
+    with ThreadPoolExecutor(max_workers=maxWorkers or len(instList)) as pool:
+        futures = {inst: pool.submit(download_all, inst) for inst in instList}
+        for inst, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                failures[inst] = e
+
+    if failures:
+        raise error.MultiDownloadError(failures, results)
+    return results
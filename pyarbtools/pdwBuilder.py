@@ -5,10 +5,17 @@ Pulse Descriptor Word building functions for Analog and Vector UXGs.
 """
 
 import math
+import mmap
+import os
 import struct
+import functools
 import numpy as np
 from pyarbtools import error
 
+# math.log(2 ** k) / math.log(2) for every finite power of two, 2 ** -1074 to 2 ** 1023. The scalar
+# result isn't always exactly k, so the vectorized conversions look it up to stay bit-compatible.
+POWER_OF_TWO_LOG = np.array([math.log(math.ldexp(1.0, k)) / math.log(2) for k in range(-1074, 1024)])
+
 
 def convert_to_floating_point(inputVal, exponentOffset, mantissaBits, exponentBits):
     """
@@ -91,6 +98,46 @@ def closest_m_2_n(inputVal, mantissaBits):
     return success, exponent, mantissa
 
 
+def pdw_columns(pdwList, pdwFormat=None):
+    """
+    HELPER FUNCTION
+    Converts a list of PDWs (one list of parameters per PDW), a 2D array,
+    or a PdwTable into a list of parameter columns for the array PDW builders.
+    Args:
+        pdwList (list/NumPy array/PdwTable): List of lists or 2D array. Each row contains a single pulse descriptor word.
+        pdwFormat (str): Expected PdwTable format. ('analog', 'vector', 'vector3') None accepts any format.
+
+    Returns:
+        (list(NumPy array)): One array per PDW parameter.
+    """
+
+    if isinstance(pdwList, PdwTable):
+        if pdwFormat and pdwList.pdwFormat != pdwFormat:
+            raise error.UXGError(f'Expected {pdwFormat} PDWs, got a {pdwList.pdwFormat} PdwTable.')
+        return pdwList.columns() if len(pdwList) else []
+    pdws = np.asarray(pdwList, dtype=np.float64)
+    if pdws.size == 0:
+        return []
+    if pdws.ndim != 2:
+        raise error.UXGError('PDWs must be a list of lists or a 2D array with the same number of parameters per PDW.')
+    return list(pdws.T)
+
+
+def int_column(values):
+    """
+    HELPER FUNCTION
+    Converts a PDW parameter column to int64, truncating toward zero like int().
+    Args:
+        values (float/NumPy array): Parameter values.
+
+    Returns:
+        (NumPy array): int64 values.
+    """
+
+    # Casting float to int truncates toward zero
+    return np.asarray(values, dtype=np.float64).astype(np.int64)
+
+
 def chirp_closest_m_2_n(chirpRate, chirpRateRes=21.822):
     """
     HELPER FUNCTION NOT WRITTEN BY THE AUTHORS
@@ -122,6 +169,178 @@ def chirp_closest_m_2_n(chirpRate, chirpRateRes=21.822):
     return output
 
 
+def convert_to_floating_point_array(inputVals, exponentOffset, mantissaBits, exponentBits):
+    """
+    HELPER FUNCTION
+    Vectorized version of convert_to_floating_point(). Converts an array of
+    values at once and returns the same bit patterns as the scalar function.
+    Args:
+        inputVals (float/NumPy array): Positive values to convert.
+        exponentOffset (int): Exponent offset of the floating point format.
+        mantissaBits (int): Number of mantissa bits.
+        exponentBits (int): Number of exponent bits.
+
+    Returns:
+        (NumPy array): int64 array of exponent/mantissa words.
+    """
+
+    inputVals = np.atleast_1d(np.asarray(inputVals, dtype=np.float64))
+    if np.any(inputVals <= 0) or np.any(np.isnan(inputVals)):
+        raise ValueError('math domain error')
+
+    maxExponent = (1 << exponentBits) - 1
+    maxMantissa = (1 << mantissaBits) - 1
+
+    logRatio = np.log(inputVals) / math.log(2) - exponentOffset
+    # np.log and math.log can differ by an ulp, which only matters next to an integer
+    ambiguous = np.abs(logRatio - np.round(logRatio)) < 1e-9
+    if np.any(ambiguous):
+        ambiguousVals = inputVals[ambiguous]
+        fraction, powerOfTwo = np.frexp(ambiguousVals)
+        # Exact powers of two (the usual linear power settings) come from the lookup table
+        exact = fraction == 0.5
+        scalarLog = POWER_OF_TWO_LOG[np.where(exact, powerOfTwo - 1 + 1074, 0)]
+        scalarLog[~exact] = [math.log(v) / math.log(2) for v in ambiguousVals[~exact]]
+        logRatio[ambiguous] = scalarLog - exponentOffset
+    exponent = np.floor(logRatio).astype(np.int64)
+    tooBig = exponent > maxExponent
+    tooSmall = exponent < 0
+
+    # Clip the exponent so ldexp never sees huge shifts, tooBig and tooSmall values are replaced below
+    exponent = np.clip(exponent, 0, maxExponent)
+    mantissa = (((np.ldexp(inputVals, -(exponentOffset + exponent)) - 1) * (1 << mantissaBits)) + 0.5).astype(np.int64)
+    # Handle case where rounding causes the mantissa to overflow
+    overflow = mantissa > maxMantissa
+    carry = overflow & (exponent < maxExponent)
+    mantissa = np.where(carry, 0, np.where(overflow, maxMantissa, mantissa))
+    exponent = np.where(carry, exponent + 1, exponent)
+
+    # Too big to represent
+    exponent = np.where(tooBig, maxExponent, exponent)
+    mantissa = np.where(tooBig, maxMantissa, mantissa)
+    # Too small to represent
+    exponent = np.where(tooSmall, 0, exponent)
+    mantissa = np.where(tooSmall, 0, mantissa)
+
+    return ((exponent << mantissaBits) | mantissa) & 0xFFFFFFFF
+
+
+def closest_m_2_n_array(inputVals, mantissaBits):
+    """
+    HELPER FUNCTION
+    Vectorized version of closest_m_2_n(). Converts an array of values to
+    Mantissa*2^Exponent form at once.
+    Args:
+        inputVals (float/NumPy array): Non-negative values to convert.
+        mantissaBits (int): Number of mantissa bits.
+
+    Returns:
+        (tuple(NumPy array)): int64 arrays of exponents and mantissas.
+    """
+
+    inputVals = np.atleast_1d(np.asarray(inputVals, dtype=np.float64))
+    if np.any(inputVals + 0.5 < 0):
+        raise error.UXGError('Chirp rate and mantissa values must not be negative.')
+    maxMantissa = (1 << mantissaBits) - 1
+
+    # inputVal <= mantissa max inputVal have exponent=0
+    small = inputVals < (maxMantissa + 0.5)
+    smallMantissa = np.minimum((inputVals + 0.5).astype(np.int64), maxMantissa)
+
+    # exponent > 0 (for values that will have exponent>0 after rounding)
+    _, possibleExponent = np.frexp(np.where(small, 1, inputVals))
+    possibleExponent = possibleExponent.astype(np.int64) - mantissaBits
+    fracMantissa = np.ldexp(np.where(small, 1, inputVals), -possibleExponent)
+    # round to next N if that is closer
+    roundUp = fracMantissa > (maxMantissa + 0.5 - 1e-9)
+    largeMantissa = np.where(roundUp, 1 << (mantissaBits - 1),
+                             np.minimum((fracMantissa + 0.5).astype(np.int64), maxMantissa))
+    possibleExponent = np.where(roundUp, possibleExponent + 1, possibleExponent)
+
+    exponent = np.where(small, 0, possibleExponent & 0xFFFFFFFF)
+    mantissa = np.where(small, smallMantissa, largeMantissa)
+
+    return exponent, mantissa
+
+
+def chirp_closest_m_2_n_array(chirpRates, chirpRateRes=21.822):
+    """
+    HELPER FUNCTION
+    Vectorized version of chirp_closest_m_2_n(). Converts an array of chirp
+    rates to the hardware representation at once.
+    Args:
+        chirpRates (float/NumPy array): Chirp rates in Hz/us.
+        chirpRateRes (float): Chirp rate resolution.
+
+    Returns:
+        (NumPy array): int64 array of chirp rate words.
+    """
+
+    mantissaBits = 13
+    mantissaMask = (1 << mantissaBits) - 1
+    # convert to clocks
+    chirpValues = np.asarray(chirpRates, dtype=np.float64) / float(chirpRateRes)
+    exponent, mantissa = closest_m_2_n_array(chirpValues, mantissaBits)
+    # compensate for exponent being multiplied by 2
+    odd = (exponent & 0x01).astype(bool)
+    mantissa = np.where(odd, mantissa // 2, mantissa)
+    exponent = np.where(odd, exponent + 1, exponent) >> 1
+
+    return ((exponent << mantissaBits) | (mantissa & mantissaMask)) & 0xFFFFFFFF
+
+
+@functools.lru_cache(maxsize=256)
+def analog_power_code(powerLin):
+    """
+    HELPER FUNCTION
+    Memoized analog UXG power word. PDW lists usually repeat a handful of
+    power values, so each one is only converted once.
+    Args:
+        powerLin (float): Linear scaling of the output in Vrms.
+
+    Returns:
+        (int): Power bits of PDW word 5.
+    """
+
+    return int(convert_to_floating_point(powerLin, -26, 10, 5))
+
+
+@functools.lru_cache(maxsize=256)
+def analog_chirp_code(chirpRate):
+    """
+    HELPER FUNCTION
+    Memoized analog UXG chirp rate word, see analog_power_code().
+    Args:
+        chirpRate (float): Chirp rate in Hz/us.
+
+    Returns:
+        (int): Chirp rate bits of PDW word 6.
+    """
+
+    return int(chirp_closest_m_2_n(chirpRate))
+
+
+def memo_column(memoFunc, arrayFunc, values):
+    """
+    HELPER FUNCTION
+    Converts a PDW parameter column, using the memoized scalar conversion
+    when the whole column holds a single value and the vectorized
+    conversion otherwise.
+    Args:
+        memoFunc (function): Memoized scalar conversion function.
+        arrayFunc (function): Vectorized conversion function.
+        values (float/NumPy array): Parameter values.
+
+    Returns:
+        (NumPy array): int64 results.
+    """
+
+    values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+    if (values == values[0]).all():
+        return np.full(values.shape, memoFunc(float(values[0])), dtype=np.int64)
+    return arrayFunc(values)
+
+
 def analog_bin_pdw_builder(operation=0, freq=1e9, phase=0, startTimeSec=0, width=0, powerLin=1, markers=0, pulseMode=2, phaseControl=0,
                     bandAdjust=0, chirpControl=0, code=0, chirpRate=0, freqMap=0):
     """
@@ -156,8 +375,8 @@ def analog_bin_pdw_builder(operation=0, freq=1e9, phase=0, startTimeSec=0, width
     _phase = int(phase * 4096 / 360 + 0.5)
     _startTimePs = int(startTimeSec * 1e12)
     _widthNs = int(width * 1e9)
-    _power = convert_to_floating_point(powerLin, -26, 10, 5)
-    _chirpRate = chirp_closest_m_2_n(chirpRate)
+    _power = analog_power_code(powerLin)
+    _chirpRate = analog_chirp_code(chirpRate)
 
     # Build PDW
     pdw = np.zeros(7, dtype=np.uint32)
@@ -179,6 +398,65 @@ def analog_bin_pdw_builder(operation=0, freq=1e9, phase=0, startTimeSec=0, width
     return pdw
 
 
+def analog_bin_pdw_array_builder(operation=0, freq=1e9, phase=0, startTimeSec=0, width=0, powerLin=1, markers=0,
+                                 pulseMode=2, phaseControl=0, bandAdjust=0, chirpControl=0, code=0, chirpRate=0,
+                                 freqMap=0):
+    """
+    Builds format-1 analog UXG PDWs from columns of parameters. Produces the
+    same binary values as analog_bin_pdw_builder(), but encodes every PDW at
+    once with vectorized operations. Each argument can be a scalar or an
+    array, and all arrays must have the same length.
+    Args:
+        operation (int/NumPy array): Specifies the operation of the PDW. (0-none, 1-first PDW, 2-last PDW)
+        freq (float/NumPy array): CW frequency of PDW.
+        phase (float/NumPy array): Phase of CW frequency of PDW.
+        startTimeSec (float/NumPy array): Start time of the 50% rising edge power.
+        width (float/NumPy array): Width of the pulse from 50% rise power to 50% fall power.
+        powerLin (float/NumPy array): Linear scaling of the output in Vrms.
+        markers (int/NumPy array): Bit mask input of active markers.
+        pulseMode (int/NumPy array): Configures pulse mode. (0-CW, 1-RF off, 2-Pulse enabled)
+        phaseControl (int/NumPy array): Switches between phase mode. (0-coherent, 1-continuous)
+        bandAdjust (int/NumPy array): Configures band adjustment criteria. (0-CW switch pts, 1-upper band, 2-lower band).
+        chirpControl (int/NumPy array): Configures chirp shape. (0-stiched ramp, 1-triangle, 2-ramp)
+        code (int/NumPy array): Selects hard-coded frequency/phase coding table index.
+        chirpRate (float/NumPy array): Chirp rate in Hz/us.
+        freqMap (int/NumPy array): Selects frequency band map. (0-A, 6-B)
+
+    Returns:
+        (NumPy array): N x 7 array of uint32 PDW words. Use .tobytes() for streaming or file building.
+    """
+
+    columns = [np.atleast_1d(np.asarray(c, dtype=np.float64)) for c in
+               [operation, freq, phase, startTimeSec, width, powerLin, markers, pulseMode,
+                phaseControl, bandAdjust, chirpControl, code, chirpRate, freqMap]]
+    numPdws = np.broadcast_shapes(*[c.shape for c in columns])[0]
+    operation, freq, phase, startTimeSec, width, powerLin, markers, pulseMode, phaseControl, bandAdjust, \
+        chirpControl, code, chirpRate, freqMap = columns
+
+    pdwFormat = 1
+    _freq = int_column(freq * 1024 + 0.5)
+    phase = np.where((phase > 180) & (phase <= 360), phase - 360, phase)
+    _phase = int_column(phase * 4096 / 360 + 0.5)
+    _startTimePs = int_column(startTimeSec * 1e12)
+    _widthNs = int_column(width * 1e9)
+    _power = memo_column(analog_power_code, lambda v: convert_to_floating_point_array(v, -26, 10, 5), powerLin)
+    _chirpRate = memo_column(analog_chirp_code, chirp_closest_m_2_n_array, chirpRate)
+    operation, markers, pulseMode, phaseControl, bandAdjust, chirpControl, code, freqMap = [
+        int_column(c) for c in [operation, markers, pulseMode, phaseControl, bandAdjust, chirpControl, code, freqMap]]
+
+    # Build PDWs, same word layout as analog_bin_pdw_builder()
+    pdw = np.empty((numPdws, 7), dtype=np.uint32)
+    pdw[:, 0] = pdwFormat | operation << 3 | (_freq << 5 & 0xFFFFFFFF)
+    pdw[:, 1] = (_freq >> 27 | _phase << 20) & 0xFFFFFFFF
+    pdw[:, 2] = _startTimePs & 0xFFFFFFFF
+    pdw[:, 3] = (_startTimePs >> 32) & 0xFFFFFFFF
+    pdw[:, 4] = _widthNs & 0xFFFFFFFF
+    pdw[:, 5] = (_power | markers << 15 | pulseMode << 27 | phaseControl << 29 | bandAdjust << 30) & 0xFFFFFFFF
+    pdw[:, 6] = (chirpControl | code << 3 | _chirpRate << 12 | freqMap << 29) & 0xFFFFFFFF
+
+    return pdw
+
+
 # noinspection PyRedundantParentheses
 def create_padding_block(sizeOfPaddingAndHeaderInBytes):
     """
@@ -210,7 +488,75 @@ def create_padding_block(sizeOfPaddingAndHeaderInBytes):
     return padding
 
 
-# noinspection PyDefaultArgument,PyRedundantParentheses,PyRedundantParentheses,PyRedundantParentheses,PyRedundantParentheses
+# Demo FPC table used when no entries are specified
+#   first  entry is index 0 in FPC table - no coding
+#   second entry is index 1 in FPC table - PSK
+#   third  entry is index 2 in FPC table - FSK
+DEFAULT_FPC_ENTRIES = ((0, 1, 0, [0, 180], "", "NoCodingFirstEntry"),
+                       (1, 1, 0, [0, 180], "2A61D327", "PSKcode32bits"),
+                       (1, 1, 1, [-10e6, 10e6], "5AC4", "FSKcodeTest16bits"))
+
+FPC_ENTRY_ARGS = ['onOffState', 'numBitsPerSubpulse', 'codingType', 'stateMapping', 'pattern', 'comment']
+
+
+def fpc_pattern_bits(pattern, numBitsPerSubpulse=1):
+    """
+    HELPER FUNCTION
+    Converts an FPC code pattern to packed bytes.
+    Args:
+        pattern (str/bytes/list): Hex string (e.g. "A2F4", multiple of 2 in length), bytes, or a sequence of
+            subpulse states (0 to 2^numBitsPerSubpulse - 1), each packed MSB first into numBitsPerSubpulse bits.
+        numBitsPerSubpulse (int): Number of bits per subpulse.
+
+    Returns:
+        (tuple): (bytes, int) Packed pattern and number of bits in the pattern.
+    """
+
+    if isinstance(pattern, str):
+        if len(pattern) % 2 != 0:
+            raise error.UXGError('Hex pattern length must be a multiple of 2: Length is ' + str(len(pattern)))
+        pattern = bytes.fromhex(pattern)
+    if isinstance(pattern, (bytes, bytearray)):
+        return bytes(pattern), 8 * len(pattern)
+
+    states = np.asarray(pattern, dtype=np.int64)
+    if states.ndim != 1:
+        raise error.UXGError('Pattern must be a hex string, bytes, or a 1D sequence of subpulse states.')
+    if states.size and (states.min() < 0 or states.max() >= 1 << numBitsPerSubpulse):
+        raise error.UXGError(f'Subpulse states must be between 0 and {(1 << numBitsPerSubpulse) - 1}.')
+    # Split each state into numBitsPerSubpulse bits, MSB first, then pack 8 bits per byte
+    shifts = np.arange(numBitsPerSubpulse - 1, -1, -1)
+    bits = ((states[:, np.newaxis] >> shifts) & 1).astype(np.uint8).ravel()
+    return np.packbits(bits).tobytes(), len(bits)
+
+
+def fpc_entry_key(entry):
+    """
+    HELPER FUNCTION
+    Converts an FPC entry to a hashable tuple used as a cache key.
+    Args:
+        entry (tuple/dict): Arguments for bin_freqPhaseCodingSingleEntry(), as a tuple in argument order or a dict.
+
+    Returns:
+        (tuple): (onOffState, numBitsPerSubpulse, codingType, stateMapping, patternBytes, numBitsInPattern, comment)
+    """
+
+    # Missing values take the bin_freqPhaseCodingSingleEntry() defaults
+    defaults = [0, 1, 0, [0, 180], "E2", "default Comment"]
+    if isinstance(entry, dict):
+        unknown = set(entry) - set(FPC_ENTRY_ARGS)
+        if unknown:
+            raise error.UXGError(f'Invalid FPC entry fields: {", ".join(sorted(unknown))}.')
+        entry = [entry.get(a, d) for a, d in zip(FPC_ENTRY_ARGS, defaults)]
+    onOffState, numBitsPerSubpulse, codingType, stateMapping, pattern, comment = list(entry) + defaults[len(entry):]
+
+    patternBytes, numBitsInPattern = fpc_pattern_bits(pattern, numBitsPerSubpulse)
+    stateMapping = tuple(float(s) for s in stateMapping)
+    return (int(onOffState), int(numBitsPerSubpulse), int(codingType), stateMapping, patternBytes,
+            numBitsInPattern, comment)
+
+
+# noinspection PyDefaultArgument
 def bin_freqPhaseCodingSingleEntry(onOffState=0, numBitsPerSubpulse=1, codingType=0, stateMapping=[0, 180],
                                    hexPatternString="E2", comment="default Comment"):
     """
@@ -222,7 +568,8 @@ def bin_freqPhaseCodingSingleEntry(onOffState=0, numBitsPerSubpulse=1, codingTyp
             numBitsPerSubpulse (int): = number of bits per subpulse.  E.g. For BPSK, this is 1
             codingType (int): 0=phase coding, 1= frequency coding, 2 = both phase and frequency coding
             stateMapping (double array): 2^numBitsPerSubpulse entries of phase / freq states
-            hexPatternString (string):  Hex values to encode in FPC table e.g. "A2F4" multiple of 2 in length
+            hexPatternString (string/bytes/list):  Hex values to encode in FPC table e.g. "A2F4" multiple of 2 in length.
+                Also accepts bytes or a sequence of subpulse states, see fpc_pattern_bits().
             comment (string): FPC entry name
 
         Returns:
@@ -230,46 +577,63 @@ def bin_freqPhaseCodingSingleEntry(onOffState=0, numBitsPerSubpulse=1, codingTyp
 
          TODO - Combination of simultaneous phase and frequency modulation not yet implemented
     """
-    if ((len(hexPatternString) % 2) != 0):
-        raise error.UXGError('Hex pattern length must be a multiple of 2: Length is ' + str(len(hexPatternString)))
 
-    hexPatternBytes = bytearray.fromhex(hexPatternString)
-    numBitsInPattern = 8 * len(hexPatternBytes)
+    patternBytes, numBitsInPattern = fpc_pattern_bits(hexPatternString, numBitsPerSubpulse)
+    return encode_fpc_entry(onOffState, numBitsPerSubpulse, codingType, tuple(stateMapping), patternBytes,
+                            numBitsInPattern, comment)
+
 
-    if (codingType != 0 and codingType != 1):
+def encode_fpc_entry(onOffState, numBitsPerSubpulse, codingType, stateMapping, patternBytes, numBitsInPattern, comment):
+    """
+    HELPER FUNCTION
+    Encodes a single FPC entry from the normalized values returned by fpc_entry_key().
+
+    Returns:
+        (bytes): FPC entry.
+    """
+
+    if codingType not in [0, 1]:
         raise error.UXGError('Only phase and frequency coding via streaming has been implemented in this example')
-    if (numBitsPerSubpulse != 1):
-        raise error.UXGError('Only one bit per subpulse has been implemented in this example')
-    if (len(hexPatternBytes) > 8192):
+    if not 1 <= numBitsPerSubpulse <= 8:
+        raise error.UXGError('numBitsPerSubpulse must be between 1 and 8.')
+    if len(stateMapping) != 1 << numBitsPerSubpulse:
+        raise error.UXGError(f'stateMapping must have 2^numBitsPerSubpulse ({1 << numBitsPerSubpulse}) entries.')
+    if len(patternBytes) > 8192:
         raise error.UXGError('Pattern must be less than 8192 bytes')
-    if (len(comment) > 60):
+    if len(comment) > 60:
         raise error.UXGError('Comment must be less than 60 characters long')
 
-    entryState = onOffState.to_bytes(1, byteorder='little')
-    numBitsPerSub = numBitsPerSubpulse.to_bytes(1, byteorder='little')
-    modType = codingType.to_bytes(1, byteorder='little')
-    numBytesInComment = len(comment).to_bytes(1, byteorder='little')
-    numBitsInPat = numBitsInPattern.to_bytes(4, byteorder='little')
+    # State mapping is written as little endian doubles, 8 bytes per value
+    header = struct.pack('<BBBBI', onOffState, numBitsPerSubpulse, codingType, len(comment), numBitsInPattern)
+    states = np.asarray(stateMapping, dtype='<f8').tobytes()
 
-    fpcBin = entryState + numBitsPerSub + modType + numBytesInComment + numBitsInPat
+    return b''.join([header, states, patternBytes, comment.encode('utf-8')])
 
-    # Convert double array to little endian byte array - 8 bytes per double value
-    for phaseOrFreq in stateMapping:
-        doubleByteArrayPhase = bytearray(struct.pack("<d", phaseOrFreq))
-        # arraySize = len(doubleByteArrayPhase)
-        fpcBin = fpcBin + doubleByteArrayPhase
 
-    fpcBin = fpcBin + hexPatternBytes
+@functools.lru_cache(maxsize=64)
+def encoded_fpc_block(entryKeys):
+    """
+    HELPER FUNCTION
+    Encodes and caches a full FPC block from a tuple of fpc_entry_key() values.
 
-    # Translate comment to char[]
-    commentEncoded = bytearray(comment, 'utf-8')
-    fpcBin = fpcBin + commentEncoded
+    Returns:
+        (bytes): FPC block with header and padding.
+    """
 
-    return fpcBin
+    entries = b''.join([encode_fpc_entry(*key) for key in entryKeys])
+    version = 2
+    # Size does not include blockID and reserved fields, 16 bytes
+    sizeInBytes = 8 + len(entries)
+    header = struct.pack('<IIQII', FPC_BLOCK_ID, 0, sizeInBytes, version, len(entryKeys))
 
+    # fpcBlock size must be a multiple of 16 to be on proper byte boundary - Add padding as needed
+    tempSize = len(header) + len(entries)
+    endFpcBlockBufferBytes = bytes(16 - (tempSize % 16))
 
-# noinspection PyRedundantParentheses,PyRedundantParentheses,PyRedundantParentheses,PyRedundantParentheses
-def bin_pdw_freqPhaseCodingBlock():
+    return b''.join([header, entries, endFpcBlockBufferBytes])
+
+
+def bin_pdw_freqPhaseCodingBlock(entries=DEFAULT_FPC_ENTRIES):
     """
     Creates a complete frequency and phase coding block containing header and data
     for analog UXG streaming.
@@ -278,63 +642,49 @@ def bin_pdw_freqPhaseCodingBlock():
     instead of having to send SCPI commands.
     http://rfmw.em.keysight.com/wireless/helpfiles/n519xa/n519xa.htm#User's%20Guide/Streaming%20Mode%20File%20Format%20Definition.htm%3FTocPath%3DUser's%2520Guide%7CStreaming%2520Mode%2520Use%7C_____5
 
-    currently hardcoded to create FCP block with 3 fixed entries
-           first  entry is index 0 in FPC table - no coding
-           second entry is index 1 in FPC table - PSK
-           third  entry is index 2 in FPC table - FSK
+    Encoded blocks are cached, so building the same table again (e.g. for
+    each PDW file or stream header) doesn't re-encode it.
+        Args:
+            entries (list(tuple/dict)): FPC entries in table index order. Each entry holds the arguments for
+                bin_freqPhaseCodingSingleEntry() as a tuple in argument order or a dict with keys onOffState,
+                numBitsPerSubpulse, codingType, stateMapping, pattern, and comment. Default is the demo table
+                (no coding, PSK, FSK).
 
-    Returns (bytearray):
-        Bytearray containing full FCP block with header.
+    Returns (list(bytes)):
+        List containing the full FCP block with header.
     """
 
-    numEntries = 3
-
-    freqPhaseBlockId = (13).to_bytes(4, byteorder='little')
-    reserved1 = (0).to_bytes(4, byteorder='little')
-    # Size calculated last
-    version = (2).to_bytes(4, byteorder='little')
-    numberOfEntries = numEntries.to_bytes(4, byteorder='little')
+    return [encoded_fpc_block(tuple(fpc_entry_key(e) for e in entries))]
 
-    entry0 = bin_freqPhaseCodingSingleEntry(0, 1, 0, [0, 180], "", "NoCodingFirstEntry")
-    entry1 = bin_freqPhaseCodingSingleEntry(1, 1, 0, [0, 180], "2A61D327", "PSKcode32bits")
-    entry2 = bin_freqPhaseCodingSingleEntry(1, 1, 1, [-10e6, 10e6], "5AC4", "FSKcodeTest16bits")
 
-    # Size does not include blockID and reserved fields 8 bytes
-    sizeInBytes = len(version) + len(numberOfEntries) + len(entry0) + len(entry1) + len(entry2)
-    sizeBlock = sizeInBytes.to_bytes(8, byteorder='little')
-
-    returnBlock = [freqPhaseBlockId, reserved1, sizeBlock, version, numberOfEntries, entry0, entry1, entry2]
-
-    # fpcBlock size must be a multiple of 16 to be on proper byte boundary - Add padding as needed
-    tempSize = len(b''.join(returnBlock))
-    sizeOfEndBufferBytes = 16 - (tempSize % 16)
-    endFpcBlockBufferBytes = (0).to_bytes(sizeOfEndBufferBytes, byteorder='little')
+def analog_bin_pdw_file_header(fpcEntries=DEFAULT_FPC_ENTRIES):
+    """
+    Builds the start of an analog UXG binary PDW file: file header, frequency
+    phase coding block, padding block, and PDW block header. PDW data follows
+    at an offset of 4096 bytes. Headers are cached by FPC table.
+    Args:
+        fpcEntries (list(tuple/dict)): FPC table entries, see bin_pdw_freqPhaseCodingBlock(). None omits the FPC block.
 
-    returnBlockWithPadding = [freqPhaseBlockId, reserved1, sizeBlock, version, numberOfEntries, entry0, entry1, entry2,
-                              endFpcBlockBufferBytes]
+    Returns:
+        (bytes): First 4096 bytes of the PDW file.
+    """
 
-    return returnBlockWithPadding
+    if fpcEntries is None:
+        return cached_analog_file_header(None)
+    return cached_analog_file_header(tuple(fpc_entry_key(e) for e in fpcEntries))
 
 
 # noinspection PyRedundantParentheses
-def analog_bin_pdw_file_builder(pdwList):
+@functools.lru_cache(maxsize=64)
+def cached_analog_file_header(entryKeys):
     """
-    Builds a binary PDW file with a padding block to ensure the
-    PDW section begins at an offset of 4096 bytes (required by UXG).
-
-    See User's Guide>Streaming Use>PDW File Format section of
-    Keysight UXG X-Series Agile Signal Generator Online Documentation
-    http://rfmw.em.keysight.com/wireless/helpfiles/n519xa/n519xa.htm
-    Args:
-        pdwList (list): List of lists. Each inner list contains a single pulse descriptor word.
+    HELPER FUNCTION
+    Builds and caches the analog PDW file header for a tuple of fpc_entry_key() values, or None for no FPC block.
 
     Returns:
-        (bytes): Binary data that contains a full PDW file that can be downloaded to and played out of the UXG.
+        (bytes): First 4096 bytes of the PDW file.
     """
 
-    # Include frequency phase coding block flag: 1 = yes, 0 = no
-    includeFpcBlock = 1
-
     # Header section, all fixed values
     fileId = b'STRM'
     version = (1).to_bytes(4, byteorder='little')
@@ -353,14 +703,18 @@ def analog_bin_pdw_file_builder(pdwList):
     header = [fileId, version, offset, magic, res0, flags, uniqueId, dataId, res1]
     tempHeaderSize = len(b''.join(header))
 
-    # FPC Block - skip fpcBlock if flag is zero
+    # FPC Block - skip fpcBlock if there are no entries
     fpcBlock = [b'']
-    if (includeFpcBlock):
-        fpcBlock = bin_pdw_freqPhaseCodingBlock()
+    if entryKeys is not None:
+        fpcBlock = [encoded_fpc_block(entryKeys)]
     fpcBlockSize = len(b''.join(fpcBlock))
 
     # PDW block header must start at byte 4080 so PDW stream data starts at byte 4097
+    # The padding block needs at least its 16 byte header
     paddingSize = 4080 - tempHeaderSize - fpcBlockSize
+    if paddingSize < 16:
+        raise error.UXGError(f'FPC table is too large ({fpcBlockSize} bytes). '
+                             f'The FPC block must be at most {4080 - tempHeaderSize - 16} bytes.')
     paddingBlock = create_padding_block(paddingSize)
 
     # PDW block header = 16 bytes
@@ -369,15 +723,46 @@ def analog_bin_pdw_file_builder(pdwList):
     pdwSize = (0xffffffffffffffff).to_bytes(8, byteorder='little')
     pdwBlock = [pdwBlockId, res4, pdwSize]
 
-    # Build Raw PDW Data from list
-    rawPdwData = [analog_bin_pdw_builder(*p) for p in pdwList]
+    return b''.join(header + fpcBlock + paddingBlock + pdwBlock)
+
+
+def analog_bin_pdw_file_end():
+    """
+    Builds the end of an analog UXG binary PDW file, which follows the PDW data.
+
+    Returns:
+        (bytes): PDW block padding and end block.
+    """
+
     # Add 8 bytes of zero to make sure PDW block ends on 16 byte boundary.
-    rawPdwData += [(0).to_bytes(8, byteorder='little')]
+    padding = (0).to_bytes(8, byteorder='little')
+    pdwEndBlock = (0).to_bytes(16, byteorder='little')
 
-    pdwEndBlock = [(0).to_bytes(16, byteorder='little')]
+    return padding + pdwEndBlock
 
-    # Build PDW file from header, padBlock, pdwBlock, and PDWs
-    pdwFile = header + fpcBlock + paddingBlock + pdwBlock + rawPdwData + pdwEndBlock
+
+def analog_bin_pdw_file_builder(pdwList, fpcEntries=DEFAULT_FPC_ENTRIES):
+    """
+    Builds a binary PDW file with a padding block to ensure the
+    PDW section begins at an offset of 4096 bytes (required by UXG).
+
+    See User's Guide>Streaming Use>PDW File Format section of
+    Keysight UXG X-Series Agile Signal Generator Online Documentation
+    http://rfmw.em.keysight.com/wireless/helpfiles/n519xa/n519xa.htm
+    Args:
+        pdwList (list/PdwTable): List of lists. Each inner list contains a single pulse descriptor word.
+        fpcEntries (list(tuple/dict)): FPC table entries, see bin_pdw_freqPhaseCodingBlock(). None omits the FPC block.
+
+    Returns:
+        (bytes): Binary data that contains a full PDW file that can be downloaded to and played out of the UXG.
+    """
+
+    # Build Raw PDW Data from list, encoding all PDWs at once
+    columns = pdw_columns(pdwList, 'analog')
+    rawPdwData = [analog_bin_pdw_array_builder(*columns).tobytes()] if columns else []
+
+    # Build PDW file from header, padBlock, pdwBlock, PDWs, and end block
+    pdwFile = [analog_bin_pdw_file_header(fpcEntries)] + rawPdwData + [analog_bin_pdw_file_end()]
 
     # Convert arrays of data to a single byte-type variable
     pdwFile = b''.join(pdwFile)
@@ -450,6 +835,55 @@ def vector_bin_pdw_builder_3(operation=0, freq=1e9, phase=0, startTimeSec=0, wid
     return pdw
 
 
+def vector_bin_pdw_array_builder_3(operation=0, freq=1e9, phase=0, startTimeSec=0, width=10e-6, maxPower=0,
+                                   markers=0, powerDbm=0, phaseControl=0, rfOff=0, autoBlank=0, zeroHold=0, loLead=0,
+                                   wfmMkrMask=0, wIndex=0):
+    """
+    Builds format-3 vector UXG PDWs from columns of parameters. Produces the
+    same binary values as vector_bin_pdw_builder_3(), but encodes every PDW
+    at once with vectorized operations. Each argument can be a scalar or an
+    array, and all arrays must have the same length. See
+    vector_bin_pdw_builder_3() for parameter descriptions.
+
+    Returns:
+        (NumPy array): N x 11 array of uint32 PDW words.
+    """
+
+    columns = [np.atleast_1d(np.asarray(c, dtype=np.float64)) for c in
+               [operation, freq, phase, startTimeSec, width, maxPower, markers, powerDbm,
+                phaseControl, rfOff, autoBlank, zeroHold, loLead, wfmMkrMask, wIndex]]
+    numPdws = np.broadcast_shapes(*[c.shape for c in columns])[0]
+    operation, freq, phase, startTimeSec, width, maxPower, markers, powerDbm, phaseControl, rfOff, autoBlank, \
+        zeroHold, loLead, wfmMkrMask, wIndex = columns
+
+    pdwFormat = 3
+    _freq = int_column(freq * 1024 + 0.5)
+    _phase = int_column(phase * 4096 / 360 + 0.5)
+    _startTimePs = int_column(startTimeSec * 1e12)
+    _pulseWidthPs = int_column(width * 1e12 * 2)
+    _maxPower = int_column((maxPower + 140) / 0.005 + 0.5)
+    _power = int_column((powerDbm + 140) / 0.005 + 0.5)
+    _loLead = int_column(loLead / 4e-9)
+    _newWfm = 1
+    _wfmType = 0
+    operation, markers, phaseControl, rfOff, autoBlank, zeroHold, wfmMkrMask, wIndex = [
+        int_column(c) for c in [operation, markers, phaseControl, rfOff, autoBlank, zeroHold, wfmMkrMask, wIndex]]
+
+    # Build PDWs, same word layout as vector_bin_pdw_builder_3()
+    pdw = np.zeros((numPdws, 11), dtype=np.uint32)
+    pdw[:, 0] = (pdwFormat | operation << 3 | _freq << 5) & 0xFFFFFFFF
+    pdw[:, 1] = (_freq >> 27 | _phase << 20) & 0xFFFFFFFF
+    pdw[:, 2] = _startTimePs & 0xFFFFFFFF
+    pdw[:, 3] = (_startTimePs >> 32) & 0xFFFFFFFF
+    pdw[:, 4] = _pulseWidthPs & 0xFFFFFFFF
+    pdw[:, 5] = ((_pulseWidthPs & 0x1F00000000) >> 32 | _maxPower << 5 | markers << 20) & 0xFFFFFFFF
+    pdw[:, 6] = (_power | phaseControl << 15 | rfOff << 16 | autoBlank << 17 | _newWfm << 18 | zeroHold << 19 |
+                 _loLead << 20 | wfmMkrMask << 28) & 0xFFFFFFFF
+    pdw[:, 7] = (_wfmType << 8 | wIndex << 10) & 0xFFFFFFFF
+
+    return pdw
+
+
 def vector_bin_pdw_builder(operation, freq, phase, startTimeSec, powerDbm, markers, phaseControl, rfOff, wIndex, wfmMkrMask):
     """
     This function builds a single format-1 PDW from a list of parameters.
@@ -499,22 +933,54 @@ def vector_bin_pdw_builder(operation, freq, phase, startTimeSec, powerDbm, marke
     return pdw
 
 
-# noinspection PyRedundantParentheses
-def vector_bin_pdw_file_builder(pdwList):
+def vector_bin_pdw_array_builder(operation, freq, phase, startTimeSec, powerDbm, markers, phaseControl, rfOff, wIndex,
+                                 wfmMkrMask):
     """
-    Builds a binary PDW file with a padding block to ensure the
-    PDW section begins at an offset of 4096 bytes (required by UXG).
+    Builds format-1 vector UXG PDWs from columns of parameters. Produces the
+    same binary values as vector_bin_pdw_builder(), but encodes every PDW at
+    once with vectorized operations. Each argument can be a scalar or an
+    array, and all arrays must have the same length. See
+    vector_bin_pdw_builder() for parameter descriptions.
 
-    See User's Guide>Streaming Use>PDW Definitions section of
-    Keysight UXG X-Series Agile Vector Adapter Online Documentation
-    http://rfmw.em.keysight.com/wireless/helpfiles/n519xa-vector/n519xa-vector.htm
-    Args:
-        pdwList (list): List of lists. Each inner list contains a single
-    pulse descriptor word.
+    Returns:
+        (NumPy array): N x 6 array of uint32 PDW words. Use .tobytes() for streaming or file building.
+    """
+
+    columns = [np.atleast_1d(np.asarray(c, dtype=np.float64)) for c in
+               [operation, freq, phase, startTimeSec, powerDbm, markers, phaseControl, rfOff,
+                wIndex, wfmMkrMask]]
+    numPdws = np.broadcast_shapes(*[c.shape for c in columns])[0]
+    operation, freq, phase, startTimeSec, powerDbm, markers, phaseControl, rfOff, wIndex, wfmMkrMask = columns
+
+    # Format 1 PDWs are deprecated
+    pdwFormat = 1
+    _freq = int_column(freq * 1024 + 0.5)
+    _phase = int_column(phase * 4096 / 360 + 0.5)
+    _startTimePs = int_column(startTimeSec * 1e12)
+    _power = int_column((powerDbm + 140) / 0.005 + 0.5)
+    operation, markers, phaseControl, rfOff, wIndex, wfmMkrMask = [
+        int_column(c) for c in [operation, markers, phaseControl, rfOff, wIndex, wfmMkrMask]]
+
+    # Build PDWs, same word layout as vector_bin_pdw_builder()
+    pdw = np.empty((numPdws, 6), dtype=np.uint32)
+    pdw[:, 0] = (pdwFormat | operation << 3 | _freq << 5) & 0xFFFFFFFF
+    pdw[:, 1] = (_freq >> 27 | _phase << 20) & 0xFFFFFFFF
+    pdw[:, 2] = _startTimePs & 0xFFFFFFFF
+    pdw[:, 3] = (_startTimePs >> 32) & 0xFFFFFFFF
+    pdw[:, 4] = (_power | markers << 15 | phaseControl << 27 | rfOff << 28) & 0xFFFFFFFF
+    pdw[:, 5] = (wIndex | wfmMkrMask << 28) & 0xFFFFFFFF
+
+    return pdw
+
+
+# noinspection PyRedundantParentheses
+def vector_bin_pdw_file_header():
+    """
+    Builds the start of a vector UXG binary PDW file: file header, padding
+    block, and PDW block header. PDW data follows at an offset of 4096 bytes.
 
     Returns:
-        (bytes): Binary data that contains a full PDW file that can
-            be downloaded to and played out of the UXG.
+        (bytes): First 4096 bytes of the PDW file.
     """
 
     # Header section, all fixed values
@@ -544,10 +1010,781 @@ def vector_bin_pdw_file_builder(pdwList):
     pdwSize = (0xffffffffffffffff).to_bytes(8, byteorder='little')
     pdwBlock = [pdwBlockId, res4, pdwSize]
 
+    return b''.join(header + padding + pdwBlock)
+
+
+def vector_bin_pdw_file_builder(pdwList):
+    """
+    Builds a binary PDW file with a padding block to ensure the
+    PDW section begins at an offset of 4096 bytes (required by UXG).
+
+    See User's Guide>Streaming Use>PDW Definitions section of
+    Keysight UXG X-Series Agile Vector Adapter Online Documentation
+    http://rfmw.em.keysight.com/wireless/helpfiles/n519xa-vector/n519xa-vector.htm
+    Args:
+        pdwList (list/PdwTable): List of lists. Each inner list contains a single
+    pulse descriptor word.
+
+    Returns:
+        (bytes): Binary data that contains a full PDW file that can
+            be downloaded to and played out of the UXG.
+    """
+
     # Build PDW file from header, padBlock, pdwBlock, and PDWs
-    pdwFile = header + padding + pdwBlock
-    pdwFile += [vector_bin_pdw_builder(*p) for p in pdwList]
+    pdwFile = [vector_bin_pdw_file_header()]
+    columns = pdw_columns(pdwList, 'vector')
+    if columns:
+        pdwFile += [vector_bin_pdw_array_builder(*columns).tobytes()]
     # Convert arrays of data to a single byte-type variable
     pdwFile = b''.join(pdwFile)
 
     return pdwFile
+
+
+# Named fields of each PDW format, in the argument order of the matching PDW builder
+PDW_FIELDS = {
+    'analog': [('operation', 'u1'), ('freq', 'f8'), ('phase', 'f8'), ('startTimeSec', 'f8'), ('width', 'f8'),
+               ('powerLin', 'f8'), ('markers', 'u2'), ('pulseMode', 'u1'), ('phaseControl', 'u1'),
+               ('bandAdjust', 'u1'), ('chirpControl', 'u1'), ('code', 'u2'), ('chirpRate', 'f8'), ('freqMap', 'u1')],
+    'vector': [('operation', 'u1'), ('freq', 'f8'), ('phase', 'f8'), ('startTimeSec', 'f8'), ('powerDbm', 'f8'),
+               ('markers', 'u2'), ('phaseControl', 'u1'), ('rfOff', 'u1'), ('wIndex', 'u4'), ('wfmMkrMask', 'u1')],
+    'vector3': [('operation', 'u1'), ('freq', 'f8'), ('phase', 'f8'), ('startTimeSec', 'f8'), ('width', 'f8'),
+                ('maxPower', 'f8'), ('markers', 'u2'), ('powerDbm', 'f8'), ('phaseControl', 'u1'), ('rfOff', 'u1'),
+                ('autoBlank', 'u1'), ('zeroHold', 'u1'), ('loLead', 'f8'), ('wfmMkrMask', 'u1'), ('wIndex', 'u4')],
+}
+
+# Default field values, taken from the PDW builder defaults. Other fields default to 0.
+PDW_DEFAULTS = {'analog': {'freq': 1e9, 'powerLin': 1, 'pulseMode': 2},
+                'vector': {'freq': 1e9},
+                'vector3': {'freq': 1e9, 'width': 10e-6}}
+
+PDW_ARRAY_BUILDERS = {'analog': analog_bin_pdw_array_builder, 'vector': vector_bin_pdw_array_builder,
+                      'vector3': vector_bin_pdw_array_builder_3}
+
+
+class PdwTable:
+    """
+    Columnar PDW storage backed by a NumPy structured array with one named
+    field per PDW parameter. Tables can be passed anywhere a list of PDWs
+    is accepted (file builders, bin_raw_pdw_block_builder(), PDW streaming)
+    and are encoded a column at a time without converting each row.
+
+    Example:
+        pdws = PdwTable('analog')
+        pdws.extend({'startTimeSec': np.arange(1000) * 10e-6, 'width': 1e-6})
+        pdws.operation[0] = 1
+        pdwFile = uxg.bin_pdw_file_builder(pdws)
+
+    Attributes:
+        pdwFormat (str): PDW format. ('analog', 'vector', 'vector3')
+        fields (list(str)): Field names in PDW builder argument order.
+        numPdws (int): Number of PDWs in the table.
+        array (NumPy structured array): Storage, including unused capacity. Use data to access the PDWs.
+    """
+
+    def __init__(self, pdwFormat='analog', capacity=0):
+        if pdwFormat not in PDW_FIELDS:
+            raise error.UXGError(f'Invalid pdwFormat. Use one of {", ".join(PDW_FIELDS)}.')
+        self.pdwFormat = pdwFormat
+        self.dtype = np.dtype(PDW_FIELDS[pdwFormat])
+        self.fields = list(self.dtype.names)
+        self.array = np.zeros(capacity, dtype=self.dtype)
+        self.numPdws = 0
+
+    @classmethod
+    def from_list(cls, pdwList, pdwFormat='analog'):
+        """
+        Creates a PdwTable from a list of lists, 2D array, structured array, or dict of columns.
+        Args:
+            pdwList (list/NumPy array/dict): PDWs to add. See extend().
+            pdwFormat (str): PDW format. ('analog', 'vector', 'vector3')
+
+        Returns:
+            (PdwTable): New table containing the PDWs.
+        """
+
+        table = cls(pdwFormat)
+        table.extend(pdwList)
+        return table
+
+    @property
+    def data(self):
+        """Structured array view of the PDWs in the table."""
+        return self.array[:self.numPdws]
+
+    def __len__(self):
+        return self.numPdws
+
+    def __getitem__(self, index):
+        """Integers return a single PDW record, slices and index arrays return a new PdwTable."""
+        if isinstance(index, (int, np.integer)):
+            return self.data[index]
+        table = PdwTable(self.pdwFormat)
+        table.array = np.array(self.data[index], dtype=self.dtype, ndmin=1)
+        table.numPdws = len(table.array)
+        return table
+
+    def __getattr__(self, name):
+        # Field names access columns, e.g. table.startTimeSec
+        if name in self.__dict__.get('fields', []):
+            return self.data[name]
+        raise AttributeError(f"'PdwTable' object has no attribute '{name}'")
+
+    def __repr__(self):
+        return f'PdwTable({self.pdwFormat}, {self.numPdws} PDWs)'
+
+    def reserve(self, capacity):
+        """
+        Grows storage so the table can hold at least capacity PDWs without reallocating.
+        Args:
+            capacity (int): Number of PDWs.
+        """
+
+        if capacity > len(self.array):
+            # Grow geometrically so repeated appends are amortized
+            newArray = np.zeros(max(capacity, 2 * len(self.array)), dtype=self.dtype)
+            newArray[:self.numPdws] = self.data
+            self.array = newArray
+
+    def append(self, *values, **fields):
+        """
+        Adds a single PDW.
+        Args:
+            values: Field values in PDW builder argument order.
+            fields: Field values by name. Unspecified fields use the PDW builder defaults.
+        """
+
+        if len(values) > len(self.fields):
+            raise error.UXGError(f'Too many values for {self.pdwFormat} PDW, expected {len(self.fields)}.')
+        fields.update(zip(self.fields, values))
+        self.extend({k: [v] for k, v in fields.items()})
+
+    def extend(self, pdws):
+        """
+        Adds PDWs in bulk.
+        Args:
+            pdws (list/NumPy array/dict/PdwTable): List of lists or 2D array with one row per PDW in
+                PDW builder argument order, a structured array or PdwTable with matching field names, or a dict
+                of {fieldName: column}. Dict fields that are omitted use the PDW builder defaults, and scalar
+                values are broadcast to all new PDWs.
+        """
+
+        if isinstance(pdws, PdwTable):
+            pdws = pdws.data
+
+        if isinstance(pdws, dict):
+            unknown = set(pdws) - set(self.fields)
+            if unknown:
+                raise error.UXGError(f'Unknown {self.pdwFormat} PDW fields: {", ".join(sorted(unknown))}.')
+            columns = {k: np.asarray(v) for k, v in pdws.items()}
+            try:
+                count = np.broadcast_shapes(*[np.atleast_1d(c).shape for c in columns.values()])[0]
+            except (ValueError, IndexError):
+                raise error.UXGError('PDW columns must be scalars or 1D arrays of the same length.')
+        elif isinstance(pdws, np.ndarray) and pdws.dtype.names:
+            columns = {k: pdws[k] for k in pdws.dtype.names if k in self.fields}
+            count = len(pdws)
+        else:
+            rows = np.asarray(pdws, dtype=np.float64)
+            if rows.size == 0:
+                return
+            if rows.ndim != 2 or rows.shape[1] > len(self.fields):
+                raise error.UXGError(f'PDWs must be a list of lists or a 2D array with up to {len(self.fields)} '
+                                     f'parameters per {self.pdwFormat} PDW.')
+            columns = dict(zip(self.fields, rows.T))
+            count = len(rows)
+
+        # Integer fields are stored in small unsigned types, so check the values fit instead of letting them wrap
+        for name, column in columns.items():
+            fieldType = self.dtype[name]
+            values = np.asarray(column)
+            if fieldType.kind != 'u' or values.dtype.kind == 'b' or values.size == 0:
+                continue
+            if values.dtype.kind == 'u' and values.dtype.itemsize <= fieldType.itemsize:
+                continue
+            limit = np.iinfo(fieldType).max
+            if np.any(values < 0) or np.any(values > limit) or np.any(values != np.floor(values)):
+                raise error.UXGError(f'{name} values must be integers from 0 to {limit}.')
+
+        self.reserve(self.numPdws + count)
+        new = self.array[self.numPdws:self.numPdws + count]
+        for name in self.fields:
+            new[name] = columns.get(name, PDW_DEFAULTS[self.pdwFormat].get(name, 0))
+        self.numPdws += count
+
+    def sort_by_time(self):
+        """
+        Sorts PDWs by start time in place. PDWs with equal start times keep
+        their order. Operation flags mark positions in the PDW sequence
+        rather than individual pulses, so the operation column isn't
+        reordered: the first PDW stays the first PDW (1) and a final reset
+        (2) stays last.
+        """
+
+        order = np.argsort(self.data['startTimeSec'], kind='stable')
+        operation = self.data['operation'].copy()
+        self.array[:self.numPdws] = self.data[order]
+        self.data['operation'] = operation
+
+    def columns(self):
+        """
+        Returns the PDW columns in PDW builder argument order.
+
+        Returns:
+            (list(NumPy array)): One array per field.
+        """
+
+        return [self.data[name] for name in self.fields]
+
+    def encode(self):
+        """
+        Encodes the PDWs with the array PDW builder for the table's format.
+
+        Returns:
+            (NumPy array): N x words array of uint32 PDW words.
+        """
+
+        return PDW_ARRAY_BUILDERS[self.pdwFormat](*self.columns())
+
+
+class PdwFileWriter:
+    """
+    Writes a binary PDW file incrementally to a file or socket so large
+    scenarios never have to be held in memory. The file header and PDW
+    block header are written first, PDWs are encoded and written as they
+    arrive, and close() writes the end of the file. The output is identical
+    to analog_bin_pdw_file_builder()/vector_bin_pdw_file_builder() for the
+    same PDWs. If the with block raises, abort() is called instead of
+    close(), so no end block is written and a file opened by the writer is
+    deleted.
+
+    Example:
+        with PdwFileWriter('scenario.pdw', 'analog') as writer:
+            for burst in bursts:
+                writer.write(burst)
+        uxg.download_bin_pdw_file('scenario.pdw', pdwName='scenario')
+
+    Attributes:
+        target (str/file/socket): File name, file object opened in binary mode, or connected socket.
+        pdwFormat (str): PDW format. ('analog', 'vector')
+        chunkSize (int): Maximum number of PDWs encoded at a time.
+        fpcEntries (list(tuple/dict)): Analog FPC table entries, see bin_pdw_freqPhaseCodingBlock(). None omits the FPC block.
+        pdwsWritten (int): Number of PDWs written so far.
+        bytesWritten (int): Number of bytes written so far, including headers.
+    """
+
+    def __init__(self, target, pdwFormat='analog', chunkSize=65536, fpcEntries=DEFAULT_FPC_ENTRIES):
+        if pdwFormat not in ['analog', 'vector']:
+            raise error.UXGError('Invalid pdwFormat. Use "analog" or "vector".')
+        if not isinstance(chunkSize, int) or chunkSize < 1:
+            raise ValueError('chunkSize must be a positive integer.')
+
+        self.target = target
+        self.pdwFormat = pdwFormat
+        self.chunkSize = chunkSize
+        self.fpcEntries = fpcEntries
+        self.pdwsWritten = 0
+        self.bytesWritten = 0
+        self.fileObj = None
+        self.ownsFile = False
+        self.closed = False
+
+        if isinstance(target, (str, bytes)) or hasattr(target, '__fspath__'):
+            self.fileObj = open(target, 'wb')
+            self.ownsFile = True
+            self.emit = self.fileObj.write
+        elif hasattr(target, 'sendall'):
+            self.emit = target.sendall
+        elif hasattr(target, 'write'):
+            self.emit = target.write
+        else:
+            raise error.UXGError('target must be a file name, a binary file object, or a socket.')
+
+        try:
+            if pdwFormat == 'analog':
+                self.send(analog_bin_pdw_file_header(fpcEntries))
+            else:
+                self.send(vector_bin_pdw_file_header())
+        except BaseException:
+            self.abort()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if excType is None:
+            self.close()
+        else:
+            self.abort()
+
+    def send(self, data):
+        """
+        HELPER FUNCTION
+        Writes bytes to the target and updates bytesWritten.
+        """
+
+        self.emit(data)
+        self.bytesWritten += len(data)
+
+    def write(self, pdws):
+        """
+        Encodes and writes PDWs.
+        Args:
+            pdws (list/NumPy array/PdwTable): List of lists, 2D array, or PdwTable in the writer's PDW format.
+        """
+
+        if self.closed:
+            raise error.UXGError('PdwFileWriter is closed.')
+        if not isinstance(pdws, PdwTable):
+            pdws = PdwTable.from_list(pdws, self.pdwFormat)
+        for i in range(0, len(pdws), self.chunkSize):
+            columns = pdw_columns(pdws[i:i + self.chunkSize], self.pdwFormat)
+            self.send(PDW_ARRAY_BUILDERS[self.pdwFormat](*columns).tobytes())
+        self.pdwsWritten += len(pdws)
+
+    def close(self):
+        """Writes the end of the PDW file and closes files opened by the writer."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if self.pdwFormat == 'analog':
+                self.send(analog_bin_pdw_file_end())
+        finally:
+            if self.ownsFile:
+                self.fileObj.close()
+
+    def abort(self):
+        """
+        Stops writing without ending the PDW file. Files opened by the writer
+        are closed and deleted so an incomplete file isn't left behind. The
+        end block isn't written to file objects or sockets supplied by the
+        caller.
+        """
+
+        if self.closed:
+            return
+        self.closed = True
+        if self.ownsFile:
+            self.fileObj.close()
+            os.remove(self.target)
+
+
+# Binary PDW word layouts read by PdwFileReader, keyed by the file header data ID
+PDW_FILE_FORMATS = {16: 'analog', 64: 'vector'}
+PDW_WORDS = {'analog': 7, 'vector': 6}
+
+# Block IDs used in binary PDW files
+END_BLOCK_ID = 0
+PADDING_BLOCK_ID = 1
+FPC_BLOCK_ID = 13
+PDW_BLOCK_ID = 16
+
+
+def pdw_freq(w):
+    """HELPER FUNCTION Decodes frequency in Hz from PDW words 0 and 1."""
+    return ((w['word0'].astype(np.uint64) >> 5) | (w['word1'].astype(np.uint64) & 0xFFFFF) << 27) / 1024
+
+
+def pdw_start_time(w):
+    """HELPER FUNCTION Decodes start time in seconds from PDW words 2 and 3."""
+    return (w['word2'].astype(np.uint64) | w['word3'].astype(np.uint64) << 32) / 1e12
+
+
+def analog_pdw_phase(w):
+    """HELPER FUNCTION Decodes phase in degrees from analog PDW word 1. Analog PDWs store phase from -180 to 180."""
+    bits = ((w['word1'] >> 20) & 0xFFF).astype(np.int64)
+    return np.where(bits >= 2048, bits - 4096, bits) * 360 / 4096
+
+
+def analog_pdw_power(w):
+    """HELPER FUNCTION Decodes linear power from the mantissa/exponent in analog PDW word 5."""
+    bits = w['word5'] & 0x7FFF
+    return (1 + (bits & 0x3FF) / 1024) * np.ldexp(1.0, (bits >> 10).astype(np.int64) - 26)
+
+
+def analog_pdw_chirp_rate(w):
+    """HELPER FUNCTION Decodes chirp rate in Hz/us from the mantissa/exponent in analog PDW word 6."""
+    bits = (w['word6'] >> 12) & 0x1FFFF
+    return (bits & 0x1FFF) * np.ldexp(1.0, 2 * (bits >> 13).astype(np.int64)) * 21.822
+
+
+# Functions that decode each PdwTable field from the raw PDW words
+PDW_DECODERS = {
+    'analog': {
+        'operation': lambda w: (w['word0'] >> 3) & 0x3,
+        'freq': pdw_freq,
+        'phase': analog_pdw_phase,
+        'startTimeSec': pdw_start_time,
+        'width': lambda w: w['word4'] / 1e9,
+        'powerLin': analog_pdw_power,
+        'markers': lambda w: (w['word5'] >> 15) & 0xFFF,
+        'pulseMode': lambda w: (w['word5'] >> 27) & 0x3,
+        'phaseControl': lambda w: (w['word5'] >> 29) & 0x1,
+        'bandAdjust': lambda w: (w['word5'] >> 30) & 0x3,
+        'chirpControl': lambda w: w['word6'] & 0x7,
+        'code': lambda w: (w['word6'] >> 3) & 0x1FF,
+        'chirpRate': analog_pdw_chirp_rate,
+        'freqMap': lambda w: (w['word6'] >> 29) & 0x7,
+    },
+    'vector': {
+        'operation': lambda w: (w['word0'] >> 3) & 0x3,
+        'freq': pdw_freq,
+        'phase': lambda w: ((w['word1'] >> 20) & 0xFFF) * 360 / 4096,
+        'startTimeSec': pdw_start_time,
+        'powerDbm': lambda w: (w['word4'] & 0x7FFF) * 0.005 - 140,
+        'markers': lambda w: (w['word4'] >> 15) & 0xFFF,
+        'phaseControl': lambda w: (w['word4'] >> 27) & 0x1,
+        'rfOff': lambda w: (w['word4'] >> 28) & 0x1,
+        'wIndex': lambda w: w['word5'] & 0xFFFFFFF,
+        'wfmMkrMask': lambda w: w['word5'] >> 28,
+    },
+}
+
+
+class PdwFileReader:
+    """
+    Reads an analog or vector UXG binary PDW file through a read-only memory
+    map. The file header and block chain (padding, frequency/phase coding,
+    and PDW blocks) are parsed when the file is opened, and the PDWs are
+    exposed as a zero-copy structured array of raw words. Fields in
+    engineering units are decoded on demand, so only the columns that are
+    used are ever computed.
+
+    Example:
+        with PdwFileReader('scenario.pdw') as pdws:
+            print(len(pdws), pdws.startTimeSec[-1])
+            table = pdws.to_table()
+
+    Attributes:
+        fileName (str): Name of the PDW file.
+        pdwFormat (str): PDW format. ('analog', 'vector')
+        version (int): File format version from the header.
+        dataId (int): PDW data ID from the header.
+        blocks (list(tuple)): (blockId, offset, size) of each block in file order. Size includes the block header.
+        pdwOffset (int): Byte offset of the first PDW.
+        words (NumPy structured array): Raw PDW words as fields word0, word1, ... backed by the file.
+    """
+
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.fileObj = open(fileName, 'rb')
+        try:
+            self.mmap = mmap.mmap(self.fileObj.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.fileObj.close()
+            raise error.UXGError(f'{fileName} is empty.')
+        try:
+            self.parse()
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.words)
+
+    def __getattr__(self, name):
+        # Field names decode columns, e.g. reader.startTimeSec
+        decoders = PDW_DECODERS.get(self.__dict__.get('pdwFormat'), {})
+        if name in decoders:
+            return self.field(name)
+        raise AttributeError(f"'PdwFileReader' object has no attribute '{name}'")
+
+    def __repr__(self):
+        return f'PdwFileReader({self.fileName}, {self.pdwFormat}, {len(self)} PDWs)'
+
+    def parse(self):
+        """
+        HELPER FUNCTION
+        Parses the STRM/KEYS file header and walks the block chain to the PDW block.
+        """
+
+        data = self.mmap
+        if len(data) < 48 or data[:4] != b'STRM' or data[12:16] != b'KEYS':
+            raise error.UXGError(f'{self.fileName} is not a binary PDW file.')
+        self.version = int.from_bytes(data[4:8], byteorder='little')
+        self.dataId = int.from_bytes(data[40:44], byteorder='little')
+        if self.dataId not in PDW_FILE_FORMATS:
+            raise error.UXGError(f'Unsupported PDW data ID {self.dataId}.')
+        self.pdwFormat = PDW_FILE_FORMATS[self.dataId]
+        numWords = PDW_WORDS[self.pdwFormat]
+
+        self.blocks = []
+        position = 48
+        while True:
+            if position + 16 > len(data):
+                raise error.UXGError(f'{self.fileName} ends before the PDW block.')
+            blockId = int.from_bytes(data[position:position + 4], byteorder='little')
+            size = int.from_bytes(data[position + 8:position + 16], byteorder='little')
+            if blockId == PDW_BLOCK_ID:
+                break
+            elif blockId == PADDING_BLOCK_ID:
+                # Padding block size is the number of filler bytes after the block header
+                blockSize = 16 + size
+            elif blockId == FPC_BLOCK_ID:
+                # FPC block size excludes the block header, and the block is padded with 1 to 16 bytes
+                blockSize = (16 + size) + (16 - (16 + size) % 16)
+            else:
+                raise error.UXGError(f'Unexpected block ID {blockId} at byte {position}.')
+            self.blocks.append((blockId, position, blockSize))
+            position += blockSize
+
+        # PDW block size is 0xFFFFFFFFFFFFFFFF when the PDWs run until the end block
+        self.pdwOffset = position + 16
+        if size != 0xFFFFFFFFFFFFFFFF:
+            pdwBytes = size
+        else:
+            pdwBytes = len(data) - self.pdwOffset
+            if self.pdwFormat == 'analog':
+                # Analog files end with 8 bytes of block padding and a 16 byte end block
+                pdwBytes -= 24
+        if pdwBytes < 0 or pdwBytes % (4 * numWords):
+            raise error.UXGError(f'PDW block length ({pdwBytes} bytes) is not a whole number of PDWs.')
+        self.blocks.append((PDW_BLOCK_ID, position, 16 + pdwBytes))
+
+        wordDtype = np.dtype([(f'word{i}', '<u4') for i in range(numWords)])
+        self.words = np.frombuffer(data, dtype=wordDtype, count=pdwBytes // (4 * numWords), offset=self.pdwOffset)
+
+    def field(self, name, start=0, stop=None):
+        """
+        Decodes one PDW field in engineering units.
+        Args:
+            name (str): Field name, the same as the PdwTable field names for the file's PDW format.
+            start (int): First PDW to decode.
+            stop (int): PDW to stop before. None decodes to the end of the file.
+
+        Returns:
+            (NumPy array): Decoded values.
+        """
+
+        decoders = PDW_DECODERS[self.pdwFormat]
+        if name not in decoders:
+            raise error.UXGError(f'Unknown {self.pdwFormat} PDW field "{name}".')
+        return decoders[name](self.words[start:stop])
+
+    def to_table(self, start=0, stop=None):
+        """
+        Decodes PDWs into a PdwTable.
+        Args:
+            start (int): First PDW to decode.
+            stop (int): PDW to stop before. None decodes to the end of the file.
+
+        Returns:
+            (PdwTable): Decoded PDWs.
+        """
+
+        return PdwTable.from_list({name: self.field(name, start, stop) for name in PDW_DECODERS[self.pdwFormat]},
+                                  self.pdwFormat)
+
+    def close(self):
+        """Releases the PDW view and closes the memory map and file."""
+        # The memory map can't be closed while NumPy views of it exist
+        self.words = None
+        try:
+            self.mmap.close()
+        except BufferError:
+            # Views of the raw words are still in use, the map is released when they are
+            pass
+        self.fileObj.close()
+
+
+# Maximum number of PDWs in a single UXG PDW file
+MAX_PDWS = 600000
+
+# Largest start time that fits in the 64 bit picosecond start time field
+MAX_START_TIME = (2 ** 64 - 1) / 1e12
+
+# Valid (minimum, maximum) value of each PDW field in engineering units. Ranges are the documented instrument
+# ranges where they are tighter than the field's bit width, so nothing is silently masked by the encoders.
+PDW_FIELD_LIMITS = {
+    'analog': {'operation': (0, 2), 'freq': (10e6, 40e9), 'phase': (-180, 360), 'startTimeSec': (0, MAX_START_TIME),
+               'width': (0, (2 ** 32 - 1) / 1e9), 'powerLin': (2 ** -26, 2 ** 6), 'markers': (0, 0xFFF),
+               'pulseMode': (0, 2), 'phaseControl': (0, 1), 'bandAdjust': (0, 2), 'chirpControl': (0, 2),
+               'code': (0, 0x1FF), 'chirpRate': (0, 8191 * 4 ** 15 * 21.822), 'freqMap': (0, 7)},
+    'vector': {'operation': (0, 2), 'freq': (50e6, 20e9), 'phase': (0, 360), 'startTimeSec': (0, MAX_START_TIME),
+               'powerDbm': (-140, 23.835), 'markers': (0, 0xFFF), 'phaseControl': (0, 1), 'rfOff': (0, 1),
+               'wIndex': (0, 2 ** 28 - 1), 'wfmMkrMask': (0, 0xF)},
+    'vector3': {'operation': (0, 2), 'freq': (50e6, 20e9), 'phase': (0, 360), 'startTimeSec': (0, MAX_START_TIME),
+                'width': (0, (2 ** 37 - 1) / 2e12), 'maxPower': (-140, 23.835), 'markers': (0, 0xFFF),
+                'powerDbm': (-140, 23.835), 'phaseControl': (0, 1), 'rfOff': (0, 1), 'autoBlank': (0, 1),
+                'zeroHold': (0, 1), 'loLead': (0, 255 * 4e-9), 'wfmMkrMask': (0, 0xF), 'wIndex': (0, 0xFFFF)},
+}
+
+
+def validate_pdws(pdws, pdwFormat=None, minSpacing=0, maxPdws=None):
+    """
+    Checks a whole set of PDWs with vectorized operations before they are
+    encoded or downloaded. Each check returns the indices of the PDWs that
+    fail it, so problems in multi-million PDW scenarios can be located
+    directly.
+
+    Checks:
+        startTimeOrder: Start time is earlier than the previous PDW's start time.
+        overlap: Pulse starts before the previous pulse ends. (formats with a width field)
+        spacing: Start time is less than minSpacing after the previous PDW's start time.
+        <field name>: Value is out of range (see PDW_FIELD_LIMITS) or not an integer for integer fields.
+        operation: Operation flags are out of sequence. The first PDW must be 1 (first PDW),
+            1 may only follow 2 (reset), and 2 must be followed by 1 unless it is the last PDW.
+        count: PDWs beyond maxPdws.
+
+    Args:
+        pdws (list/NumPy array/PdwTable): List of lists or 2D array in PDW builder argument order, or a PdwTable.
+        pdwFormat (str): PDW format. ('analog', 'vector', 'vector3') Defaults to the PdwTable's format, or 'analog'.
+        minSpacing (float): Minimum time in seconds between consecutive PDW start times. 0 disables the check.
+        maxPdws (int): Maximum number of PDWs, e.g. MAX_PDWS for a PDW file. None disables the check.
+
+    Returns:
+        (dict): {checkName: NumPy array of failing PDW indices} for each failed check. Empty if all PDWs are valid.
+    """
+
+    if isinstance(pdws, PdwTable):
+        pdwFormat = pdwFormat or pdws.pdwFormat
+        if pdws.pdwFormat != pdwFormat:
+            raise error.UXGError(f'Expected {pdwFormat} PDWs, got a {pdws.pdwFormat} PdwTable.')
+        columns = {name: pdws.data[name] for name in pdws.fields} if len(pdws) else {}
+    else:
+        pdwFormat = pdwFormat or 'analog'
+        if pdwFormat not in PDW_FIELDS:
+            raise error.UXGError(f'Invalid pdwFormat. Use one of {", ".join(PDW_FIELDS)}.')
+        # Check the raw values, before they are cast to PdwTable field types
+        columns = dict(zip([name for name, _ in PDW_FIELDS[pdwFormat]], pdw_columns(pdws)))
+
+    failures = {}
+
+    def fail(name, mask):
+        indices = np.flatnonzero(mask)
+        if indices.size:
+            failures[name] = indices
+
+    if not columns:
+        return failures
+    numPdws = len(columns['startTimeSec'])
+
+    # Timing, comparing each PDW with the previous one
+    startTime = np.asarray(columns['startTimeSec'], dtype=np.float64)
+    interval = np.diff(startTime)
+    fail('startTimeOrder', np.concatenate([[False], interval < 0]))
+    if 'width' in columns:
+        width = np.asarray(columns['width'], dtype=np.float64)
+        fail('overlap', np.concatenate([[False], interval < width[:-1]]))
+    if minSpacing:
+        fail('spacing', np.concatenate([[False], interval < minSpacing]))
+
+    # Field ranges
+    dtypes = dict(PDW_FIELDS[pdwFormat])
+    for name, (low, high) in PDW_FIELD_LIMITS[pdwFormat].items():
+        if name not in columns:
+            continue
+        values = np.asarray(columns[name])
+        if values.dtype.kind in 'ui':
+            # PdwTable integer fields are already whole numbers
+            bad = values > high
+            if low > 0 or values.dtype.kind == 'i':
+                bad |= values < low
+        else:
+            # NaN fails both comparisons
+            bad = ~((values >= low) & (values <= high))
+            if dtypes[name][0] == 'u':
+                bad |= values != np.floor(values)
+        fail(name, bad)
+
+    # Operation flag sequencing
+    if 'operation' in columns:
+        operation = np.asarray(columns['operation'])
+        first = operation == 1
+        reset = operation == 2
+        badSequence = np.zeros(numPdws, dtype=bool)
+        badSequence[0] = not first[0]
+        badSequence[1:] |= first[1:] & ~reset[:-1]
+        badSequence[:-1] |= reset[:-1] & ~first[1:]
+        fail('operation', badSequence)
+
+    if maxPdws is not None and numPdws > maxPdws:
+        failures['count'] = np.arange(maxPdws, numPdws)
+
+    return failures
+
+
+def csv_columns(data, fields=None):
+    """
+    HELPER FUNCTION
+    Converts CSV data to a list of columns without building per-row lists.
+    Checks that every column has the same length and that there is one
+    column per field.
+    Args:
+        data (list/NumPy array/PdwTable/dict): Rows (list of lists or 2D array), a PdwTable, or {name: column}.
+        fields (list(str)): Column names. Dict columns are selected in this order. None skips the field checks.
+
+    Returns:
+        (list): One list or NumPy array per CSV column.
+    """
+
+    if isinstance(data, PdwTable):
+        columns = data.columns()
+    elif isinstance(data, dict):
+        if fields is None:
+            columns = list(data.values())
+        else:
+            missing = [f for f in fields if f not in data]
+            if missing:
+                raise error.UXGError(f'data is missing columns for fields {missing}.')
+            columns = [data[f] for f in fields]
+    elif isinstance(data, np.ndarray) and data.ndim == 2:
+        columns = list(data.T)
+    else:
+        widths = {len(row) for row in data}
+        if len(widths) > 1:
+            raise error.UXGError(f'All rows must have the same number of values. Got rows of length {sorted(widths)}.')
+        columns = [list(c) for c in zip(*data)]
+
+    if fields is not None and columns and len(columns) != len(fields):
+        raise error.UXGError(f'Got {len(columns)} columns of data for {len(fields)} fields.')
+    lengths = {len(c) for c in columns}
+    if len(lengths) > 1:
+        raise error.UXGError(f'All columns must have the same length. Got columns of length {sorted(lengths)}.')
+    return columns
+
+
+def write_csv(fileObj, fields, data, chunkSize=65536):
+    """
+    Writes a CSV file (e.g. a UXG PDW or waveform index CSV) to a binary
+    file object. Values are converted to text a column at a time and rows
+    are written in chunks of chunkSize, so the cost is linear in the number
+    of rows and only one chunk of text is held in memory. Values are written
+    with str(), the same as f'{value}'.
+    Args:
+        fileObj (file): Binary file object or other object with a write(bytes) method.
+        fields (list(str)): Column names for the header row.
+        data (list/NumPy array/PdwTable/dict): Rows (list of lists or 2D array), a PdwTable, or {name: column}.
+            Dict columns are written in fields order.
+        chunkSize (int): Number of rows converted and written at a time.
+
+    Returns:
+        (int): Number of bytes written.
+    """
+
+    header = (','.join(fields) + '\n').encode('utf-8')
+    fileObj.write(header)
+    numBytes = len(header)
+
+    columns = csv_columns(data, fields)
+    numRows = len(columns[0]) if columns else 0
+    for start in range(0, numRows, chunkSize):
+        text = []
+        for column in columns:
+            chunk = column[start:start + chunkSize]
+            # tolist() turns NumPy values into Python ints/floats so str() matches Python formatting
+            text.append(map(str, chunk.tolist() if isinstance(chunk, np.ndarray) else chunk))
+        rows = '\n'.join(map(','.join, zip(*text))) + '\n'
+        rows = rows.encode('utf-8')
+        fileObj.write(rows)
+        numBytes += len(rows)
+
+    return numBytes
@@ -0,0 +1,334 @@
+"""
+pdwConvert
+Author: Morgan Allison, Keysight RF/uW Application Engineer
+Conversions between IQ waveforms and PDWs.
+extract_pulses() finds the pulses in a long, mostly empty IQ waveform,
+deduplicates identical pulse bodies, and returns VectorUXG PDWs plus the
+small set of unique waveforms they play. render_pdws() goes the other way
+and synthesizes baseband IQ from analog or vector PDWs to preview a
+scenario without hardware.
+"""
+
+import hashlib
+import math
+
+import numpy as np
+
+from pyarbtools import error
+from pyarbtools import pdwBuilder
+
+
+def pulse_edges(wfm, threshold, chunkSize=1 << 22):
+    """
+    HELPER FUNCTION
+    Finds the sample ranges where the envelope of a waveform is above a
+    threshold. The waveform is processed chunkSize samples at a time, so it
+    can be a memory-mapped array larger than memory.
+    Args:
+        wfm (NumPy array): Complex waveform values.
+        threshold (float): Linear envelope threshold.
+        chunkSize (int): Number of samples processed at a time.
+
+    Returns:
+        (tuple): (starts, stops) NumPy arrays of pulse sample ranges, stops are exclusive.
+    """
+
+    starts = []
+    stops = []
+    prev = np.zeros(1, dtype=np.int8)
+    for offset in range(0, len(wfm), chunkSize):
+        above = (np.abs(wfm[offset:offset + chunkSize]) > threshold).view(np.int8)
+        # +1 where the envelope rises above the threshold, -1 where it falls below
+        edges = np.diff(above, prepend=prev)
+        starts.append(np.flatnonzero(edges == 1) + offset)
+        stops.append(np.flatnonzero(edges == -1) + offset)
+        prev = above[-1:]
+    if prev[0]:
+        stops.append(np.array([len(wfm)]))
+
+    return (np.concatenate(starts or [np.zeros(0, dtype=np.int64)]).astype(np.int64),
+            np.concatenate(stops or [np.zeros(0, dtype=np.int64)]).astype(np.int64))
+
+
+def waveform_peak(wfm, chunkSize=1 << 22):
+    """
+    HELPER FUNCTION
+    Returns the peak envelope of a waveform, processed chunkSize samples at a time.
+    """
+
+    peak = 0.0
+    for offset in range(0, len(wfm), chunkSize):
+        peak = max(peak, float(np.abs(wfm[offset:offset + chunkSize]).max()))
+    return peak
+
+
+def extract_pulses(wfm, fs, threshold=-40, minGap=0, pad=0, gran=1, minLen=1, normalize=True, cf=1e9, power=0,
+                   startTime=0, terminate=True, chunkSize=1 << 22):
+    """
+    Converts a pulsed IQ waveform into VectorUXG PDWs and a minimal set of
+    waveforms. Pulses are found by thresholding the envelope, and pulses
+    with identical bodies (after quantizing to the UXG's 16 bit IQ format)
+    share a waveform. With normalize=True each pulse is scaled to a peak of
+    1 before comparison and its amplitude is moved into the PDW power, so
+    copies of a pulse at different amplitudes (e.g. from an antenna scan)
+    share a waveform too.
+
+    Example:
+        pdws, wfms = extract_pulses(iq, fs=uxg.fs, gran=uxg.gran, minLen=uxg.minLen, cf=9e9, power=-10)
+        pdws, windex = WfmLibrary(uxg).build(pdws, wfms, windexName='scenario')
+    Args:
+        wfm (NumPy array): Complex waveform values. May be memory-mapped.
+        fs (float): Sample rate in Hz.
+        threshold (float): Envelope threshold in dB relative to the waveform peak.
+        minGap (int): Gaps shorter than this many samples are treated as part of the pulse (e.g. phase code transitions).
+        pad (int): Number of samples added before and after each pulse.
+        gran (int): Waveform length granularity in samples. Pulses are zero padded to a multiple of gran.
+        minLen (int): Minimum waveform length in samples.
+        normalize (bool): Scales each pulse to a peak of 1 and sets its PDW power from its amplitude.
+        cf (float): PDW frequency in Hz.
+        power (float): PDW power in dBm for a pulse with a peak magnitude of 1.
+        startTime (float): Time in seconds added to each PDW start time.
+        terminate (bool): Sets the operation field of the first PDW to 1 and
+            appends a final PDW with operation 2 at the end of the waveform.
+        chunkSize (int): Number of samples processed at a time during pulse detection.
+
+    Returns:
+        (tuple): (pdws, wfms) PdwTable of vector PDWs whose wIndex values index into wfms,
+            a list of complex waveforms.
+    """
+
+    if fs <= 0:
+        raise error.WfmBuilderError('fs must be a positive value.')
+    if gran < 1 or minLen < 1 or minGap < 0 or pad < 0:
+        raise error.WfmBuilderError('gran and minLen must be at least 1, and minGap and pad must not be negative.')
+
+    numSamples = len(wfm)
+    peak = waveform_peak(wfm, chunkSize) if numSamples else 0
+    pdws = pdwBuilder.PdwTable('vector')
+    wfms = []
+
+    if peak > 0:
+        starts, stops = pulse_edges(wfm, peak * 10 ** (threshold / 20), chunkSize)
+
+        # Merge pulses separated by short gaps
+        if minGap and len(starts) > 1:
+            keep = starts[1:] - stops[:-1] >= minGap
+            starts = starts[np.concatenate([[True], keep])]
+            stops = stops[np.concatenate([keep, [True]])]
+
+        starts = np.maximum(starts - pad, 0)
+        stops = np.minimum(stops + pad, numSamples)
+        lengths = np.maximum(-(-(stops - starts) // gran) * gran, math.ceil(minLen / gran) * gran)
+
+        wIndex = np.zeros(len(starts), dtype=np.int64)
+        peaks = np.ones(len(starts))
+        bodies = {}
+        for i, (start, stop, length) in enumerate(zip(starts.tolist(), stops.tolist(), lengths.tolist())):
+            pulse = np.zeros(length, dtype=np.complex128)
+            pulse[:stop - start] = wfm[start:stop]
+            if normalize:
+                peaks[i] = np.abs(pulse).max()
+                pulse /= peaks[i]
+            # Identical bodies at UXG resolution share a waveform
+            quantized = np.round(pulse.view(np.float64) * 32767).astype(np.int16)
+            key = hashlib.blake2b(quantized.tobytes(), digest_size=16).digest()
+            if key not in bodies:
+                bodies[key] = len(wfms)
+                wfms.append(pulse)
+            wIndex[i] = bodies[key]
+
+        pdws.extend({'freq': cf, 'startTimeSec': starts / fs + startTime, 'powerDbm': power + 20 * np.log10(peaks),
+                     'wIndex': wIndex})
+
+    if terminate:
+        if len(pdws):
+            pdws.operation[0] = 1
+        pdws.append(operation=2, freq=cf, startTimeSec=numSamples / fs + startTime)
+
+    return pdws, wfms
+
+
+def fpc_states(entryKey):
+    """
+    HELPER FUNCTION
+    Unpacks the subpulse states of a normalized FPC entry from pdwBuilder.fpc_entry_key().
+
+    Returns:
+        (NumPy array): Phase (degrees) or frequency offset (Hz) of each subpulse.
+    """
+
+    _, numBitsPerSubpulse, _, stateMapping, patternBytes, numBitsInPattern, _ = entryKey
+    bits = np.unpackbits(np.frombuffer(patternBytes, dtype=np.uint8))[:numBitsInPattern]
+    bits = bits[:len(bits) // numBitsPerSubpulse * numBitsPerSubpulse].reshape(-1, numBitsPerSubpulse)
+    symbols = bits.astype(np.int64) @ (1 << np.arange(numBitsPerSubpulse - 1, -1, -1))
+    return np.asarray(stateMapping)[symbols]
+
+
+def pdw_intervals(pdws, wfms=None, wfmFs=None, refPower=0):
+    """
+    HELPER FUNCTION
+    Computes when each PDW's output starts and stops and its amplitude.
+    A PDW's output is cut short by the next PDW, like the UXG, and PDWs
+    with operation 2 have no output.
+    Args:
+        pdws (PdwTable): PDWs sorted by start time.
+        wfms (list(NumPy array)): Waveforms selected by wIndex for vector PDWs.
+        wfmFs (float): Waveform sample rate in Hz.
+        refPower (float): Vector PDW power in dBm that renders at a magnitude of 1.
+
+    Returns:
+        (tuple): (start, stop, amplitude) NumPy arrays. Inactive PDWs have stop == start.
+    """
+
+    start = pdws.startTimeSec
+    nextStart = np.append(start[1:], np.inf)
+    if pdws.pdwFormat == 'analog':
+        # pulseMode: 0-CW until the next PDW, 1-RF off, 2-pulse
+        stop = np.where(pdws.pulseMode == 0, nextStart, start + pdws.width)
+        stop = np.where(pdws.pulseMode == 1, start, stop)
+        amplitude = pdws.powerLin.astype(np.float64)
+    else:
+        if wfms is None:
+            raise error.UXGError('Vector PDWs need the waveforms selected by wIndex.')
+        # Only PDWs that produce output play a waveform, so a scenario with no waveforms can still be rendered
+        active = (pdws.operation != 2) & (pdws.rfOff == 0)
+        if np.any(pdws.wIndex[active] >= len(wfms)):
+            raise error.UXGError(f'wIndex values of PDWs with output must be between 0 and {len(wfms) - 1}.')
+        lengths = np.array([len(w) for w in wfms] or [0], dtype=np.float64)
+        stop = start + lengths[np.where(active, pdws.wIndex, 0)] / wfmFs
+        if pdws.pdwFormat == 'vector3':
+            stop = np.where(pdws.width > 0, start + pdws.width, stop)
+        stop = np.where(pdws.rfOff == 1, start, stop)
+        amplitude = 10 ** ((pdws.powerDbm - refPower) / 20)
+
+    # Operation 2 marks the end of the scenario and has no output
+    stop = np.where(pdws.operation == 2, start, stop)
+
+    return start, np.maximum(np.minimum(stop, nextStart), start), amplitude
+
+
+def render_chunks(pdws, fs, cf=None, wfms=None, wfmFs=None, pdwFormat='analog', duration=None, chunkSize=1 << 20,
+                  refPower=0, fpcEntries=pdwBuilder.DEFAULT_FPC_ENTRIES):
+    """
+    Renders PDWs to baseband IQ a chunk at a time, so long scenarios can be
+    previewed or compared against VSA captures without holding the whole
+    waveform in memory. All pulses that overlap a chunk are rendered at once.
+    Analog PDWs render frequency, phase, linear power, ramp and triangle
+    chirps, and frequency/phase codes from the FPC table (each code's
+    subpulses are spread evenly across the pulse width). Vector PDWs play
+    the waveform selected by wIndex, scaled by powerDbm and shifted by freq
+    and phase. Phase is coherent (referenced to time 0) when phaseControl is
+    0 and referenced to the start of each PDW when phaseControl is 1.
+    Args:
+        pdws (list/PdwTable): PDWs in the format accepted by the PDW file builders.
+        fs (float): Output sample rate in Hz.
+        cf (float): Center frequency in Hz of the baseband output. Default is the first PDW's frequency.
+        wfms (list(NumPy array)): Complex waveforms selected by wIndex. Required for vector PDWs.
+        wfmFs (float): Sample rate of wfms in Hz. Default is fs.
+        pdwFormat (str): Format of list PDWs. ('analog', 'vector', 'vector3') Ignored for PdwTable.
+        duration (float): Length of the output in seconds. Default is the end of the last output
+            or the start of the last PDW, whichever is later.
+        chunkSize (int): Number of samples in each chunk.
+        refPower (float): Vector PDW power in dBm that renders at a magnitude of 1.
+        fpcEntries (list(tuple/dict)): Analog FPC table selected by the code field, see pdwBuilder.bin_pdw_freqPhaseCodingBlock().
+
+    Yields:
+        (NumPy array): Complex IQ chunks of chunkSize samples, the last chunk may be shorter.
+    """
+
+    if fs <= 0 or chunkSize < 1:
+        raise error.UXGError('fs and chunkSize must be positive values.')
+    if not isinstance(pdws, pdwBuilder.PdwTable):
+        pdws = pdwBuilder.PdwTable.from_list(pdws, pdwFormat)
+    if np.any(np.diff(pdws.startTimeSec) < 0):
+        pdws = pdws[:]
+        pdws.sort_by_time()
+    wfmFs = wfmFs or fs
+    analog = pdws.pdwFormat == 'analog'
+
+    start, stop, amplitude = pdw_intervals(pdws, wfms, wfmFs, refPower)
+    if cf is None:
+        cf = float(pdws.freq[0]) if len(pdws) else 0
+    if duration is None:
+        duration = float(stop.max()) if len(pdws) else 0
+    numSamples = math.ceil(duration * fs - 1e-6)
+
+    # First and last sample of each PDW's output. Outputs don't overlap, so both are sorted.
+    firstSample = np.ceil(start * fs - 1e-6).astype(np.int64)
+    stopSample = np.maximum(np.ceil(np.minimum(stop, duration) * fs - 1e-6).astype(np.int64), firstSample)
+    fpcTable = [pdwBuilder.fpc_entry_key(e) for e in fpcEntries] if analog else []
+
+    for s0 in range(0, numSamples, chunkSize):
+        s1 = min(s0 + chunkSize, numSamples)
+        iq = np.zeros(s1 - s0, dtype=np.complex128)
+        first = np.searchsorted(stopSample, s0, 'right')
+        last = np.searchsorted(firstSample, s1, 'left')
+        if first >= last:
+            yield iq
+            continue
+
+        # Flatten the samples of every PDW in the chunk, idx is the PDW for each sample
+        pdwIdx = np.arange(first, last)
+        a = np.maximum(firstSample[pdwIdx], s0)
+        counts = np.maximum(np.minimum(stopSample[pdwIdx], s1) - a, 0)
+        idx = np.repeat(pdwIdx, counts)
+        n = np.arange(len(idx)) + np.repeat(a - np.cumsum(counts) + counts, counts)
+        t = n / fs
+        tau = t - start[idx]
+
+        freqOffset = pdws.freq[idx] - cf
+        phase = np.deg2rad(pdws.phase[idx]) + 2 * np.pi * freqOffset * np.where(pdws.phaseControl[idx] == 1, tau, t)
+        values = amplitude[idx].astype(np.complex128)
+
+        if analog:
+            rate = pdws.chirpRate[idx] * 1e6
+            width = pdws.width[idx]
+            ramp = np.pi * rate * tau ** 2
+            # Triangle chirps ramp up for half the pulse width and back down
+            half = width / 2
+            after = tau - half
+            triangle = np.pi * rate * (np.minimum(tau, half) ** 2 + 2 * np.maximum(after, 0) * half
+                                       - np.maximum(after, 0) ** 2)
+            phase += np.where(pdws.chirpControl[idx] == 1, triangle, ramp)
+
+            codes = pdws.code[idx]
+            for code in np.unique(codes).tolist():
+                if code >= len(fpcTable):
+                    raise error.UXGError(f'PDW code {code} is not in the FPC table.')
+                entry = fpcTable[code]
+                states = fpc_states(entry)
+                if not entry[0] or not len(states):
+                    continue
+                mask = codes == code
+                subWidth = width[mask] / len(states)
+                sub = np.minimum((tau[mask] / subWidth + 1e-9).astype(np.int64), len(states) - 1)
+                if entry[2] == 0:
+                    phase[mask] += np.deg2rad(states[sub])
+                else:
+                    # Frequency codes are phase continuous across subpulses
+                    cumFreq = np.concatenate([[0], np.cumsum(states)])
+                    phase[mask] += 2 * np.pi * (cumFreq[sub] * subWidth + states[sub] * (tau[mask] - sub * subWidth))
+        else:
+            wIndex = pdws.wIndex[idx]
+            wfmSample = (tau * wfmFs + 1e-6).astype(np.int64)
+            for w in np.unique(wIndex).tolist():
+                mask = wIndex == w
+                wfm = np.asarray(wfms[w])
+                values[mask] *= wfm[np.minimum(wfmSample[mask], len(wfm) - 1)]
+
+        iq[n - s0] = values * np.exp(1j * phase)
+        yield iq
+
+
+def render_pdws(pdws, fs, cf=None, wfms=None, wfmFs=None, pdwFormat='analog', duration=None, chunkSize=1 << 20,
+                refPower=0, fpcEntries=pdwBuilder.DEFAULT_FPC_ENTRIES):
+    """
+    Renders PDWs to a single baseband IQ waveform. See render_chunks() for
+    arguments and rendering details.
+
+    Returns:
+        (NumPy array): Complex IQ waveform.
+    """
+
+    chunks = list(render_chunks(pdws, fs, cf, wfms, wfmFs, pdwFormat, duration, chunkSize, refPower, fpcEntries))
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.complex128)
@@ -0,0 +1,291 @@
+"""
+pdwScenario
+Author: Morgan Allison, Keysight RF/uW Application Engineer
+Compiles emitter descriptions into time-ordered PDWs for the UXG.
+Each emitter's pulse train (PRI pattern, frequency agility, and power
+vs. time from its antenna scan) is generated with vectorized NumPy
+operations, and the emitters are merged by start time into a single
+PdwTable that can be encoded, written to a PDW file, or streamed.
+"""
+
+import math
+
+import numpy as np
+
+from pyarbtools import error
+from pyarbtools import pdwBuilder
+
+
+def scan_gain(t, scanType='steady', scanPeriod=1, beamwidth=3, sidelobe=-30, scanOffset=0, sectorWidth=90):
+    """
+    Antenna gain in dB seen by a fixed receiver as an emitter's beam scans.
+    The main lobe is a sinc^2 pattern with the specified 3 dB beamwidth, and
+    gain never drops below the sidelobe level.
+    Args:
+        t (NumPy array): Times in seconds.
+        scanType (str): Scan pattern. ('steady', 'circular', 'sector')
+        scanPeriod (float): Time in seconds for one full rotation (circular) or one sweep and return (sector).
+        beamwidth (float): 3 dB beamwidth in degrees.
+        sidelobe (float): Sidelobe level in dB relative to the main lobe.
+        scanOffset (float): Scan position at t = 0 as a fraction of scanPeriod.
+        sectorWidth (float): Width of the sector in degrees, centered on the receiver.
+
+    Returns:
+        (NumPy array): Gain in dB for each time.
+    """
+
+    t = np.asarray(t, dtype=np.float64)
+    if scanType == 'steady':
+        return np.zeros(t.shape)
+
+    phase = (t / scanPeriod + scanOffset) % 1
+    if scanType == 'circular':
+        # Angle from the receiver, -180 to 180 degrees
+        angle = phase * 360 - 180
+    elif scanType == 'sector':
+        # Triangle wave from -sectorWidth/2 to sectorWidth/2 and back
+        angle = (1 - np.abs(2 * phase - 1)) * sectorWidth - sectorWidth / 2
+    else:
+        raise error.UXGError('Invalid scanType. Use "steady", "circular", or "sector".')
+
+    # sinc(0.443) is the 3 dB point of the sinc^2 pattern
+    pattern = np.abs(np.sinc(0.886 * angle / beamwidth))
+    with np.errstate(divide='ignore'):
+        gain = 20 * np.log10(pattern)
+    return np.maximum(gain, sidelobe)
+
+
+class Emitter:
+    """
+    Describes a pulsed emitter for the scenario compiler.
+
+    Attributes:
+        pri (float/list): Pulse repetition interval in seconds. Lists are used by 'stagger' and 'dwell' PRI types.
+        width (float): Pulse width in seconds.
+        freq (float/list): Carrier frequency in Hz, or a list of frequencies for frequency agility.
+        power (float): Peak power in dBm at the receiver, before antenna scan gain.
+        priType (str): PRI pattern. ('fixed', 'stagger', 'jitter', 'dwell')
+            'stagger' repeats the PRI list pulse to pulse, 'jitter' varies pri randomly by +/- jitter,
+            and 'dwell' switches between the PRIs in the list after dwellPulses pulses at each.
+        jitter (float): Maximum PRI deviation as a fraction of pri for 'jitter'.
+        dwellPulses (int/list): Number of pulses at each PRI for 'dwell'.
+        freqPattern (str): Frequency agility pattern when freq is a list. ('cycle', 'random')
+        freqDwell (int): Number of consecutive pulses at each frequency.
+        scanType (str): Antenna scan pattern. ('steady', 'circular', 'sector') See scan_gain().
+        scanPeriod (float): Scan period in seconds.
+        beamwidth (float): 3 dB beamwidth in degrees.
+        sidelobe (float): Sidelobe level in dB relative to the main lobe.
+        scanOffset (float): Scan position at t = 0 as a fraction of scanPeriod.
+        sectorWidth (float): Sector width in degrees for 'sector' scans.
+        powerFunc (function): Optional powerFunc(t) that returns a power offset in dB for an array of times.
+        startTime (float): Time of the first pulse in seconds.
+        fields (dict): Other PdwTable fields for this emitter's PDWs, e.g. {'wIndex': 2, 'markers': 0x1}.
+        seed (int): Random seed for jitter and random frequency agility.
+    """
+
+    def __init__(self, pri, width=1e-6, freq=1e9, power=0, priType='fixed', jitter=0, dwellPulses=1,
+                 freqPattern='cycle', freqDwell=1, scanType='steady', scanPeriod=1, beamwidth=3, sidelobe=-30,
+                 scanOffset=0, sectorWidth=90, powerFunc=None, startTime=0, fields=None, seed=None):
+        if priType not in ['fixed', 'stagger', 'jitter', 'dwell']:
+            raise error.UXGError('Invalid priType. Use "fixed", "stagger", "jitter", or "dwell".')
+        if freqPattern not in ['cycle', 'random']:
+            raise error.UXGError('Invalid freqPattern. Use "cycle" or "random".')
+        if not 0 <= jitter < 1:
+            raise error.UXGError('jitter must be between 0 and 1.')
+
+        pris = np.atleast_1d(np.asarray(pri, dtype=np.float64))
+        if pris.size == 0 or np.any(pris <= 0):
+            raise error.UXGError('pri must contain positive values.')
+        if priType in ['fixed', 'jitter'] and pris.size > 1:
+            raise error.UXGError(f'priType "{priType}" uses a single PRI.')
+
+        self.pri = pri
+        self.width = width
+        self.freq = freq
+        self.power = power
+        self.priType = priType
+        self.jitter = jitter
+        self.dwellPulses = dwellPulses
+        self.freqPattern = freqPattern
+        self.freqDwell = freqDwell
+        self.scanType = scanType
+        self.scanPeriod = scanPeriod
+        self.beamwidth = beamwidth
+        self.sidelobe = sidelobe
+        self.scanOffset = scanOffset
+        self.sectorWidth = sectorWidth
+        self.powerFunc = powerFunc
+        self.startTime = startTime
+        self.fields = fields or {}
+        self.seed = seed
+
+    def pri_pattern(self):
+        """
+        HELPER FUNCTION
+        Returns one period of the PRI sequence.
+        """
+
+        pris = np.atleast_1d(np.asarray(self.pri, dtype=np.float64))
+        if self.priType == 'dwell':
+            return np.repeat(pris, np.broadcast_to(self.dwellPulses, pris.shape))
+        return pris
+
+    def start_times(self, duration, rng):
+        """
+        Generates pulse start times from startTime up to (not including) duration.
+        Args:
+            duration (float): Scenario duration in seconds.
+            rng (NumPy Generator): Random number generator for jitter.
+
+        Returns:
+            (NumPy array): Start times in seconds.
+        """
+
+        if duration <= self.startTime:
+            return np.zeros(0)
+        pattern = self.pri_pattern()
+        if self.priType == 'jitter':
+            minPri = pattern[0] * (1 - self.jitter)
+        else:
+            minPri = pattern.min()
+        # Enough PRIs to reach duration even if every interval were the shortest one
+        numPulses = math.ceil((duration - self.startTime) / minPri) + 1
+
+        if self.priType == 'jitter':
+            pris = pattern[0] * (1 + self.jitter * rng.uniform(-1, 1, numPulses))
+        else:
+            pris = np.resize(pattern, numPulses)
+        times = np.empty(numPulses)
+        times[0] = self.startTime
+        np.cumsum(pris[:-1], out=times[1:])
+        times[1:] += self.startTime
+
+        return times[:np.searchsorted(times, duration)]
+
+    def frequencies(self, numPulses, rng):
+        """
+        Generates a carrier frequency for each pulse.
+        Args:
+            numPulses (int): Number of pulses.
+            rng (NumPy Generator): Random number generator for random frequency agility.
+
+        Returns:
+            (NumPy array): Frequencies in Hz.
+        """
+
+        freqs = np.atleast_1d(np.asarray(self.freq, dtype=np.float64))
+        if freqs.size == 1:
+            return np.full(numPulses, freqs[0])
+        numDwells = math.ceil(numPulses / self.freqDwell)
+        if self.freqPattern == 'cycle':
+            dwellIndex = np.arange(numDwells) % freqs.size
+        else:
+            dwellIndex = rng.integers(0, freqs.size, numDwells)
+        return np.repeat(freqs[dwellIndex], self.freqDwell)[:numPulses]
+
+    def generate(self, duration, pdwFormat='vector'):
+        """
+        Generates this emitter's PDWs.
+        Args:
+            duration (float): Scenario duration in seconds.
+            pdwFormat (str): PDW format. ('analog', 'vector', 'vector3')
+
+        Returns:
+            (dict): {fieldName: NumPy array} columns for PdwTable.extend().
+        """
+
+        rng = np.random.default_rng(self.seed)
+        times = self.start_times(duration, rng)
+        numPulses = len(times)
+
+        power = self.power + scan_gain(times, self.scanType, self.scanPeriod, self.beamwidth, self.sidelobe,
+                                       self.scanOffset, self.sectorWidth)
+        if self.powerFunc is not None:
+            power = power + self.powerFunc(times)
+
+        columns = {'startTimeSec': times, 'freq': self.frequencies(numPulses, rng)}
+        if pdwFormat == 'analog':
+            # Analog PDW power is a linear scale factor relative to the configured amplitude
+            columns['powerLin'] = 10 ** (power / 20)
+            columns['width'] = np.full(numPulses, self.width)
+        elif pdwFormat == 'vector3':
+            columns['powerDbm'] = power
+            columns['maxPower'] = np.full(numPulses, self.power)
+            columns['width'] = np.full(numPulses, self.width)
+        else:
+            columns['powerDbm'] = power
+
+        for name, value in self.fields.items():
+            columns[name] = np.broadcast_to(value, (numPulses,))
+
+        return columns
+
+
+class Scenario:
+    """
+    Compiles a set of emitters into a single time-ordered PdwTable.
+
+    Example:
+        scenario = Scenario(duration=1, pdwFormat='vector')
+        scenario.add_emitter(Emitter(pri=100e-6, freq=[9.1e9, 9.3e9], scanType='circular', scanPeriod=0.2))
+        scenario.add_emitter(Emitter(pri=[80e-6, 95e-6], priType='stagger', freq=3e9, power=-20))
+        pdws = scenario.compile()
+        pdwFile = uxg.bin_pdw_file_builder(pdws)
+
+    Attributes:
+        duration (float): Scenario duration in seconds.
+        pdwFormat (str): PDW format. ('analog', 'vector', 'vector3')
+        emitters (list(Emitter)): Emitters in the scenario.
+    """
+
+    def __init__(self, duration, pdwFormat='vector'):
+        if pdwFormat not in pdwBuilder.PDW_FIELDS:
+            raise error.UXGError(f'Invalid pdwFormat. Use one of {", ".join(pdwBuilder.PDW_FIELDS)}.')
+        self.duration = duration
+        self.pdwFormat = pdwFormat
+        self.emitters = []
+
+    def add_emitter(self, emitter):
+        """
+        Adds an emitter to the scenario.
+        Args:
+            emitter (Emitter): Emitter description.
+        """
+
+        self.emitters.append(emitter)
+
+    def compile(self, terminate=True):
+        """
+        Generates every emitter's PDWs and merges them by start time.
+        Pulses with equal start times keep emitter order.
+        Args:
+            terminate (bool): Sets the operation field of the first PDW to 1 and
+                appends a final PDW with operation 2 at the end of the scenario.
+
+        Returns:
+            (PdwTable): Time-ordered PDWs.
+        """
+
+        trains = [e.generate(self.duration, self.pdwFormat) for e in self.emitters]
+        trains = [t for t in trains if len(t['startTimeSec'])]
+        table = pdwBuilder.PdwTable(self.pdwFormat)
+        if trains:
+            fields = [f for f in table.fields if any(f in t for t in trains)]
+            startTimes = np.concatenate([t['startTimeSec'] for t in trains])
+            # Each pulse train is already sorted, so a stable sort only merges the sorted runs
+            order = np.argsort(startTimes, kind='stable')
+            defaults = pdwBuilder.PDW_DEFAULTS[self.pdwFormat]
+            table.reserve(len(startTimes) + int(terminate))
+            columns = {}
+            for name in fields:
+                column = np.concatenate([np.broadcast_to(t.get(name, defaults.get(name, 0)),
+                                                         t['startTimeSec'].shape) for t in trains])
+                columns[name] = column[order]
+            table.extend(columns)
+
+        if terminate:
+            if len(table):
+                table.operation[0] = 1
+            table.append(operation=2, startTimeSec=self.duration)
+
+        return table
@@ -0,0 +1,700 @@
+"""
+pdwStreaming
+Author: Morgan Allison, Keysight RF/uW Application Engineer
+Continuous PDW streaming to the UXG over the LAN streaming port (5033).
+A producer thread encodes PDWs into binary blocks while a sender thread
+writes them to the streaming socket. A bounded queue between the two
+provides backpressure so memory use stays constant no matter how many
+PDWs are streamed.
+
+AsyncBurstScheduler streams repeating bursts to an AnalogUXG from
+asyncio, paced against the PDW start time clock so several UXGs can be
+fed from one process.
+"""
+
+import asyncio
+import collections
+import functools
+import queue
+import socket
+import threading
+import time
+
+import numpy as np
+
+from pyarbtools import error
+from pyarbtools import pdwBuilder
+
+# Maximum number of buffers passed to a single sendmsg() call
+MAX_GATHER = 64
+
+
+def encode_vector_pdws(pdwList):
+    """
+    HELPER FUNCTION
+    Encodes a list of VectorUXG PDWs into raw binary PDW data.
+    Args:
+        pdwList (list/PdwTable): List of lists. Each inner list contains the arguments
+            for pdwBuilder.vector_bin_pdw_builder().
+
+    Returns:
+        (bytes): Raw binary PDWs without file header.
+    """
+
+    columns = pdwBuilder.pdw_columns(pdwList, 'vector')
+    return pdwBuilder.vector_bin_pdw_array_builder(*columns).tobytes() if columns else b''
+
+
+def encode_analog_pdws(pdwList):
+    """
+    HELPER FUNCTION
+    Encodes a list of AnalogUXG PDWs into raw binary PDW data.
+    Args:
+        pdwList (list/PdwTable): List of lists. Each inner list contains the arguments
+            for pdwBuilder.analog_bin_pdw_builder().
+
+    Returns:
+        (bytes): Raw binary PDWs without file header.
+    """
+
+    columns = pdwBuilder.pdw_columns(pdwList, 'analog')
+    return pdwBuilder.analog_bin_pdw_array_builder(*columns).tobytes() if columns else b''
+
+
+def encode_burst(burstFactory, index, offsetPs, first, encoder=encode_analog_pdws):
+    """
+    HELPER FUNCTION
+    Builds and encodes one burst of AnalogUXG PDWs, then moves it to its
+    place on the stream time line. Start times are offset with integer
+    picosecond arithmetic on the encoded words, so timing stays exact no
+    matter how long the stream runs.
+    Args:
+        burstFactory (function): burstFactory(index) returns the PDWs for a burst with start times relative to the burst.
+        index (int): Burst number.
+        offsetPs (int): Stream start time of the burst in picoseconds.
+        first (bool): Marks the first PDW as the first PDW of the stream (operation 1).
+        encoder (function): Converts a list of PDWs into bytes.
+
+    Returns:
+        (tuple): (number of PDWs, encoded burst)
+    """
+
+    pdws = np.frombuffer(encoder(burstFactory(index)), dtype=np.uint32).reshape(-1, 7).copy()
+    offset_start_times(pdws, offsetPs)
+    # Operation field is bits 3-4 of word 0
+    pdws[:, 0] &= np.uint32(~0x18 & 0xFFFFFFFF)
+    if first:
+        pdws[0, 0] |= np.uint32(1 << 3)
+
+    return len(pdws), pdws.tobytes()
+
+
+def offset_start_times(pdws, offsetPs):
+    """
+    HELPER FUNCTION
+    Adds an offset to the start time of encoded analog or vector PDWs in place.
+    Args:
+        pdws (NumPy array): N x words array of uint32 PDW words.
+        offsetPs (int): Offset in picoseconds.
+    """
+
+    # Words 2 and 3 hold the start time in picoseconds
+    startPs = pdws[:, 2].astype(np.uint64) | (pdws[:, 3].astype(np.uint64) << np.uint64(32))
+    startPs += np.uint64(offsetPs)
+    pdws[:, 2] = (startPs & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+    pdws[:, 3] = (startPs >> np.uint64(32)).astype(np.uint32)
+
+
+def vector_stream_header():
+    """
+    HELPER FUNCTION
+    Builds the 4096 byte PDW file header sent to the VectorUXG with
+    stream:external:header? before PDWs are streamed.
+
+    Returns:
+        (bytes): PDW file header.
+    """
+
+    return pdwBuilder.vector_bin_pdw_file_builder([])
+
+
+def send_buffers(sock, buffers):
+    """
+    HELPER FUNCTION
+    Sends a list of buffers with as few system calls as possible. Uses a
+    gathering sendmsg() where available and resends any partially sent
+    buffers.
+    Args:
+        sock (socket): Connected socket.
+        buffers (list(bytes)): Data to send in order.
+    """
+
+    if not hasattr(sock, 'sendmsg'):
+        for b in buffers:
+            sock.sendall(b)
+        return
+
+    views = [memoryview(b).cast('B') for b in buffers]
+    while views:
+        sent = sock.sendmsg(views[:MAX_GATHER])
+        # Drop the buffers that were sent completely and trim a partially sent one
+        while sent:
+            if sent >= len(views[0]):
+                sent -= len(views[0])
+                views.pop(0)
+            else:
+                views[0] = views[0][sent:]
+                sent = 0
+        while views and not len(views[0]):
+            views.pop(0)
+
+
+def send_stream_header(inst, header):
+    """
+    HELPER FUNCTION
+    Clears the stream header to prepare for a new stream and sends the
+    header of a PDW file with stream:external:header?.
+    Args:
+        inst (VectorUXG/AnalogUXG): Instrument object.
+        header (bytes/memoryview): PDW file header.
+    """
+
+    inst.write('stream:external:header:clear')
+    inst.binblockwrite('stream:external:header? ', header)
+    response = inst.read()
+    if response.strip() != '+0':
+        raise error.UXGError(f'stream:external:header? response invalid: "{response}".')
+
+
+class PdwStreamSession:
+    """
+    Streams PDWs to a UXG over LAN from any iterable, including
+    generators that produce PDWs indefinitely.
+
+    Example:
+        with PdwStreamSession(uxg, pdwGenerator()) as session:
+            uxg.write('stream:trigger:play:immediate')
+            session.wait()
+        print(session.stats())
+
+    Attributes:
+        inst (VectorUXG/AnalogUXG): Instrument object. Streaming source must be set to LAN.
+        pdws (iterable/PdwTable): PDWs to stream. Each item is one PDW in the format accepted by encoder.
+        encoder (function): Converts a list of PDWs into bytes.
+        header (bytes): PDW file header sent with stream:external:header? before streaming. None skips the handshake.
+        chunkSize (int): Number of PDWs encoded into each block.
+        queueDepth (int): Maximum number of encoded blocks waiting to be sent.
+        streamPort (int): LAN streaming port.
+        timeout (float): Socket timeout in seconds.
+        pdwsQueued (int): Number of PDWs encoded so far.
+        pdwsSent (int): Number of PDWs sent so far.
+        bytesSent (int): Number of bytes sent so far.
+        underruns (int): Number of times the sender had to wait for the producer after streaming started.
+        underrunTime (float): Total time in seconds the sender spent waiting for the producer.
+        producerStalls (int): Number of times the producer had to wait for the sender (backpressure).
+        maxQueued (int): Largest number of blocks waiting to be sent.
+    """
+
+    def __init__(self, inst, pdws, encoder=None, header=None, chunkSize=4096, queueDepth=16, streamPort=5033,
+                 timeout=10):
+        if not isinstance(chunkSize, int) or chunkSize < 1:
+            raise ValueError('chunkSize must be a positive integer.')
+        if not isinstance(queueDepth, int) or queueDepth < 1:
+            raise ValueError('queueDepth must be a positive integer.')
+
+        self.inst = inst
+        self.pdws = pdws
+        self.chunkSize = chunkSize
+        self.queueDepth = queueDepth
+        self.streamPort = streamPort
+        self.timeout = timeout
+
+        # The VectorUXG needs the file header before raw PDWs, the AnalogUXG accepts raw PDWs directly
+        if inst.pdwFormat == 'analog':
+            self.encoder = encoder or inst.bin_raw_pdw_block_builder
+            self.header = header
+        else:
+            self.encoder = encoder or encode_vector_pdws
+            self.header = header if header is not None else vector_stream_header()
+
+        self.sock = None
+        self.blocks = queue.Queue(maxsize=queueDepth)
+        self.stopEvent = threading.Event()
+        self.threads = []
+        self.errors = []
+
+        self.pdwsQueued = 0
+        self.pdwsSent = 0
+        self.bytesSent = 0
+        self.underruns = 0
+        self.underrunTime = 0
+        self.producerStalls = 0
+        self.maxQueued = 0
+        self.startTime = None
+        self.stopTime = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if excType is None:
+            self.wait()
+        else:
+            self.stop()
+
+    def start(self):
+        """Sends the stream header, enables streaming, opens the streaming socket, and starts streaming PDWs."""
+
+        if self.header is not None:
+            send_stream_header(self.inst, self.header)
+
+        self.inst.write('stream:state on')
+        self.inst.query('*opc?')
+        self.sock = socket.create_connection((self.inst.host, self.streamPort), timeout=self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self.startTime = time.perf_counter()
+        self.threads = [threading.Thread(target=self.produce, daemon=True),
+                        threading.Thread(target=self.send, daemon=True)]
+        for t in self.threads:
+            t.start()
+
+    def put(self, block):
+        """
+        HELPER FUNCTION
+        Adds a block to the send queue, waiting while the queue is full.
+        Args:
+            block (tuple): (number of PDWs, encoded PDWs), or None to mark the end of the stream.
+
+        Returns:
+            (bool): False if the session was stopped while waiting.
+        """
+
+        try:
+            self.blocks.put_nowait(block)
+        except queue.Full:
+            # Backpressure: the sender can't keep up, wait for room in the queue
+            self.producerStalls += 1
+            while True:
+                if self.stopEvent.is_set():
+                    return False
+                try:
+                    self.blocks.put(block, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+        self.maxQueued = max(self.maxQueued, self.blocks.qsize())
+        return True
+
+    def produce(self):
+        """
+        HELPER FUNCTION
+        Producer thread. Encodes PDWs in chunks and queues them for the sender.
+        """
+
+        try:
+            for chunk in self.chunks():
+                if not self.put((len(chunk), self.encoder(chunk))):
+                    return
+                self.pdwsQueued += len(chunk)
+        except Exception as e:
+            self.errors.append(e)
+            self.stopEvent.set()
+        finally:
+            self.put(None)
+
+    def chunks(self):
+        """
+        HELPER FUNCTION
+        Splits pdws into chunks of up to chunkSize PDWs. PdwTables are
+        sliced so the encoder gets columns instead of rows.
+        """
+
+        if isinstance(self.pdws, pdwBuilder.PdwTable):
+            for i in range(0, len(self.pdws), self.chunkSize):
+                yield self.pdws[i:i + self.chunkSize]
+            return
+
+        chunk = []
+        for pdw in self.pdws:
+            chunk.append(pdw)
+            if len(chunk) == self.chunkSize:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def get(self):
+        """
+        HELPER FUNCTION
+        Waits for the next block in the send queue.
+
+        Returns:
+            (tuple): (number of PDWs, encoded PDWs), or None at the end of the stream or if the session was stopped.
+        """
+
+        while not self.stopEvent.is_set():
+            try:
+                return self.blocks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+
+    def send(self):
+        """
+        HELPER FUNCTION
+        Sender thread. Sends every block that is ready with a single gathering send.
+        """
+
+        try:
+            while True:
+                try:
+                    items = [self.blocks.get_nowait()]
+                except queue.Empty:
+                    # Waiting after the first block has been sent means the instrument may be starved
+                    waitStart = time.perf_counter()
+                    items = [self.get()]
+                    if self.pdwsSent:
+                        self.underruns += 1
+                        self.underrunTime += time.perf_counter() - waitStart
+
+                # Collect any other blocks that are already waiting
+                while items[-1] is not None and len(items) < MAX_GATHER:
+                    try:
+                        items.append(self.blocks.get_nowait())
+                    except queue.Empty:
+                        break
+
+                done = items[-1] is None
+                blocks = [i for i in items if i is not None]
+                if blocks and not self.stopEvent.is_set():
+                    send_buffers(self.sock, [data for _, data in blocks])
+                    self.pdwsSent += sum(count for count, _ in blocks)
+                    self.bytesSent += sum(len(data) for _, data in blocks)
+                if done or self.stopEvent.is_set():
+                    break
+        except Exception as e:
+            self.errors.append(e)
+            self.stopEvent.set()
+            # Unblock the producer
+            while True:
+                try:
+                    self.blocks.get_nowait()
+                except queue.Empty:
+                    break
+        finally:
+            self.stopTime = time.perf_counter()
+
+    def wait(self, timeout=None):
+        """
+        Waits until all PDWs have been sent, then closes the streaming socket.
+        Args:
+            timeout (float): Maximum time to wait in seconds. Default waits indefinitely.
+        """
+
+        end = None if timeout is None else time.perf_counter() + timeout
+        for t in self.threads:
+            t.join(None if end is None else max(end - time.perf_counter(), 0))
+            if t.is_alive():
+                raise error.UXGError('Timed out waiting for PDW stream to finish.')
+        self.close()
+
+    def stop(self):
+        """Stops streaming immediately, discards PDWs that have not been sent, and closes the streaming socket."""
+        self.stopEvent.set()
+        for t in self.threads:
+            t.join()
+        self.close()
+
+    def close(self):
+        """
+        HELPER FUNCTION
+        Closes the streaming socket and raises any error from the producer or sender threads.
+        """
+
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+        if self.errors:
+            raise error.UXGError(f'PDW streaming failed: {self.errors[0]}') from self.errors[0]
+
+    def stats(self):
+        """
+        Returns streaming metrics.
+
+        Returns:
+            (dict): PDWs and bytes sent, elapsed time, PDW and byte throughput,
+                underrun count/time, producer stalls, and peak queue depth.
+        """
+
+        if self.startTime is None:
+            elapsed = 0
+        else:
+            elapsed = (self.stopTime or time.perf_counter()) - self.startTime
+        return {'pdwsSent': self.pdwsSent,
+                'bytesSent': self.bytesSent,
+                'elapsed': elapsed,
+                'pdwRate': self.pdwsSent / elapsed if elapsed else 0,
+                'byteRate': self.bytesSent / elapsed if elapsed else 0,
+                'underruns': self.underruns,
+                'underrunTime': self.underrunTime,
+                'producerStalls': self.producerStalls,
+                'maxQueued': self.maxQueued}
+
+
+class AsyncBurstScheduler:
+    """
+    Streams an endless (or fixed length) series of PDW bursts to an
+    AnalogUXG, keeping a target lead time ahead of the PDW start time
+    clock. Sending too early overruns the UXG's PDW buffer and sending
+    too late starves it, so each burst is sent leadTime seconds before it
+    starts. Bursts are built and encoded ahead of time in an executor so
+    the event loop is free to feed other instruments.
+
+    Example:
+        async def main():
+            async with AsyncAnalogUXG(ip1) as uxg1, AsyncAnalogUXG(ip2) as uxg2:
+                s1 = AsyncBurstScheduler(uxg1, burst, burstPeriod=0.5)
+                s2 = AsyncBurstScheduler(uxg2, burst, burstPeriod=0.5)
+                await asyncio.gather(s1.run(numBursts=100), s2.run(numBursts=100))
+
+    Attributes:
+        inst (AsyncAnalogUXG): Connected async instrument object. Streaming source must be set to LAN.
+        burstFactory (function): burstFactory(index) returns a list of PDWs (analog_bin_pdw_builder() arguments)
+            with start times relative to the start of burst number index.
+        burstPeriod (float): Time in seconds between the starts of consecutive bursts.
+        leadTime (float): Target time in seconds between sending a burst and its start time.
+        startDelay (float): Stream start time of the first burst in seconds.
+        prefetch (int): Number of bursts encoded ahead of time.
+        executor (Executor): Executor used to build and encode bursts. Default is the event loop's default
+            executor. A ProcessPoolExecutor can be used if burstFactory can be pickled.
+        streamPort (int): LAN streaming port.
+        burstsSent (int): Number of bursts sent so far.
+        pdwsSent (int): Number of PDWs sent so far.
+        bytesSent (int): Number of bytes sent so far.
+        lateBursts (int): Number of bursts sent after their start time.
+        minLead (float): Smallest lead time in seconds of any burst sent so far.
+    """
+
+    def __init__(self, inst, burstFactory, burstPeriod, leadTime=0.1, startDelay=None, prefetch=4, executor=None,
+                 streamPort=5033):
+        if not isinstance(burstPeriod, (int, float)) or burstPeriod <= 0:
+            raise ValueError('burstPeriod must be a positive value.')
+        if not isinstance(leadTime, (int, float)) or leadTime < 0:
+            raise ValueError('leadTime must be a non-negative value.')
+        if not isinstance(prefetch, int) or prefetch < 1:
+            raise ValueError('prefetch must be a positive integer.')
+
+        self.inst = inst
+        self.burstFactory = burstFactory
+        self.burstPeriod = burstPeriod
+        self.leadTime = leadTime
+        self.startDelay = leadTime if startDelay is None else startDelay
+        self.prefetch = prefetch
+        self.executor = executor
+        self.streamPort = streamPort
+
+        self.stopRequested = False
+        self.burstsSent = 0
+        self.pdwsSent = 0
+        self.bytesSent = 0
+        self.lateBursts = 0
+        self.minLead = None
+        self.startTime = None
+        self.stopTime = None
+
+    def burst_offset(self, index):
+        """
+        HELPER FUNCTION
+        Returns the stream start time of a burst in integer picoseconds.
+        Args:
+            index (int): Burst number.
+
+        Returns:
+            (int): Start time in picoseconds.
+        """
+
+        return int(round(self.startDelay * 1e12)) + index * int(round(self.burstPeriod * 1e12))
+
+    async def run(self, numBursts=None, trigger=True):
+        """
+        Turns on streaming, connects to the streaming port, optionally
+        triggers playback, and streams bursts until numBursts have been sent
+        or stop() is called.
+        Args:
+            numBursts (int): Number of bursts to stream. Default streams until stop() is called.
+            trigger (bool): Sends stream:trigger:play:immediate to start playback. If False, playback
+                must be triggered externally (for example with the configured stream trigger source) when
+                run() is called.
+        """
+
+        loop = asyncio.get_running_loop()
+        await self.inst.write('stream:state on')
+        await self.inst.query('*opc?')
+        reader, writer = await asyncio.open_connection(self.inst.host, self.streamPort)
+        writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        pending = collections.deque()
+        nextIndex = 0
+
+        def schedule():
+            nonlocal nextIndex
+            while len(pending) < self.prefetch and (numBursts is None or nextIndex < numBursts):
+                job = functools.partial(encode_burst, self.burstFactory, nextIndex, self.burst_offset(nextIndex),
+                                        nextIndex == 0)
+                pending.append(loop.run_in_executor(self.executor, job))
+                nextIndex += 1
+
+        try:
+            schedule()
+            if trigger:
+                await self.inst.write('stream:trigger:play:immediate')
+                await self.inst.query('*opc?')
+            self.startTime = loop.time()
+
+            index = 0
+            while pending and not self.stopRequested:
+                count, data = await pending.popleft()
+                schedule()
+
+                # Wait until the burst is leadTime ahead of the stream clock
+                burstStart = self.startTime + self.burst_offset(index) / 1e12
+                delay = burstStart - self.leadTime - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                writer.write(data)
+                await writer.drain()
+                lead = burstStart - loop.time()
+                if lead < 0:
+                    self.lateBursts += 1
+                self.minLead = lead if self.minLead is None else min(self.minLead, lead)
+                self.burstsSent += 1
+                self.pdwsSent += count
+                self.bytesSent += len(data)
+                index += 1
+        finally:
+            for job in pending:
+                job.cancel()
+            self.stopTime = loop.time()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    def stop(self):
+        """Stops streaming after the burst currently being sent."""
+        self.stopRequested = True
+
+    def stats(self):
+        """
+        Returns streaming metrics.
+
+        Returns:
+            (dict): Bursts, PDWs, and bytes sent, elapsed time, PDW rate,
+                late bursts, and minimum lead time.
+        """
+
+        if self.startTime is None:
+            elapsed = 0
+        else:
+            # The event loop clock is time.monotonic()
+            elapsed = (self.stopTime or time.monotonic()) - self.startTime
+        return {'burstsSent': self.burstsSent,
+                'pdwsSent': self.pdwsSent,
+                'bytesSent': self.bytesSent,
+                'elapsed': elapsed,
+                'pdwRate': self.pdwsSent / elapsed if elapsed else 0,
+                'lateBursts': self.lateBursts,
+                'minLead': self.minLead}
+
+
+def replay_pdw_file(inst, fileName, loops=1, loopPeriod=None, streamPort=5033, chunkSize=65536, timeout=10):
+    """
+    Streams a binary PDW file from disk to a UXG over LAN. The file is
+    memory-mapped and the first pass is sent with socket.sendfile(), so the
+    PDWs are never copied into Python. Later loops are moved along the
+    stream time line by adding loop * loopPeriod to the start time words of
+    each chunk, so the scenario repeats seamlessly. Only the first PDW keeps
+    operation 1, and a final PDW with operation 2 is sent once at the end of
+    the last loop.
+
+    Example:
+        stats = replay_pdw_file(uxg, 'scenario.pdw', loops=10)
+    Args:
+        inst (VectorUXG/AnalogUXG): Instrument object. Streaming source must be set to LAN.
+        fileName (str): Binary PDW file built by bin_pdw_file_builder() or PdwFileWriter.
+        loops (int): Number of times to play the file.
+        loopPeriod (float): Time in seconds between loop starts. Default is the start time of the
+            last PDW, which must have operation 2 (the end of the scenario), when loops > 1.
+        streamPort (int): LAN streaming port.
+        chunkSize (int): Number of PDWs rebased and sent at a time for loops after the first.
+        timeout (float): Socket timeout in seconds.
+
+    Returns:
+        (dict): PDWs and bytes sent, elapsed time, and PDW and byte throughput.
+    """
+
+    if not isinstance(loops, int) or loops < 1:
+        raise ValueError('loops must be a positive integer.')
+    if not isinstance(chunkSize, int) or chunkSize < 1:
+        raise ValueError('chunkSize must be a positive integer.')
+
+    with pdwBuilder.PdwFileReader(fileName) as reader:
+        # The VectorUXG needs the file header before raw PDWs, the AnalogUXG accepts raw PDWs directly
+        if reader.pdwFormat != inst.pdwFormat:
+            raise error.UXGError(f'{fileName} contains {reader.pdwFormat} PDWs, but the instrument streams '
+                                 f'{inst.pdwFormat} PDWs.')
+        analog = inst.pdwFormat == 'analog'
+        numPdws = len(reader)
+        pdwBytes = reader.words.itemsize
+        words = reader.words.view(np.uint32).reshape(numPdws, -1) if numPdws else np.zeros((0, 7), np.uint32)
+
+        # Operation field is bits 3-4 of word 0
+        endMarker = numPdws > 0 and (int(words[-1, 0]) >> 3) & 0x3 == 2
+        if loops > 1:
+            if loopPeriod is None:
+                if not endMarker:
+                    raise error.UXGError('Specify loopPeriod, the last PDW in the file does not have operation 2.')
+                loopPeriod = float(reader.field('startTimeSec', numPdws - 1)[0])
+            if loopPeriod <= 0:
+                raise error.UXGError('loopPeriod must be a positive value.')
+        periodPs = round((loopPeriod or 0) * 1e12)
+
+        if not analog:
+            send_stream_header(inst, bytes(reader.mmap[:reader.pdwOffset]))
+        inst.write('stream:state on')
+        inst.query('*opc?')
+
+        pdwsSent = 0
+        startTime = time.perf_counter()
+        with socket.create_connection((inst.host, streamPort), timeout=timeout) as sock:
+            for loop in range(loops):
+                # The end marker is only sent after the last loop
+                count = numPdws - 1 if endMarker and loop < loops - 1 else numPdws
+                if loop == 0:
+                    reader.fileObj.seek(0)
+                    sock.sendfile(reader.fileObj, reader.pdwOffset, count * pdwBytes)
+                else:
+                    for i in range(0, count, chunkSize):
+                        chunk = words[i:min(i + chunkSize, count)].copy()
+                        offset_start_times(chunk, loop * periodPs)
+                        if i == 0:
+                            chunk[0, 0] &= np.uint32(~0x18 & 0xFFFFFFFF)
+                        sock.sendall(chunk)
+                pdwsSent += count
+            elapsed = time.perf_counter() - startTime
+        del words
+
+    bytesSent = pdwsSent * pdwBytes
+    return {'pdwsSent': pdwsSent,
+            'bytesSent': bytesSent,
+            'elapsed': elapsed,
+            'pdwRate': pdwsSent / elapsed if elapsed else 0,
+            'byteRate': bytesSent / elapsed if elapsed else 0}
@@ -0,0 +1,731 @@
+"""
+simulator
+Author: Morgan Allison, Keysight RF/uW Application Engineer
+Local TCP stand-in for the instruments controlled by PyArbTools. It
+emulates the subset of SCPI used by the instrument classes so that
+driver behavior and download/streaming performance can be developed and
+tested without hardware.
+
+Example:
+    with InstrumentSimulator('VSG', latency=1e-3, bandwidth=50e6) as sim:
+        vsg = pyarbtools.instruments.VSG('127.0.0.1', port=sim.port)
+        vsg.configure(cf=1e9, amp=-10)
+
+Emulated behavior:
+    * Settings commands are stored and returned by the matching query.
+      "on"/"off" arguments are stored as 1/0.
+    * *idn?, *opc?, *rst, *cls, and the system:error? queue.
+    * Acquisitions (initiate:immediate) and autoranging take
+      acquisitionTime seconds. *opc? blocks until they finish, and
+      *opc sets the operation complete bit in *esr? when they finish. The
+      bit stays set until *esr? reads it or *cls clears it.
+    * Binary block writes are parsed at line rate and stored in file
+      memory (mmemory:data/memory:data) or AWG segment memory
+      (trace:def/trace:data/trace:catalog?/trace:delete), and AWG
+      sequence tables (stable:data/stable:reset).
+    * Dynamic sequence selection (stable:dynamic:select). The sequencer
+      state query reports the new entry sequenceSwitchTime seconds later.
+    * AWG run state. initiate:immediate starts both channels, abort stops
+      them, and status:operation:run:condition? reports them as bits 0 and 1.
+    * File deletion and catalog queries.
+    * A stream sink (port 5033 on the UXG) that consumes PDW data.
+    * VSA trace queries (trace<n>:data:x?/y?) in ASCII or binary block
+      format, as selected by format:trace:data.
+"""
+
+import re
+import socket
+import socketserver
+import threading
+import time
+
+import numpy as np
+
+IDN = {
+    'M8190A': 'Agilent Technologies,M8190A,SIM00001,5.4.0.0',
+    'M8195A': 'Keysight Technologies,M8195A,SIM00001,3.2.0.0',
+    'VSG': 'Keysight Technologies,N5182B,SIM00001,B.01.86',
+    'VXG': 'Keysight Technologies,M9384B,SIM00001,1.0.0',
+    'AnalogUXG': 'Keysight Technologies,N5193A,SIM00001,1.0.0',
+    'VectorUXG': 'Keysight Technologies,N5194A,SIM00001,1.0.0',
+    'VSA': 'Keysight Technologies,89601B,SIM00001,22.21',
+}
+
+DEFAULTS = {
+    'M8190A': {
+        'trace1:dwidth': 'WSP', 'trace2:dwidth': 'WSP',
+        'func1:mode': 'ARB', 'func2:mode': 'ARB',
+        'frequency:raster:source': 'INT', 'frequency:raster': '7200000000', 'frequency:raster:external': '7200000000',
+        'roscillator:source': 'AXI', 'roscillator:frequency': '100000000',
+        'output1:route': 'DAC', 'output2:route': 'DAC',
+        'carrier1:freq': '0,0', 'carrier2:freq': '0,0',
+        'dac1:voltage:amplitude': '0.7', 'dac2:voltage:amplitude': '0.7',
+        'dc1:voltage:amplitude': '0.7', 'dc2:voltage:amplitude': '0.7',
+        'ac1:voltage:amplitude': '0.7', 'ac2:voltage:amplitude': '0.7',
+    },
+    'M8195A': {
+        'inst:dacm': 'SING', 'frequency:raster': '64000000000', 'func:mode': 'ARB', 'roscillator:source': 'AXI',
+        'roscillator:frequency': '100000000', 'voltage1': '0.3', 'voltage2': '0.3', 'voltage3': '0.3',
+        'voltage4': '0.3',
+    },
+    'VSG': {
+        'output': '0', 'output:modulation': '0', 'frequency': '1000000000', 'power': '-20', 'power:alc': '1',
+        'roscillator:source': 'INT', 'radio:arb': '0', 'radio:arb:sclock:rate': '200000000',
+        'radio:arb:rscaling': '70',
+    },
+    'VXG': {
+        'roscillator:source': 'INT',
+        **{k.format(ch=ch): v for ch in [1, 2] for k, v in {
+            'rf{ch}:output': '0', 'rf{ch}:output:modulation': '0', 'rf{ch}:frequency': '1000000000',
+            'rf{ch}:power': '-20', 'rf{ch}:power:alc': '1', 'signal{ch}': '0',
+            'signal{ch}:waveform:scale': '70', 'signal{ch}:waveform:sclock:rate': '200000000'}.items()},
+    },
+    'AnalogUXG': {
+        'inst:select': 'STR', 'output': '0', 'output:modulation': '0', 'stream': '0', 'frequency': '1000000000',
+        'power': '-20', 'roscillator:source': 'INT',
+    },
+    'VectorUXG': {
+        'output': '0', 'output:modulation': '0', 'radio:arb': '0', 'stream': '0', 'frequency': '1000000000',
+        'power': '-20', 'radio:arb:rscaling': '70', 'roscillator:source': 'INT',
+        'radio:arb:sclock:rate': '250000000', 'radio:arb:information:quantum': '4',
+        'radio:arb:information:slength:minimum': '128',
+    },
+    'VSA': {
+        'sense:frequency:center': '1000000000', 'input:analog:range:dbm': '0', 'sense:frequency:span': '36000000',
+        'measure:configure': 'VECT', 'sense:rbw': '3000', 'sense:time:length': '0.001',
+        'system:vsa:hardware:configuration:catalog': '"Analyzer1","Analyzer2"',
+        'system:vsa:hardware:configuration:select': '"Analyzer1"', 'format:trace:data': 'ASC',
+    },
+}
+
+NO_ERROR = '+0,"No error"'
+
+
+def normalize_header(header):
+    """
+    HELPER FUNCTION
+    Converts a SCPI command header to the key used to store its value.
+    Removes leading colons, the optional SOURce node, and the optional
+    trailing STATe node so that, for example, "source:rf1:output:state"
+    and "rf1:output" refer to the same setting.
+    Args:
+        header (str): SCPI command header without arguments.
+
+    Returns:
+        (str): Normalized header.
+    """
+
+    header = header.strip().lstrip(':').lower().rstrip('?')
+    if header.startswith('source:'):
+        header = header[len('source:'):]
+    elif header.startswith('sour:'):
+        header = header[len('sour:'):]
+    if header.endswith(':state'):
+        header = header[:-len(':state')]
+    return header
+
+
+def split_message(msg):
+    """
+    HELPER FUNCTION
+    Splits a SCPI program message into individual commands, ignoring
+    semicolons inside quoted strings.
+    Args:
+        msg (str): SCPI program message.
+
+    Returns:
+        (list(str)): Individual commands.
+    """
+
+    cmds = []
+    start = 0
+    inQuote = False
+    for idx, char in enumerate(msg):
+        if char == '"':
+            inQuote = not inQuote
+        elif char == ';' and not inQuote:
+            cmds.append(msg[start:idx])
+            start = idx + 1
+    cmds.append(msg[start:])
+    return [c.strip() for c in cmds if c.strip()]
+
+
+class InstrumentSimulator:
+    """
+    Simulated SCPI instrument served over TCP on the local machine.
+
+    Attributes:
+        model (str): Simulated instrument ('M8190A', 'M8195A', 'VSG', 'VXG', 'AnalogUXG', 'VectorUXG', 'VSA').
+        host (str): Address the server listens on.
+        port (int): SCPI port. Use 0 to pick a free port; the chosen port is stored here after start().
+        streamPort (int): Stream sink port (5033 on the UXG). None disables the sink, 0 picks a free port.
+        latency (float): Delay in seconds added before each response.
+        bandwidth (float): Maximum binary data rate in bytes/sec. None means unlimited.
+        keepStream (bool): Keeps a copy of all stream data in streamData.
+        acquisitionTime (float): Time in seconds taken by each acquisition or autorange.
+        sequenceSwitchTime (float): Time in seconds before a dynamically selected AWG sequence starts playing.
+        state (dict): Current settings, keyed by normalized header.
+        memory (dict): Files stored by binary block writes, {name: bytes}.
+        segments (dict): AWG segment memory, {channel: {segment: bytearray}}.
+        segmentNames (dict): AWG segment names, {channel: {segment: name}}.
+        sequenceTables (dict): AWG sequence table words, {channel: [uint32, ...]}.
+        errors (list(str)): Error queue.
+        log (list(str)): Received commands. Binary payloads are logged as their size only.
+        stats (dict): Counters for messages, queries, responses, binary bytes, stream bytes, and acquisitions.
+        streamData (bytearray): Stream data received if keepStream is True.
+        traces (dict): VSA trace data returned by trace<n>:data:x?/y?, {trace: (x, y)}.
+    """
+
+    def __init__(self, model='VSG', host='127.0.0.1', port=0, streamPort=None, latency=0, bandwidth=None,
+                 keepStream=False, acquisitionTime=0, sequenceSwitchTime=0):
+        if model not in IDN:
+            raise ValueError(f'Invalid model "{model}". Choose from {list(IDN.keys())}.')
+        if latency < 0:
+            raise ValueError('latency must be a non-negative value.')
+        if bandwidth is not None and bandwidth <= 0:
+            raise ValueError('bandwidth must be a positive value.')
+
+        self.model = model
+        self.host = host
+        self.port = port
+        self.streamPort = streamPort
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.keepStream = keepStream
+        self.acquisitionTime = acquisitionTime
+        self.sequenceSwitchTime = sequenceSwitchTime
+        # Dynamic sequence selection per channel, {ch: (previous entry, selected entry, time the switch happens)}
+        self.sequenceEntry = {1: (0, 0, 0), 2: (0, 0, 0)}
+        self.busyUntil = 0
+        # Time the operation complete bit is set by the last *opc, None if not pending or set
+        self.opcTime = None
+        self.runState = 0
+
+        self.lock = threading.RLock()
+        self.state = {}
+        self.memory = {}
+        self.segments = {ch: {} for ch in range(1, 5)}
+        self.segmentNames = {ch: {} for ch in range(1, 5)}
+        self.sequenceTables = {1: [], 2: []}
+        self.errors = []
+        self.log = []
+        self.stats = {'messages': 0, 'queries': 0, 'responses': 0, 'binaryBytes': 0, 'streamBytes': 0,
+                      'acquisitions': 0}
+        self.streamData = bytearray()
+        x = np.linspace(0, 1, 801)
+        self.traces = {n: (x, np.sin(2 * np.pi * n * x)) for n in range(1, 5)}
+        self.reset()
+
+        self.server = None
+        self.streamServer = None
+        self.threads = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.stop()
+
+    def start(self):
+        """Starts serving SCPI (and stream) connections in background threads."""
+
+        sim = self
+
+        class ScpiHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                sim.serve_scpi(self.request)
+
+        class StreamHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                sim.serve_stream(self.request)
+
+        self.server = ThreadingServer((self.host, self.port), ScpiHandler)
+        self.port = self.server.server_address[1]
+        servers = [self.server]
+        if self.streamPort is not None:
+            self.streamServer = ThreadingServer((self.host, self.streamPort), StreamHandler)
+            self.streamPort = self.streamServer.server_address[1]
+            servers.append(self.streamServer)
+
+        for server in servers:
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """Stops the servers and closes all connections."""
+        for server in [self.server, self.streamServer]:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def reset(self):
+        """Restores default settings (*rst). File and segment memory are preserved, like the real instruments."""
+        with self.lock:
+            self.state = dict(DEFAULTS[self.model])
+
+    def push_error(self, code, msg):
+        """
+        Adds an error to the error queue.
+        Args:
+            code (int): SCPI error code.
+            msg (str): Error message.
+        """
+
+        with self.lock:
+            self.errors.append(f'{code:+d},"{msg}"')
+
+    def throttle(self, start, numBytes):
+        """
+        HELPER FUNCTION
+        Sleeps long enough that numBytes transferred since start don't exceed the configured bandwidth.
+        Args:
+            start (float): time.perf_counter() value when the transfer started.
+            numBytes (int): Number of bytes transferred since start.
+        """
+
+        if self.bandwidth:
+            delay = start + numBytes / self.bandwidth - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def serve_stream(self, conn):
+        """
+        HELPER FUNCTION
+        Consumes stream data from a single connection until it is closed.
+        Args:
+            conn (socket): Connected stream socket.
+        """
+
+        buf = bytearray(1 << 16)
+        view = memoryview(buf)
+        start = time.perf_counter()
+        total = 0
+        while True:
+            try:
+                n = conn.recv_into(buf)
+            except OSError:
+                break
+            if not n:
+                break
+            total += n
+            with self.lock:
+                self.stats['streamBytes'] += n
+                if self.keepStream:
+                    self.streamData += view[:n]
+            self.throttle(start, total)
+
+    def serve_scpi(self, conn):
+        """
+        HELPER FUNCTION
+        Parses program messages and binary blocks from a single connection until it is closed.
+        Args:
+            conn (socket): Connected SCPI socket.
+        """
+
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        buf = bytearray()
+        pos = 0
+        inQuote = False
+
+        def fill(count):
+            # Receive until buf holds at least count bytes
+            while len(buf) < count:
+                chunk = conn.recv(1 << 16)
+                if not chunk:
+                    raise ConnectionError
+                buf.extend(chunk)
+
+        try:
+            while True:
+                if pos >= len(buf):
+                    fill(pos + 1)
+                char = buf[pos]
+                if char == ord('"'):
+                    inQuote = not inQuote
+                    pos += 1
+                elif char == ord('\n') and not inQuote:
+                    msg = buf[:pos].decode('latin_1')
+                    del buf[:pos + 1]
+                    pos = 0
+                    if msg.strip():
+                        self.handle_message(conn, msg)
+                elif char == ord('#') and not inQuote:
+                    # Binary block: #<number of length digits><length><data>
+                    fill(pos + 2)
+                    numDigits = int(chr(buf[pos + 1]), 16)
+                    fill(pos + 2 + numDigits)
+                    length = int(buf[pos + 2:pos + 2 + numDigits].decode('latin_1'))
+                    cmd = buf[:pos].decode('latin_1')
+                    del buf[:pos + 2 + numDigits]
+                    pos = 0
+                    data = self.receive_block(conn, buf, length)
+                    response = self.handle_binblock(cmd, data)
+                    if response is not None:
+                        self.send_responses(conn, [response])
+                    # Discard the termination character
+                    fill(1)
+                    if buf[0] == ord('\n'):
+                        del buf[:1]
+                else:
+                    pos += 1
+        except (ConnectionError, OSError):
+            pass
+
+    def receive_block(self, conn, buf, length):
+        """
+        HELPER FUNCTION
+        Receives a binary block payload directly into a preallocated buffer.
+        Args:
+            conn (socket): Connected SCPI socket.
+            buf (bytearray): Bytes already received after the block header. Consumed bytes are removed.
+            length (int): Payload length in bytes.
+
+        Returns:
+            (bytearray): Payload.
+        """
+
+        data = bytearray(length)
+        view = memoryview(data)
+        have = min(len(buf), length)
+        view[:have] = buf[:have]
+        del buf[:have]
+        start = time.perf_counter()
+        while have < length:
+            n = conn.recv_into(view[have:], length - have)
+            if not n:
+                raise ConnectionError
+            have += n
+            self.throttle(start, have)
+        with self.lock:
+            self.stats['binaryBytes'] += length
+        return data
+
+    def handle_message(self, conn, msg):
+        """
+        HELPER FUNCTION
+        Executes a program message and sends any query responses.
+        Args:
+            conn (socket): Connected SCPI socket.
+            msg (str): Program message.
+        """
+
+        responses = []
+        with self.lock:
+            self.stats['messages'] += 1
+            self.log.append(msg)
+            for cmd in split_message(msg):
+                response = self.execute(cmd)
+                if response is not None:
+                    self.stats['queries'] += 1
+                    responses.append(response)
+
+        if responses:
+            self.send_responses(conn, responses)
+
+    def send_responses(self, conn, responses):
+        """
+        HELPER FUNCTION
+        Sends query responses as a single response message.
+        Args:
+            conn (socket): Connected SCPI socket.
+            responses (list): Responses (str or bytes) to the queries in a program message.
+        """
+
+        if self.latency:
+            time.sleep(self.latency)
+        out = bytearray()
+        for idx, r in enumerate(responses):
+            if idx:
+                out += b';'
+            out += r if isinstance(r, (bytes, bytearray)) else r.encode('latin_1')
+        out += b'\n'
+        start = time.perf_counter()
+        conn.sendall(out)
+        self.throttle(start, len(out))
+        with self.lock:
+            self.stats['responses'] += 1
+
+    def execute(self, cmd):
+        """
+        HELPER FUNCTION
+        Executes a single command or query.
+        Args:
+            cmd (str): SCPI command or query.
+
+        Returns:
+            (str/bytes): Query response, or None for commands.
+        """
+
+        parts = cmd.split(None, 1)
+        header = parts[0]
+        args = parts[1].strip() if len(parts) > 1 else ''
+        isQuery = header.endswith('?')
+        key = normalize_header(header)
+
+        # IEEE 488.2 common commands
+        if key == '*idn':
+            return IDN[self.model]
+        elif key == '*opc':
+            if not isQuery:
+                # A bit that is already set stays set, otherwise it's set when pending operations finish
+                if self.opcTime is None or self.opcTime > time.perf_counter():
+                    self.opcTime = self.busyUntil
+                return None
+            delay = self.busyUntil - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            return '1'
+        elif key == '*rst':
+            self.reset()
+            return None
+        elif key == '*cls':
+            self.errors.clear()
+            self.opcTime = None
+            return None
+        elif key == '*esr':
+            # Operation complete bit, cleared by reading
+            if self.opcTime is not None and time.perf_counter() >= self.opcTime:
+                self.opcTime = None
+                return '1'
+            return '0'
+        elif key == '*stb':
+            return '0'
+        elif key in ['initiate:immediate', 'init:imm', 'input:analog:range:auto']:
+            self.busyUntil = time.perf_counter() + self.acquisitionTime
+            self.stats['acquisitions'] += 1
+            if key != 'input:analog:range:auto':
+                self.runState = 0b11
+            return None
+        elif key in ['abort', 'abor']:
+            self.runState = 0
+            return None
+        elif key in ['status:operation:run:condition', 'stat:oper:run:cond'] and isQuery:
+            return str(self.runState)
+        elif key == '*wai':
+            return None
+        elif key in ['system:error', 'syst:err', 'system:error:next', 'syst:err:next']:
+            return self.errors.pop(0) if self.errors else NO_ERROR
+
+        # AWG segment memory
+        match = re.fullmatch(r'trac(?:e)?([1-4])?:(cat(?:alog)?|def(?:ine)?|del(?:ete)?(?::all)?|name|sel(?:ect)?)', key)
+        if match:
+            return self.segment_command(int(match.group(1) or 1), match.group(2), args, isQuery)
+
+        match = re.fullmatch(r'stab(?:le)?([12])?:reset', key)
+        if match:
+            self.sequenceTables[int(match.group(1) or 1)].clear()
+            return None
+        match = re.fullmatch(r'stab(?:le)?([12])?:dyn(?:amic)?:sel(?:ect)?', key)
+        if match and not isQuery:
+            ch = int(match.group(1) or 1)
+            current = self.sequence_entry(ch)
+            self.sequenceEntry[ch] = (current, int(args), time.perf_counter() + self.sequenceSwitchTime)
+            self.state[key] = args
+            return None
+        # Sequencer state (the trailing :state node is removed by normalize_header)
+        match = re.fullmatch(r'stab(?:le)?([12])?:seq(?:uence)?', key)
+        if match and isQuery:
+            # Bits 20..19 execution state (2 = running), bits 18..0 current sequence table entry
+            return str((2 << 19) | self.sequence_entry(int(match.group(1) or 1)))
+
+        # File memory
+        if re.fullmatch(r'm?mem(?:ory)?:del(?:ete)?', key):
+            name = args.split(',')[0].strip().strip('"')
+            if name in self.memory:
+                del self.memory[name]
+            else:
+                self.push_error(-256, 'File name not found')
+            return None
+        elif re.fullmatch(r'm?mem(?:ory)?:del(?:ete)?:\w+', key):
+            self.memory.clear()
+            return None
+        elif re.fullmatch(r'm?mem(?:ory)?:cat(?:alog)?(?::\w+)?', key) and isQuery:
+            used = sum(len(v) for v in self.memory.values())
+            # A directory argument (e.g. "WFM1:") lists only the files in that directory, without the prefix
+            directory = args.strip().strip('"')
+            files = ','.join(f'"{name[len(directory):]},BIN,{len(data)}"' for name, data in self.memory.items()
+                             if name.upper().startswith(directory.upper()))
+            return f'{used},0' + (f',{files}' if files else '')
+        elif re.fullmatch(r'mem(?:ory)?:import:\w+', key):
+            # Conversion result is stored under the destination name
+            names = [a.strip().strip('"') for a in args.split(',')]
+            if names[0] not in self.memory:
+                self.push_error(-256, 'File name not found')
+            else:
+                self.memory[names[-1]] = self.memory[names[0]]
+            return None
+        elif key == 'memory:copy':
+            names = [a.strip().strip('"') for a in args.split(',')]
+            if names[0] not in self.memory:
+                self.push_error(-256, 'File name not found')
+            else:
+                self.memory[names[1]] = self.memory[names[0]]
+            return None
+
+        # VSA traces
+        match = re.fullmatch(r'trac(?:e)?(\d+):data:([xy])', key)
+        if match and isQuery:
+            x, y = self.traces.get(int(match.group(1)), (np.zeros(0), np.zeros(0)))
+            return self.format_trace(x if match.group(2) == 'x' else y)
+        match = re.fullmatch(r'trac(?:e)?(\d+):data:table', key)
+        if match and isQuery:
+            return self.state.get(f'{key} {args.lower()}', '0')
+
+        # Generic settings
+        if isQuery:
+            if args:
+                return self.state.get(f'{key} {args.lower()}', '0')
+            return self.state.get(key, '0')
+        if args.lower() in ['on', 'off']:
+            args = '1' if args.lower() == 'on' else '0'
+        self.state[key] = args
+        return None
+
+    def segment_command(self, ch, node, args, isQuery):
+        """
+        HELPER FUNCTION
+        Executes AWG segment memory commands.
+        Args:
+            ch (int): Channel.
+            node (str): Command node after trace<ch>.
+            args (str): Command arguments.
+            isQuery (bool): Determines if the command is a query.
+
+        Returns:
+            (str): Query response, or None for commands.
+        """
+
+        segments = self.segments[ch]
+        values = [a.strip() for a in args.split(',')] if args else []
+        if node.startswith('cat'):
+            if not segments:
+                return '0,0'
+            return ','.join(f'{s},{len(d) // self.bytes_per_sample(ch)}' for s, d in sorted(segments.items()))
+        elif node.startswith('def'):
+            segments[int(values[0])] = bytearray(int(float(values[1])) * self.bytes_per_sample(ch))
+        elif node.startswith('del'):
+            if node.endswith('all'):
+                segments.clear()
+                self.segmentNames[ch].clear()
+            elif int(values[0]) in segments:
+                del segments[int(values[0])]
+                self.segmentNames[ch].pop(int(values[0]), None)
+            else:
+                self.push_error(-222, 'Data out of range;Segment not defined')
+        elif node == 'name':
+            if isQuery:
+                return f'"{self.segmentNames[ch].get(int(values[0]), "")}"'
+            self.segmentNames[ch][int(values[0])] = values[1].strip('"')
+        elif node.startswith('sel'):
+            if isQuery:
+                return self.state.get(f'trace{ch}:select', '1')
+            self.state[f'trace{ch}:select'] = values[0]
+        return None
+
+    def sequence_entry(self, ch):
+        """
+        HELPER FUNCTION
+        Returns the sequence table entry that is playing on a channel.
+        Args:
+            ch (int): Channel.
+
+        Returns:
+            (int): Sequence table index.
+        """
+
+        previous, selected, switchTime = self.sequenceEntry[ch]
+        return selected if time.perf_counter() >= switchTime else previous
+
+    def bytes_per_sample(self, ch):
+        """
+        HELPER FUNCTION
+        Returns the number of bytes per AWG sample. The M8195A uses 8-bit samples and M8190A
+        interpolated (DUC) modes use IQ sample pairs.
+        Args:
+            ch (int): Channel.
+
+        Returns:
+            (int): Bytes per sample.
+        """
+
+        if self.model == 'M8195A':
+            return 1
+        return 4 if 'intx' in self.state.get(f'trace{ch}:dwidth', '').lower() else 2
+
+    def handle_binblock(self, cmd, data):
+        """
+        HELPER FUNCTION
+        Stores binary block data.
+        Args:
+            cmd (str): Command that preceded the binary block, including arguments.
+            data (bytearray): Binary block payload.
+
+        Returns:
+            (str): Response for binary block queries, otherwise None.
+        """
+
+        with self.lock:
+            self.log.append(f'{cmd}#<{len(data)} bytes>')
+            header, _, args = cmd.strip().partition(' ')
+            key = normalize_header(header)
+            match = re.fullmatch(r'trac(?:e)?([1-4])?:data', key)
+            if match:
+                ch = int(match.group(1) or 1)
+                segment, offset = [int(float(a)) for a in args.split(',')[:2]]
+                if segment not in self.segments[ch]:
+                    self.push_error(-222, 'Data out of range;Segment not defined')
+                    return None
+                start = offset * self.bytes_per_sample(ch)
+                seg = self.segments[ch][segment]
+                if start + len(data) > len(seg):
+                    self.push_error(-222, 'Data out of range;Data exceeds segment length')
+                    return None
+                seg[start:start + len(data)] = data
+                return None
+            match = re.fullmatch(r'stab(?:le)?([12])?:data', key)
+            if match:
+                # Sequence table entries are 6 little endian uint32 words
+                table = self.sequenceTables[int(match.group(1) or 1)]
+                start = int(float(args.split(',')[0])) * 6
+                words = np.frombuffer(bytes(data), dtype='<u4').tolist()
+                table.extend([0] * (start + len(words) - len(table)))
+                table[start:start + len(words)] = words
+            elif re.fullmatch(r'm?mem(?:ory)?:data', key):
+                name = args.split(',')[0].strip().strip('"')
+                self.memory[name] = bytes(data)
+            elif key == 'stream:external:header':
+                # UXG stream header handshake, the header is a PDW file without PDWs
+                self.memory['stream:external:header'] = bytes(data)
+                return '+0' if data[:4] == b'STRM' else '-1'
+            else:
+                self.push_error(-113, 'Undefined header')
+        return None
+
+    def format_trace(self, values):
+        """
+        HELPER FUNCTION
+        Formats VSA trace values based on the format:trace:data setting.
+        Args:
+            values (NumPy array): Trace values.
+
+        Returns:
+            (str/bytes): ASCII values or big endian binary block.
+        """
+
+        fmt = self.state.get('format:trace:data', 'ASC').lower()
+        if fmt.startswith('real'):
+            dtype = '>f8' if fmt.endswith('64') else '>f4'
+            data = np.asarray(values, dtype=dtype).tobytes()
+            return f'#{len(str(len(data)))}{len(data)}'.encode('latin_1') + data
+        return ','.join(f'{v:.10g}' for v in values)
+
+
+class ThreadingServer(socketserver.ThreadingTCPServer):
+    """TCP server that handles each connection in its own thread and can be restarted on the same port quickly."""
+    allow_reuse_address = True
+    daemon_threads = True
@@ -0,0 +1,347 @@
+"""
+vsaAcquisition
+Author: Morgan Allison, Keysight RF/uW Application Engineer
+Event-driven acquisition control for Keysight 89600 VSA.
+Instead of sending initiate:immediate, *opc?, and a result query as
+separate round trips in a tight loop, each acquisition is a single
+program message. Completion is detected either by a blocking *opc?
+that the analyzer answers when it's done ('opc' mode) or by setting
+*opc and polling the event status register with backoff ('poll' mode),
+which never holds a query open on the connection. Repeated acquisitions
+stop when a result reaches a target, stops changing, or time runs out.
+"""
+
+import asyncio
+import inspect
+import socket
+import time
+
+from pyarbtools import error
+from pyarbtools.batchConfig import join_commands, split_responses
+from pyarbtools.instruments import reconnect
+
+# Operation complete bit of the standard event status register (*esr?)
+OPC_BIT = 1
+
+
+def opc_message(cmds, mode):
+    """
+    HELPER FUNCTION
+    Builds the program message that starts an operation and marks its completion.
+    Args:
+        cmds (list(str)): SCPI commands that start the operation.
+        mode (str): 'opc' appends a blocking *opc? query, 'poll' appends *opc,
+            which sets the operation complete bit in *esr? when the operation finishes.
+            In 'poll' mode the message starts with *esr? to clear a bit left set by an
+            earlier operation (e.g. one that timed out). Its response must be read and discarded.
+
+    Returns:
+        (str): Program message.
+    """
+
+    if mode == 'opc':
+        return join_commands(list(cmds) + ['*opc?'])
+    elif mode == 'poll':
+        return join_commands(['*esr?'] + list(cmds) + ['*opc'])
+    raise error.VSAError(f'Invalid wait mode "{mode}". Use \'opc\' or \'poll\'.')
+
+
+def poll_intervals(pollInterval, maxPollInterval, backoff=2):
+    """
+    HELPER FUNCTION
+    Generates delays between status polls, growing geometrically from
+    pollInterval to maxPollInterval.
+    Args:
+        pollInterval (float): First delay in seconds.
+        maxPollInterval (float): Longest delay in seconds.
+        backoff (float): Factor applied to the delay after each poll.
+
+    Yields:
+        (float): Delay in seconds.
+    """
+
+    interval = pollInterval
+    while True:
+        yield interval
+        interval = min(interval * backoff, maxPollInterval)
+
+
+def query_with_timeout(inst, cmd, timeout):
+    """
+    HELPER FUNCTION
+    Sends a query with the socket timeout temporarily set to timeout. If
+    the query times out, the connection is reopened so the late response
+    isn't read by the next query, and VSAError is raised. The operation
+    started by cmd may still be running on VSA.
+    Args:
+        inst (socketscpi.SocketInstrument): Connection to VSA.
+        cmd (str): SCPI query.
+        timeout (float): Time in seconds to wait for the response.
+
+    Returns:
+        (str): Query response.
+    """
+
+    original = inst.socket.gettimeout()
+    inst.socket.settimeout(max(timeout, 1e-3))
+    try:
+        # socketscpi's query() hides read timeouts, so read directly. No error check before the
+        # read, it would read the response as the syst:err? response.
+        inst.write(cmd, errCheck=False)
+        response = inst.read()
+    except socket.timeout:
+        inst.socket.settimeout(original)
+        reconnect(inst)
+        raise error.VSAError(f'Timed out waiting {timeout:.3g} sec for "{cmd}". The connection was reopened to '
+                             'discard the late response.')
+    inst.socket.settimeout(original)
+    return response
+
+
+def wait_for_opc(inst, cmds, timeout=60, mode='opc', pollInterval=0.01, maxPollInterval=0.5, queries=()):
+    """
+    Sends commands that start an operation and waits for the operation to
+    complete. Optional queries are answered after completion in the same
+    transaction.
+    Args:
+        inst (socketscpi.SocketInstrument): Connection to VSA.
+        cmds (list(str)): SCPI commands that start the operation.
+        timeout (float): Time in seconds to wait for completion.
+        mode (str): 'opc' sends a single blocking *opc? (one round trip). On
+            timeout the connection is reopened to discard the late response.
+            'poll' polls *esr? at pollInterval, backing off to maxPollInterval.
+            No query is left waiting on the connection after a timeout.
+        pollInterval (float): First delay between status polls in seconds.
+        maxPollInterval (float): Longest delay between status polls in seconds.
+        queries (list(str)): SCPI queries sent after the operation completes.
+
+    Returns:
+        (list(str)): Responses to queries.
+    """
+
+    deadline = time.perf_counter() + timeout
+    if mode == 'opc':
+        response = query_with_timeout(inst, join_commands([opc_message(cmds, mode)] + list(queries)), timeout)
+        return split_responses(response, len(queries) + 1)[1:]
+
+    # Discard the *esr? response that clears a stale operation complete bit
+    inst.query(opc_message(cmds, mode))
+    for interval in poll_intervals(pollInterval, maxPollInterval):
+        if int(inst.query('*esr?')) & OPC_BIT:
+            break
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            raise error.VSAError(f'Timed out after {timeout:.3g} sec waiting for operation to complete.')
+        time.sleep(min(interval, remaining))
+    if not queries:
+        return []
+    return split_responses(inst.query(join_commands(queries)), len(queries))
+
+
+async def wait_for_opc_async(inst, cmds, timeout=60, mode='poll', pollInterval=0.01, maxPollInterval=0.5, queries=()):
+    """
+    Async counterpart of wait_for_opc() for asyncInstruments.AsyncVSA.
+    The connection is released while waiting between status polls so other
+    coroutines can use it. In 'opc' mode the connection is held for the
+    whole wait, which is also limited by the connection timeout, and is
+    reopened after a timeout to discard the late response.
+    Args:
+        inst (asyncInstruments.AsyncVSA): Connected async VSA object.
+        cmds (list(str)): SCPI commands that start the operation.
+        timeout (float): Time in seconds to wait for completion.
+        mode (str): 'opc' or 'poll' (default). See wait_for_opc().
+        pollInterval (float): First delay between status polls in seconds.
+        maxPollInterval (float): Longest delay between status polls in seconds.
+        queries (list(str)): SCPI queries sent after the operation completes.
+
+    Returns:
+        (list(str)): Responses to queries.
+    """
+
+    transport = inst.transport
+    deadline = time.perf_counter() + timeout
+    if mode == 'opc':
+        cmd = join_commands([opc_message(cmds, mode)] + list(queries))
+        async with transport.lock:
+            try:
+                response = await asyncio.wait_for(transport.query(cmd), timeout)
+            except asyncio.TimeoutError:
+                await transport.reconnect()
+                raise error.VSAError(f'Timed out waiting {timeout:.3g} sec for "{cmd}". The connection was reopened '
+                                     'to discard the late response.')
+        return split_responses(response, len(queries) + 1)[1:]
+
+    async with transport.lock:
+        await transport.query(opc_message(cmds, mode))
+    for interval in poll_intervals(pollInterval, maxPollInterval):
+        async with transport.lock:
+            status = int(await transport.query('*esr?'))
+        if status & OPC_BIT:
+            break
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            raise error.VSAError(f'Timed out after {timeout:.3g} sec waiting for operation to complete.')
+        await asyncio.sleep(min(interval, remaining))
+    if not queries:
+        return []
+    async with transport.lock:
+        response = await transport.query(join_commands(queries))
+    return split_responses(response, len(queries))
+
+
+class AcquisitionController:
+    """
+    Repeats single acquisitions until a measurement result reaches a
+    target or converges. Each acquisition and its result query are sent
+    as one transaction.
+
+    Example:
+        controller = AcquisitionController(vsa, measure='trace4:data:table? "EvmRms"', target=0.5, tolerance=0.01)
+        result = controller.run()
+        print(f'EVM {result["value"]}% after {result["acquisitions"]} acquisitions ({result["reason"]})')
+
+    Attributes:
+        inst (VSA/socketscpi.SocketInstrument): Connection to VSA.
+        measure (str): SCPI query that returns a numeric result after each
+            acquisition. None takes a single acquisition.
+        target (float): Stops when the result is at or below target.
+        tolerance (float): Stops when the last settle results are all within tolerance of each other.
+        settle (int): Number of results used for convergence detection.
+        maxAcquisitions (int): Stops after this many acquisitions. None means
+            no limit if target or tolerance is set, otherwise 1.
+        timeout (float): Time in seconds for all acquisitions. Raises VSAError if exceeded.
+        mode (str): Completion detection. 'opc' (blocking *opc?) or 'poll' (*esr? polling).
+        pollInterval (float): First delay between status polls in seconds.
+        maxPollInterval (float): Longest delay between status polls in seconds.
+        callback (function): Called as callback(controller, value) after each
+            acquisition. Returning True stops acquiring. May be a coroutine
+            function when used with run_async().
+        values (list(float)): Results of each acquisition.
+    """
+
+    def __init__(self, inst, measure=None, target=None, tolerance=None, settle=3, maxAcquisitions=None, timeout=60,
+                 mode='opc', pollInterval=0.01, maxPollInterval=0.5, callback=None):
+        if mode not in ['opc', 'poll']:
+            raise error.VSAError(f'Invalid wait mode "{mode}". Use \'opc\' or \'poll\'.')
+        if settle < 2:
+            raise error.VSAError('settle must be at least 2.')
+        if timeout <= 0:
+            raise error.VSAError('timeout must be a positive value.')
+
+        self.inst = inst
+        self.measure = measure
+        self.target = target
+        self.tolerance = tolerance
+        self.settle = settle
+        if maxAcquisitions is None and target is None and tolerance is None:
+            maxAcquisitions = 1
+        self.maxAcquisitions = maxAcquisitions
+        self.timeout = timeout
+        self.mode = mode
+        self.pollInterval = pollInterval
+        self.maxPollInterval = maxPollInterval
+        self.callback = callback
+        self.values = []
+        self.start = 0
+
+    def remaining(self):
+        """
+        HELPER FUNCTION
+        Returns the time left before timeout. Raises VSAError if it's up.
+
+        Returns:
+            (float): Time left in seconds.
+        """
+
+        remaining = self.timeout - (time.perf_counter() - self.start)
+        if remaining <= 0:
+            raise error.VSAError(f'Acquisition timed out after {self.timeout:.3g} sec and {len(self.values)} acquisitions.')
+        return remaining
+
+    def check(self, value):
+        """
+        HELPER FUNCTION
+        Records a result and decides whether to stop.
+        Args:
+            value (float): Result of the latest acquisition, None if there is no measure query.
+
+        Returns:
+            (str): Reason for stopping ('target', 'converged', 'maxAcquisitions'), or None to keep acquiring.
+        """
+
+        self.values.append(value)
+        if value is not None:
+            if self.target is not None and value <= self.target:
+                return 'target'
+            recent = self.values[-self.settle:]
+            if self.tolerance is not None and len(recent) == self.settle and max(recent) - min(recent) <= self.tolerance:
+                return 'converged'
+        if self.maxAcquisitions is not None and len(self.values) >= self.maxAcquisitions:
+            return 'maxAcquisitions'
+        return None
+
+    def result(self, reason):
+        """
+        HELPER FUNCTION
+        Summarizes a finished run.
+        Args:
+            reason (str): Reason for stopping.
+
+        Returns:
+            (dict): {'value': last result, 'values': all results, 'acquisitions': count,
+                'reason': reason, 'elapsed': seconds}
+        """
+
+        return {'value': self.values[-1] if self.values else None, 'values': list(self.values),
+                'acquisitions': len(self.values), 'reason': reason, 'elapsed': time.perf_counter() - self.start}
+
+    def run(self):
+        """
+        Takes acquisitions until a stop condition is met.
+
+        Returns:
+            (dict): See result(). reason is 'target', 'converged',
+                'maxAcquisitions', or 'callback'.
+        """
+
+        self.values = []
+        self.start = time.perf_counter()
+        self.inst.write('initiate:continuous off')
+        queries = [self.measure] if self.measure else []
+        while True:
+            responses = wait_for_opc(self.inst, ['initiate:immediate'], self.remaining(), self.mode,
+                                     self.pollInterval, self.maxPollInterval, queries)
+            value = float(responses[0]) if responses else None
+            reason = self.check(value)
+            if self.callback is not None and self.callback(self, value):
+                reason = 'callback'
+            if reason:
+                return self.result(reason)
+
+    async def run_async(self):
+        """
+        Async counterpart of run() for asyncInstruments.AsyncVSA. Other
+        coroutines can use the connection between status polls.
+
+        Returns:
+            (dict): See result().
+        """
+
+        self.values = []
+        self.start = time.perf_counter()
+        async with self.inst.transport.lock:
+            await self.inst.transport.write('initiate:continuous off')
+        queries = [self.measure] if self.measure else []
+        while True:
+            responses = await wait_for_opc_async(self.inst, ['initiate:immediate'], self.remaining(), self.mode,
+                                                 self.pollInterval, self.maxPollInterval, queries)
+            value = float(responses[0]) if responses else None
+            reason = self.check(value)
+            if self.callback is not None:
+                stop = self.callback(self, value)
+                if inspect.isawaitable(stop):
+                    stop = await stop
+                if stop:
+                    reason = 'callback'
+            if reason:
+                return self.result(reason)
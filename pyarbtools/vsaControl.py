@@ -6,11 +6,230 @@ Generic VSA control object for PyArbTools.
 
 import socketscpi
 import os
+import re
 import warnings
+from contextlib import contextmanager
+import numpy as np
 from pyarbtools import error
+from pyarbtools import vsaAcquisition
+from pyarbtools.batchConfig import BatchConfigMixin, join_commands
 
+# Settings whose values VSA changes when the key setting changes
+COUPLED_SETTINGS = {'span': ['rbw', 'time'], 'rbw': ['time'], 'time': ['rbw']}
 
-class VSA(socketscpi.SocketInstrument):
+# Commands that change settings behind the state cache's back
+INVALIDATING_COMMANDS = re.compile(r'(^|;)\s*:?(\*rst|syst(em)?:pres(et)?|mmem(ory)?:load)', re.IGNORECASE)
+
+# Wire data types for format:trace:data. VSA sends binary trace data big endian.
+TRACE_FORMATS = {'real32': '>f4', 'real64': '>f8'}
+
+
+def trace_dtype(dataFormat):
+    """
+    HELPER FUNCTION
+    Returns the wire data type for a binary trace format.
+    Args:
+        dataFormat (str): Binary trace format ('real32', 'real64').
+
+    Returns:
+        (NumPy dtype): Big endian data type of trace values sent by VSA.
+    """
+
+    try:
+        return np.dtype(TRACE_FORMATS[dataFormat.lower()])
+    except KeyError:
+        raise error.VSAError(f'Invalid trace data format: "{dataFormat}". Use one of {", ".join(TRACE_FORMATS)}.')
+
+
+def recv_exact(sock, view):
+    """
+    HELPER FUNCTION
+    Fills a writable buffer from a socket.
+    Args:
+        sock (socket): Connected socket.
+        view (memoryview): Byte buffer to fill.
+    """
+
+    while len(view):
+        n = sock.recv_into(view)
+        if not n:
+            raise error.VSAError('Connection closed while reading trace data.')
+        view = view[n:]
+
+
+def read_block_header(sock):
+    """
+    HELPER FUNCTION
+    Reads an IEEE 488.2 definite length block header.
+    Args:
+        sock (socket): Connected socket.
+
+    Returns:
+        (int): Payload length in bytes.
+    """
+
+    first = sock.recv(1)
+    if first != b'#':
+        raise error.VSAError(f'Trace data is not in binary block format. Expecting #, got {first}.')
+    numDigits = int(sock.recv(1).decode('latin_1'), 16)
+    digits = bytearray(numDigits)
+    recv_exact(sock, memoryview(digits))
+    return int(digits.decode('latin_1'))
+
+
+def read_block_payload(sock, numBytes, wireType, dest, chunkSize=1 << 16):
+    """
+    HELPER FUNCTION
+    Reads binary block data straight into an array. Contiguous float
+    arrays of the wire width are filled in place by the socket and
+    byte swapped in place if needed. Any other destination (e.g. the
+    strided real/imag view of a complex array) is filled through a small
+    scratch buffer, converting chunk by chunk.
+    Args:
+        sock (socket): Connected socket.
+        numBytes (int): Payload length in bytes.
+        wireType (NumPy dtype): Data type of the values sent by the instrument.
+        dest (NumPy array): 1D destination with numBytes / wireType.itemsize elements.
+    """
+
+    if dest.flags.c_contiguous and dest.dtype.kind == wireType.kind and dest.dtype.itemsize == wireType.itemsize:
+        recv_exact(sock, memoryview(dest).cast('B'))
+        if dest.dtype != wireType:
+            dest.byteswap(inplace=True)
+        return
+
+    chunkSize -= chunkSize % wireType.itemsize
+    scratch = bytearray(min(numBytes, chunkSize))
+    view = memoryview(scratch)
+    pos = 0
+    while numBytes:
+        n = min(numBytes, len(scratch))
+        recv_exact(sock, view[:n])
+        count = n // wireType.itemsize
+        dest[pos:pos + count] = np.frombuffer(scratch, wireType, count)
+        pos += count
+        numBytes -= n
+
+
+def read_block_end(sock, last):
+    """
+    HELPER FUNCTION
+    Reads the character that follows a binary block in a response message.
+    Args:
+        sock (socket): Connected socket.
+        last (bool): Block is the last response in the message.
+    """
+
+    expected = b'\n' if last else b';'
+    char = sock.recv(1)
+    if char != expected:
+        raise error.VSAError(f'Trace data not terminated correctly. Expecting {expected}, got {char}.')
+
+
+def check_trace_size(dest, numBytes, wireType):
+    """
+    HELPER FUNCTION
+    Checks whether a destination array holds exactly one trace.
+    Args:
+        dest (NumPy array): Destination array.
+        numBytes (int): Payload length in bytes.
+        wireType (NumPy dtype): Data type of the values sent by the instrument.
+
+    Returns:
+        (bool): True if dest is a 1D array with one element per trace value.
+    """
+
+    return dest.ndim == 1 and dest.size * wireType.itemsize == numBytes
+
+
+def fetch_traces(inst, queries, dataFormat='real32', out=None):
+    """
+    Sends several binary trace queries as one compound query and reads
+    every response straight into its destination array. The trace data
+    format is set to dataFormat in the same message, so it can't be stale.
+    Works with any socketscpi.SocketInstrument connected to VSA.
+    Args:
+        inst (socketscpi.SocketInstrument): Connection to VSA.
+        queries (list(str)): Trace queries, e.g. 'trace1:data:y?'.
+        dataFormat (str): Binary trace format ('real32', 'real64').
+        out (list(NumPy array)): Optional preallocated 1D arrays, one per
+            query. None entries (or out=None) allocate new float32/float64 arrays.
+
+    Returns:
+        (list(NumPy array)): Trace values for each query in native byte order.
+    """
+
+    wireType = trace_dtype(dataFormat)
+    if out is None:
+        out = [None] * len(queries)
+    if len(out) != len(queries):
+        raise error.VSAError('out must contain one array per trace.')
+
+    # No error check here, it would read the trace data as the syst:err? response
+    inst.write(join_commands([f'format:trace:data {dataFormat.lower()}'] + list(queries)), errCheck=False)
+    traces = []
+    badSize = []
+    for idx, dest in enumerate(out):
+        numBytes = read_block_header(inst.socket)
+        if dest is not None and not check_trace_size(dest, numBytes, wireType):
+            badSize.append(f'{queries[idx]} returned {numBytes // wireType.itemsize} values, out has shape {dest.shape}')
+            # Still consume the block so the connection stays in sync
+            dest = None
+        if dest is None:
+            dest = np.empty(numBytes // wireType.itemsize, dtype=wireType.newbyteorder('='))
+        read_block_payload(inst.socket, numBytes, wireType, dest)
+        read_block_end(inst.socket, idx == len(out) - 1)
+        traces.append(dest)
+
+    if badSize:
+        raise error.VSAError('Preallocated trace array size mismatch: ' + '; '.join(badSize))
+    return traces
+
+
+def fetch_iq(inst, trace, dataFormat='real32', out=None):
+    """
+    Reads a trace in "IQ" format (I values on the x axis, Q values on the
+    y axis) with one compound query and returns I + jQ. Each axis is
+    written directly into the real or imaginary part of the result. The
+    trace data format is set to dataFormat in the same message.
+    Args:
+        inst (socketscpi.SocketInstrument): Connection to VSA.
+        trace (int): Trace number.
+        dataFormat (str): Binary trace format ('real32', 'real64').
+        out (NumPy array): Optional preallocated 1D complex array.
+
+    Returns:
+        (NumPy array): Complex trace values, complex64 for 'real32' and
+            complex128 for 'real64' unless out is given.
+    """
+
+    wireType = trace_dtype(dataFormat)
+    if out is not None and out.dtype.kind != 'c':
+        raise error.VSAError('out must be a complex array.')
+
+    inst.write(join_commands([f'format:trace:data {dataFormat.lower()}', f'trace{trace}:data:x?',
+                              f'trace{trace}:data:y?']), errCheck=False)
+    iq = None
+    badSize = False
+    for idx in range(2):
+        numBytes = read_block_header(inst.socket)
+        if iq is None:
+            if out is not None and check_trace_size(out, numBytes, wireType):
+                iq = out
+            else:
+                badSize = out is not None
+                iq = np.empty(numBytes // wireType.itemsize, dtype=f'c{2 * wireType.itemsize}')
+        if not check_trace_size(iq, numBytes, wireType):
+            raise error.VSAError(f'I and Q lengths of trace {trace} do not match.')
+        read_block_payload(inst.socket, numBytes, wireType, iq.imag if idx else iq.real)
+        read_block_end(inst.socket, idx == 1)
+
+    if badSize:
+        raise error.VSAError(f'Preallocated trace array size mismatch: trace {trace} returned {len(iq)} values, out has shape {out.shape}')
+    return iq
+
+
+class VSA(BatchConfigMixin, socketscpi.SocketInstrument):
     """
     Generic class for controlling Keysight 89600 Vector Signal Analysis Software
 
@@ -33,9 +252,17 @@ class VSA(socketscpi.SocketInstrument):
 
         rbw (float): Resolution bandwidth in Hz.
         time (float): Analysis time in sec.
+
+        traceFormat (str): Trace data format selected by format:trace:data ('asc', 'real32', 'real64').
+
+        stateCache (bool): Skips set_*() calls that would resend the last command sent for that setting.
+        verify (bool): Confirms cache hits by querying the setting (no write) and resends it if VSA disagrees.
+        cache (dict): Last command sent for each setting known to be current, {attr: command}.
+        cacheStats (dict): {'sent': settings written, 'skipped': cache hits, 'mismatches': failed verifications}
     """
 
-    def __init__(self, host, port=5025, timeout=10, reset=False, vsaHardware=None):
+    def __init__(self, host, port=5025, timeout=10, reset=False, vsaHardware=None, stateCache=True, verify=False):
+        self.init_cache(stateCache, verify)
         super().__init__(host, port, timeout)
 
         # Set up hardware
@@ -52,14 +279,27 @@ class VSA(socketscpi.SocketInstrument):
             self.query('*opc?')
             self.write('init:pause')
 
-        # Pause measurement before doing anything
-        self.write('init:pause')
+        self.init_settings()
+
+    def init_settings(self):
+        """
+        HELPER FUNCTION
+        Pauses the measurement, queries global settings from VSA with a
+        single compound query, and initializes measurement-specific attributes.
+        """
+
+        self.invalidate()
+
+        with self.batch():
+            # Pause measurement before doing anything
+            self.write('init:pause')
 
-        # Initialize global attributes
-        self.cf = float(self.query('sense:frequency:center?'))
-        self.amp = float(self.query('input:analog:range:dbm?'))
-        self.span = float(self.query('sense:frequency:span?'))
-        self.meas = self.query('measure:configure?')
+            # Initialize global attributes
+            self.read_setting('sense:frequency:center?', 'cf', float)
+            self.read_setting('input:analog:range:dbm?', 'amp', float)
+            self.read_setting('sense:frequency:span?', 'span', float)
+            self.read_setting('measure:configure?', 'meas')
+            self.read_setting('format:trace:data?', 'traceFormat', lambda r: r.strip().lower())
 
         # Initialize measurement-specific attributes.
         # Digital Demod
@@ -77,30 +317,167 @@ class VSA(socketscpi.SocketInstrument):
         self.rbw = 0
         self.time = 0
 
+    def init_cache(self, stateCache=True, verify=False):
+        """
+        HELPER FUNCTION
+        Sets up the client-side settings cache.
+        Args:
+            stateCache (bool): Skips set_*() calls that would resend the last command sent for that setting.
+            verify (bool): Confirms cache hits with a read-only query before skipping the write.
+        """
+
+        self.stateCache = stateCache
+        self.verify = verify
+        self.cache = {}
+        self.cacheStats = {'sent': 0, 'skipped': 0, 'mismatches': 0}
+
+    def invalidate(self, *attrs):
+        """
+        Marks cached settings as unknown so that the next set_*() call
+        sends them. Call this after changing settings with raw write()
+        calls. system:preset, *rst, and mmemory:load commands invalidate
+        the whole cache automatically.
+        Args:
+            *attrs (str): Attribute names to invalidate. No arguments invalidates everything.
+        """
+
+        if not attrs:
+            self.cache.clear()
+        for attr in attrs:
+            self.cache.pop(attr, None)
+
+    def cache_hit(self, attr, cmd, query, parser=str.strip):
+        """
+        HELPER FUNCTION
+        Determines whether a setting command can be skipped because it
+        was the last command sent for that setting. In verify mode, the
+        setting is queried first and a mismatch invalidates it. Inside a
+        batch, verify mode never skips.
+        Args:
+            attr (str): Name of the class attribute that holds the setting.
+            cmd (str): SCPI command that changes the setting.
+            query (str): SCPI query that reads the setting back.
+            parser (function): Converts the query response to the attribute value.
+
+        Returns:
+            (bool): True if the command doesn't need to be sent.
+        """
+
+        if not self.stateCache or self.cache.get(attr) != cmd:
+            return False
+        if self.verify:
+            if self.batchState is not None:
+                return False
+            if parser(self.query(query)) != getattr(self, attr):
+                self.cacheStats['mismatches'] += 1
+                self.invalidate(attr)
+                return False
+        self.cacheStats['skipped'] += 1
+        return True
+
+    def set_and_read(self, cmd, query, attr, parser=str.strip, after=None, pending=None):
+        """
+        HELPER FUNCTION
+        Sends a setting command and reads the value back into a class
+        attribute, unless the state cache shows the setting is already
+        current. See BatchConfigMixin.set_and_read().
+        """
+
+        if self.cache_hit(attr, cmd, query, parser):
+            return
+        self.invalidate(attr, *COUPLED_SETTINGS.get(attr, []))
+        super().set_and_read(cmd, query, attr, parser, after, pending)
+        self.cacheStats['sent'] += 1
+        if self.stateCache:
+            self.cache[attr] = cmd
+
+    def write(self, cmd, *args, **kwargs):
+        """Writes a command to the instrument (or the pending batch), invalidating the state cache for presets and recalls."""
+        if INVALIDATING_COMMANDS.search(cmd):
+            self.invalidate()
+        return super().write(cmd, *args, **kwargs)
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager that groups settings changes into a single
+        transaction. See BatchConfigMixin.batch(). The state cache is
+        invalidated if the batch fails, because its commands may not
+        have been sent.
+
+        Yields:
+            (ConfigBatch): Batch object holding pending commands and read-backs.
+        """
+
+        try:
+            with super().batch() as batch:
+                yield batch
+        except BaseException:
+            self.invalidate()
+            raise
+
     def acquire_continuous(self):
         """Begins continuous acquisition in VSA using SCPI commands."""
         self.write('initiate:continuous on')
         self.write('initiate:immediate')
 
-    def acquire_single(self):
-        """Sets single acquisition mode and takes a single acquisition in VSA using SCPI commands."""
-        self.write('initiate:continuous off')
-        self.write('initiate:immediate')
-        self.query('*opc?')
+    def acquire_single(self, timeout=60, mode='opc'):
+        """
+        Sets single acquisition mode and takes a single acquisition in VSA using SCPI commands.
+        Args:
+            timeout (float): Time in seconds to wait for the acquisition to complete.
+            mode (str): Completion detection. 'opc' (blocking *opc?) or 'poll' (*esr? polling).
+        """
+
+        with self.suspend_batch():
+            self.write('initiate:continuous off')
+            vsaAcquisition.wait_for_opc(self, ['initiate:immediate'], timeout, mode)
+
+    def acquire_until(self, measure, target=None, tolerance=None, settle=3, maxAcquisitions=None, timeout=60,
+                      mode='opc', pollInterval=0.01, maxPollInterval=0.5, callback=None):
+        """
+        Takes single acquisitions until a measurement result reaches a
+        target or converges. Each acquisition costs one transaction.
+        See vsaAcquisition.AcquisitionController.
+        Args:
+            measure (str): SCPI query that returns a numeric result, e.g. 'trace4:data:table? "EvmRms"'.
+            target (float): Stops when the result is at or below target.
+            tolerance (float): Stops when the last settle results are all within tolerance of each other.
+            settle (int): Number of results used for convergence detection.
+            maxAcquisitions (int): Stops after this many acquisitions.
+            timeout (float): Time in seconds for all acquisitions. Raises VSAError if exceeded.
+            mode (str): Completion detection. 'opc' (blocking *opc?) or 'poll' (*esr? polling).
+            pollInterval (float): First delay between status polls in seconds.
+            maxPollInterval (float): Longest delay between status polls in seconds.
+            callback (function): Called as callback(controller, value) after each acquisition. Returning True stops.
+
+        Returns:
+            (dict): {'value', 'values', 'acquisitions', 'reason', 'elapsed'}
+        """
+
+        controller = vsaAcquisition.AcquisitionController(self, measure, target, tolerance, settle, maxAcquisitions,
+                                                          timeout, mode, pollInterval, maxPollInterval, callback)
+        with self.suspend_batch():
+            return controller.run()
 
     def stop(self):
         """Stops acquisition in VSA using SCPI commands."""
         self.write('initiate:pause')
 
-    def autorange(self):
-        """Executes an amplitude autorange in VSA and waits for it to complete using SCPI commands."""
+    def autorange(self, timeout=60, mode='opc'):
+        """
+        Executes an amplitude autorange in VSA and waits for it to complete using SCPI commands.
+        Args:
+            timeout (float): Time in seconds to wait for the autorange to complete.
+            mode (str): Completion detection. 'opc' (blocking *opc?) or 'poll' (*esr? polling).
+        """
 
-        # Gotta make sure measurement is running while doing this
-        self.write('initiate:continuous on')
-        self.write('initiate:immediate')
+        with self.suspend_batch():
+            # Gotta make sure measurement is running while doing this
+            self.write('initiate:continuous on')
+            self.write('initiate:immediate')
 
-        self.write('input:analog:range:auto')
-        self.query('*opc?')
+            vsaAcquisition.wait_for_opc(self, ['input:analog:range:auto'], timeout, mode)
 
         # Turn it back off when we're done
         self.write('initiate:continuous off')
@@ -123,6 +500,7 @@ class VSA(socketscpi.SocketInstrument):
         self.write(f'system:vsa:hardware:configuration:select "{hw}"')
         self.query('*opc?')
         self.hw = self.query('system:vsa:hardware:configuration:select?')
+        self.invalidate()
 
     def set_cf(self, cf):
         """
@@ -135,8 +513,7 @@ class VSA(socketscpi.SocketInstrument):
         if not isinstance(cf, float) or cf <= 0:
             raise ValueError('Center frequency must be a positive floating point value.')
 
-        self.write(f'sense:frequency:center {cf}')
-        self.cf = float(self.query('sense:frequency:center?'))
+        self.set_and_read(f'sense:frequency:center {cf}', 'sense:frequency:center?', 'cf', float)
 
     def set_amp(self, amp):
         """
@@ -149,8 +526,7 @@ class VSA(socketscpi.SocketInstrument):
         if not isinstance(amp, float) and not isinstance(amp, int):
             raise ValueError('Reference level/vertical range must be a numerical value.')
 
-        self.write(f'input:analog:range:dbm {amp}')
-        self.amp = float(self.query('input:analog:range:dbm?'))
+        self.set_and_read(f'input:analog:range:dbm {amp}', 'input:analog:range:dbm?', 'amp', float)
 
     def set_span(self, span):
         """
@@ -163,8 +539,7 @@ class VSA(socketscpi.SocketInstrument):
         if not isinstance(span, float) and not isinstance(span, int):
             raise ValueError('Span must be a positive numerical value.')
 
-        self.write(f'sense:frequency:span {span}')
-        self.span = float(self.query('sense:frequency:span?'))
+        self.set_and_read(f'sense:frequency:span {span}', 'sense:frequency:span?', 'span', float)
 
     def set_measurement(self, meas):
         """
@@ -177,12 +552,14 @@ class VSA(socketscpi.SocketInstrument):
         if meas.lower() not in ['vector', 'vect', 'ddemod', 'ddem']:
             raise ValueError('Invalid measurement selected. Choose \'vector\' or \'ddemod\'.')
 
-        self.write('measure:nselect 1')
-        self.write(f'measure:configure {meas}')
-        self.meas = self.query('measure:configure?')
+        def auto_rbw_points():
+            if 'vect' in self.meas.lower():
+                self.write('sense:rbw:points:auto 1')
 
-        if 'vect' in self.meas.lower():
-            self.write('sense:rbw:points:auto 1')
+        # Measurement-specific settings don't carry over
+        self.invalidate()
+        self.write('measure:nselect 1')
+        self.set_and_read(f'measure:configure {meas}', 'measure:configure?', 'meas', after=auto_rbw_points)
 
     def configure_ddemod(self, **kwargs):
         """
@@ -204,39 +581,41 @@ class VSA(socketscpi.SocketInstrument):
         if 'ddem' not in self.meas.lower():
             raise error.VSAError(f'Measurement type is currently "{self.meas}". Measurement type must be "ddem" to configure digital demod.')
 
-        # Check to see which keyword arguments the user sent and call the appropriate function
-        for key, value in kwargs.items():
-            if key == 'cf':
-                self.set_cf(value)
-            elif key == 'amp':
-                self.set_amp(value)
-            elif key == 'span':
-                self.set_span(value)
-            elif key == 'modType':
-                self.set_modType(value)
-            elif key == 'symRate':
-                self.set_symRate(value)
-            elif key == 'measFilter':
-                self.set_measFilter(value)
-            elif key == 'refFilter':
-                self.set_refFilter(value)
-            elif key == 'filterAlpha':
-                self.set_filterAlpha(value)
-            elif key == 'measLength':
-                self.set_measLength(value)
-            elif key == 'eqState':
-                self.set_eqState(value)
-            elif key == 'eqLength':
-                self.set_eqLength(value)
-            elif key == 'eqConvergence':
-                self.set_eqConvergence(value)
-            else:
-                raise KeyError(f'Invalid keyword argument: "{key}"')
+        # Send all settings as a single transaction with one read-back query and one error check
+        with self.batch():
+            # Check to see which keyword arguments the user sent and call the appropriate function
+            for key, value in kwargs.items():
+                if key == 'cf':
+                    self.set_cf(value)
+                elif key == 'amp':
+                    self.set_amp(value)
+                elif key == 'span':
+                    self.set_span(value)
+                elif key == 'modType':
+                    self.set_modType(value)
+                elif key == 'symRate':
+                    self.set_symRate(value)
+                elif key == 'measFilter':
+                    self.set_measFilter(value)
+                elif key == 'refFilter':
+                    self.set_refFilter(value)
+                elif key == 'filterAlpha':
+                    self.set_filterAlpha(value)
+                elif key == 'measLength':
+                    self.set_measLength(value)
+                elif key == 'eqState':
+                    self.set_eqState(value)
+                elif key == 'eqLength':
+                    self.set_eqLength(value)
+                elif key == 'eqConvergence':
+                    self.set_eqConvergence(value)
+                else:
+                    raise KeyError(f'Invalid keyword argument: "{key}"')
 
             # Handy way to actually visualize everything. The defaults in VSA are terrible.
             self.write('display:layout 2, 2')
 
-        self.err_check()
+            self.err_check()
 
     def set_modType(self, modType):
         """
@@ -248,8 +627,7 @@ class VSA(socketscpi.SocketInstrument):
         if modType.lower() not in ['qam16', 'qam32', 'qam64', 'qam256', 'qpsk', 'differentialqpsk', 'pi4differentialqpsk', 'offsetqpsk', 'bpsk', 'psk8', 'msk', 'msk2', 'fsk2', 'fsk4', 'dvbqam16', 'dvbqam32', 'dvbqam64', 'vsb8', 'vsb16', 'edge', 'fsk8', 'fsk16', 'qam128', 'differentialpsk8', 'qam512', 'qam1024', 'apsk16', 'apsk16dvb', 'apsk32', 'apsk32dvb', 'dvbqam128', 'dvbqam256', 'pi8differentialpsk8', 'cpmfm', 'star16qam', 'star32qam', 'customapsk', 'shapedoffsetqpsk', 'qam2048', 'qam4096']:
             raise ValueError('Invalid modulation type chosen.')
 
-        self.write(f'ddemod:mod "{modType}"')
-        self.modType = self.query('ddemod:mod?').lower()
+        self.set_and_read(f'ddemod:mod "{modType}"', 'ddemod:mod?', 'modType', str.lower)
 
     def set_symRate(self, symRate):
         """
@@ -261,8 +639,7 @@ class VSA(socketscpi.SocketInstrument):
         if not isinstance(symRate, float) and not isinstance(symRate, int) or symRate < 0:
             raise ValueError('Symbol rate must be a positive floating point value.')
 
-        self.write(f'ddemod:srate {symRate}')
-        self.symRate = float(self.query('ddemod:srate?'))
+        self.set_and_read(f'ddemod:srate {symRate}', 'ddemod:srate?', 'symRate', float)
 
     def set_measFilter(self, measFilter):
         """
@@ -274,8 +651,7 @@ class VSA(socketscpi.SocketInstrument):
         if measFilter.lower() not in ['none', 'rectangular', 'rootraisedcosine', 'gaussian', 'userdefined', 'lowpass', 'is95basephasecompensating', 'edge']:
             raise ValueError(f'Invalid measurement filter selected: {measFilter}')
 
-        self.write(f'ddemod:filter "{measFilter}"')
-        self.measFilter = self.query('ddemod:filter?')
+        self.set_and_read(f'ddemod:filter "{measFilter}"', 'ddemod:filter?', 'measFilter')
 
     def set_refFilter(self, refFilter):
         """
@@ -287,8 +663,7 @@ class VSA(socketscpi.SocketInstrument):
         if refFilter.lower() not in ['rectangular', 'raisedcosine', 'rootraisedcosine', 'gaussian', 'userdefined', 'is95baseband', 'edge', 'halfsine', 'rectangularonesymbolduration', 'raisedcosinethreesymbolduration', 'shapedoffsetqpsktgirig10604', 'raisedcosinefoursymbolduration', 'shapedoffsetqpska', 'shapedoffsetqpskb']:
             raise ValueError('Invalid reference filter selected.')
 
-        self.write(f'ddemod:filter:reference "{refFilter}"')
-        self.refFilter = self.query('ddemod:filter:reference?')
+        self.set_and_read(f'ddemod:filter:reference "{refFilter}"', 'ddemod:filter:reference?', 'refFilter')
 
     def set_filterAlpha(self, filterAlpha):
         """
@@ -300,8 +675,7 @@ class VSA(socketscpi.SocketInstrument):
         if not isinstance(filterAlpha, float) or filterAlpha < 0 or filterAlpha > 1:
             raise ValueError('filterAlpha must be a floating point value between 0 and 1')
 
-        self.write(f'ddemod:filter:abt {filterAlpha}')
-        self.filterAlpha = float(self.query('ddemod:filter:abt?'))
+        self.set_and_read(f'ddemod:filter:abt {filterAlpha}', 'ddemod:filter:abt?', 'filterAlpha', float)
 
     def set_measLength(self, measLength):
         """
@@ -313,8 +687,7 @@ class VSA(socketscpi.SocketInstrument):
         if not isinstance(measLength, int) or measLength < 10 or measLength > 4096:
             raise ValueError('measLength must be a positive integer value between 10 and 4096')
 
-        self.write(f'ddemod:rlength {measLength}')
-        self.measLength = int(self.query('ddemod:rlength?'))
+        self.set_and_read(f'ddemod:rlength {measLength}', 'ddemod:rlength?', 'measLength', int)
 
     def set_eqState(self, eqState):
         """
@@ -331,13 +704,8 @@ class VSA(socketscpi.SocketInstrument):
         else:
             eqStateArg = 0
 
-        self.write(f'ddemod:compensate:equalize {eqStateArg}')
-        ret = self.query('ddemod:compensate:equalize?')
-
-        if ret == '1':
-            self.eqState = True
-        elif ret == '0':
-            self.eqState = False
+        self.set_and_read(f'ddemod:compensate:equalize {eqStateArg}', 'ddemod:compensate:equalize?', 'eqState',
+                          lambda r: r.strip() == '1')
 
     def set_eqLength(self, eqLength):
         """
@@ -349,8 +717,7 @@ class VSA(socketscpi.SocketInstrument):
         if not isinstance(eqLength, int) or eqLength < 3 or eqLength > 99:
             raise ValueError('eqLength must be an integer between 3 and 99.')
 
-        self.write(f'ddemod:compensate:equalize:length {eqLength}')
-        self.eqLength = int(self.query('ddemod:compensate:equalize:length?'))
+        self.set_and_read(f'ddemod:compensate:equalize:length {eqLength}', 'ddemod:compensate:equalize:length?', 'eqLength', int)
 
     def set_eqConvergence(self, eqConvergence):
         """
@@ -362,8 +729,7 @@ class VSA(socketscpi.SocketInstrument):
         if not isinstance(eqConvergence, float) or eqConvergence > 1.0:
             raise ValueError('eqConvergence must be a floating point value between about 1e-12 and 1.0')
 
-        self.write(f'ddemod:compensate:equalize:convergence {eqConvergence}')
-        self.eqConvergence = float(self.query('ddemod:compensate:equalize:convergence?'))
+        self.set_and_read(f'ddemod:compensate:equalize:convergence {eqConvergence}', 'ddemod:compensate:equalize:convergence?', 'eqConvergence', float)
 
     def configure_vector(self, **kwargs):
         """
@@ -380,27 +746,29 @@ class VSA(socketscpi.SocketInstrument):
         if 'vect' not in self.meas.lower():
             raise error.VSAError(f'Measurement type is currently "{self.meas}". Measurement type must be "vect" to configure digital demod.')
 
-        # Check to see which keyword arguments the user sent and call the appropriate function
-        for key, value in kwargs.items():
-            if key == 'cf':
-                self.set_cf(value)
-            elif key == 'amp':
-                self.set_amp(value)
-            elif key == 'span':
-                self.set_span(value)
-            elif key == 'rbw':
-                self.set_rbw(value)
-            elif key == 'time':
-                self.set_time(value)
-            else:
-                raise KeyError(f'Invalid keyword argument: "{key}"')
-
-            # Check for conflicting settings in keyword arguments (RBW and acq time).
-            lowerKeys = [k.lower() for k in kwargs.keys()]
-            if 'time' in lowerKeys and 'rbw' in lowerKeys:
-                warnings.warn('When both acquisition time and RBW are set, the last one configured will override the first.')
-
-        self.err_check()
+        # Send all settings as a single transaction with one read-back query and one error check
+        with self.batch():
+            # Check to see which keyword arguments the user sent and call the appropriate function
+            for key, value in kwargs.items():
+                if key == 'cf':
+                    self.set_cf(value)
+                elif key == 'amp':
+                    self.set_amp(value)
+                elif key == 'span':
+                    self.set_span(value)
+                elif key == 'rbw':
+                    self.set_rbw(value)
+                elif key == 'time':
+                    self.set_time(value)
+                else:
+                    raise KeyError(f'Invalid keyword argument: "{key}"')
+
+                # Check for conflicting settings in keyword arguments (RBW and acq time).
+                lowerKeys = [k.lower() for k in kwargs.keys()]
+                if 'time' in lowerKeys and 'rbw' in lowerKeys:
+                    warnings.warn('When both acquisition time and RBW are set, the last one configured will override the first.')
+
+            self.err_check()
 
     def set_rbw(self, rbw):
         """
@@ -410,10 +778,11 @@ class VSA(socketscpi.SocketInstrument):
             rbw (float): Resolution bandwidth in Hz.
         """
 
+        if self.cache_hit('rbw', f'sense:rbw {rbw}', 'sense:rbw?', float):
+            return
         self.write('sense:rbw:points:auto 1')
-        self.write(f'sense:rbw {rbw}')
-        self.rbw = float(self.query('sense:rbw?'))
-        self.time = float(self.query('sense:time:length?'))
+        self.set_and_read(f'sense:rbw {rbw}', 'sense:rbw?', 'rbw', float)
+        self.read_setting('sense:time:length?', 'time', float)
 
     def set_time(self, time):
         """
@@ -423,10 +792,11 @@ class VSA(socketscpi.SocketInstrument):
             time (float): Acquisition time in seconds.
         """
 
+        if self.cache_hit('time', f'sense:time:length {time}', 'sense:time:length?', float):
+            return
         self.write('sense:rbw:points:auto 1')
-        self.write(f'sense:time:length {time}')
-        self.time = float(self.query('sense:time:length?'))
-        self.rbw = float(self.query('sense:rbw?'))
+        self.set_and_read(f'sense:time:length {time}', 'sense:time:length?', 'time', float)
+        self.read_setting('sense:rbw?', 'rbw', float)
 
     def recall_recording(self, fileName, fileFormat='csv'):
         """
@@ -448,12 +818,84 @@ class VSA(socketscpi.SocketInstrument):
         if fileFormat.lower() not in ['csv', 'e3238s', 'mat', 'mat7', 'n5110a', 'n5106a', 'sdf', 'text']:
             raise error.VSAError('Incorrect file format. Must be "csv", "e3238s", "mat", "mat7", "n5110a", "n5106a", "sdf", or "text".')
 
-        # Load the recording
+        # Load the recording. This changes acquisition settings, so the state cache is invalidated.
+        self.invalidate()
         self.write(f'mmemory:load:recording "{fileName}", "{fileFormat}"')
 
         # VSA helpfully reports an error if the file and the selected file format don't match. Check this here.
         self.err_check()
 
+    def set_traceFormat(self, dataFormat):
+        """
+        Sets the trace data format in VSA using SCPI commands. get_traces()
+        and get_iq() send the format with every fetch, so this is only
+        needed before reading traces with other queries.
+        Args:
+            dataFormat (str): Binary trace format ('real32', 'real64').
+        """
+
+        trace_dtype(dataFormat)
+        self.write(f'format:trace:data {dataFormat.lower()}')
+        self.traceFormat = dataFormat.lower()
+
+    def get_traces(self, traces, axis='y', dataFormat='real32', out=None):
+        """
+        Reads several traces from VSA with a single compound query. Binary
+        data is received directly into the result arrays and converted
+        from big endian in place, with no intermediate copies.
+        Args:
+            traces (list(int)): Trace numbers.
+            axis (str): Trace axis to read ('x', 'y').
+            dataFormat (str): Binary trace format ('real32', 'real64').
+            out (list(NumPy array)): Optional preallocated 1D arrays, one
+                per trace. None entries allocate new arrays.
+
+        Returns:
+            (list(NumPy array)): Trace values for each trace.
+        """
+
+        if axis.lower() not in ['x', 'y']:
+            raise ValueError('axis must be \'x\' or \'y\'.')
+
+        trace_dtype(dataFormat)
+        with self.suspend_batch():
+            self.traceFormat = dataFormat.lower()
+            return fetch_traces(self, [f'trace{t}:data:{axis.lower()}?' for t in traces], dataFormat, out)
+
+    def get_trace(self, trace, axis='y', dataFormat='real32', out=None):
+        """
+        Reads a single trace from VSA. See get_traces().
+        Args:
+            trace (int): Trace number.
+            axis (str): Trace axis to read ('x', 'y').
+            dataFormat (str): Binary trace format ('real32', 'real64').
+            out (NumPy array): Optional preallocated 1D array.
+
+        Returns:
+            (NumPy array): Trace values.
+        """
+
+        return self.get_traces([trace], axis, dataFormat, None if out is None else [out])[0]
+
+    def get_iq(self, trace, dataFormat='real32', out=None):
+        """
+        Reads a trace displayed in "IQ" format from VSA and returns I + jQ.
+        I and Q are fetched with one compound query and written directly
+        into the real and imaginary parts of the result.
+        Args:
+            trace (int): Trace number.
+            dataFormat (str): Binary trace format ('real32', 'real64').
+            out (NumPy array): Optional preallocated 1D complex array.
+
+        Returns:
+            (NumPy array): Complex trace values.
+        """
+
+        trace_dtype(dataFormat)
+        with self.suspend_batch():
+            self.traceFormat = dataFormat.lower()
+            return fetch_iq(self, trace, dataFormat, out)
+
     def sanity_check(self):
         """Prints out measurement context-sensitive user-accessible class attributes."""
 
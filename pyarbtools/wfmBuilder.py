@@ -11,6 +11,8 @@ import scipy.io
 import socketscpi
 import warnings
 from pyarbtools import error
+from pyarbtools import vsaControl
+from pyarbtools import vsaAcquisition
 from fractions import Fraction
 import os
 import cmath
@@ -1674,7 +1676,7 @@ def digmod_generator(fs=10, symRate=1, modType='bpsk', numSymbols=1000, filt='ra
     return iq
 
 
-def iq_correction(iq, inst, vsaIPAddress='127.0.0.1', vsaHardware='"Analyzer1"', cf=1e9, osFactor=4, thresh=0.4, convergence=2e-8):
+def iq_correction(iq, inst, vsaIPAddress='127.0.0.1', vsaHardware='"Analyzer1"', cf=1e9, osFactor=4, thresh=0.4, convergence=2e-8, tolerance=None, timeout=300):
     """
     Creates a BPSK signal from a signal generator at a
     user-selected center frequency and sample rate. Symbol rate and
@@ -1702,6 +1704,11 @@ def iq_correction(iq, inst, vsaIPAddress='127.0.0.1', vsaHardware='"Analyzer1"',
         convergence (float): Equalizer convergence value. High values
             settle more quickly but may become unstable. Low values
             take longer to settle but tend to have better stability
+        tolerance (float): Stops acquiring when the last three EVM
+            values are within tolerance of each other, even if thresh
+            hasn't been reached. None waits for thresh.
+        timeout (float): Time in seconds allowed for autoranging and
+            for the equalizer to reach thresh. Raises VSAError if exceeded.
 
     TODO
         Refactor using vsaControl
@@ -1760,24 +1767,21 @@ def iq_correction(iq, inst, vsaIPAddress='127.0.0.1', vsaHardware='"Analyzer1"',
     vsa.write('ddemod:compensate:equalize 1')
     vsa.write('ddemod:compensate:equalize:reset')
 
-    vsa.write('input:analog:range:auto')
-    vsa.query('*opc?')
+    vsaAcquisition.wait_for_opc(vsa, ['input:analog:range:auto'], timeout)
 
-    # Acquire data until EVM drops below a certain threshold
-    evm = 100
-    vsa.write('initiate:continuous off')
-    while evm > thresh:
-        vsa.write('initiate:immediate')
-        vsa.query('*opc?')
-        evm = float(vsa.query('trace4:data:table? "EvmRms"').strip())
+    # Acquire data until EVM drops below a certain threshold or stops improving
+    controller = vsaAcquisition.AcquisitionController(vsa, 'trace4:data:table? "EvmRms"', target=thresh,
+                                                      tolerance=tolerance, timeout=timeout)
+    result = controller.run()
+    if result['reason'] != 'target':
+        warn(f'EVM converged at {result["value"]}% without reaching thresh ({thresh}%).')
 
     vsa.write('trace3:format "IQ"')
-    eqI = vsa.binblockread('trace3:data:x?', datatype='d').byteswap()
-    eqQ = vsa.binblockread('trace3:data:y?', datatype='d').byteswap()
+    equalizer = vsaControl.fetch_iq(vsa, 3, 'real64')
     vsa.write('ddemod:compensate:equalize 0')
 
     # Invert the phase of the equalizer impulse response
-    equalizer = np.array(eqI - eqQ*1j)
+    np.conjugate(equalizer, out=equalizer)
 
     # Pseudo circular convolution to mitigate zeroing of samples due to filter delay
     # iq = np.array(i + q*1j)
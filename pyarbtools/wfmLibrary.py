@@ -0,0 +1,192 @@
+"""
+wfmLibrary
+Author: Morgan Allison, Keysight RF/uW Application Engineer
+Waveform library management for VectorUXG PDW streaming.
+Waveforms are named by a hash of their IQ content, so a waveform that is
+already in the UXG's WFM1 memory is never sent again and identical
+waveforms referenced by several PDWs are downloaded once. The library
+builds the waveform index file and rewrites PDW wIndex fields to match.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+
+from pyarbtools import error
+from pyarbtools import pdwBuilder
+
+# Position of the waveform index in list-of-lists PDWs for each format
+WINDEX_POSITION = {fmt: [f for f, _ in fields].index('wIndex') for fmt, fields in pdwBuilder.PDW_FIELDS.items()
+                   if fmt != 'analog'}
+
+
+def wfm_hash(wfm, digestSize=8):
+    """
+    HELPER FUNCTION
+    Computes a hash of a complex waveform's IQ content.
+    Args:
+        wfm (NumPy array): Complex waveform values.
+        digestSize (int): Hash length in bytes.
+
+    Returns:
+        (str): Hash as a hex string.
+    """
+
+    data = np.ascontiguousarray(wfm, dtype=np.complex128)
+    return hashlib.blake2b(memoryview(data).cast('B'), digest_size=digestSize).hexdigest()
+
+
+def parse_catalog(response, directory='WFM1:'):
+    """
+    HELPER FUNCTION
+    Extracts file names from a mmemory:catalog? response.
+    Args:
+        response (str): Catalog response, '<used>,<free>,"<name>,<type>,<size>",...'
+        directory (str): Directory prefix removed from file names.
+
+    Returns:
+        (set(str)): File names.
+    """
+
+    names = set()
+    for entry in re.findall(r'"([^"]*)"', response):
+        name = entry.split(',')[0]
+        if name.upper().startswith(directory.upper()):
+            name = name[len(directory):]
+        names.add(name)
+    return names
+
+
+class WfmLibrary:
+    """
+    Keeps a VectorUXG's waveform memory in sync with the waveforms used by
+    a PDW scenario. Waveforms are named '<prefix><hash>' and only those
+    missing from the instrument's WFM1 catalog are downloaded.
+
+    Example:
+        library = WfmLibrary(uxg)
+        pdws, windex = library.build(pdws, [chirp, barker, chirp], windexName='scenario')
+        uxg.stream_play(pdwID='scenario', wIndexID='scenario')
+
+    Attributes:
+        inst (VectorUXG): Instrument object.
+        prefix (str): Waveform name prefix.
+        names (set(str)): Waveform names known to be in instrument memory.
+        stats (dict): {'uploaded': waveforms downloaded, 'skipped': waveforms already in memory,
+            'bytesSent': bytes of waveform data downloaded}
+    """
+
+    def __init__(self, inst, prefix='h'):
+        self.inst = inst
+        self.prefix = prefix
+        self.names = set()
+        self.stats = {'uploaded': 0, 'skipped': 0, 'bytesSent': 0}
+
+    def wfm_name(self, wfm):
+        """
+        Returns the library name for a waveform.
+        Args:
+            wfm (NumPy array): Complex waveform values.
+
+        Returns:
+            (str): Waveform name.
+        """
+
+        return f'{self.prefix}{wfm_hash(wfm)}'
+
+    def refresh(self):
+        """
+        Reads the instrument's WFM1 catalog.
+
+        Returns:
+            (set(str)): Waveform names in instrument memory.
+        """
+
+        self.names = parse_catalog(self.inst.query('mmemory:catalog? "WFM1:"'))
+        return self.names
+
+    def sync(self, wfms, refresh=True):
+        """
+        Downloads the waveforms that aren't already in instrument memory.
+        Args:
+            wfms (list(NumPy array)): Complex waveforms.
+            refresh (bool): Reads the WFM1 catalog first. Set to False to
+                trust names from the last sync, e.g. when nothing else
+                modifies waveform memory.
+
+        Returns:
+            (list(str)): Waveform name for each waveform in wfms.
+        """
+
+        if refresh:
+            self.refresh()
+        names = [self.wfm_name(w) for w in wfms]
+        # Each distinct waveform is checked once
+        unique = dict(zip(reversed(names), reversed(wfms)))
+        for name in dict.fromkeys(names):
+            wfm = unique[name]
+            if name in self.names:
+                self.stats['skipped'] += 1
+                continue
+            formatted = self.inst.format_wfm(wfm)
+            self.inst.download_formatted_wfm(formatted, name)
+            self.names.add(name)
+            self.stats['uploaded'] += 1
+            self.stats['bytesSent'] += formatted.nbytes
+        return names
+
+    def build(self, pdws, wfms, windexName='windex', pdwFormat='vector', refresh=True):
+        """
+        Syncs the waveforms referenced by a set of PDWs, downloads a
+        waveform index file, and rewrites each PDW's wIndex to point at
+        the matching entry. wIndex values in pdws index into wfms.
+        Duplicate waveforms share one index file entry.
+        Args:
+            pdws (list/PdwTable): PDWs for VectorUXG.bin_pdw_file_builder() or PDW streaming.
+            wfms (list(NumPy array)): Complex waveforms.
+            windexName (str): Name of the waveform index file.
+            pdwFormat (str): PDW format of list PDWs. ('vector', 'vector3') Ignored for PdwTable.
+            refresh (bool): Reads the WFM1 catalog before downloading waveforms.
+
+        Returns:
+            (tuple): (pdws, windex) PDWs with updated wIndex fields (a new
+                list or PdwTable, pdws is not modified) and the windex dict
+                sent to csv_windex_file_download().
+        """
+
+        if isinstance(pdws, pdwBuilder.PdwTable):
+            pdwFormat = pdws.pdwFormat
+            wIndex = np.asarray(pdws.wIndex, dtype=np.int64) if 'wIndex' in pdws.fields else None
+        elif pdwFormat in WINDEX_POSITION:
+            position = WINDEX_POSITION[pdwFormat]
+            wIndex = np.array([p[position] for p in pdws], dtype=np.int64)
+        else:
+            wIndex = None
+        if wIndex is None:
+            raise error.UXGError(f'Invalid pdwFormat. Use one of {", ".join(WINDEX_POSITION)}.')
+        if len(wIndex) and (wIndex.min() < 0 or wIndex.max() >= len(wfms)):
+            raise error.UXGError(f'wIndex values must be between 0 and {len(wfms) - 1}.')
+
+        # Only download waveforms the PDWs actually use
+        used = np.unique(wIndex)
+        names = self.sync([wfms[i] for i in used], refresh)
+
+        wfmNames = list(dict.fromkeys(names))
+        entry = {name: i for i, name in enumerate(wfmNames)}
+        remap = np.zeros(len(wfms), dtype=np.int64)
+        remap[used] = [entry[name] for name in names]
+        newIndex = remap[wIndex]
+
+        if isinstance(pdws, pdwBuilder.PdwTable):
+            pdws = pdws[:]
+            pdws.wIndex[:] = newIndex
+        else:
+            pdws = [list(p) for p in pdws]
+            for p, i in zip(pdws, newIndex.tolist()):
+                p[position] = i
+
+        windex = {'fileName': windexName, 'wfmNames': wfmNames}
+        self.inst.csv_windex_file_download(windex)
+
+        return pdws, windex